@@ -19,6 +19,8 @@ class AutoPlayController:
         # ワークショップ/デモモード設定
         self.WORKSHOP_MODE = getattr(config, "WORKSHOP_MODE", False)
         self.WORKSHOP_MODE_INTERVAL_MS = getattr(config, "WORKSHOP_MODE_INTERVAL_SECONDS", 3) * 1000
+        # ワークショップモードで再生中に次のシナリオをプレイリストに追加する
+        self.WORKSHOP_PLAYLIST = getattr(config, "WORKSHOP_PLAYLIST", True)
 
     def on_user_interaction(self):
         """ユーザー操作があったことを記録"""
@@ -62,6 +64,28 @@ class AutoPlayController:
         
         return None
 
+    def next_for_playlist(self, is_playing, queued, select_mode):
+        """
+        ワークショップモードで、再生中にプレイリストへ追加する次のシナリオを選ぶ
+        （終了を待たずに次のシナリオを用意し、データを先読みさせる）
+        
+        Args:
+            is_playing: 再生中かどうか
+            queued: プレイリストで待機中のシナリオ数
+            select_mode: セレクトモード中かどうか
+        
+        Returns:
+            str | None: 追加すべきシナリオ番号、または None
+        """
+        if not (self.WORKSHOP_MODE and self.WORKSHOP_PLAYLIST) or not is_playing or queued or select_mode:
+            return None
+        if not self.random_scenarios:
+            return None
+        scenario = random.choice(self.random_scenarios)
+        print(f"[Workshop Mode] Next: {scenario}")
+        self.last_auto_play_time = time.ticks_ms()
+        return scenario
+
     def reset_autoplay_timer(self):
         """自動再生タイマーをリセット"""
         self.last_auto_play_time = time.ticks_ms()
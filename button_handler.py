@@ -1,5 +1,6 @@
 # button_handler.py
 import time
+from array import array
 
 class ButtonHandler:
     """ボタン入力処理を担当するクラス"""
@@ -17,18 +18,118 @@ class ButtonHandler:
         self.BUTTON_SHORT_PRESS_MS = getattr(config, "BUTTON_SHORT_PRESS_MS", 500)
         self.BUTTON_LONG_PRESS_MS = getattr(config, "BUTTON_LONG_PRESS_MS", 1000)
         self.BUTTON_DOUBLE_CLICK_INTERVAL_MS = getattr(config, "BUTTON_DOUBLE_CLICK_INTERVAL_MS", 500)
+        self.BUTTON_DEBOUNCE_MS = getattr(config, "BUTTON_DEBOUNCE_MS", 20)
+        # 再生中の短押しで次のシナリオに切り替える（False なら従来どおり停止）
+        self.PRESS_SWITCHES = getattr(config, "BUTTON_SWITCH_ON_PRESS", False) and getattr(config, "PLAYBACK_PREEMPT", True)
 
+        # 割り込みモード: 割り込みハンドラーがエッジ（時刻・レベル）をリングバッファに積み、
+        # update() はそれを取り出して判定するだけ（押下時間をミリ秒精度で測定、短い押下も取りこぼさない）
+        self.irq_mode = getattr(config, "BUTTON_IRQ_MODE", False)
+        queue_size = getattr(config, "BUTTON_EVENT_QUEUE_SIZE", 16)
+        self._edge_times = array('i', [0] * queue_size)
+        self._edge_levels = bytearray(queue_size)
+        self._edge_head = 0       # 割り込みハンドラーのみが更新
+        self._edge_tail = 0       # update() のみが更新
+        self.dropped_edges = 0    # バッファ満杯で捨てたエッジ数
+        self._last_edge_time = 0  # 最後に採用したエッジの時刻（チャタリング除去用）
+        self._irq_pin = None
+        self._wake_flag = None
+        # 割り込み内でバウンドメソッドを生成しないよう事前に保持
+        self._isr = self._on_edge
+
+    # ----------------------------------------------------------------------
+    # 割り込み処理
+    # ----------------------------------------------------------------------
+    def attach_irq(self, button, wake_flag=None):
+        """
+        ボタンの両エッジに割り込みハンドラーを登録
+
+        Args:
+            button: ボタンのPinオブジェクト
+            wake_flag: エッジ検出時に set() するフラグ（asyncio.ThreadSafeFlag など、オプション）
+
+        Returns:
+            bool: 登録できた場合True
+        """
+        if wake_flag is not None:
+            self._wake_flag = wake_flag
+        if self._irq_pin is button:
+            return True
+
+        try:
+            button.irq(trigger=button.IRQ_RISING | button.IRQ_FALLING, handler=self._isr)
+        except Exception as e:
+            print(f"[Warning] Button IRQ setup failed: {e}")
+            self.irq_mode = False
+            return False
+
+        self._irq_pin = button
+        # 登録直後のエッジもチャタリング除去で捨てないよう、基準時刻を除去時間分さかのぼる
+        self._last_edge_time = time.ticks_add(time.ticks_ms(), -self.BUTTON_DEBOUNCE_MS)
+        return True
+
+    def _on_edge(self, pin):
+        """割り込みハンドラー（メモリ確保なし）: エッジの時刻とレベルをリングバッファに積む"""
+        if self.irq_mode:
+            head = self._edge_head
+            next_head = (head + 1) % len(self._edge_times)
+            if next_head == self._edge_tail:
+                self.dropped_edges += 1
+            else:
+                self._edge_times[head] = time.ticks_ms()
+                self._edge_levels[head] = pin.value()
+                self._edge_head = next_head
+
+        if self._wake_flag is not None:
+            self._wake_flag.set()
+
+    def _pop_edge(self):
+        """
+        チャタリングを除去して次のエッジを取り出す
+
+        Returns:
+            tuple | None: (時刻, レベル)、採用できるエッジが無い場合None
+        """
+        while self._edge_tail != self._edge_head:
+            tail = self._edge_tail
+            t = self._edge_times[tail]
+            level = self._edge_levels[tail]
+            self._edge_tail = (tail + 1) % len(self._edge_times)
+
+            # 現在の状態と同じレベル、または直前のエッジから BUTTON_DEBOUNCE_MS 以内は読み捨て
+            if level == self.button_pressed:
+                continue
+            if time.ticks_diff(t, self._last_edge_time) < self.BUTTON_DEBOUNCE_MS:
+                continue
+
+            self._last_edge_time = t
+            return (t, level)
+        return None
+
+    def is_idle(self):
+        """押下中・クリック判定中・未処理のエッジがなければTrue（割り込み待ちで眠ってよい）"""
+        return not self.button_pressed and self.click_count == 0 and self._edge_tail == self._edge_head
+
+    # ----------------------------------------------------------------------
+    # イベント判定
+    # ----------------------------------------------------------------------
     def update(self, button, select_mode, is_playing):
         """
         ボタン状態を更新し、検出されたイベントを返す
+        割り込みモードでは、溜まったエッジを1つのイベントが検出されるまで取り出して判定する
         
         戻り値:
             dict: {
-                'event': 'short_press' | 'long_press' | 'select_click' | 'select_confirm' | 'stop' | None,
+                'event': 'short_press' | 'long_press' | 'select_click' | 'select_confirm' | 'switch' | 'stop' | None,
                 'press_duration': int (ms),
                 'timestamp': int (ms)
             }
         """
+        if self.irq_mode and self._irq_pin is not button:
+            self.attach_irq(button)
+        if self.irq_mode:
+            return self._update_from_edges(button, select_mode, is_playing)
+
         now = time.ticks_ms()
         current_state = button.value()  # 押下:1, 離:0 の想定
         event = None
@@ -36,36 +137,15 @@ class ButtonHandler:
 
         # 押下開始
         if current_state == 1 and not self.button_pressed:
-            self.button_pressed = True
-            self.press_time = now
-            self.last_press_time = now
+            self._on_press(now)
 
         # 長押し検出（通常モード → セレクトモード）
         elif current_state == 1 and self.button_pressed:
-            press_duration = time.ticks_diff(now, self.press_time)
-            if press_duration >= self.BUTTON_LONG_PRESS_MS and not select_mode and not is_playing:
-                event = 'enter_select_mode'
+            event, press_duration = self._check_hold(now, select_mode, is_playing)
 
         # 離した瞬間
         elif current_state == 0 and self.button_pressed:
-            self.button_pressed = False
-            self.release_time = now
-            press_duration = time.ticks_diff(now, self.press_time)
-
-            if select_mode:
-                # セレクトモード内の短押し・長押し判定
-                if press_duration < self.BUTTON_SHORT_PRESS_MS:
-                    self.click_count += 1
-                    self.last_click_time = now
-                    event = 'select_click'
-                elif press_duration >= self.BUTTON_LONG_PRESS_MS:
-                    event = 'select_confirm'
-            else:
-                # 通常モードの短押しによるランダム再生
-                if press_duration < self.BUTTON_SHORT_PRESS_MS and not is_playing:
-                    event = 'short_press'
-                elif is_playing:
-                    event = 'stop'
+            event, press_duration = self._on_release(now, select_mode, is_playing)
 
         return {
             'event': event,
@@ -73,6 +153,76 @@ class ButtonHandler:
             'timestamp': now
         }
 
+    def _update_from_edges(self, button, select_mode, is_playing):
+        """割り込みモードの update(): キューのエッジからイベントを判定"""
+        while True:
+            edge = self._pop_edge()
+            if edge is None:
+                break
+            t, level = edge
+            if level:
+                self._on_press(t)
+            else:
+                event, press_duration = self._on_release(t, select_mode, is_playing)
+                if event:
+                    return {'event': event, 'press_duration': press_duration, 'timestamp': t}
+
+        now = time.ticks_ms()
+
+        # チャタリング除去で読み捨てた最後のエッジを補う（ピンの状態と食い違ったままにしない）
+        if (button.value() != self.button_pressed
+                and time.ticks_diff(now, self._last_edge_time) >= self.BUTTON_DEBOUNCE_MS):
+            self._last_edge_time = now
+            if self.button_pressed:
+                event, press_duration = self._on_release(now, select_mode, is_playing)
+                return {'event': event, 'press_duration': press_duration, 'timestamp': now}
+            self._on_press(now)
+
+        event = None
+        press_duration = 0
+        if self.button_pressed:
+            event, press_duration = self._check_hold(now, select_mode, is_playing)
+        return {'event': event, 'press_duration': press_duration, 'timestamp': now}
+
+    def _on_press(self, t):
+        """押下開始"""
+        self.button_pressed = True
+        self.press_time = t
+        self.last_press_time = t
+
+    def _check_hold(self, now, select_mode, is_playing):
+        """押し続けている間の長押し判定（通常モード → セレクトモード）"""
+        press_duration = time.ticks_diff(now, self.press_time)
+        if press_duration >= self.BUTTON_LONG_PRESS_MS and not select_mode and not is_playing:
+            return 'enter_select_mode', press_duration
+        return None, press_duration
+
+    def _on_release(self, t, select_mode, is_playing):
+        """離した瞬間の判定"""
+        self.button_pressed = False
+        self.release_time = t
+        press_duration = time.ticks_diff(t, self.press_time)
+        event = None
+
+        if select_mode:
+            # セレクトモード内の短押し・長押し判定
+            if press_duration < self.BUTTON_SHORT_PRESS_MS:
+                self.click_count += 1
+                self.last_click_time = t
+                event = 'select_click'
+            elif press_duration >= self.BUTTON_LONG_PRESS_MS:
+                event = 'select_confirm'
+        else:
+            # 通常モードの短押しによるランダム再生（再生中は停止。BUTTON_SWITCH_ON_PRESS なら短押しで切り替え）
+            if press_duration < self.BUTTON_SHORT_PRESS_MS and not is_playing:
+                event = 'short_press'
+            elif press_duration < self.BUTTON_SHORT_PRESS_MS and self.PRESS_SWITCHES:
+                event = 'switch'
+            elif is_playing:
+                event = 'stop'
+
+        return event, press_duration
+
     def get_selection_change(self):
         """
         セレクトモード内のクリック連打を検出し、選択変更を返す
@@ -100,3 +250,4 @@ class ButtonHandler:
         """ボタン状態をリセット"""
         self.button_pressed = False
         self.click_count = 0
+        self._edge_tail = self._edge_head
@@ -89,6 +89,29 @@ def wait_with_stop_check(duration_ms, stop_flag_ref, check_interval_ms=50):
     
     return True
 
+def wait_until(deadline_ms, stop_flag_ref, check_interval_ms=50):
+    """
+    停止フラグを監視しながら、絶対時刻（time.ticks_ms() の値）まで待機します。
+    呼び出しまでにかかった処理時間は待機時間から差し引かれるため、
+    wait_with_stop_check() と異なり連続して使っても遅れが累積しません。
+    
+    Args:
+        deadline_ms: 待機終了時刻（time.ticks_ms() / ticks_add() の値）
+        stop_flag_ref: 停止フラグのリスト参照 [bool]
+        check_interval_ms: フラグチェック間隔（ミリ秒）
+    
+    Returns:
+        期限に達した場合True（既に過ぎている場合も含む）、中断された場合False
+    """
+    while True:
+        remaining = time.ticks_diff(deadline_ms, time.ticks_ms())
+        if remaining <= 0:
+            return True
+        if check_stop_flag(stop_flag_ref):
+            print("[Info] Wait interrupted by stop_flag")
+            return False
+        time.sleep_ms(min(remaining, check_interval_ms))
+
 def safe_call(func, *args, error_context="", **kwargs):
     """
     エラーハンドリング付きで関数を呼び出します。
@@ -65,6 +65,17 @@ DFPLAYER_TX_PIN = 12
 DFPLAYER_RX_PIN = 13
 DFPLAYER_BUSY_PIN = 14
 DFPLAYER_DEFAULT_VOLUME = 5  # デフォルト音量
+# コマンドの送信キュー（シナリオはキューに追加して待たずに戻り、メインループが間隔を空けて送信）
+DFPLAYER_COMMAND_INTERVAL_MS = 30   # コマンドの最小送信間隔（ms）
+DFPLAYER_QUEUE_SIZE = 8             # 送信キューの上限（超えた場合は最も古いコマンドを破棄）
+DFPLAYER_ACK = True                 # コマンドごとに ACK を要求し、受信するまで次を送信しない
+DFPLAYER_ACK_TIMEOUT_MS = 200       # ACK を待つ最大時間（ms）
+DFPLAYER_BOOT_MS = 1000             # 起動直後に送信を待つ時間（ms、初期化完了の通知を受信したら待たない）
+DFPLAYER_SERVICE_INTERVAL_MS = 10   # 非同期モードで送信キュー・受信を処理する間隔（ms）
+DFPLAYER_VOLUME_INTERVAL_MS = 100   # 音量コマンドの最小送信間隔（ms、間の変更は最新の値のみ送信）
+# 再生終了待ち（sound の wait_end コマンド）。DFPLAYER_BUSY_PIN = None の場合は再生終了イベントで判定
+DFPLAYER_START_TIMEOUT_MS = 500     # 再生コマンドの送信から BUSY が LOW になるまでの最大時間（ms）
+DFPLAYER_WAIT_END_TIMEOUT_MS = 300000  # wait_end の既定の最大待ち時間（ms）
 
 # I2C (OLEDディスプレイ用)
 I2C_ID = 0
@@ -105,8 +116,10 @@ PWM_LED_PINS = [1, 2, 3, 4]
 PWM_LED_FREQUENCY = 1000
 # PWM最大デューティ比 (16bit PWM: 0-65535)
 PWM_LED_MAX_DUTY = 65535
-# フェード処理のステップ間隔 (ms)
-PWM_FADE_STEP_INTERVAL_MS = 10
+# フェードエンジンの更新間隔 (ms) - PWM LED・NeoPixelの全フェードをこの周期でまとめて更新
+FADE_ENGINE_INTERVAL_MS = 10
+# 同時に実行できるフェード数（PWM LED・NeoPixelのLED群の合計）
+FADE_ENGINE_MAX_FADES = 16
 # 待機処理のチェック間隔 (ms)
 PWM_WAIT_CHECK_INTERVAL_MS = 50
 # ガンマ補正値 (人間の視覚特性に合わせた輝度補正)
@@ -165,11 +178,48 @@ VOLUME_POLL_INTERVAL_MS = 100
 # ----------------------------------------------------------------
 # メインループのポーリング間隔 (ms)
 MAIN_LOOP_POLLING_MS = 50
+# 非同期モード（asyncio のイベントループでメインループを実行）
+# True: ボリューム・ボタン・自動再生・GCを個別の周期で動くタスクとして実行し、
+#       シナリオ再生もスレッドではなくイベントループ上のコルーチンとして実行
+#       （ボタンは押下割り込みで起床するため、待機中の無駄な起床がなく応答も速い）
+# False: 従来通り MAIN_LOOP_POLLING_MS ごとにすべてをポーリング（再生は別スレッド）
+# asyncio が使えないファームウェアでは自動的に従来のループで動作します
+MAIN_LOOP_ASYNC = True
+# 非同期モードでのボタンの更新間隔 (ms) - 押下中・クリック判定中のみ使用
+BUTTON_POLL_MS = 10
+# ポーリングループでシナリオを再生するワーカースレッド（core1）が次の要求を確認する間隔 (ms)
+PLAYBACK_WORKER_POLL_MS = 5
+# 再生中に別のシナリオの再生要求があった場合、現在のシナリオを中断して切り替える（False: 要求を無視）
+PLAYBACK_PREEMPT = True
+# 切り替え時に中断したシナリオの終了を待つ最大時間 (ms)。超えた場合も後始末をして切り替える
+PLAYBACK_SWITCH_TIMEOUT_MS = 80
+# 非同期モードでのアイドル自動再生チェック間隔 (ms)
+AUTOPLAY_CHECK_INTERVAL_MS = 500
 # アイドル状態に移行するまでの無操作時間 (ms)
 IDLE_TIMEOUT_MS = 300000
 # アイドル状態での自動再生間隔 (秒)
 AUTO_PLAY_INTERVAL_SECONDS = 60
 
+# シナリオ実行設定
+# ----------------------------------------------------------------
+# 起動時にscenarios.jsonの各シナリオを命令列（バイトコード）へ事前コンパイルする
+# True: 再生時のコマンド解析・バリデーションを省略（推奨）
+# False: 従来通りJSONの辞書/リストを再生のたびに解釈実行
+SCENARIO_PRECOMPILE = True
+# scenarios.jsonをインデックスモードで読み込む
+# True: 起動時はキーとバイト範囲のインデックス（scenarios.idx）のみ読み込み、
+#       各シナリオは再生開始時にその範囲だけを読み込む（RAM使用量・起動時間を削減）
+# False: 起動時にscenarios.json全体を読み込んで常駐させる
+# インデックスは初回起動時に自動作成されます（ホストで `python scenario_index.py` でも作成可）
+SCENARIO_LAZY_LOAD = True
+# タイムラインモード（シナリオ開始時刻を基準にした絶対時刻でコマンドを実行）
+# True: 各コマンドの開始時刻をシナリオ開始からのオフセットとして事前計算し、
+#       delay/wait_msはその時刻まで待機する（処理時間の遅れが累積せず、音声と同期しやすい）
+# False: 従来どおり各delay/wait_msを「実行時点から○ms」待機する
+SCENARIO_TIMELINE = True
+# タイムラインモードで、この時間（ms）を超えて遅れて開始したコマンドを警告表示する
+TIMELINE_LATE_WARN_MS = 20
+
 # ワークショップ/デモモード設定
 # ----------------------------------------------------------------
 # 勉強会やデモ展示用の連続再生モード
@@ -177,7 +227,21 @@ AUTO_PLAY_INTERVAL_SECONDS = 60
 # False: 通常動作（アイドルタイムアウト後に自動再生）
 WORKSHOP_MODE = True
 # ワークショップモードでのシナリオ間の待機時間 (秒)
+# WORKSHOP_PLAYLIST = True の場合は最初の再生と停止後の再開までの時間（連続再生中の間隔は PLAYLIST_GAP_MS）
 WORKSHOP_MODE_INTERVAL_SECONDS = 3
+# ワークショップモードで再生中に次のシナリオをプレイリストに追加し、終了後すぐに開始する
+WORKSHOP_PLAYLIST = True
+
+# プレイリスト設定
+# ----------------------------------------------------------------
+# プレイリストに追加できるシナリオ数の上限
+PLAYLIST_SIZE = 8
+# プレイリストのシナリオ間の間隔 (ms)。0 の場合は前のシナリオの終了後すぐに開始
+PLAYLIST_GAP_MS = 0
+# 再生中にプレイリストの次のシナリオを読み込み・コンパイルしておく
+PLAYLIST_PREFETCH = True
+# 非同期モードでプレイリストを確認する間隔 (ms)
+PLAYLIST_CHECK_INTERVAL_MS = 20
 
 # ボタン操作の閾値設定 (ms)
 # ----------------------------------------------------------------
@@ -187,6 +251,17 @@ BUTTON_SHORT_PRESS_MS = 500
 BUTTON_LONG_PRESS_MS = 1000
 # ダブルクリック判定の最大間隔
 BUTTON_DOUBLE_CLICK_INTERVAL_MS = 500
+# 割り込みモード（ボタンのエッジを割り込みで記録し、時刻をミリ秒精度で判定）
+# True: 短い押下も取りこぼさず、押下時間がループ周期に丸められない（推奨）
+# False: 従来通りメインループごとに button.value() を読み取る
+BUTTON_IRQ_MODE = True
+# チャタリング除去時間 (ms) - 直前のエッジからこの時間内のエッジは無視
+BUTTON_DEBOUNCE_MS = 20
+# 割り込みで記録するエッジのバッファサイズ（満杯時は新しいエッジを破棄）
+BUTTON_EVENT_QUEUE_SIZE = 16
+# 再生中の短押しで別のランダムシナリオに切り替える（PLAYBACK_PREEMPT が必要）
+# False: 再生中はボタンを押すと停止（従来通り）
+BUTTON_SWITCH_ON_PRESS = False
 
 # エラーハンドリング設定 (ms)
 # ----------------------------------------------------------------
@@ -242,8 +317,13 @@ ONBOARD_LED_OFF_TIME_MS = 200
 OLED_LINE_HEIGHT = 10
 # 最大表示行数
 OLED_MAX_LINES = 4
-# I2Cタイムアウト時のリトライ回数
+# I2Cタイムアウト時のリトライ回数（起動時の oled_patterns.push_message() のみ）
 OLED_I2C_RETRY_COUNT = 1
+# 表示の最小間隔 (ms)。この間に届いたメッセージは最新のものだけを表示
+DISPLAY_FRAME_INTERVAL_MS = 50
+# I2Cエラー時の再試行間隔 (ms)。失敗するたびに2倍にし、DISPLAY_RETRY_MAX_MS で打ち止め
+DISPLAY_RETRY_MS = 100
+DISPLAY_RETRY_MAX_MS = 5000
 
 # ステッピングモーターのGPIOピン設定
 STEPPER_MOTOR_CONFIG = {
@@ -252,3 +332,21 @@ STEPPER_MOTOR_CONFIG = {
     'BIN1': 11,   # BOUT1
     'BIN2': 15    # BOUT2
 }
+# machine.Timer のコールバックでステップを出力（μs単位の間隔、回転中も再生スレッドを占有しない）
+# False の場合は再生スレッド内で1ステップごとに待機（1ms単位、最大1000ステップ/秒）
+STEPPER_TIMER_MODE = True
+# 使用するタイマーID（RP2040 は -1 = ソフトウェアタイマー）
+STEPPER_TIMER_ID = -1
+# 加減速プロファイル: 'trapezoid'（台形: 一定加速度）または 's_curve'（S字: 加速度がなめらかに変化）
+STEPPER_PROFILE = 'trapezoid'
+# 最高速度（steps/s、速度指定がこれより速い場合は制限。タイマー駆動時のみ1000超が有効）
+STEPPER_MAX_SPEED = 2000
+# 加速度（steps/s²、S字では加速区間での最大値）
+STEPPER_ACCELERATION = 10000
+# 開始速度（steps/s、ここから最高速度まで加速し、同じ速度まで減速して止まる）
+STEPPER_START_SPEED = 200
+# 加減速テーブルのキャッシュ数（ステップ数・速度・加速度が同じ移動はテーブルを再利用）
+STEPPER_PROFILE_CACHE_SIZE = 8
+# コイル出力: 'auto'（RP2040/RP2350 では 'sio'）、'sio'（SIO レジスタへの1回の書き込みで4本同時に切り替え）、
+# 'pin'（ピンごとの Pin.value()、4本の切り替えに時間差がある）
+STEPPER_COIL_OUTPUT = 'auto'
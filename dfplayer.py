@@ -0,0 +1,303 @@
+# dfplayer.py
+# DFPlayer Mini のシリアルプロトコルドライバ
+#
+# 送信コマンドは上限つきのキューに入れ、DFPlayer が処理できる間隔（DFPLAYER_COMMAND_INTERVAL_MS）で
+# 1つずつ送信します。受信したフレームは ACK・再生終了・エラーなどのイベントとして解析します。
+# send() は待機せずに戻るため、シナリオのスレッドやタスクが UART の送信で止まることはありません。
+# キューの送信と受信の解析は service() で行います（メインループから定期的に呼び出す）。
+# 音量はキューに入れず最新の目標値のみを保持し、DFPLAYER_VOLUME_INTERVAL_MS 以上の間隔で送信します。
+
+import _thread
+import utime
+
+# フレーム: 7E FF 06 CMD FEEDBACK PARAM_H PARAM_L CHECKSUM_H CHECKSUM_L EF
+FRAME_START = 0x7E
+FRAME_VERSION = 0xFF
+FRAME_LENGTH = 0x06
+FRAME_END = 0xEF
+FRAME_SIZE = 10
+
+# 送信コマンド
+CMD_PLAY_TRACK = 0x03
+CMD_SET_VOLUME = 0x06
+CMD_PLAY_FOLDER = 0x0F
+CMD_STOP = 0x16
+
+# 受信イベント
+EVT_CARD_INSERTED = 0x3A
+EVT_CARD_REMOVED = 0x3B
+EVT_USB_FINISHED = 0x3C
+EVT_SD_FINISHED = 0x3D
+EVT_FLASH_FINISHED = 0x3E
+EVT_INIT_DONE = 0x3F
+EVT_ERROR = 0x40
+EVT_ACK = 0x41
+
+_FINISHED_EVENTS = (EVT_USB_FINISHED, EVT_SD_FINISHED, EVT_FLASH_FINISHED)
+
+# エラーイベント（0x40）のパラメータ
+ERROR_NAMES = {
+    0x01: 'busy',
+    0x02: 'sleeping',
+    0x03: 'serial error',
+    0x04: 'checksum error',
+    0x05: 'track out of range',
+    0x06: 'track not found',
+    0x07: 'insertion error',
+    0x08: 'card read failed',
+    0x0A: 'entered sleep',
+}
+
+
+def checksum(cmd, feedback, param_h, param_l):
+    """フレームのチェックサム（バージョン〜パラメータの合計の2の補数、16ビット）"""
+    return -(FRAME_VERSION + FRAME_LENGTH + cmd + feedback + param_h + param_l) & 0xFFFF
+
+
+def build_frame(cmd, param=0, feedback=False):
+    """
+    送信フレームを作成します。
+
+    Args:
+        cmd: コマンド番号
+        param: パラメータ（16ビット）
+        feedback: True の場合、DFPlayer に ACK の返信を要求する
+
+    Returns:
+        bytes: 10バイトのフレーム
+    """
+    fb = 1 if feedback else 0
+    param_h = (param >> 8) & 0xFF
+    param_l = param & 0xFF
+    cs = checksum(cmd, fb, param_h, param_l)
+    return bytes((FRAME_START, FRAME_VERSION, FRAME_LENGTH, cmd, fb, param_h, param_l, cs >> 8, cs & 0xFF, FRAME_END))
+
+
+class FrameParser:
+    """
+    受信バイト列からフレームを取り出すパーサー
+
+    フレームは複数回の read() にまたがって届くことがあるため、未完成の分はバッファに残します。
+    開始・終了バイトやチェックサムが合わないデータは1バイトずつ読み飛ばして同期を取り直します。
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self.bad_frames = 0
+
+    def feed(self, data):
+        """
+        受信データを追加し、完成したフレームを返します。
+
+        Args:
+            data: 受信したバイト列
+
+        Returns:
+            list: (コマンド, パラメータ) のリスト
+        """
+        buf = self._buf
+        buf.extend(data)
+        frames = []
+        while len(buf) >= FRAME_SIZE:
+            if buf[0] != FRAME_START:
+                del buf[0]
+                continue
+            if (buf[1] != FRAME_VERSION or buf[2] != FRAME_LENGTH or buf[9] != FRAME_END
+                    or (buf[7] << 8 | buf[8]) != checksum(buf[3], buf[4], buf[5], buf[6])):
+                self.bad_frames += 1
+                del buf[0]
+                continue
+            frames.append((buf[3], buf[5] << 8 | buf[6]))
+            del buf[:FRAME_SIZE]
+        return frames
+
+
+class DFPlayer:
+    """
+    DFPlayer Mini ドライバ（送信キューとイベントの解析）
+
+    ACK を要求したコマンドは、ACK（またはエラー）を受信するか ack_timeout_ms が経過するまで
+    次のコマンドを送信しません。起動直後は boot_ms が経過するか初期化完了イベントを受信するまで
+    送信を待ちます。
+    """
+
+    def __init__(self, uart, interval_ms=30, queue_size=8, ack=True, ack_timeout_ms=200, boot_ms=0, volume_interval_ms=100):
+        """
+        Args:
+            uart: machine.UART（write/any/read）
+            interval_ms: コマンドの最小送信間隔（ms）
+            queue_size: 送信キューの上限（超えた場合は最も古いコマンドを破棄）
+            ack: コマンドごとに ACK を要求する
+            ack_timeout_ms: ACK を待つ最大時間（ms）
+            boot_ms: 起動直後に送信を待つ時間（ms）
+            volume_interval_ms: 音量コマンドの最小送信間隔（ms）
+        """
+        self.uart = uart
+        self.interval_ms = interval_ms
+        self.queue_size = queue_size
+        self.ack = ack
+        self.ack_timeout_ms = ack_timeout_ms
+        self._queue = []
+        self._lock = _thread.allocate_lock()
+        self._parser = FrameParser()
+        self._next_send = utime.ticks_add(utime.ticks_ms(), boot_ms)
+        self._awaiting = None     # ACK 待ちのコマンド番号
+        self._sent_at = 0
+
+        # 音量（最新の目標値のみ保持）
+        self.volume_interval_ms = volume_interval_ms
+        self._volume_target = None
+        self._volume_sent = None
+        self._volume_next = self._next_send
+
+        # イベント・統計
+        self.playing = False
+        self.play_sent_at = None  # 最後に再生コマンドを送信した時刻（ms）
+        self.finished_count = 0
+        self.last_finished = None
+        self.last_error = None
+        self.error_count = 0
+        self.sent = 0
+        self.acked = 0
+        self.ack_timeouts = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def send(self, cmd, param=0):
+        """
+        コマンドを送信キューに追加します（待機しない）。送信できる状態であればすぐに送信します。
+
+        Args:
+            cmd: コマンド番号
+            param: パラメータ（16ビット）
+
+        Returns:
+            bool: キューが一杯で古いコマンドを破棄した場合は False
+        """
+        with self._lock:
+            self._queue.append((cmd, param))
+            ok = True
+            if len(self._queue) > self.queue_size:
+                del self._queue[0]
+                self.dropped += 1
+                ok = False
+        self.service()
+        return ok
+
+    def set_volume(self, volume):
+        """
+        音量の目標値を設定します（待機しない）。
+
+        ノブを回している間のように短い間隔で呼ばれた場合は最新の値のみを保持し、
+        前回の音量コマンドから volume_interval_ms が経過してから送信します（最後の値は必ず送信される）。
+
+        Args:
+            volume: 音量（0〜30）
+        """
+        if self._volume_target is not None and self._volume_target != self._volume_sent:
+            self.coalesced += 1
+        self._volume_target = volume
+        self.service()
+
+    def pending(self):
+        """送信待ちのコマンド数"""
+        return len(self._queue)
+
+    def pending_play(self):
+        """送信待ちの再生コマンドがあるか"""
+        with self._lock:
+            for cmd, param in self._queue:
+                if cmd == CMD_PLAY_TRACK or cmd == CMD_PLAY_FOLDER:
+                    return True
+        return False
+
+    def clear(self):
+        """送信待ちのコマンドを破棄"""
+        with self._lock:
+            self._queue.clear()
+
+    def service(self, now=None):
+        """
+        受信フレームを解析し、送信できる状態であればキューの先頭のコマンドを1つ送信します。
+
+        Args:
+            now: 現在時刻（ms、省略時は utime.ticks_ms()）
+        """
+        with self._lock:
+            if now is None:
+                now = utime.ticks_ms()
+            self._receive(now)
+
+            if self._awaiting is not None:
+                if utime.ticks_diff(now, self._sent_at) < self.ack_timeout_ms:
+                    return
+                self.ack_timeouts += 1
+                self._awaiting = None
+
+            if utime.ticks_diff(now, self._next_send) < 0:
+                return
+            volume = self._volume_target
+            if volume is not None and volume != self._volume_sent and utime.ticks_diff(now, self._volume_next) >= 0:
+                # 音量は送信キューより優先（起動音も設定した音量で再生される）
+                cmd, param = CMD_SET_VOLUME, volume
+                self._volume_sent = volume
+                self._volume_next = utime.ticks_add(now, self.volume_interval_ms)
+            elif self._queue:
+                cmd, param = self._queue.pop(0)
+            else:
+                return
+            self.uart.write(build_frame(cmd, param, self.ack))
+            self.sent += 1
+            self._sent_at = now
+            self._next_send = utime.ticks_add(now, self.interval_ms)
+            if self.ack:
+                self._awaiting = cmd
+            if cmd in (CMD_PLAY_TRACK, CMD_PLAY_FOLDER):
+                self.playing = True
+                self.play_sent_at = now
+            elif cmd == CMD_STOP:
+                self.playing = False
+
+    def _receive(self, now):
+        """UART の受信データを読み込み、イベントを処理"""
+        if not self.uart.any():
+            return
+        data = self.uart.read()
+        if not data:
+            return
+        for cmd, param in self._parser.feed(data):
+            self._on_frame(cmd, param, now)
+
+    def _on_frame(self, cmd, param, now):
+        """受信フレーム1つを処理"""
+        if cmd == EVT_ACK:
+            self.acked += 1
+            self._awaiting = None
+        elif cmd == EVT_ERROR:
+            self.error_count += 1
+            self.last_error = param
+            self._awaiting = None
+            self.playing = False
+            print(f"[Warning] DFPlayer error: {ERROR_NAMES.get(param, param)}")
+        elif cmd in _FINISHED_EVENTS:
+            self.finished_count += 1
+            self.last_finished = param
+            self.playing = False
+        elif cmd == EVT_INIT_DONE:
+            # 起動完了の通知を受信したら待たずに送信を始める
+            self._next_send = now
+        elif cmd == EVT_CARD_REMOVED:
+            print("[Warning] DFPlayer: SDカードが取り外されました")
+
+    def get_stats(self):
+        """送信・受信の統計"""
+        return {
+            'sent': self.sent,
+            'acked': self.acked,
+            'ack_timeouts': self.ack_timeouts,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'errors': self.error_count,
+            'finished': self.finished_count,
+            'pending': len(self._queue),
+        }
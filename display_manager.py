@@ -4,26 +4,132 @@ Simple display manager wrapper around `oled_patterns`.
 Provides a minimal facade so the main program can call `push_message`
 without depending directly on the lower-level module. This keeps
 main.py tidy and centralizes error handling for OLED operations.
+
+`push_message` never touches the I2C bus: it stores the message in a
+single-slot mailbox (a newer message replaces one that has not been shown
+yet) and returns, so it is safe to call from the main loop, the playback
+thread and error paths. `service()` is called periodically by the main
+loop (or its display task) and renders the latest message at most once
+per `DISPLAY_FRAME_INTERVAL_MS`. I2C errors are retried there with an
+exponential backoff, re-initializing the OLED before each retry.
 """
 
+import time
+import _thread
+
+
 class DisplayManager:
-    def __init__(self, oled_patterns):
+    def __init__(self, oled_patterns, config=None):
+        """
+        Args:
+            oled_patterns: the `oled_patterns` module (or an object with the same API)
+            config: settings module (optional)
+        """
         self.oled = oled_patterns
         self.last_message = None
+        self.frame_interval_ms = getattr(config, 'DISPLAY_FRAME_INTERVAL_MS', 50) if config else 50
+        self.retry_ms = getattr(config, 'DISPLAY_RETRY_MS', 100) if config else 100
+        self.retry_max_ms = getattr(config, 'DISPLAY_RETRY_MAX_MS', 5000) if config else 5000
+
+        self._pending = None
+        self._lock = _thread.allocate_lock()
+        self._next_frame = time.ticks_ms()
+        self._backoff_ms = 0  # 0 while the display is healthy
+
+        # Statistics
+        self.frames = 0
+        self.replaced = 0
+        self.errors = 0
+        self.retries = 0
 
     def push_message(self, messages):
-        """Push a message to the OLED. `messages` can be a string or list of strings.
+        """Queue a message for the OLED. `messages` can be a string or list of strings.
 
-        This method swallows OLED errors and logs a warning so the main loop
-        keeps running if the display fails.
+        Returns immediately; the message is shown by the next `service()`
+        call. A message equal to the one last pushed is ignored, and a
+        message still waiting to be shown is replaced by the new one.
         """
         try:
             # Normalize single string to list for convenience
             if isinstance(messages, str):
                 msgs = [messages]
             else:
-                msgs = messages
-            self.oled.push_message(msgs)
-            self.last_message = msgs
+                msgs = list(messages)
         except Exception as e:
             print(f"Warning: OLED push failed: {e}")
+            return
+        with self._lock:
+            if msgs == self.last_message:
+                return  # 表示中（または表示待ち）と同じ内容
+            if self._pending is not None:
+                self.replaced += 1
+            self._pending = msgs
+            self.last_message = msgs
+
+    def pending(self):
+        """Return True if a message is waiting to be shown."""
+        return self._pending is not None
+
+    def service(self, now=None):
+        """Show the waiting message if the frame interval (or retry backoff) has elapsed.
+
+        The lock is released before drawing, so `push_message` from another
+        thread never waits for the I2C transfer. OLED errors are swallowed
+        and logged so the main loop keeps running if the display fails.
+
+        Args:
+            now: current time in ms (defaults to time.ticks_ms())
+
+        Returns:
+            bool: True if a frame was attempted
+        """
+        with self._lock:
+            msgs = self._pending
+            if msgs is None:
+                return False
+            if now is None:
+                now = time.ticks_ms()
+            if time.ticks_diff(now, self._next_frame) < 0:
+                return False
+            self._pending = None
+        self._show(msgs, now)
+        return True
+
+    def flush(self):
+        """Show the waiting message now, ignoring the frame interval (used during boot)."""
+        self._next_frame = time.ticks_ms()
+        return self.service()
+
+    def _show(self, msgs, now):
+        """Draw one frame; on failure keep the message and schedule a retry with backoff."""
+        try:
+            if self._backoff_ms:
+                # 前回失敗している場合は再初期化してから再試行
+                self.retries += 1
+                self.oled.init_oled()
+                if not self.oled.is_oled_available():
+                    raise OSError("OLED re-initialization failed")
+            self.oled.show_message(msgs)
+            if self._backoff_ms:
+                print("OLED: I2C通信が回復し、メッセージを表示しました。")
+            self._backoff_ms = 0
+            self.frames += 1
+            self._next_frame = time.ticks_add(now, self.frame_interval_ms)
+        except Exception as e:
+            self.errors += 1
+            self._backoff_ms = min(self._backoff_ms * 2, self.retry_max_ms) if self._backoff_ms else self.retry_ms
+            self._next_frame = time.ticks_add(now, self._backoff_ms)
+            with self._lock:
+                if self._pending is None:
+                    self._pending = msgs  # 新しいメッセージがなければ同じ内容を再試行
+            print(f"Warning: OLED update failed, retrying in {self._backoff_ms}ms: {e}")
+
+    def get_stats(self):
+        """Return display statistics."""
+        return {
+            'frames': self.frames,
+            'replaced': self.replaced,
+            'errors': self.errors,
+            'retries': self.retries,
+            'backoff_ms': self._backoff_ms,
+        }
@@ -3,12 +3,15 @@
 
 import config
 import time
+from array import array
 
 import sound_patterns
 from stepper_motor import StepperMotor
 
 # コマンドハンドラーをインポート
 import command_parser
+import scenario_compiler
+import step_scheduler
 import servo_command_handler
 import led_command_handler
 import pwm_led_command_handler
@@ -18,9 +21,22 @@ import sound_command_handler
 # motor変数をモジュールレベルで初期化
 motor = None 
 
+# 直近のタイムライン実行の遅れ集計（_report_timeline() が更新）
+last_timeline_report = None
+
+# コマンドタイプ → ハンドラー関数 handler(cmd, stop_flag_ref) のディスパッチテーブル
+# init() で構築され、各ハンドラーモジュールの register() が自身を登録する
+_handlers = {}
+_builtin_handlers_registered = False
+
+# 周辺機器名 → 後始末関数 cleanup() のテーブル（シナリオの切り替え時に cleanup_peripherals() が呼ぶ）
+_cleanups = {}
+
 def init():
-    """モジュール初期化：モーターなどの外部デバイスを安全に初期化"""
+    """モジュール初期化：ディスパッチテーブルを構築し、モーターなどの外部デバイスを安全に初期化"""
     global motor
+    _register_builtin_handlers()
+
     try:
         motor = StepperMotor(debug=True)
         print("[Init] StepperMotor 初期化完了")
@@ -36,11 +52,92 @@ def init():
         sys.print_exception(e)
         motor = None
 
+def register_handler(cmd_type, handler):
+    """
+    コマンドタイプに対応するハンドラーをディスパッチテーブルに登録します。
+    登録済みのコマンドタイプは上書きされます（init() 後に呼ぶと標準ハンドラーも置き換え可能）。
+    
+    Args:
+        cmd_type: コマンドタイプ文字列（'led', 'servo' など）
+        handler: handler(cmd, stop_flag_ref) 形式の関数
+    """
+    _handlers[cmd_type] = handler
+
+def register_cleanup(name, cleanup):
+    """
+    シナリオの切り替え時に呼ぶ周辺機器の後始末を登録します（登録済みの名前は上書き）。
+    
+    Args:
+        name: 周辺機器名（'led', 'servo' など）
+        cleanup: 引数なしの関数（消灯・停止・通電解除など）
+    """
+    _cleanups[name] = cleanup
+
+def cleanup_peripherals():
+    """
+    登録済みの全周辺機器の後始末を実行します（中断したシナリオの出力を残さない）。
+    1つの後始末が失敗しても残りは実行します。
+    """
+    if not _builtin_handlers_registered:
+        _register_builtin_handlers()
+    for name, cleanup in _cleanups.items():
+        command_parser.safe_call(cleanup, error_context=f"{name} cleanup")
+
+def _stop_sound():
+    """再生中（または再生コマンドの送信待ち）の場合のみ音声を停止"""
+    if sound_patterns.is_playing():
+        sound_patterns.stop_playback()
+
+def _register_builtin_handlers():
+    """標準のコマンドハンドラーをディスパッチテーブルに登録"""
+    global _builtin_handlers_registered
+    servo_command_handler.register(register_handler)
+    led_command_handler.register(register_handler)
+    pwm_led_command_handler.register(register_handler)
+    sound_command_handler.register(register_handler)
+
+    # effects.py 内で処理するコマンド
+    register_handler('motor', _handle_motor)
+    register_handler('delay', _handle_delay)
+    register_handler('wait_ms', _handle_wait_ms)
+    register_handler('stop_playback', _handle_stop_playback)
+    register_handler('effect', _handle_effect)
+
+    # シナリオの切り替え時の後始末
+    register_cleanup('led', lambda: led_command_handler.off([False]))
+    register_cleanup('pwm_led', pwm_led_command_handler.all_off)
+    register_cleanup('servo', servo_command_handler.stop_all)
+    register_cleanup('motor', _release_motor)
+    register_cleanup('sound', _stop_sound)
+    _builtin_handlers_registered = True
+
 def execute_command(command_list, stop_flag_ref):
     """
     JSONで定義されたコマンドリスト（リスト形式または辞書形式）を順番に実行します。
     実行終了後、モーターの通電を解除して停止させます。
+    コンパイル済みシナリオ（CompiledScenario）が渡された場合は execute_compiled() に委譲します。
+    タイムラインモード（config.SCENARIO_TIMELINE）では、未コンパイルのリストも
+    再生開始時にコンパイルしてからタイムライン実行します。
+    並列トラック形式（{"tracks": {...}}）は execute_tracks() で実行します。
     """
+    if not _builtin_handlers_registered:
+        # init() 前に呼ばれた場合（テスト・ベンチマーク等）
+        _register_builtin_handlers()
+
+    if scenario_compiler.is_tracks(command_list):
+        command_list = scenario_compiler.compile_tracks(command_list)
+    if isinstance(command_list, scenario_compiler.CompiledTracks):
+        execute_tracks(command_list, stop_flag_ref)
+        return
+
+    if (getattr(config, 'SCENARIO_TIMELINE', True)
+            and not isinstance(command_list, scenario_compiler.CompiledScenario)):
+        command_list = scenario_compiler.compile_scenario(command_list)
+
+    if isinstance(command_list, scenario_compiler.CompiledScenario):
+        execute_compiled(command_list, stop_flag_ref)
+        return
+
     motor_used = False  # モーターコマンドが実行されたかを追跡
     
     try:
@@ -49,65 +146,493 @@ def execute_command(command_list, stop_flag_ref):
             if command_parser.check_stop_flag(stop_flag_ref):
                 print("[Info] 停止フラグが検出されました。コマンドを中断します。")
                 sound_patterns.stop_playback()
-                stop_flag_ref[0] = False
                 return
 
-            # コマンドタイプ判定
-            cmd_type = command_parser.parse_command_type(cmd)
-            
-            if not cmd_type:
-                print(f"[Warning] Unknown command format or empty command: {cmd}")
-                continue
+            if _dispatch(cmd, stop_flag_ref) == 'motor':
+                motor_used = True  # モーターコマンドが実行された
 
-            try:
-                # コマンドタイプごとにハンドラーへディスパッチ
-                if cmd_type == 'servo':
-                    servo_command_handler.handle(cmd, stop_flag_ref)
-                
-                elif cmd_type == 'led':
-                    led_command_handler.handle(cmd, stop_flag_ref)
-                
-                elif cmd_type == 'motor':
-                    motor_used = True  # モーターコマンドが実行された
-                    motor_command_handler.handle(cmd, motor, stop_flag_ref)
-                
-                elif cmd_type == 'sound':
-                    sound_command_handler.handle(cmd, stop_flag_ref)
-                
-                elif cmd_type == 'delay':
-                    _handle_delay(cmd, stop_flag_ref)
-                
-                elif cmd_type == 'wait_ms':
-                    _handle_wait_ms(cmd, stop_flag_ref)
-                
-                elif cmd_type == 'stop_playback':
-                    _handle_stop_playback()
-                
-                # PWM LED旧形式（led_on, led_off, led_fade_in, led_fade_out）
-                elif cmd_type in ['led_on', 'led_off', 'led_fade_in', 'led_fade_out']:
-                    pwm_led_command_handler.handle(cmd, stop_flag_ref)
-                
-                elif cmd_type == 'effect':
-                    # effectコマンドは予約（将来の拡張用）
-                    print(f"[Warning] 'effect' command not yet implemented")
-                
-                else:
-                    print(f"[Warning] Unknown command type: {cmd_type}")
+    finally:
+        # 終了処理: モーター通電解除（モーターコマンドが実行された場合のみ）
+        if motor_used:
+            _release_motor()
+
+def _dispatch(cmd, stop_flag_ref):
+    """
+    単一のコマンドを解釈して各ハンドラーへディスパッチします。
+    
+    Returns:
+        判定したコマンドタイプ（不明な形式の場合None）
+    """
+    # コマンドタイプ判定
+    cmd_type = command_parser.parse_command_type(cmd)
+    
+    if not cmd_type:
+        print(f"[Warning] Unknown command format or empty command: {cmd}")
+        return None
+
+    try:
+        # ディスパッチテーブルを1回引くだけでハンドラーを決定
+        handler = _handlers.get(cmd_type)
+        if handler is None:
+            print(f"[Warning] Unknown command type: {cmd_type}")
+        else:
+            handler(cmd, stop_flag_ref)
+
+    except Exception as e:
+        print(f"[Error] Command execution failed: {cmd_type}")
+        import sys
+        sys.print_exception(e)
+        # エラーでも続行
 
+    return cmd_type
+
+def _release_motor():
+    """モーターの通電を解除します（シナリオ終了処理）"""
+    if motor:
+        try:
+            motor.release()
+            print("[Effects] StepperMotor通電解除完了")
+        except Exception as e:
+            print(f"[Warning] Motor release failed: {e}")
+
+# ----------------------------------------------------------------------
+# コンパイル済みシナリオの実行
+# ----------------------------------------------------------------------
+
+def execute_compiled(program, stop_flag_ref):
+    """
+    scenario_compiler でコンパイル済みの命令列を実行します。
+    パラメータ解析・検証はコンパイル時に済んでいるため、各命令は
+    オペコード表の引きと整数引数の読み出しだけで実行されます。
+    
+    Args:
+        program: CompiledScenario
+        stop_flag_ref: 停止フラグのリスト参照 [bool]
+    """
+    if getattr(config, 'SCENARIO_TIMELINE', True):
+        _execute_timeline(program, stop_flag_ref)
+        return
+
+    ops = program.ops
+    args = program.args
+    consts = program.consts
+    arity = scenario_compiler.OP_ARITY
+    table = _OP_TABLE
+    pos = 0
+    
+    try:
+        for op in ops:
+            # 停止フラグチェック
+            if stop_flag_ref[0]:
+                print("[Info] 停止フラグが検出されました。コマンドを中断します。")
+                sound_patterns.stop_playback()
+                return
+
+            try:
+                table[op](args, pos, consts, stop_flag_ref)
             except Exception as e:
-                print(f"[Error] Command execution failed: {cmd_type}")
+                print(f"[Error] Command execution failed: opcode {op}")
                 import sys
                 sys.print_exception(e)
                 # エラーでも続行
 
+            pos += arity[op]
+
     finally:
-        # 終了処理: モーター通電解除（モーターコマンドが実行された場合のみ）
-        if motor_used and motor:
-            try:
-                motor.release()
-                print("[Effects] StepperMotor通電解除完了")
-            except Exception as e:
-                print(f"[Warning] Motor release failed: {e}")
+        # 終了処理: モーター通電解除（モーターコマンドを含む場合のみ）
+        if program.uses_motor:
+            _release_motor()
+
+def _execute_timeline(program, stop_flag_ref):
+    """
+    命令列をタイムラインモードで実行します。
+    各命令はシナリオ開始時刻からの絶対オフセット（program.starts）に合わせて開始し、
+    delay/wait_ms は「今から○ms」ではなく次の命令の開始時刻まで待機します。
+    UART送信やLED書き込み、ログ出力にかかった時間が後続の命令に累積しないため、
+    長いシナリオでもDFPlayerの音声と演出のタイミングがずれません。
+    
+    Args:
+        program: CompiledScenario
+        stop_flag_ref: 停止フラグのリスト参照 [bool]
+    """
+    ops = program.ops
+    args = program.args
+    consts = program.consts
+    starts = program.starts
+    arity = scenario_compiler.OP_ARITY
+    reanchor = scenario_compiler.REANCHOR
+    table = _OP_TABLE
+    op_delay = scenario_compiler.OP_DELAY
+    op_wait_ms = scenario_compiler.OP_WAIT_MS
+    ticks_ms = time.ticks_ms
+    ticks_add = time.ticks_add
+    ticks_diff = time.ticks_diff
+
+    # 各命令の開始遅れ（ミリ秒）
+    late_ms = array('i', [0] * len(ops))
+    executed = 0
+    pos = 0
+    started = ticks_ms()
+    t0 = started  # タイムラインの基準時刻（所要時間が不明な命令の後に合わせ直す）
+
+    try:
+        for i in range(len(ops)):
+            # 停止フラグチェック
+            if stop_flag_ref[0]:
+                print("[Info] 停止フラグが検出されました。コマンドを中断します。")
+                sound_patterns.stop_playback()
+                return
+
+            op = ops[i]
+            deadline = ticks_add(t0, starts[i])
+            late = ticks_diff(ticks_ms(), deadline)
+
+            if op == op_delay or op == op_wait_ms:
+                # 待機命令: 終了時刻（= 次の命令の開始時刻）まで待つ（中断時は次の周回の停止フラグチェックで終了）
+                command_parser.wait_until(ticks_add(deadline, args[pos]), stop_flag_ref)
+            else:
+                if late < 0:
+                    # 前の命令が予定より早く終わった場合（デバイス未接続でスキップ等）は開始時刻まで待つ
+                    if not command_parser.wait_until(deadline, stop_flag_ref):
+                        pos += arity[op]
+                        continue  # 次の周回の停止フラグチェックで中断
+                    late = ticks_diff(ticks_ms(), deadline)
+                try:
+                    table[op](args, pos, consts, stop_flag_ref)
+                except Exception as e:
+                    print(f"[Error] Command execution failed: opcode {op}")
+                    import sys
+                    sys.print_exception(e)
+                    # エラーでも続行
+                if reanchor[op]:
+                    # 所要時間が不明な命令: 次の命令の予定時刻を実際の終了時刻に合わせる
+                    t0 = ticks_add(ticks_ms(), -starts[i])
+
+            late_ms[i] = late
+            executed = i + 1
+            pos += arity[op]
+
+    finally:
+        # 終了処理: モーター通電解除（モーターコマンドを含む場合のみ）
+        if program.uses_motor:
+            _release_motor()
+        _report_timeline(program, late_ms, executed, ticks_diff(ticks_ms(), started))
+
+def _report_timeline(program, late_ms, executed, elapsed_ms):
+    """
+    タイムライン実行の遅れを集計して表示し、last_timeline_report に保存します。
+    config.TIMELINE_LATE_WARN_MS を超えて遅れた命令は個別に警告します。
+    
+    Args:
+        program: 実行した CompiledScenario
+        late_ms: 各命令の開始遅れ（ミリ秒）
+        executed: 実行した命令数（中断時は途中まで）
+        elapsed_ms: 実際の経過時間（ミリ秒）
+    """
+    global last_timeline_report
+
+    max_late = 0
+    max_index = -1
+    total_late = 0
+    for i in range(executed):
+        late = late_ms[i]
+        total_late += late
+        if late > max_late:
+            max_late = late
+            max_index = i
+
+    last_timeline_report = {
+        'executed': executed,
+        'planned_ms': program.total_ms,
+        'elapsed_ms': elapsed_ms,
+        'max_late_ms': max_late,
+        'max_late_index': max_index,
+        'late_ms': late_ms,
+    }
+
+    if executed == 0:
+        return
+
+    avg_late = total_late // executed
+    print(f"[Timeline] {executed}命令を実行: 予定 {program.total_ms}ms / 実績 {elapsed_ms}ms, "
+          f"最大遅れ {max_late}ms, 平均遅れ {avg_late}ms")
+
+    warn_ms = getattr(config, 'TIMELINE_LATE_WARN_MS', 20)
+    warned = 0
+    for i in range(executed):
+        if late_ms[i] > warn_ms:
+            warned += 1
+            if warned <= 10:
+                print(f"[Warning] Timeline: 命令#{i}（opcode {program.ops[i]}, 予定 {program.starts[i]}ms）が {late_ms[i]}ms 遅れて開始しました")
+    if warned > 10:
+        print(f"[Warning] Timeline: ほか {warned - 10}件の命令が {warn_ms}ms を超えて遅れました")
+
+# ----------------------------------------------------------------------
+# 並列トラックの実行
+# ----------------------------------------------------------------------
+
+def execute_tracks(program, stop_flag_ref):
+    """
+    並列トラック形式のシナリオを実行します。
+    各トラックはシナリオ開始時刻を共通の基準にしたタイムラインで進み、
+    step_scheduler によって1つの再生スレッド上で交互に実行されます。
+    フェード・時間指定サーボ回転・モーター回転などは再開可能ステップとして実行されるため、
+    あるトラックの長い動作中も他のトラックが止まりません。
+    
+    Args:
+        program: CompiledTracks
+        stop_flag_ref: 停止フラグのリスト参照 [bool]
+    """
+    steps = _track_steps(program.tracks, stop_flag_ref)
+
+    try:
+        if not step_scheduler.run_concurrently(steps, stop_flag_ref):
+            _on_tracks_stopped(stop_flag_ref)
+    finally:
+        # 終了処理: モーター通電解除（モーターコマンドを含む場合のみ）
+        if program.uses_motor:
+            _release_motor()
+
+async def execute_command_async(command_list, stop_flag_ref):
+    """
+    execute_command() のコルーチン版（非同期メインループ用）。
+    シナリオをコンパイルし、各トラック（通常のシナリオは1トラック）を再開可能ステップとして
+    イベントループ上で実行します。待機中はボタン・ボリュームなどの他のタスクが動作します。
+    コンパイルできない形式のシナリオは execute_command() でそのまま実行します。
+    
+    Args:
+        command_list: シナリオ（コマンドリスト・並列トラック形式・コンパイル済み）
+        stop_flag_ref: 停止フラグのリスト参照 [bool]
+    """
+    if not _builtin_handlers_registered:
+        _register_builtin_handlers()
+
+    program = command_list
+    if not isinstance(program, (scenario_compiler.CompiledScenario, scenario_compiler.CompiledTracks)):
+        program = scenario_compiler.compile_entry(command_list)
+
+    if isinstance(program, scenario_compiler.CompiledTracks):
+        tracks = program.tracks
+    elif isinstance(program, scenario_compiler.CompiledScenario):
+        tracks = [("main", program)]
+    else:
+        execute_command(command_list, stop_flag_ref)
+        return
+
+    steps = _track_steps(tracks, stop_flag_ref)
+
+    try:
+        if not await step_scheduler.run_concurrently_async(steps, stop_flag_ref):
+            _on_tracks_stopped(stop_flag_ref)
+    finally:
+        if program.uses_motor:
+            _release_motor()
+
+def _track_steps(tracks, stop_flag_ref):
+    """各トラックの再開可能ステップを、共通の開始時刻で作成"""
+    t0 = time.ticks_ms()
+    return [_track_gen(name, track, t0, stop_flag_ref) for name, track in tracks]
+
+def _on_tracks_stopped(stop_flag_ref):
+    """停止フラグでトラック実行を中断した時の後処理"""
+    print("[Info] 停止フラグが検出されました。コマンドを中断します。")
+    sound_patterns.stop_playback()
+
+def _track_gen(name, program, t0, stop_flag_ref):
+    """
+    1トラック分の命令列を実行する再開可能ステップ。
+    待機命令と時間のかかる命令は、再開時刻を yield してスケジューラに制御を返します。
+    
+    Args:
+        name: トラック名（ログ用）
+        program: CompiledScenario
+        t0: シナリオ開始時刻（ticks_ms、所要時間が不明な命令の後はこのトラックだけ合わせ直す）
+        stop_flag_ref: 停止フラグのリスト参照 [bool]
+    """
+    ops = program.ops
+    args = program.args
+    consts = program.consts
+    starts = program.starts
+    arity = scenario_compiler.OP_ARITY
+    reanchor = scenario_compiler.REANCHOR
+    op_delay = scenario_compiler.OP_DELAY
+    op_wait_ms = scenario_compiler.OP_WAIT_MS
+    pos = 0
+
+    for i in range(len(ops)):
+        if stop_flag_ref[0]:
+            return
+
+        op = ops[i]
+        deadline = time.ticks_add(t0, starts[i])
+        if time.ticks_diff(deadline, time.ticks_ms()) > 0:
+            yield deadline
+
+        try:
+            if op == op_delay or op == op_wait_ms:
+                # 待機命令: 終了時刻（= 次の命令の開始時刻）まで他のトラックに譲る
+                yield time.ticks_add(deadline, args[pos])
+            else:
+                step = _OP_STEPS[op]
+                if step is None:
+                    # 即時完了する命令（OP_RAW の解釈実行は完了までブロックする）
+                    _OP_TABLE[op](args, pos, consts, stop_flag_ref)
+                else:
+                    yield from step(args, pos, consts, stop_flag_ref)
+        except Exception as e:
+            print(f"[Error] Track '{name}': command execution failed: opcode {op}")
+            import sys
+            sys.print_exception(e)
+            # エラーでも続行
+
+        if reanchor[op]:
+            # 所要時間が不明な命令: 次の命令の予定時刻を実際の終了時刻に合わせる
+            t0 = time.ticks_add(time.ticks_ms(), -starts[i])
+        pos += arity[op]
+
+# 各オペコードの実行関数: (args, pos, consts, stop_flag_ref)
+# args[pos] から順に、そのオペコードの引数が並んでいる
+
+def _op_delay(a, i, c, stop_flag_ref):
+    command_parser.wait_with_stop_check(a[i], stop_flag_ref)
+
+def _op_wait_ms(a, i, c, stop_flag_ref):
+    if not command_parser.wait_with_stop_check(a[i], stop_flag_ref):
+        print("[Info] Wait中断します。")
+
+def _op_stop_playback(a, i, c, stop_flag_ref):
+    _handle_stop_playback()
+
+def _op_sound(a, i, c, stop_flag_ref):
+    sound_command_handler.play(a[i], a[i + 1])
+
+def _op_sound_wait_end(a, i, c, stop_flag_ref):
+    sound_command_handler.wait_end(a[i], stop_flag_ref)
+
+def _op_led_off(a, i, c, stop_flag_ref):
+    led_command_handler.off(stop_flag_ref)
+
+def _op_led_fill(a, i, c, stop_flag_ref):
+    led_command_handler.fill(c[a[i]], a[i + 1], a[i + 2], a[i + 3], a[i + 4], stop_flag_ref)
+
+def _op_led_fade(a, i, c, stop_flag_ref):
+    led_command_handler.fade(c[a[i]], scenario_compiler.unpack_color(a[i + 1]), scenario_compiler.unpack_color(a[i + 2]), a[i + 3], stop_flag_ref, a[i + 4])
+
+def _op_pwm_on(a, i, c, stop_flag_ref):
+    pwm_led_command_handler.led_on(a[i], a[i + 1])
+
+def _op_pwm_off(a, i, c, stop_flag_ref):
+    pwm_led_command_handler.led_off(a[i])
+
+def _op_pwm_fade_in(a, i, c, stop_flag_ref):
+    pwm_led_command_handler.fade_in(a[i], a[i + 1], a[i + 2], stop_flag_ref, a[i + 3])
+
+def _op_pwm_fade_out(a, i, c, stop_flag_ref):
+    pwm_led_command_handler.fade_out(a[i], a[i + 1], stop_flag_ref, a[i + 2])
+
+def _op_servo_rotate(a, i, c, stop_flag_ref):
+    servo_command_handler.rotate(a[i], a[i + 1], a[i + 2], stop_flag_ref)
+
+def _op_servo_stop(a, i, c, stop_flag_ref):
+    servo_command_handler.stop(a[i])
+
+def _op_servo_stop_all(a, i, c, stop_flag_ref):
+    servo_command_handler.stop_all()
+
+def _op_servo_set_angle(a, i, c, stop_flag_ref):
+    servo_command_handler.set_angle(a[i], a[i + 1], a[i + 2], stop_flag_ref)
+
+def _op_servo_center(a, i, c, stop_flag_ref):
+    servo_command_handler.center(a[i])
+
+def _op_servo_center_all(a, i, c, stop_flag_ref):
+    servo_command_handler.center_all()
+
+def _op_motor_rotate(a, i, c, stop_flag_ref):
+    motor_command_handler.rotate(motor, c[a[i]], c[a[i + 1]], a[i + 2], stop_flag_ref)
+
+def _op_motor_step(a, i, c, stop_flag_ref):
+    motor_command_handler.step(motor, a[i], c[a[i + 1]], a[i + 2], stop_flag_ref)
+
+def _op_motor_move_to(a, i, c, stop_flag_ref):
+    motor_command_handler.move_to(motor, c[a[i]], c[a[i + 1]], a[i + 2], a[i + 3], stop_flag_ref)
+
+def _op_motor_set_home(a, i, c, stop_flag_ref):
+    motor_command_handler.set_home(motor)
+
+def _op_raw(a, i, c, stop_flag_ref):
+    _dispatch(c[a[i]], stop_flag_ref)
+
+# オペコード → 実行関数の対応表（インデックス = オペコード）
+_OP_TABLE = [None] * scenario_compiler.OP_COUNT
+_OP_TABLE[scenario_compiler.OP_DELAY] = _op_delay
+_OP_TABLE[scenario_compiler.OP_WAIT_MS] = _op_wait_ms
+_OP_TABLE[scenario_compiler.OP_STOP_PLAYBACK] = _op_stop_playback
+_OP_TABLE[scenario_compiler.OP_SOUND] = _op_sound
+_OP_TABLE[scenario_compiler.OP_LED_OFF] = _op_led_off
+_OP_TABLE[scenario_compiler.OP_LED_FILL] = _op_led_fill
+_OP_TABLE[scenario_compiler.OP_PWM_ON] = _op_pwm_on
+_OP_TABLE[scenario_compiler.OP_PWM_OFF] = _op_pwm_off
+_OP_TABLE[scenario_compiler.OP_PWM_FADE_IN] = _op_pwm_fade_in
+_OP_TABLE[scenario_compiler.OP_PWM_FADE_OUT] = _op_pwm_fade_out
+_OP_TABLE[scenario_compiler.OP_SERVO_ROTATE] = _op_servo_rotate
+_OP_TABLE[scenario_compiler.OP_SERVO_STOP] = _op_servo_stop
+_OP_TABLE[scenario_compiler.OP_SERVO_STOP_ALL] = _op_servo_stop_all
+_OP_TABLE[scenario_compiler.OP_SERVO_SET_ANGLE] = _op_servo_set_angle
+_OP_TABLE[scenario_compiler.OP_SERVO_CENTER] = _op_servo_center
+_OP_TABLE[scenario_compiler.OP_SERVO_CENTER_ALL] = _op_servo_center_all
+_OP_TABLE[scenario_compiler.OP_MOTOR_ROTATE] = _op_motor_rotate
+_OP_TABLE[scenario_compiler.OP_MOTOR_STEP] = _op_motor_step
+_OP_TABLE[scenario_compiler.OP_RAW] = _op_raw
+_OP_TABLE[scenario_compiler.OP_LED_FADE] = _op_led_fade
+_OP_TABLE[scenario_compiler.OP_MOTOR_MOVE_TO] = _op_motor_move_to
+_OP_TABLE[scenario_compiler.OP_MOTOR_SET_HOME] = _op_motor_set_home
+_OP_TABLE[scenario_compiler.OP_SOUND_WAIT_END] = _op_sound_wait_end
+
+# 並列トラック用: 時間のかかるオペコードの再開可能ステップ版（戻り値はジェネレーター）
+# None のオペコードは _OP_TABLE の実行関数をそのまま呼ぶ（即時完了）
+
+def _step_led_fill(a, i, c, stop_flag_ref):
+    return led_command_handler.fill_gen(c[a[i]], a[i + 1], a[i + 2], a[i + 3], a[i + 4], stop_flag_ref)
+
+def _step_led_fade(a, i, c, stop_flag_ref):
+    return led_command_handler.fade_gen(c[a[i]], scenario_compiler.unpack_color(a[i + 1]), scenario_compiler.unpack_color(a[i + 2]), a[i + 3], stop_flag_ref, a[i + 4])
+
+def _step_pwm_fade_in(a, i, c, stop_flag_ref):
+    return pwm_led_command_handler.fade_in_gen(a[i], a[i + 1], a[i + 2], stop_flag_ref, a[i + 3])
+
+def _step_pwm_fade_out(a, i, c, stop_flag_ref):
+    return pwm_led_command_handler.fade_out_gen(a[i], a[i + 1], stop_flag_ref, a[i + 2])
+
+def _step_servo_rotate(a, i, c, stop_flag_ref):
+    return servo_command_handler.rotate_gen(a[i], a[i + 1], a[i + 2], stop_flag_ref)
+
+def _step_servo_set_angle(a, i, c, stop_flag_ref):
+    return servo_command_handler.set_angle_gen(a[i], a[i + 1], a[i + 2], stop_flag_ref)
+
+def _step_motor_rotate(a, i, c, stop_flag_ref):
+    return motor_command_handler.rotate_gen(motor, c[a[i]], c[a[i + 1]], a[i + 2])
+
+def _step_motor_step(a, i, c, stop_flag_ref):
+    return motor_command_handler.step_gen(motor, a[i], c[a[i + 1]], a[i + 2])
+
+def _step_motor_move_to(a, i, c, stop_flag_ref):
+    return motor_command_handler.move_to_gen(motor, c[a[i]], c[a[i + 1]], a[i + 2], a[i + 3])
+
+def _step_sound_wait_end(a, i, c, stop_flag_ref):
+    return sound_command_handler.wait_end_gen(a[i])
+
+_OP_STEPS = [None] * scenario_compiler.OP_COUNT
+_OP_STEPS[scenario_compiler.OP_LED_FILL] = _step_led_fill
+_OP_STEPS[scenario_compiler.OP_LED_FADE] = _step_led_fade
+_OP_STEPS[scenario_compiler.OP_PWM_FADE_IN] = _step_pwm_fade_in
+_OP_STEPS[scenario_compiler.OP_PWM_FADE_OUT] = _step_pwm_fade_out
+_OP_STEPS[scenario_compiler.OP_SERVO_ROTATE] = _step_servo_rotate
+_OP_STEPS[scenario_compiler.OP_SERVO_SET_ANGLE] = _step_servo_set_angle
+_OP_STEPS[scenario_compiler.OP_MOTOR_ROTATE] = _step_motor_rotate
+_OP_STEPS[scenario_compiler.OP_MOTOR_STEP] = _step_motor_step
+_OP_STEPS[scenario_compiler.OP_MOTOR_MOVE_TO] = _step_motor_move_to
+_OP_STEPS[scenario_compiler.OP_SOUND_WAIT_END] = _step_sound_wait_end
 
 def _handle_delay(cmd, stop_flag_ref):
     """delay コマンドを処理（辞書形式・リスト形式両対応）"""
@@ -134,9 +659,16 @@ def _handle_wait_ms(cmd, stop_flag_ref):
     interrupted = not command_parser.wait_with_stop_check(duration_ms, stop_flag_ref)
     if interrupted:
         print("[Info] Wait中断します。")
-        stop_flag_ref[0] = False
 
-def _handle_stop_playback():
+def _handle_motor(cmd, stop_flag_ref):
+    """motor コマンドを処理（初期化済みのモーターを渡す）"""
+    motor_command_handler.handle(cmd, motor, stop_flag_ref)
+
+def _handle_effect(cmd, stop_flag_ref):
+    """effectコマンドは予約（将来の拡張用）"""
+    print(f"[Warning] 'effect' command not yet implemented")
+
+def _handle_stop_playback(cmd=None, stop_flag_ref=None):
     """全モジュールの停止処理"""
     print("[Info] 全モジュール停止コマンドを実行します。")
     
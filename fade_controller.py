@@ -3,120 +3,428 @@
 # PWM LEDとNeoPixelの両方で使用される汎用フェード処理を提供します
 
 import time
+import math
+from array import array
 import config
+import step_scheduler
 
-def linear_fade(start_value, end_value, duration_ms, step_interval_ms, update_callback, stop_flag_ref=None):
+def wait_with_cancel(duration_ms, check_interval_ms, stop_flag_ref=None):
     """
-    汎用線形フェード処理
+    キャンセル可能な待機処理
     
     Args:
-        start_value: 開始値（数値またはタプル/リスト）
-        end_value: 終了値（数値またはタプル/リスト）
-        duration_ms: フェード時間（ミリ秒）
-        step_interval_ms: 更新間隔（ミリ秒）
-        update_callback: 値を更新するためのコールバック関数 update_callback(current_value)
+        duration_ms: 待機時間（ミリ秒）
+        check_interval_ms: 停止フラグチェック間隔（ミリ秒）
         stop_flag_ref: 停止フラグのリスト参照 [bool]（オプション）
     
     Returns:
-        正常完了した場合True、中断/エラーの場合False
+        正常完了した場合True、中断の場合False
     """
     if duration_ms <= 0:
-        # 時間が0以下の場合は即座に終了値を設定
-        try:
-            update_callback(end_value)
-            return True
-        except Exception as e:
-            print(f"[Error] Fade immediate update failed: {e}")
-            return False
-    
-    # 開始値と終了値が同じ場合は処理不要
-    if start_value == end_value:
         return True
     
-    # 値が単一の数値かタプル/リストかを判定
-    is_tuple = isinstance(start_value, (tuple, list))
+    start_time = time.ticks_ms()
     
-    if is_tuple:
-        # タプル/リストの場合（RGB色など）
-        if len(start_value) != len(end_value):
-            print(f"[Error] Start and end value dimensions mismatch")
+    while time.ticks_diff(time.ticks_ms(), start_time) < duration_ms:
+        if stop_flag_ref and stop_flag_ref[0]:
+            print(f"[Info] Wait interrupted by stop_flag")
             return False
-        
-        # 各要素の変化量を計算
-        start_values = [float(v) for v in start_value]
-        delta_values = [float(end_value[i] - start_value[i]) for i in range(len(start_value))]
+        time.sleep_ms(check_interval_ms)
+    
+    return True
+
+
+# --- 複数チャンネル同時フェードエンジン ---
+# 実行中のフェード（出力先, チャンネル, 開始値, 変化量, 開始時刻, 時間）を固定長の配列に保持し、
+# 1回の tick() ですべてを進めます。値は出力先ごとにまとめて1回の呼び出しで反映するため、
+# 複数のLED・ストリップを同時にフェードさせても更新周期は1つです。
+#
+# 値は整数（1フェードあたり最大 FADE_LANES 要素: RGB など）で、補間も整数演算のみで行います。
+# 出力先（sink）は apply(channels, values, count) を持つ関数で、register_fade_sink() で登録します。
+#   channels[k]: k番目の更新のチャンネル、values[k * FADE_LANES + j]: その j 番目の値
+
+FADE_LANES = 3
+
+# --- イージングカーブ ---
+# 各カーブは進捗 0.0〜1.0 を EASING_SEGMENTS 等分した点の値（0〜EASING_ONE の固定小数点）を
+# array('H') のテーブルに事前計算し、tick() では整数演算のみで補間します（浮動小数点演算なし）。
+# ID 0 は線形（テーブルなし）。名前付きカーブは初回使用時に作成し、カスタムカーブは点列ごとに登録します。
+
+EASING_LINEAR = 0
+EASING_ONE = 65535
+EASING_SEGMENTS = 64
+_EASING_SHIFT = 10  # 進捗（0〜65535）→ 区間番号のシフト量（65536 / EASING_SEGMENTS = 1024）
+_EASING_FRAC_MASK = (1 << _EASING_SHIFT) - 1
+
+_EASING_CURVES = {
+    'ease_in': lambda t: t * t,
+    'ease_out': lambda t: 1 - (1 - t) * (1 - t),
+    'ease_in_out': lambda t: 2 * t * t if t < 0.5 else 1 - 2 * (1 - t) * (1 - t),
+    'sine': lambda t: (1 - math.cos(math.pi * t)) / 2,
+    'exponential': lambda t: 0.0 if t <= 0 else math.pow(2, 10 * t - 10),
+}
+
+# イージングID → テーブル（ID 0 は線形のため None）
+_easing_tables = [None]
+# 名前またはカスタムカーブの点列（タプル） → イージングID
+_easing_ids = {'linear': EASING_LINEAR}
+
+
+def _build_easing_table(curve):
+    """カーブ関数 curve(t)（t: 0.0〜1.0）から固定小数点のテーブルを作成"""
+    table = array('H', [0] * (EASING_SEGMENTS + 1))
+    for i in range(EASING_SEGMENTS + 1):
+        value = int(curve(i / EASING_SEGMENTS) * EASING_ONE + 0.5)
+        table[i] = 0 if value < 0 else (EASING_ONE if value > EASING_ONE else value)
+    # 両端は必ず開始値・終了値に一致させる
+    table[0] = 0
+    table[EASING_SEGMENTS] = EASING_ONE
+    return table
+
+
+def _custom_curve(points):
+    """等間隔の点列（0.0〜1.0）を折れ線で結んだカーブ関数"""
+    last = len(points) - 1
+    def curve(t):
+        pos = t * last
+        i = int(pos)
+        if i >= last:
+            return points[last]
+        return points[i] + (points[i + 1] - points[i]) * (pos - i)
+    return curve
+
+
+def easing_id(spec):
+    """
+    イージング指定をイージングIDに変換します（シナリオの読み込み時に呼び出し、必要ならテーブルを作成）。
+    
+    Args:
+        spec: None / 'linear' / 'ease_in' / 'ease_out' / 'ease_in_out' / 'sine' / 'exponential'、
+              またはカスタムカーブ（進捗0〜1を等間隔に区切った各点の値 0.0〜1.0 のリスト、2点以上）
+    
+    Returns:
+        int: イージングID（start_fade() に渡す）。無効な指定の場合は警告を表示して線形
+    """
+    if spec is None:
+        return EASING_LINEAR
+    
+    if isinstance(spec, str):
+        key = spec
+        curve = _EASING_CURVES.get(spec)
+        if curve is None and key not in _easing_ids:
+            print(f"[Warning] Unknown easing '{spec}', using linear")
+            return EASING_LINEAR
+    elif isinstance(spec, (list, tuple)) and len(spec) >= 2 and all(
+            isinstance(v, (int, float)) and not isinstance(v, bool) and 0 <= v <= 1 for v in spec):
+        key = tuple(spec)
+        curve = _custom_curve(key)
     else:
-        # 単一数値の場合
-        start_values = float(start_value)
-        delta_values = float(end_value - start_value)
+        print(f"[Warning] Invalid easing {spec}, using linear")
+        return EASING_LINEAR
     
-    # フェードパラメータの計算
-    total_steps = max(1, duration_ms // step_interval_ms)
-    start_time = time.ticks_ms()
+    easing = _easing_ids.get(key)
+    if easing is None:
+        if len(_easing_tables) > 255:
+            print(f"[Warning] Too many easing curves, using linear")
+            return EASING_LINEAR
+        _easing_tables.append(_build_easing_table(curve))
+        easing = len(_easing_tables) - 1
+        _easing_ids[key] = easing
+    return easing
+
+
+def get_easing_table(easing):
+    """イージングIDのテーブルを返します（線形・未登録の場合None）。"""
+    if 0 < easing < len(_easing_tables):
+        return _easing_tables[easing]
+    return None
+
+
+def eased_progress(easing, elapsed, duration):
+    """
+    経過時間の進捗にイージングを適用します（整数演算のみ）。
+    
+    Args:
+        easing: イージングID
+        elapsed: 経過時間（0〜duration）
+        duration: 全体の時間（1以上）
+    
+    Returns:
+        int: 進捗（0〜EASING_ONE）
+    """
+    table = _easing_tables[easing] if easing < len(_easing_tables) else None
+    if table is None:
+        return elapsed * EASING_ONE // duration
+    # テーブル上の位置（区間番号 << _EASING_SHIFT | 区間内の位置）
+    pos = elapsed * (EASING_SEGMENTS << _EASING_SHIFT) // duration
+    i = pos >> _EASING_SHIFT
+    if i >= EASING_SEGMENTS:
+        return table[EASING_SEGMENTS]
+    frac = pos & _EASING_FRAC_MASK
+    low = table[i]
+    return low + (((table[i + 1] - low) * frac) >> _EASING_SHIFT)
+
+
+_sinks = []
+_fade_count = 0
+# 次の tick() の時刻（None: フェードが無く周期が止まっている）
+_next_tick = None
+
+
+def init_fade_engine(max_fades=None):
+    """
+    フェードエンジンの配列を確保します（実行中のフェードは破棄）。
     
+    Args:
+        max_fades: 同時に実行できるフェード数（None の場合は config.FADE_ENGINE_MAX_FADES）
+    """
+    global _fade_sink, _fade_channel, _fade_start, _fade_delta, _fade_t0, _fade_duration, _fade_easing
+    global _out_channels, _out_values, _fade_count, _max_fades
+    
+    if max_fades is None:
+        max_fades = getattr(config, 'FADE_ENGINE_MAX_FADES', 16)
+    _max_fades = max_fades
+    _fade_sink = bytearray(max_fades)
+    _fade_channel = array('H', [0] * max_fades)
+    _fade_start = array('i', [0] * (max_fades * FADE_LANES))
+    _fade_delta = array('i', [0] * (max_fades * FADE_LANES))
+    _fade_t0 = array('l', [0] * max_fades)
+    _fade_duration = array('i', [0] * max_fades)
+    _fade_easing = bytearray(max_fades)
+    # tick() で出力先に渡す作業領域（tick ごとのメモリ確保なし）
+    _out_channels = array('H', [0] * max_fades)
+    _out_values = array('i', [0] * (max_fades * FADE_LANES))
+    _fade_count = 0
+
+
+def register_fade_sink(apply):
+    """
+    フェード値の出力先を登録します。
+    
+    Args:
+        apply: apply(channels, values, count) - 1回の tick で更新されたチャンネルと値をまとめて受け取る関数
+    
+    Returns:
+        int: 出力先ID（start_fade() に渡す）
+    """
+    _sinks.append(apply)
+    return len(_sinks) - 1
+
+
+def _find_fade(sink, channel):
+    """実行中のフェードのスロット番号（無ければ -1）"""
+    for k in range(_fade_count):
+        if _fade_sink[k] == sink and _fade_channel[k] == channel:
+            return k
+    return -1
+
+
+def _remove_fade(k):
+    """スロット k のフェードを削除（末尾のフェードを移動して詰める）"""
+    global _fade_count
+    last = _fade_count - 1
+    if k != last:
+        _fade_sink[k] = _fade_sink[last]
+        _fade_channel[k] = _fade_channel[last]
+        _fade_t0[k] = _fade_t0[last]
+        _fade_duration[k] = _fade_duration[last]
+        _fade_easing[k] = _fade_easing[last]
+        for j in range(FADE_LANES):
+            _fade_start[k * FADE_LANES + j] = _fade_start[last * FADE_LANES + j]
+            _fade_delta[k * FADE_LANES + j] = _fade_delta[last * FADE_LANES + j]
+    _fade_count = last
+
+
+def start_fade(sink, channel, start_values, end_values, duration_ms, easing=EASING_LINEAR):
+    """
+    フェードを開始します（同じ出力先・チャンネルのフェードが実行中なら置き換え）。
+    値の反映は tick() で行います。時間が0以下の場合は即座に終了値を反映します。
+    
+    Args:
+        sink: 出力先ID（register_fade_sink() の戻り値）
+        channel: チャンネル番号（0-65535、出力先ごとの意味: LED番号など）
+        start_values: 開始値（整数のタプル/リスト、FADE_LANES 要素まで）
+        end_values: 終了値（start_values と同じ要素数）
+        duration_ms: フェード時間（ミリ秒）
+        easing: イージングID（easing_id() の戻り値、デフォルト: 線形）
+    
+    Returns:
+        bool: 開始できた場合True（同時フェード数の上限を超えた場合は終了値を反映してFalse）
+    """
+    global _fade_count
+    
+    k = _find_fade(sink, channel)
+    if duration_ms <= 0 or (k < 0 and _fade_count >= _max_fades):
+        if k >= 0:
+            _remove_fade(k)
+        _apply_now(sink, channel, end_values)
+        if duration_ms > 0:
+            print(f"[Warning] Fade engine full ({_max_fades}), fade skipped")
+            return False
+        return True
+    
+    if k < 0:
+        k = _fade_count
+        _fade_count += 1
+    _fade_sink[k] = sink
+    _fade_channel[k] = channel
+    _fade_t0[k] = time.ticks_ms()
+    _fade_duration[k] = duration_ms
+    _fade_easing[k] = easing
+    base = k * FADE_LANES
+    for j in range(FADE_LANES):
+        if j < len(start_values):
+            _fade_start[base + j] = int(start_values[j])
+            _fade_delta[base + j] = int(end_values[j]) - int(start_values[j])
+        else:
+            _fade_start[base + j] = 0
+            _fade_delta[base + j] = 0
+    return True
+
+
+def _apply_now(sink, channel, values):
+    """1チャンネルの値を即座に出力先へ反映"""
+    _out_channels[0] = channel
+    for j in range(FADE_LANES):
+        _out_values[j] = int(values[j]) if j < len(values) else 0
+    _sinks[sink](_out_channels, _out_values, 1)
+
+
+def cancel_fade(sink, channel):
+    """実行中のフェードを現在の値のまま止めます（フェードが無ければ何もしない）"""
+    k = _find_fade(sink, channel)
+    if k >= 0:
+        _remove_fade(k)
+
+
+def cancel_all_fades():
+    """実行中のフェードをすべて止めます。"""
+    global _fade_count
+    _fade_count = 0
+
+
+def is_fading(sink, channel):
+    """指定チャンネルのフェードが実行中ならTrue"""
+    return _find_fade(sink, channel) >= 0
+
+
+def get_active_fade_count():
+    """実行中のフェード数を返します。"""
+    return _fade_count
+
+
+def tick(now=None):
+    """
+    実行中のすべてのフェードを現在時刻まで進め、出力先ごとに1回ずつ値を反映します。
+    終了時刻を過ぎたフェードは終了値を反映して削除します。
+    
+    Args:
+        now: 現在時刻（ticks_ms、None の場合は取得）
+    
+    Returns:
+        int: 残りのフェード数
+    """
+    if _fade_count == 0:
+        return 0
+    if now is None:
+        now = time.ticks_ms()
+    
+    finished = False
+    for sink in range(len(_sinks)):
+        n = 0
+        for k in range(_fade_count):
+            if _fade_sink[k] != sink:
+                continue
+            elapsed = time.ticks_diff(now, _fade_t0[k])
+            duration = _fade_duration[k]
+            if elapsed >= duration:
+                elapsed = duration
+                finished = True
+            elif elapsed < 0:
+                elapsed = 0
+            base = k * FADE_LANES
+            out = n * FADE_LANES
+            easing = _fade_easing[k]
+            if easing == EASING_LINEAR:
+                for j in range(FADE_LANES):
+                    _out_values[out + j] = _fade_start[base + j] + _fade_delta[base + j] * elapsed // duration
+            else:
+                progress = eased_progress(easing, elapsed, duration)
+                for j in range(FADE_LANES):
+                    _out_values[out + j] = _fade_start[base + j] + _fade_delta[base + j] * progress // EASING_ONE
+            _out_channels[n] = _fade_channel[k]
+            n += 1
+        if n:
+            try:
+                _sinks[sink](_out_channels, _out_values, n)
+            except Exception as e:
+                print(f"[Error] Fade sink #{sink} update failed: {e}")
+                import sys
+                sys.print_exception(e)
+    
+    if finished:
+        k = 0
+        while k < _fade_count:
+            if time.ticks_diff(now, _fade_t0[k]) >= _fade_duration[k]:
+                _remove_fade(k)
+            else:
+                k += 1
+    return _fade_count
+
+
+def run_fades_gen(stop_flag_ref=None, sink=None, channel=None):
+    """
+    フェードエンジンを FADE_ENGINE_INTERVAL_MS 周期で進めます（再開可能ステップ版）。
+    複数のトラックから同時に実行しても、tick() は周期ごとに1回だけ行われます。
+    
+    Args:
+        stop_flag_ref: 停止フラグのリスト参照 [bool]（オプション）
+        sink: 出力先ID（channel と合わせて指定すると、そのフェードの終了まで実行）
+        channel: チャンネル番号
+    
+    Returns:
+        正常完了した場合True、中断の場合False（中断時は対象のフェードを現在の値で止める）
+    """
+    global _next_tick
+    interval = getattr(config, 'FADE_ENGINE_INTERVAL_MS', 10)
+    done = False
     try:
-        for step in range(total_steps + 1):
-            # 停止フラグチェック
+        while True:
             if stop_flag_ref and stop_flag_ref[0]:
                 print(f"[Info] Fade interrupted by stop_flag")
                 return False
             
-            # 経過時間から進捗率を計算
-            elapsed_ms = time.ticks_diff(time.ticks_ms(), start_time)
-            if elapsed_ms >= duration_ms:
-                # 最終ステップ：正確に目標値に設定
-                update_callback(end_value)
-                break
+            now = time.ticks_ms()
+            if _next_tick is None or time.ticks_diff(now, _next_tick) >= 0:
+                tick(now)
+                _next_tick = time.ticks_add(now, interval)
             
-            # 進捗率（0.0～1.0）
-            progress = elapsed_ms / duration_ms
-            
-            # 現在の値を計算
-            if is_tuple:
-                current_values = []
-                for i in range(len(start_values)):
-                    current = start_values[i] + (delta_values[i] * progress)
-                    # 整数に変換してクリップ（0-255想定）
-                    current = max(0, min(255, int(current)))
-                    current_values.append(current)
-                update_callback(current_values)
+            done = True
+            if _fade_count == 0:
+                _next_tick = None
+                return True
+            if channel is not None and not is_fading(sink, channel):
+                return True
+            done = False
+            yield _next_tick
+    finally:
+        # 停止フラグでの中断に加え、スケジューラが close() した場合（GeneratorExit）も
+        # フェードを止める（共有のエンジンに残ると次のシナリオの tick で動き出す）
+        if not done:
+            if channel is None:
+                cancel_all_fades()
             else:
-                current = start_values + (delta_values * progress)
-                update_callback(current)
-            
-            # 次のステップまで待機
-            time.sleep_ms(step_interval_ms)
-        
-        return True
-        
-    except Exception as e:
-        print(f"[Error] Fade processing error: {e}")
-        import sys
-        sys.print_exception(e)
-        return False
+                cancel_fade(sink, channel)
 
 
-def wait_with_cancel(duration_ms, check_interval_ms, stop_flag_ref=None):
+def run_fades(stop_flag_ref=None):
     """
-    キャンセル可能な待機処理
-    
-    Args:
-        duration_ms: 待機時間（ミリ秒）
-        check_interval_ms: 停止フラグチェック間隔（ミリ秒）
-        stop_flag_ref: 停止フラグのリスト参照 [bool]（オプション）
+    実行中のフェードがすべて終わるまでフェードエンジンを進めます（ブロッキング）。
     
     Returns:
         正常完了した場合True、中断の場合False
     """
-    if duration_ms <= 0:
-        return True
-    
-    start_time = time.ticks_ms()
-    
-    while time.ticks_diff(time.ticks_ms(), start_time) < duration_ms:
-        if stop_flag_ref and stop_flag_ref[0]:
-            print(f"[Info] Wait interrupted by stop_flag")
-            return False
-        time.sleep_ms(check_interval_ms)
-    
-    return True
+    return step_scheduler.run_blocking(run_fades_gen(stop_flag_ref))
+
+
+init_fade_engine()
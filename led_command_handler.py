@@ -2,7 +2,9 @@
 # NeoPixel LEDコマンドのハンドラー
 
 import neopixel_controller
+import fade_controller
 import command_parser
+import step_scheduler
 
 def handle(cmd, stop_flag_ref):
     """
@@ -19,13 +21,24 @@ def handle(cmd, stop_flag_ref):
         return
     
     if command == 'off':
-        _handle_off(stop_flag_ref)
+        off(stop_flag_ref)
     elif command == 'fill':
         _handle_fill(cmd, stop_flag_ref)
+    elif command == 'fade':
+        _handle_fade(cmd, stop_flag_ref)
     else:
         print(f"[Warning] Unknown led command: {command}")
 
-def _handle_off(stop_flag_ref):
+def register(register_handler):
+    """
+    LEDコマンドを effects のディスパッチテーブルに登録します。
+    
+    Args:
+        register_handler: effects.register_handler
+    """
+    register_handler('led', handle)
+
+def off(stop_flag_ref):
     """
     全NeoPixel LEDを消灯します。
     
@@ -56,7 +69,19 @@ def _handle_fill(cmd, stop_flag_ref):
         return
     
     r, g, b = validated_color
+    fill(strip_name, r, g, b, duration_ms, stop_flag_ref)
+
+def fill(strip_name, r, g, b, duration_ms, stop_flag_ref):
+    """
+    検証済みのパラメータでストリップを塗りつぶします。
+    コンパイル済みシナリオ（scenario_compiler）からも直接呼び出されます。
     
+    Args:
+        strip_name: ストリップ名（'all'/'LV1'など）
+        r, g, b: 色（0-255、検証済み）
+        duration_ms: 点灯後の待機時間（ミリ秒）
+        stop_flag_ref: 停止フラグのリスト参照
+    """
     # NeoPixel利用可能チェック
     if not neopixel_controller.is_neopixel_available():
         print(f"[Warning] LED: fill {strip_name} を ({r}, {g}, {b})（スキップ - NeoPixel利用不可）")
@@ -74,4 +99,84 @@ def _handle_fill(cmd, stop_flag_ref):
         interrupted = not command_parser.wait_with_stop_check(duration_ms, stop_flag_ref)
         if interrupted:
             print("LED点灯を中断します。")
-            stop_flag_ref[0] = False
+
+def fill_gen(strip_name, r, g, b, duration_ms, stop_flag_ref):
+    """
+    fill() の再開可能ステップ版（並列トラック再生用）。
+    点灯後の待機を yield するため、待機中も他のトラックが動作します。
+    
+    Args:
+        fill() と同じ
+    """
+    fill(strip_name, r, g, b, 0, stop_flag_ref)
+    yield from step_scheduler.sleep_gen(duration_ms)
+
+def _handle_fade(cmd, stop_flag_ref):
+    """
+    指定したストリップを開始色から終了色までフェードさせます。
+    
+    Args:
+        cmd: コマンド辞書
+        stop_flag_ref: 停止フラグのリスト参照
+    """
+    strip_name = command_parser.get_param(cmd, "strip", "all")
+    start_color = command_parser.get_param(cmd, "start_color")
+    end_color = command_parser.get_param(cmd, "end_color", command_parser.get_param(cmd, "color"))
+    duration_ms = command_parser.get_param(cmd, "duration", 0)
+    
+    # カラーバリデーション（開始色は省略時、対象の先頭LEDの現在の色）
+    validated_end = command_parser.validate_color(end_color)
+    if not validated_end:
+        return
+    validated_start = None
+    if start_color is not None:
+        validated_start = command_parser.validate_color(start_color)
+        if not validated_start:
+            return
+    
+    easing = fade_controller.easing_id(command_parser.get_param(cmd, "easing"))
+    fade(strip_name, validated_start, validated_end, duration_ms, stop_flag_ref, easing)
+
+def fade(strip_name, start_color, end_color, duration_ms, stop_flag_ref, easing=fade_controller.EASING_LINEAR):
+    """
+    検証済みのパラメータでストリップをフェードさせます（フェード終了までブロック）。
+    コンパイル済みシナリオ（scenario_compiler）からも直接呼び出されます。
+    
+    Args:
+        strip_name: ストリップ名（'all'/'LV1'など）
+        start_color: 開始色 (R, G, B)、None の場合は対象の先頭LEDの現在の色
+        end_color: 終了色 (R, G, B)（検証済み）
+        duration_ms: フェード時間（ミリ秒）
+        stop_flag_ref: 停止フラグのリスト参照
+        easing: イージングID（fade_controller.easing_id() の戻り値、デフォルト: 線形）
+    """
+    step_scheduler.run_blocking(fade_gen(strip_name, start_color, end_color, duration_ms, stop_flag_ref, easing))
+
+def fade_gen(strip_name, start_color, end_color, duration_ms, stop_flag_ref, easing=fade_controller.EASING_LINEAR):
+    """
+    fade() の再開可能ステップ版（並列トラック再生用）。
+    複数のトラックのフェードは共通フェードエンジンで同じ周期にまとめて更新されます。
+    
+    Args:
+        fade() と同じ
+    """
+    # NeoPixel利用可能チェック
+    if not neopixel_controller.is_neopixel_available():
+        print(f"[Warning] LED: fade {strip_name} を {end_color}（スキップ - NeoPixel利用不可）")
+        return
+    
+    if strip_name == "all":
+        indices = range(neopixel_controller.get_total_led_count())
+    else:
+        indices = neopixel_controller.get_global_indices_for_strip(strip_name)
+    if not indices:
+        return
+    
+    if start_color is None:
+        start_color = neopixel_controller.get_global_led(indices[0])
+    try:
+        yield from neopixel_controller.fade_global_leds_gen(indices, start_color, end_color, duration_ms, stop_flag_ref, easing)
+    except Exception as e:
+        print(f"[Error] LED fade {strip_name}: {e}")
+        import sys
+        sys.print_exception(e)
@@ -2,14 +2,21 @@
 """
 メインループの制御ロジックを管理するモジュール
 各種ハードウェアの更新処理を統合し、エラーハンドリングを一元化
+
+非同期モード（config.MAIN_LOOP_ASYNC）では、ボリューム・ボタン・DFPlayer・OLED表示・自動再生・GCを
+それぞれ独自の周期（ボタンは押下割り込み）で動く asyncio タスクとして実行し、
+シナリオ再生もスレッドではなくイベントループ上のコルーチンとして実行します。
 """
 import time
 import gc
+import step_scheduler
+import sound_patterns
+from step_scheduler import asyncio, sleep_ms_async
 
 class LoopController:
     """メインループの制御を担当するクラス"""
     
-    def __init__(self, state_manager, volume_controller, button, button_available, polling_delay_ms, onboard_led=None, config=None):
+    def __init__(self, state_manager, volume_controller, button, button_available, polling_delay_ms, onboard_led=None, config=None, display=None):
         """
         Args:
             state_manager: StateManagerのインスタンス
@@ -19,6 +26,7 @@ class LoopController:
             polling_delay_ms: ポーリング間隔（ミリ秒）
             onboard_led: 内蔵LEDモジュール（オプション）
             config: 設定モジュール（オプション）
+            display: DisplayManagerのインスタンス（オプション、表示待ちのメッセージを描画・送信）
         """
         self.state = state_manager
         self.vc = volume_controller
@@ -26,6 +34,7 @@ class LoopController:
         self.button_available = button_available
         self.polling_delay_ms = polling_delay_ms
         self.onboard_led = onboard_led
+        self.display = display
         self.loop_counter = 0
         self.running = True
         
@@ -35,6 +44,15 @@ class LoopController:
         # メモリ管理設定
         self.gc_interval = getattr(config, 'GC_INTERVAL', 1000) if config else 1000
         self.gc_memory_logging = getattr(config, 'GC_MEMORY_LOGGING', False) if config else False
+        
+        # 非同期モード設定
+        self.use_async = getattr(config, 'MAIN_LOOP_ASYNC', False) if config else False
+        self.button_poll_ms = getattr(config, 'BUTTON_POLL_MS', 10) if config else 10
+        self.autoplay_check_ms = getattr(config, 'AUTOPLAY_CHECK_INTERVAL_MS', 500) if config else 500
+        self.sound_service_ms = getattr(config, 'DFPLAYER_SERVICE_INTERVAL_MS', 10) if config else 10
+        self.playlist_check_ms = getattr(config, 'PLAYLIST_CHECK_INTERVAL_MS', 20) if config else 20
+        self._stop_event = None
+        self._playback_task = None
     
     def update_volume(self, current_time):
         """ボリューム制御の更新"""
@@ -45,6 +63,24 @@ class LoopController:
         except Exception as e:
             print(f"[Warning] Volume poll error: {e}")
     
+    def update_sound(self):
+        """DFPlayer の送信キューと受信イベントの処理"""
+        try:
+            sound_patterns.service()
+        except OSError as e:
+            print(f"[Hardware Error] DFPlayer service error: {e}")
+        except Exception as e:
+            print(f"[Warning] DFPlayer service error: {e}")
+    
+    def update_display(self):
+        """OLED表示の更新（表示待ちのメッセージをフレーム間隔ごとに描画・送信）"""
+        if self.display is None:
+            return
+        try:
+            self.display.service()
+        except Exception as e:
+            print(f"[Warning] Display service error: {e}")
+    
     def update_button(self):
         """ボタン入力の処理"""
         if not self.button_available:
@@ -61,6 +97,15 @@ class LoopController:
             import sys
             sys.print_exception(e)
     
+    def update_playback(self):
+        """ワーカースレッドで実行したシナリオの終了通知とプレイリスト（先読み・次のシナリオの開始）を処理"""
+        try:
+            self.state.playback_manager.poll()
+        except Exception as e:
+            print(f"[Error] Playback completion handling failed: {e}")
+            import sys
+            sys.print_exception(e)
+    
     def update_idle_autoplay(self):
         """アイドル状態の自動再生チェック"""
         try:
@@ -76,31 +121,35 @@ class LoopController:
             return
         
         if self.loop_counter > 0 and self.loop_counter % self.gc_interval == 0:
-            try:
-                # メモリ使用量のログ出力（有効な場合）
-                if self.gc_memory_logging:
-                    try:
-                        mem_free = gc.mem_free()
-                        mem_alloc = gc.mem_alloc()
-                        print(f"[Memory] Before GC - Free: {mem_free}, Allocated: {mem_alloc}")
-                    except Exception:
-                        pass  # メモリ情報取得失敗は無視
-                
-                # ガーベージコレクション実行
-                gc.collect()
-                
-                # メモリ使用量のログ出力（有効な場合）
-                if self.gc_memory_logging:
-                    try:
-                        mem_free = gc.mem_free()
-                        mem_alloc = gc.mem_alloc()
-                        print(f"[Memory] After GC  - Free: {mem_free}, Allocated: {mem_alloc}")
-                    except Exception:
-                        pass  # メモリ情報取得失敗は無視
-                
-            except Exception as e:
-                # GC実行失敗時もシステムは継続
-                print(f"[Warning] Garbage collection failed: {e}")
+            self.collect_garbage()
+    
+    def collect_garbage(self):
+        """ガーベージコレクションを実行（メモリ使用量のログ出力付き）"""
+        try:
+            # メモリ使用量のログ出力（有効な場合）
+            if self.gc_memory_logging:
+                try:
+                    mem_free = gc.mem_free()
+                    mem_alloc = gc.mem_alloc()
+                    print(f"[Memory] Before GC - Free: {mem_free}, Allocated: {mem_alloc}")
+                except Exception:
+                    pass  # メモリ情報取得失敗は無視
+            
+            # ガーベージコレクション実行
+            gc.collect()
+            
+            # メモリ使用量のログ出力（有効な場合）
+            if self.gc_memory_logging:
+                try:
+                    mem_free = gc.mem_free()
+                    mem_alloc = gc.mem_alloc()
+                    print(f"[Memory] After GC  - Free: {mem_free}, Allocated: {mem_alloc}")
+                except Exception:
+                    pass  # メモリ情報取得失敗は無視
+            
+        except Exception as e:
+            # GC実行失敗時もシステムは継続
+            print(f"[Warning] Garbage collection failed: {e}")
     
     def run_single_iteration(self):
         """メインループの1回分の処理を実行"""
@@ -108,8 +157,11 @@ class LoopController:
         
         # 各処理を順番に実行
         self.update_volume(current_time)
+        self.update_sound()
         self.update_button()
+        self.update_playback()
         self.update_idle_autoplay()
+        self.update_display()
         
         # 定期的なメモリ管理
         self.periodic_gc()
@@ -119,7 +171,13 @@ class LoopController:
         self.loop_counter += 1
     
     def run(self):
-        """メインループを実行"""
+        """メインループを実行（非同期モードが有効で asyncio が利用可能な場合はイベントループで実行）"""
+        if self.use_async:
+            if step_scheduler.is_async_available():
+                self.run_event_loop()
+                return
+            print("[Warning] asyncio が利用できません。ポーリングループで実行します。")
+        
         try:
             while self.running:
                 try:
@@ -146,6 +204,134 @@ class LoopController:
             # クリーンアップ処理
             self.cleanup()
     
+    def run_event_loop(self):
+        """非同期モードのメインループを実行"""
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            # Ctrl+C で停止
+            print("\n[Info] KeyboardInterrupt detected. Shutting down...")
+            self.running = False
+        except Exception as e:
+            # 最上位レベルのエラー
+            print(f"[Fatal Error] System failure: {e}")
+            import sys
+            sys.print_exception(e)
+        finally:
+            # クリーンアップ処理
+            self.cleanup()
+    
+    async def run_async(self):
+        """
+        ボリューム・ボタン・DFPlayer・OLED表示・自動再生・GCをタスクとして起動し、stop() が呼ばれるまで待機します。
+        実行中のシナリオ再生は、スレッドではなくこのイベントループ上のタスクとして起動されます。
+        """
+        self._stop_event = asyncio.Event()
+        playback = self.state.playback_manager
+        playback.set_task_runner(self._start_playback_task)
+        
+        tasks = [
+            asyncio.create_task(self._run_periodic(self._volume_step, getattr(self.vc, 'poll_interval_ms', 0))),
+            asyncio.create_task(self._button_task()),
+            asyncio.create_task(self._run_periodic(self.update_sound, self.sound_service_ms)),
+            asyncio.create_task(self._run_periodic(self.update_idle_autoplay, self.autoplay_check_ms)),
+            asyncio.create_task(self._run_periodic(self.update_playback, self.playlist_check_ms)),
+            asyncio.create_task(self._run_periodic(self.update_display, getattr(self.display, 'frame_interval_ms', 0))),
+        ]
+        if self.gc_interval > 0:
+            # GC_INTERVAL（ループ反復回数）をポーリングループと同じ時間間隔に換算
+            tasks.append(asyncio.create_task(self._run_periodic(self.collect_garbage, self.gc_interval * self.polling_delay_ms)))
+        
+        try:
+            if self.running:
+                await self._stop_event.wait()
+        finally:
+            playback.set_task_runner(None)
+            for task in tasks:
+                task.cancel()
+            # 再生中のシナリオを停止し、後始末（サーボ停止など）が終わるまで待つ
+            if self._playback_task and not self._playback_task.done():
+                playback.stop_flag[0] = True
+                await self._playback_task
+            self._playback_task = None
+            self._stop_event = None
+    
+    def _start_playback_task(self, coro):
+        """再生コルーチンをタスクとして起動（終了時に完了を待てるよう保持）"""
+        self._playback_task = asyncio.create_task(coro)
+        return self._playback_task
+    
+    def _volume_step(self):
+        """ボリューム制御の更新（周期タスク用）"""
+        self.update_volume(time.ticks_ms())
+    
+    async def _run_periodic(self, func, period_ms):
+        """
+        func を period_ms ごとに実行するタスク（period_ms が0以下なら何もしない）
+        
+        Args:
+            func: 実行する関数（例外は各 update_* 内で処理済み）
+            period_ms: 実行間隔（ミリ秒）
+        """
+        if period_ms <= 0:
+            return
+        
+        next_time = time.ticks_ms()
+        while self.running:
+            try:
+                func()
+            except Exception as e:
+                print(f"[Critical Error] Main loop error: {e}")
+                import sys
+                sys.print_exception(e)
+                await sleep_ms_async(self.error_retry_delay_ms)
+            
+            # 処理時間を差し引いた周期で実行（遅れた場合は現在時刻から数え直す）
+            next_time = time.ticks_add(next_time, period_ms)
+            wait_ms = time.ticks_diff(next_time, time.ticks_ms())
+            if wait_ms < 0:
+                next_time = time.ticks_ms()
+                wait_ms = 0
+            await sleep_ms_async(wait_ms)
+    
+    async def _button_task(self):
+        """
+        ボタン入力タスク
+        押下中・セレクトモードのクリック判定中は BUTTON_POLL_MS 間隔で更新し、
+        ボタンが離されている間はエッジ割り込みを待って眠ります
+        （割り込みを使えない環境では BUTTON_POLL_MS 間隔のポーリングを続けます）。
+        """
+        if not self.button_available:
+            return
+        
+        trigger = self._make_button_trigger()
+        handler = self.state.button_handler
+        while self.running:
+            self.update_button()
+            
+            if trigger and handler.is_idle():
+                await trigger.wait()
+            else:
+                await sleep_ms_async(self.button_poll_ms)
+    
+    def _make_button_trigger(self):
+        """
+        ボタンのエッジ割り込みで起床するフラグを作成
+        割り込みハンドラーは ButtonHandler が登録し、エッジの記録と同時にフラグを set() します。
+        
+        Returns:
+            asyncio.ThreadSafeFlag（MicroPython）。ThreadSafeFlag または Pin.irq が使えない場合はNone
+        """
+        flag_class = getattr(asyncio, 'ThreadSafeFlag', None)
+        if flag_class is None or not hasattr(self.button, 'irq'):
+            return None
+        
+        flag = flag_class()
+        if not self.state.button_handler.attach_irq(self.button, flag):
+            print("[Warning] Button IRQ unavailable, falling back to polling")
+            return None
+        return flag
+    
     def cleanup(self):
         """システムのクリーンアップ処理"""
         print("\n[Info] System cleanup...")
@@ -159,3 +345,5 @@ class LoopController:
     def stop(self):
         """ループを停止"""
         self.running = False
+        if self._stop_event:
+            self._stop_event.set()
@@ -50,7 +50,8 @@ loop = loop_controller.LoopController(
     button_available=button_available,
     polling_delay_ms=POLLING_DELAY_MS,
     onboard_led=onboard_led,
-    config=system_init.config
+    config=system_init.config,
+    display=dm
 )
 
 # --- コンソールモード通知 ---
@@ -0,0 +1,134 @@
+# motion_profile.py
+# ステッピングモーターの加減速プロファイル（ステップ間隔テーブル）
+#
+# 移動1回分のステップ間隔（μs）を、台形（一定加速度）またはS字（加速度がなめらかに変化）の
+# 速度変化から事前に計算します。ステップ出力中は配列の参照のみで、浮動小数点演算を行いません。
+# 同じ移動（ステップ数・速度・加速度）は小さなLRUキャッシュでテーブルを再利用します。
+
+from array import array
+import config
+
+PROFILE_TRAPEZOID = 'trapezoid'
+PROFILE_S_CURVE = 's_curve'
+
+# 速度の変化（加速区間の時間 0.0〜1.0 → 速度の変化の割合 0.0〜1.0）と、
+# 加速度の最大値に対する平均加速度の比（S字: smoothstep の傾きの最大値は平均の1.5倍）
+_SHAPES = {
+    PROFILE_TRAPEZOID: (lambda u: u, 1.0),
+    PROFILE_S_CURVE: (lambda u: u * u * (3 - 2 * u), 1.5),
+}
+
+# LRUキャッシュ: (キー, プロファイル) のリスト（先頭が最近使ったもの）
+_cache = []
+cache_hits = 0
+cache_misses = 0
+
+
+class MotionProfile:
+    """
+    移動1回分の加減速プロファイル
+
+    加速区間のステップ間隔を ramp_us に保持し、減速区間は同じテーブルを逆順にたどります
+    （加速と減速は対称）。ステップ数が少なく最高速度に届かない場合は、
+    加速区間がステップ数の半分で打ち切られます（三角形の速度変化）。
+    """
+
+    def __init__(self, steps, ramp_us, cruise_us):
+        self.steps = steps
+        self.ramp_us = ramp_us
+        self.cruise_us = cruise_us
+        self._ramp_len = len(ramp_us)
+        self._decel_start = steps - self._ramp_len
+
+    def interval_us(self, i):
+        """i番目のステップを出力してから次のステップまでの間隔（μs、整数演算のみ）"""
+        if i < self._ramp_len:  # 加速区間
+            return self.ramp_us[i]
+        if i >= self._decel_start:  # 減速区間
+            return self.ramp_us[self.steps - 1 - i]
+        return self.cruise_us  # 定速区間
+
+    def duration_us(self):
+        """移動全体の所要時間（μs）"""
+        return sum(self.interval_us(i) for i in range(self.steps))
+
+
+def build_profile(steps, cruise_us, accel, start_speed, shape=PROFILE_TRAPEZOID):
+    """
+    加減速プロファイルを計算します（キャッシュを使わない）。
+
+    Args:
+        steps: ステップ数
+        cruise_us: 最高速度でのステップ間隔（μs）
+        accel: 加速度（steps/s²、加速区間での最大値）
+        start_speed: 開始速度（steps/s、これ以上の速度は加速区間から始める）
+        shape: PROFILE_TRAPEZOID または PROFILE_S_CURVE
+
+    Returns:
+        MotionProfile: プロファイル
+    """
+    curve, peak_ratio = _SHAPES.get(shape, _SHAPES[PROFILE_TRAPEZOID])
+    max_speed = 1000000 / cruise_us
+    start_speed = min(start_speed, max_speed)
+    ramp = array('I')
+
+    if accel > 0 and start_speed < max_speed:
+        # 加速区間の時間（S字は最大加速度が accel になるよう平均加速度を下げる）
+        ramp_time = (max_speed - start_speed) * peak_ratio / accel
+        half = (steps + 1) // 2
+        t = 0.0
+        while len(ramp) < half and t < ramp_time:
+            speed = start_speed + (max_speed - start_speed) * curve(t / ramp_time)
+            interval = int(1000000 / speed)
+            ramp.append(interval)
+            t += interval / 1000000
+
+    return MotionProfile(steps, ramp, cruise_us)
+
+
+def get_profile(steps, cruise_us, accel=None, shape=None):
+    """
+    加減速プロファイルを取得します（LRUキャッシュ付き）。
+
+    Args:
+        steps: ステップ数
+        cruise_us: 最高速度でのステップ間隔（μs）
+        accel: 加速度（steps/s²、省略時は config.STEPPER_ACCELERATION）
+        shape: プロファイルの形（省略時は config.STEPPER_PROFILE）
+
+    Returns:
+        MotionProfile: プロファイル
+    """
+    global cache_hits, cache_misses
+
+    if accel is None:
+        accel = getattr(config, 'STEPPER_ACCELERATION', 10000)
+    if shape is None:
+        shape = getattr(config, 'STEPPER_PROFILE', PROFILE_TRAPEZOID)
+    key = (steps, cruise_us, accel, shape)
+
+    for i in range(len(_cache)):
+        if _cache[i][0] == key:
+            entry = _cache[i]
+            if i:
+                del _cache[i]
+                _cache.insert(0, entry)
+            cache_hits += 1
+            return entry[1]
+
+    cache_misses += 1
+    if shape not in _SHAPES:
+        print(f"[Warning] Unknown stepper profile '{shape}', using {PROFILE_TRAPEZOID}")
+    profile = build_profile(steps, cruise_us, accel, getattr(config, 'STEPPER_START_SPEED', 200), shape)
+
+    _cache.insert(0, (key, profile))
+    del _cache[getattr(config, 'STEPPER_PROFILE_CACHE_SIZE', 8):]
+    return profile
+
+
+def clear_cache():
+    """プロファイルのキャッシュと統計をクリア"""
+    global cache_hits, cache_misses
+    _cache.clear()
+    cache_hits = 0
+    cache_misses = 0
@@ -23,19 +23,26 @@ def handle(cmd, motor, stop_flag_ref):
         return
     
     if command == "rotate":
-        _handle_rotate(cmd, motor)
+        _handle_rotate(cmd, motor, stop_flag_ref)
     elif command == "step":
-        _handle_step(cmd, motor)
+        _handle_step(cmd, motor, stop_flag_ref)
+    elif command == "move_to":
+        _handle_move_to(cmd, motor, stop_flag_ref)
+    elif command == "home":
+        _handle_home(cmd, motor, stop_flag_ref)
+    elif command == "set_home":
+        set_home(motor)
     else:
         print(f"[Warning] Unknown motor command: {command}")
 
-def _handle_rotate(cmd, motor):
+def _handle_rotate(cmd, motor, stop_flag_ref=None):
     """
     ステッピングモーターを角度指定で回転します。
     
     Args:
         cmd: コマンド辞書
         motor: StepperMotorインスタンス
+        stop_flag_ref: 停止フラグのリスト参照 [bool]
     """
     angle = command_parser.get_param(cmd, "angle", 0)
     speed = command_parser.get_param(cmd, "speed", 200)
@@ -46,21 +53,57 @@ def _handle_rotate(cmd, motor):
         print(f"[Warning] Invalid direction {direction}, using 1")
         direction = 1
     
-    command_parser.safe_call(
+    rotate(motor, angle, speed, direction, stop_flag_ref)
+
+def rotate(motor, angle, speed, direction, stop_flag_ref=None):
+    """
+    検証済みのパラメータでステッピングモーターを角度指定回転します（回転終了まで待機）。
+    タイマー駆動では停止フラグを1ステップごとに確認し、立った時点で回転を中断します。
+    
+    Args:
+        motor: StepperMotorインスタンス
+        angle: 回転角度（度）
+        speed: 速度（プリセット名またはms値）
+        direction: 1=正転, -1=逆転（検証済み）
+        stop_flag_ref: 停止フラグのリスト参照 [bool]（オプション）
+    """
+    if not motor:
+        print("[Warning] モーター制御スキップ（モジュール未初期化）")
+        return
+    
+    move = command_parser.safe_call(
         motor.rotate_degrees,
         angle, speed, direction,
         error_context=f"Motor rotate {angle}°"
     )
+    if move is not None:
+        move.wait(stop_flag_ref)
 
-def _handle_step(cmd, motor):
+def rotate_gen(motor, angle, speed, direction):
+    """
+    rotate() の再開可能ステップ版（並列トラック再生用）。
+    各ステップの待機を yield するため、回転中も他のトラックが動作します。
+    
+    Args:
+        rotate() と同じ
+    """
+    if not motor:
+        print("[Warning] モーター制御スキップ（モジュール未初期化）")
+        return
+    
+    yield from motor.rotate_degrees_gen(angle, speed, direction)
+
+def _handle_step(cmd, motor, stop_flag_ref=None):
     """
     ステッピングモーターをステップ数指定で回転します。
     
     Args:
         cmd: コマンド辞書
         motor: StepperMotorインスタンス
+        stop_flag_ref: 停止フラグのリスト参照 [bool]
     """
     steps = command_parser.get_param(cmd, "steps", 0)
+    speed = command_parser.get_param(cmd, "speed", "NORMAL")
     direction = command_parser.get_param(cmd, "direction", 1)
     
     # 方向バリデーション
@@ -68,8 +111,130 @@ def _handle_step(cmd, motor):
         print(f"[Warning] Invalid direction {direction}, using 1")
         direction = 1
     
-    command_parser.safe_call(
+    step(motor, steps, speed, direction, stop_flag_ref)
+
+def step(motor, steps, speed, direction, stop_flag_ref=None):
+    """
+    検証済みのパラメータでステッピングモーターをステップ数指定回転します（回転終了まで待機）。
+    
+    Args:
+        motor: StepperMotorインスタンス
+        steps: ステップ数（負の値は逆方向）
+        speed: 速度（プリセット名またはms値）
+        direction: 1=正転, -1=逆転（検証済み）
+        stop_flag_ref: 停止フラグのリスト参照 [bool]（オプション）
+    """
+    if not motor:
+        print("[Warning] モーター制御スキップ（モジュール未初期化）")
+        return
+    
+    move = command_parser.safe_call(
         motor.move_steps,
-        steps, direction,
+        steps, speed, direction,
         error_context=f"Motor step {steps}"
     )
+    if move is not None:
+        move.wait(stop_flag_ref)
+
+def step_gen(motor, steps, speed, direction):
+    """
+    step() の再開可能ステップ版（並列トラック再生用）。
+    
+    Args:
+        step() と同じ
+    """
+    if not motor:
+        print("[Warning] モーター制御スキップ（モジュール未初期化）")
+        return
+    
+    yield from motor.move_steps_gen(steps, speed, direction)
+
+def _handle_move_to(cmd, motor, stop_flag_ref=None):
+    """
+    ステッピングモーターを絶対位置（角度またはステップ）へ移動します。
+    
+    Args:
+        cmd: コマンド辞書
+        motor: StepperMotorインスタンス
+        stop_flag_ref: 停止フラグのリスト参照 [bool]
+    """
+    angle = command_parser.get_param(cmd, "angle")
+    position = command_parser.get_param(cmd, "position")
+    speed = command_parser.get_param(cmd, "speed", "NORMAL")
+    shortest = command_parser.get_param(cmd, "shortest", True)
+    
+    if angle is None and position is None:
+        print("[Warning] Motor move_to requires 'angle' or 'position'")
+        return
+    
+    if angle is not None:
+        move_to(motor, angle, speed, True, bool(shortest), stop_flag_ref)
+    else:
+        move_to(motor, position, speed, False, bool(shortest), stop_flag_ref)
+
+def _handle_home(cmd, motor, stop_flag_ref=None):
+    """
+    ステッピングモーターを原点へ戻します。
+    
+    Args:
+        cmd: コマンド辞書
+        motor: StepperMotorインスタンス
+        stop_flag_ref: 停止フラグのリスト参照 [bool]
+    """
+    speed = command_parser.get_param(cmd, "speed", "NORMAL")
+    shortest = command_parser.get_param(cmd, "shortest", True)
+    move_to(motor, 0, speed, False, bool(shortest), stop_flag_ref)
+
+def _target_position(motor, target, in_degrees):
+    """目標（角度またはステップ）を絶対位置（ステップ）に変換"""
+    return motor.angle_to_position(target) if in_degrees else int(target)
+
+def move_to(motor, target, speed, in_degrees, shortest, stop_flag_ref=None):
+    """
+    検証済みのパラメータでステッピングモーターを絶対位置へ移動します（移動終了まで待機）。
+    
+    Args:
+        motor: StepperMotorインスタンス
+        target: 目標位置（in_degrees=True: 角度°、False: ステップ）
+        speed: 速度（プリセット名またはms値）
+        in_degrees: target が角度の場合True
+        shortest: 近い方向に回る場合True（1回転を法とする）
+        stop_flag_ref: 停止フラグのリスト参照 [bool]（オプション）
+    """
+    if not motor:
+        print("[Warning] モーター制御スキップ（モジュール未初期化）")
+        return
+    
+    move = command_parser.safe_call(
+        motor.move_to,
+        _target_position(motor, target, in_degrees), speed, shortest,
+        error_context=f"Motor move_to {target}{'°' if in_degrees else ''}"
+    )
+    if move is not None:
+        move.wait(stop_flag_ref)
+
+def move_to_gen(motor, target, speed, in_degrees, shortest):
+    """
+    move_to() の再開可能ステップ版（並列トラック再生用）。
+    
+    Args:
+        move_to() と同じ（stop_flag_ref を除く）
+    """
+    if not motor:
+        print("[Warning] モーター制御スキップ（モジュール未初期化）")
+        return
+    
+    yield from motor.move_to_gen(_target_position(motor, target, in_degrees), speed, shortest)
+
+def set_home(motor):
+    """
+    ステッピングモーターの現在位置を原点にします。
+    
+    Args:
+        motor: StepperMotorインスタンス
+    """
+    if not motor:
+        print("[Warning] モーター制御スキップ（モジュール未初期化）")
+        return
+    
+    motor.set_home()
@@ -1,21 +1,53 @@
 import config
 from machine import Pin
 import time
+from array import array
 from neopixel import NeoPixel
 import fade_controller
+import step_scheduler
 
 # NeoPixelのインスタンスを格納する辞書
 neopixels = {}
 
 # すべてのストリップを結合したときのLEDの総数
 total_led_count = 0
-# グローバルインデックスから (strip_instance, local_index) を検索するためのリスト
-global_led_map = [] 
-# 全LEDの現在の色を保持するキャッシュ (R, G, B)
-led_color_cache = []
+# 全ストリップ分のピクセルデータ（NeoPixelの送信形式 GRB、1LEDあたり3バイト）
+# グローバルインデックス i のLEDは framebuffer[i*3 : i*3+3]。各LEDの現在の色もここから読み出す
+framebuffer = bytearray(0)
+_fb_view = memoryview(framebuffer)
+# ストリップ名 → (開始グローバルインデックス, LED数, NeoPixelインスタンス)
+# init_neopixels() で一度だけ作成し、ストリップ指定の処理はすべてこの表を引く
+strip_table = {}
+# ストリップ名 → framebuffer のうちそのストリップ部分の memoryview
+strip_views = {}
+# 初期化順（framebuffer 上の並び順）のNeoPixelインスタンスと memoryview
+_strip_list = []
+_strip_view_list = []
+# _strip_list の番号 → 開始グローバルインデックス（末尾に total_led_count を追加）
+_strip_starts = []
+# グローバルインデックス → _strip_list の番号
+_index_strip = bytearray(0)
+# ストリップごとの未送信フラグ（1: 前回の送信から framebuffer が変化した）
+_strip_dirty = bytearray(0)
+# ストリップ全体が単色のときその色（0xRRGGBB）、不明・単色でなければ -1
+# 同じ色での塗りつぶしの繰り返しを、framebuffer を読まずに判定するために使う
+_strip_color = array('l')
+# flush() の統計: 送信したストリップ数・変化がなく送信を省略したストリップ数
+frames_written = 0
+frames_skipped = 0
+# フェードエンジンのチャンネル番号 → (インデックスのリスト/range, 連続範囲か, ストリップ番号のリスト)
+# 同じLED群へのフェードは同じチャンネルを使う（シナリオ中のLED群の種類だけ増える）
+_fade_targets = []
+# フェードの tick 中に送信対象となったストリップの印（_strip_list の番号ごと）
+_fade_flush = bytearray(0)
 # 利用可能なストリップの記録
 available_strips = set()
 
+# framebuffer 内の各色のバイト位置（GRB）
+_G_OFS = 0
+_R_OFS = 1
+_B_OFS = 2
+
 def is_neopixel_available():
     """
     いずれかのNeoPixelストリップが利用可能かどうかを返します。
@@ -31,13 +63,17 @@ def get_available_strips():
 def init_neopixels():
     """
     config.py で定義されたすべての NeoPixel ストリップを初期化し、
-    グローバルインデックスマッピングを作成します。
+    全ストリップ共通のフレームバッファを作成します。
+    各ストリップの NeoPixel.buf はフレームバッファの該当部分（memoryview）に置き換えるため、
+    np.write() はコピーなしでフレームバッファをそのまま送信します。
     """
-    global neopixels, total_led_count, global_led_map, led_color_cache, available_strips
+    global neopixels, total_led_count, framebuffer, _fb_view, strip_table, strip_views
+    global _strip_list, _strip_view_list, _strip_starts, _index_strip, _strip_dirty, _strip_color
+    global available_strips, _fade_targets, _fade_flush
     
     total_led_count = 0
-    global_led_map = []
     available_strips = set()
+    initialized = []
     
     # ストリップ名でソートして初期化順序を保証 (configの定義順)
     sorted_strips = sorted(config.NEOPIXEL_STRIPS.items())
@@ -50,13 +86,8 @@ def init_neopixels():
                 np = NeoPixel(pin, count)
                 neopixels[strip_name] = np
                 available_strips.add(strip_name)
+                initialized.append((strip_name, np, count))
                 print(f"NeoPixel Strip '{strip_name}' on GP{strip_info['pin']} with {count} LEDs initialized.")
-                
-                # グローバルインデックスマッピングを作成
-                for i in range(count):
-                    # (NeoPixelインスタンス, そのストリップ内でのローカルインデックス) を保存
-                    global_led_map.append((np, i))
-                    
                 total_led_count += count
                 
             except Exception as e:
@@ -64,8 +95,40 @@ def init_neopixels():
                 print(f"Strip '{strip_name}' will be disabled.")
                 # 失敗したストリップは available_strips に追加しない
     
-    # 色キャッシュの初期化
-    led_color_cache = [(0, 0, 0)] * total_led_count
+    # フレームバッファの作成とストリップへの割り当て
+    framebuffer = bytearray(total_led_count * 3)
+    _fb_view = memoryview(framebuffer)
+    _index_strip = bytearray(total_led_count)
+    strip_table = {}
+    strip_views = {}
+    _strip_list = []
+    _strip_view_list = []
+    _strip_starts = []
+    
+    start = 0
+    for strip_name, np, count in initialized:
+        view = _fb_view[start * 3:(start + count) * 3]
+        try:
+            np.buf = view
+        except Exception:
+            pass  # buf を差し替えられないドライバーでは書き込み時にコピー
+        strip_table[strip_name] = (start, count, np)
+        strip_views[strip_name] = view
+        for i in range(start, start + count):
+            _index_strip[i] = len(_strip_list)
+        _strip_list.append(np)
+        _strip_view_list.append(view)
+        _strip_starts.append(start)
+        start += count
+    _strip_starts.append(start)
+    
+    # 初期化直後の実機LEDの状態は不明なので、最初の flush() では必ず送信する
+    _strip_dirty = bytearray(b'\x01' * len(_strip_list))
+    _strip_color = array('l', [-1] * len(_strip_list))
+    reset_frame_stats()
+    _cancel_fades()
+    _fade_targets = []
+    _fade_flush = bytearray(len(_strip_list))
     
     print(f"Total LEDs initialized: {total_led_count}")
     print(f"Available strips: {list(available_strips)}")
@@ -74,48 +137,178 @@ def init_neopixels():
         print("Warning: No NeoPixel strips were successfully initialized. LED functionality will be disabled.")
 
 
+def _fill_view(view, r, g, b):
+    """
+    memoryview（3バイト × LED数）全体を単色で塗りつぶします。
+    先頭1LED分を書き込み、書き込み済みの範囲を倍々にスライスコピーします（ピクセルごとのループなし）。
+    """
+    n = len(view)
+    if n < 3:
+        return
+    view[_G_OFS] = g
+    view[_R_OFS] = r
+    view[_B_OFS] = b
+    filled = 3
+    while filled < n:
+        chunk = min(filled, n - filled)
+        view[filled:filled + chunk] = view[0:chunk]
+        filled += chunk
+
+
+def _view_has_color(view, r, g, b):
+    """memoryview の全LEDが指定色かどうか（最初に異なるLEDで打ち切り）"""
+    for i in range(0, len(view), 3):
+        if view[i + _G_OFS] != g or view[i + _R_OFS] != r or view[i + _B_OFS] != b:
+            return False
+    return True
+
+
+def _mark_dirty(k):
+    """ストリップ k を未送信にする（単色の記録も無効化）"""
+    _strip_dirty[k] = 1
+    _strip_color[k] = -1
+
+
+def _fill_range(first, last, r, g, b):
+    """
+    グローバルインデックス first 〜 last（両端を含む）を単色に設定します。
+    色が変わったストリップだけを未送信にします。範囲がストリップの境界に一致する場合は
+    _strip_color だけで判定し（framebuffer を読まない）、範囲全体を1回のスライスコピーで塗りつぶします。
+    """
+    k_first = _index_strip[first]
+    k_last = _index_strip[last]
+    if first == _strip_starts[k_first] and last + 1 == _strip_starts[k_last + 1]:
+        color = (r << 16) | (g << 8) | b
+        for k in range(k_first, k_last + 1):
+            if _strip_color[k] != color:
+                break
+        else:
+            return
+        _fill_view(_fb_view[first * 3:(last + 1) * 3], r, g, b)
+        for k in range(k_first, k_last + 1):
+            if _strip_color[k] != color:
+                _strip_color[k] = color
+                _strip_dirty[k] = 1
+        return
+
+    # ストリップの一部だけの範囲: ストリップごとに現在の色と比較
+    for k in range(k_first, k_last + 1):
+        lo = max(first, _strip_starts[k])
+        hi = min(last + 1, _strip_starts[k + 1])
+        view = _fb_view[lo * 3:hi * 3]
+        if not _view_has_color(view, r, g, b):
+            _fill_view(view, r, g, b)
+            if lo == _strip_starts[k] and hi == _strip_starts[k + 1]:
+                _strip_color[k] = (r << 16) | (g << 8) | b
+                _strip_dirty[k] = 1
+            else:
+                _mark_dirty(k)
+
+
+def _write_strip(k):
+    """_strip_list[k] のストリップを送信（buf を差し替えられなかった場合はフレームバッファからコピー）"""
+    np = _strip_list[k]
+    view = _strip_view_list[k]
+    if np.buf is not view:
+        np.buf[:] = view
+    np.write()
+
+
+def flush(strips=None):
+    """
+    前回の送信から変化したストリップだけを送信します。
+    
+    Args:
+        strips: 対象のストリップ番号（_strip_list の番号）の並び。None の場合はすべてのストリップ
+    
+    Returns:
+        int: 送信したストリップ数
+    """
+    if strips is None:
+        strips = range(len(_strip_list))
+    written = 0
+    for k in strips:
+        written += _flush_strip(k)
+    return written
+
+
+def _flush_strip(k):
+    """ストリップ k が未送信なら送信（送信した場合1、省略した場合0）"""
+    global frames_written, frames_skipped
+    if _strip_dirty[k]:
+        _strip_dirty[k] = 0
+        _write_strip(k)
+        frames_written += 1
+        return 1
+    frames_skipped += 1
+    return 0
+
+
+def get_frame_stats():
+    """
+    flush() の統計を返します。
+    
+    Returns:
+        dict: {'written': 送信したストリップ数, 'skipped': 変化がなく送信を省略したストリップ数}
+    """
+    return {'written': frames_written, 'skipped': frames_skipped}
+
+
+def reset_frame_stats():
+    """flush() の統計をリセットします。"""
+    global frames_written, frames_skipped
+    frames_written = 0
+    frames_skipped = 0
+
+
+def _is_contiguous(indices):
+    """インデックスのリスト（または range）が連続した範囲（昇順）かどうか"""
+    if not indices:
+        return False
+    if isinstance(indices, range):
+        return indices.step == 1
+    first = indices[0]
+    return indices[-1] - first == len(indices) - 1 and all(indices[i] == first + i for i in range(len(indices)))
+
+
 def set_global_led(index, r, g, b):
     """
     グローバルインデックス (0から total_led_count - 1) を使用して、単一のLEDの色を設定します。
+    色が変わった場合のみ、そのLEDのストリップを未送信にします。
     """
-    global led_color_cache
     if 0 <= index < total_led_count:
-        np, local_index = global_led_map[index]
-        
-        # 色を設定
-        np[local_index] = (r, g, b)
-        
-        # キャッシュを更新
-        led_color_cache[index] = (r, g, b)
+        offset = index * 3
+        if framebuffer[offset + _G_OFS] != g or framebuffer[offset + _R_OFS] != r or framebuffer[offset + _B_OFS] != b:
+            framebuffer[offset + _G_OFS] = g
+            framebuffer[offset + _R_OFS] = r
+            framebuffer[offset + _B_OFS] = b
+            _mark_dirty(_index_strip[index])
         
-        # np.write() は呼び出しません。呼び出し元でまとめて実行します。
+        # np.write() は呼び出しません。呼び出し元で flush() を実行します。
         return True
     return False
 
 
+def get_global_led(index):
+    """
+    グローバルインデックスのLEDの現在の色を (R, G, B) で返します。範囲外の場合はNone。
+    """
+    if 0 <= index < total_led_count:
+        offset = index * 3
+        return (framebuffer[offset + _R_OFS], framebuffer[offset + _G_OFS], framebuffer[offset + _B_OFS])
+    return None
+
+
 def get_global_indices_for_strip(strip_name):
     """
-    ストリップ名 ('LV1', 'LV2'など) を指定して、対応するグローバルインデックスのリストを返します。
+    ストリップ名 ('LV1', 'LV2'など) を指定して、対応するグローバルインデックスの範囲（range）を返します。
     """
-    if strip_name not in available_strips:
+    entry = strip_table.get(strip_name)
+    if entry is None:
         print(f"Warning: ストリップ '{strip_name}' は利用できません。")
-        return []
-        
-    current_index = 0
-    # config.NEOPIXEL_STRIPS の定義順序に依存するため、init_neopixels と同じソート順を使用
-    sorted_strips = sorted(config.NEOPIXEL_STRIPS.items())
-
-    for name, info in sorted_strips:
-        count = info['count']
-        if name == strip_name and name in available_strips:
-            # 該当ストリップの開始インデックスから終了インデックスまでのリストを生成
-            return list(range(current_index, current_index + count))
-        # 利用可能なストリップのみカウントを進める
-        if name in available_strips:
-            current_index += count
-        
-    # strip_name が見つからなかった場合は空のリストを返す
-    return []
+        return range(0)
+    start, count, np = entry
+    return range(start, start + count)
 
 
 def set_global_leds_by_indices(indices_or_strip_name, r, g, b):
@@ -131,85 +324,156 @@ def set_global_leds_by_indices(indices_or_strip_name, r, g, b):
     
     if isinstance(indices_or_strip_name, str):
         if indices_or_strip_name == "all":
-            # "all" の場合は全てのLEDのインデックスを使用
-            indices = list(range(total_led_count))
+            # "all" の場合はフレームバッファ全体を塗りつぶし
             print(f"LED: 全て ({total_led_count}個) を ({r}, {g}, {b}) で設定")
-        elif indices_or_strip_name in available_strips:
-            # ストリップ名の場合は対応するグローバルインデックスを取得
-            indices = get_global_indices_for_strip(indices_or_strip_name)
-            print(f"LED: ストリップ '{indices_or_strip_name}' ({len(indices)}個) を ({r}, {g}, {b}) で設定")
+            _cancel_fades()
+            _fill_range(0, total_led_count - 1, r, g, b)
+            flush()
+            return
+        elif indices_or_strip_name in strip_table:
+            # ストリップ名の場合はそのストリップ部分だけを塗りつぶし
+            start, count, np = strip_table[indices_or_strip_name]
+            print(f"LED: ストリップ '{indices_or_strip_name}' ({count}個) を ({r}, {g}, {b}) で設定")
+            _cancel_fades(range(start, start + count))
+            _fill_range(start, start + count - 1, r, g, b)
+            flush((_index_strip[start],))
+            return
         else:
             print(f"Error: 無効または利用不可のストリップ名: {indices_or_strip_name}")
             return
             
-    elif isinstance(indices_or_strip_name, list):
-        # リストの場合はそのまま使用
+    elif isinstance(indices_or_strip_name, (list, range)):
+        # リスト・range の場合はそのまま使用
         indices = indices_or_strip_name
         print(f"LED: グローバルインデックス {indices} を ({r}, {g}, {b}) で設定")
 
     else:
-        print(f"Error: set_global_leds_by_indices のインデックスはリストまたは文字列である必要があります: {indices_or_strip_name}")
+        print(f"Error: set_global_leds_by_indices のインデックスはリスト・rangeまたは文字列である必要があります: {indices_or_strip_name}")
         return
 
     # indices リストが空でなければ処理を続行
     if not indices:
         return
 
-    modified_strips = set()
+    _cancel_fades(indices)
+    _set_indices(indices, _in_range(indices), r, g, b)
+    # 対象のストリップのうち、色が変わったものだけを書き込み
+    flush(_strips_of(indices))
+
+
+def _set_indices(indices, contiguous, r, g, b):
+    """インデックスのリストのLEDを単色に設定（連続範囲ならスライスで一括設定）"""
+    if contiguous:
+        _fill_range(indices[0], indices[-1], r, g, b)
+    else:
+        for index in indices:
+            set_global_led(index, r, g, b)
+
+
+def _in_range(indices):
+    """インデックスのリストが framebuffer 内の連続範囲かどうか"""
+    return _is_contiguous(indices) and 0 <= indices[0] and indices[-1] < total_led_count
+
+
+def _strips_of(indices):
+    """インデックスのリストを含むストリップ番号のリスト（昇順）"""
+    if _in_range(indices):
+        return range(_index_strip[indices[0]], _index_strip[indices[-1]] + 1)
+    strips = set()
     for index in indices:
-        if set_global_led(index, r, g, b):
-            # 変更があったストリップインスタンスを記録
-            modified_strips.add(global_led_map[index][0])
-            
-    # 変更があったストリップのみを書き込み
-    for np in modified_strips:
-        np.write()
+        if 0 <= index < total_led_count:
+            strips.add(_index_strip[index])
+    return sorted(strips)
         
 # --- NEW: フェード機能 ---
 
-def fade_global_leds(indices, start_color, end_color, duration_ms, stop_flag_ref):
+def fade_global_leds(indices, start_color, end_color, duration_ms, stop_flag_ref, easing=fade_controller.EASING_LINEAR):
     """
-    指定されたグローバルインデックスのLED群を、開始色から終了色まで指定時間でフェードさせます。
+    指定されたグローバルインデックスのLED群を、開始色から終了色まで指定時間でフェードさせます（ブロッキング）。
+    fade_global_leds_gen() を呼び出し元のスレッドで最後まで実行します。
     
     注意: この関数は常にインデックスのリスト (indices) を受け取る必要があります。
     """
+    step_scheduler.run_blocking(fade_global_leds_gen(indices, start_color, end_color, duration_ms, stop_flag_ref, easing))
+
+
+def fade_global_leds_gen(indices, start_color, end_color, duration_ms, stop_flag_ref, easing=fade_controller.EASING_LINEAR):
+    """
+    fade_global_leds() の再開可能ステップ版。
+    共通フェードエンジンに登録して終了まで待機するため、他のLED群・PWM LEDのフェードと同じ周期で、
+    1回の tick につき1回の flush() でまとめて更新されます。
+    
+    Args:
+        indices: グローバルインデックスのリストまたは range
+        start_color: 開始色 (R, G, B)
+        end_color: 終了色 (R, G, B)
+        duration_ms: フェード時間（ミリ秒）
+        stop_flag_ref: 停止フラグのリスト参照 [bool]
+        easing: イージングID（fade_controller.easing_id() の戻り値、デフォルト: 線形）
+    """
     if not indices or duration_ms <= 0:
         # インデックスが空または時間が0の場合は即座に終了色を設定
         if indices:
             set_global_leds_by_indices(indices, end_color[0], end_color[1], end_color[2])
         return
     
-    # フェード処理のステップ間隔
-    STEP_INTERVAL_MS = 10
+    # 開始色と終了色が同じ場合は処理不要
+    if tuple(start_color) == tuple(end_color):
+        return
     
     print(f"LED: フェード開始 ({duration_ms}ms)")
     
-    # 更新コールバック関数
-    def update_callback(color):
-        r, g, b = color
-        modified_strips = set()
-        for index in indices:
-            if set_global_led(index, r, g, b):
-                modified_strips.add(global_led_map[index][0])
-        
-        # 変更があったストリップのみを書き込み
-        for np in modified_strips:
-            np.write()
-    
-    # 共通フェード処理を使用
-    success = fade_controller.linear_fade(
-        start_color,
-        end_color,
-        duration_ms,
-        STEP_INTERVAL_MS,
-        update_callback,
-        stop_flag_ref
-    )
+    channel = _fade_channel(indices)
+    fade_controller.start_fade(_FADE_SINK, channel, start_color, end_color, duration_ms, easing)
+    success = yield from fade_controller.run_fades_gen(stop_flag_ref, _FADE_SINK, channel)
     
     if not success and stop_flag_ref and stop_flag_ref[0]:
         print("フェードパターンを中断しました。")
 
 
+def _fade_channel(indices):
+    """LED群のフェード用チャンネル番号（同じLED群には同じ番号を返す）"""
+    for channel in range(len(_fade_targets)):
+        if _fade_targets[channel][0] == indices:
+            return channel
+    _fade_targets.append((indices, _in_range(indices), _strips_of(indices)))
+    return len(_fade_targets) - 1
+
+
+def _cancel_fades(indices=None):
+    """LED群（None の場合はすべて）の実行中のフェードを止める（直接の設定を優先）"""
+    for channel in range(len(_fade_targets)):
+        if indices is None or _fade_targets[channel][0] == indices:
+            fade_controller.cancel_fade(_FADE_SINK, channel)
+
+
+def _apply_fades(channels, values, count):
+    """
+    フェードエンジンの出力先: 1回の tick で更新された全LED群の色を設定し、まとめて1回送信
+    
+    Args:
+        channels: フェード用チャンネル番号の配列
+        values: 色（values[k * FADE_LANES] から R, G, B）
+        count: 更新するLED群の数
+    """
+    lanes = fade_controller.FADE_LANES
+    for k in range(count):
+        indices, contiguous, strips = _fade_targets[channels[k]]
+        base = k * lanes
+        _set_indices(indices, contiguous, values[base], values[base + 1], values[base + 2])
+        for s in strips:
+            _fade_flush[s] = 1
+    
+    # 対象のストリップのうち、色が変わったものだけを書き込み（前のステップと同じ色なら送信しない）
+    for s in range(len(_fade_flush)):
+        if _fade_flush[s]:
+            _fade_flush[s] = 0
+            _flush_strip(s)
+
+
+_FADE_SINK = fade_controller.register_fade_sink(_apply_fades)
+
+
 def get_total_led_count():
     """
     初期化された全LEDの総数を返します。
@@ -224,45 +488,34 @@ def execute_color_command(strip_name, led_index, r, g, b, duration_ms, stop_flag
         print(f"Error: Strip '{strip_name}' は利用できません。")
         return
 
-    np = neopixels[strip_name]
+    start, count, np = strip_table[strip_name]
+    k = _index_strip[start]
+    view = strip_views[strip_name]
     
-    # ストリップの開始グローバルインデックスを特定
-    start_global_index = -1
-    current_index = 0
-    for name, info in sorted(config.NEOPIXEL_STRIPS.items()):
-        if name == strip_name:
-            start_global_index = current_index
-            break
-        if name in available_strips:  # 利用可能なストリップのみカウント
-            current_index += info['count']
-    
-    original_colors = []
-    indices_to_restore = []
-
-    # 1. 色の設定
+    # 1. 色の設定（元の色はフレームバッファの該当部分をコピーして保存）
     if led_index == "ALL":
         print(f"LED: ストリップ '{strip_name}' のすべてを ({r}, {g}, {b}) で点灯")
-        # リスト内包表記でメモリ効率を向上
-        original_colors = [np[i] for i in range(np.n)]
-        indices_to_restore = [start_global_index + i for i in range(np.n)]
-        for i in range(np.n):
-            np[i] = (r, g, b)
-        np.write()
+        first, last = start, start + count - 1
+        target = view
     else:
         try:
             index = int(led_index)
             if 0 <= index < np.n:
                 print(f"LED: ストリップ '{strip_name}' インデックス {index} を ({r}, {g}, {b}) で点灯")
-                original_colors.append(np[index])
-                np[index] = (r, g, b)
-                np.write()
-                indices_to_restore.append(start_global_index + index)
+                first = last = start + index
+                target = view[index * 3:index * 3 + 3]
             else:
                 print(f"Error: ストリップ '{strip_name}' の無効なLEDインデックス {index}")
                 return
         except ValueError:
             print(f"Error: 無効なLEDインデックス型: {led_index}")
             return
+    
+    original_colors = bytes(target)
+    _fill_range(first, last, r, g, b)
+    # 色が変わらなかった場合は、送信も復元も不要
+    changed = _strip_dirty[k]
+    flush((k,))
 
     # 2. 停止フラグをチェックしながら待機
     start_time = time.ticks_ms()
@@ -272,41 +525,23 @@ def execute_color_command(strip_name, led_index, r, g, b, duration_ms, stop_flag
             break
         time.sleep_ms(50)
         
-    # 3. 元の色に戻します（グローバルキャッシュを利用して復元）
-    if indices_to_restore:
-        modified_strips = set()
-        for i, global_index in enumerate(indices_to_restore):
-            if 0 <= global_index < total_led_count:
-                # 復元する色は一時設定前の色に戻します
-                restore_r, restore_g, restore_b = original_colors[i] 
-                
-                np_restore, local_index_restore = global_led_map[global_index]
-                
-                np_restore[local_index_restore] = (restore_r, restore_g, restore_b)
-                led_color_cache[global_index] = (restore_r, restore_g, restore_b) # キャッシュも更新
-                modified_strips.add(np_restore)
-            
-        for np in modified_strips:
-            np.write()
+    # 3. 元の色に戻します
+    if changed:
+        target[:] = original_colors
+        _mark_dirty(k)
+        flush((k,))
 
 
 def pattern_off(stop_flag_ref):
     """
     すべての NeoPixel ストリップのすべての LED を消灯します。
-    色キャッシュもリセットされます。
+    フレームバッファもクリアされます。
     """
-    global led_color_cache
-    
     if not is_neopixel_available():
         print("全LEDを消灯（スキップ - 利用可能なNeoPixelストリップがありません）")
         return
         
     print("全LEDを消灯します")
-    for strip_name in available_strips:
-        if strip_name in neopixels:
-            strip = neopixels[strip_name]
-            strip.fill((0, 0, 0))
-            strip.write()
-        
-    # キャッシュをクリア
-    led_color_cache = [(0, 0, 0)] * total_led_count
+    _cancel_fades()
+    _fill_range(0, total_led_count - 1, 0, 0, 0)
+    flush()
@@ -4,10 +4,22 @@ import time
 from machine import Pin, I2C
 from ssd1306 import SSD1306_I2C # MicroPythonのssd1306ライブラリを使用
 
+# SSD1306 のアドレス設定コマンド（部分更新用）
+_SET_COL_ADDR = 0x21
+_SET_PAGE_ADDR = 0x22
+
 # OLEDオブジェクト
 oled = None
 oled_available = False
 
+# 最後に送信したフレームバッファの写し（変化したページ・列だけを送信するための比較元）
+_shadow = None
+_shadow_valid = False
+# 最後に表示した行（同じ内容の表示要求は描画・送信を省略）
+_last_lines = None
+# 送信統計
+_frame_stats = {'full': 0, 'partial': 0, 'skipped': 0, 'bytes': 0}
+
 def is_oled_available():
     """
     OLEDディスプレイが利用可能かどうかを返します。
@@ -18,9 +30,11 @@ def init_oled():
     """
     OLEDディスプレイを初期化し、グローバル変数 'oled' に設定します。
     """
-    global oled, oled_available
+    global oled, oled_available, _shadow, _shadow_valid, _last_lines
     
     oled_available = False
+    _shadow_valid = False
+    _last_lines = None
     
     # config.py から設定を直接読み込み
     i2c_id = config.I2C_ID
@@ -46,6 +60,12 @@ def init_oled():
         oled.fill(0)
         oled.text("OLED Initialized", 0, 0)
         oled.show()
+        # 部分更新はフレームバッファとコマンド送信を公開しているドライバ（MicroPython の ssd1306）のみ
+        if hasattr(oled, 'buffer') and hasattr(oled, 'write_cmd') and hasattr(oled, 'write_data'):
+            _shadow = bytearray(oled.buffer)
+            _shadow_valid = True
+        else:
+            _shadow = None
         print("OLEDディスプレイの初期化が完了しました。")
         oled_available = True
         
@@ -62,36 +82,139 @@ def init_oled():
         oled_available = False
 
 
+def _flush():
+    """
+    フレームバッファを送信します。
+    前回送信した内容と比較し、変化したページ（8行単位）ごとに変化した列の範囲だけを送信します
+    （初回・再初期化後、または部分更新に対応していないドライバでは全体を show() で送信）。
+    """
+    global _shadow_valid
+    if _shadow is None or not _shadow_valid:
+        oled.show()
+        _frame_stats['full'] += 1
+        if _shadow is not None:
+            _frame_stats['bytes'] += len(_shadow)
+            _shadow[:] = oled.buffer
+            _shadow_valid = True
+        return
+
+    buf = oled.buffer
+    width = oled.width
+    col_offset = (128 - width) // 2 if width < 128 else 0
+    sent = 0
+    for page in range(len(buf) // width):
+        start = page * width
+        end = start + width
+        if buf[start:end] == _shadow[start:end]:
+            continue
+        # 変化した列の範囲（左右から最初に異なる列を探す）
+        x0 = start
+        while buf[x0] == _shadow[x0]:
+            x0 += 1
+        x1 = end - 1
+        while buf[x1] == _shadow[x1]:
+            x1 -= 1
+        oled.write_cmd(_SET_COL_ADDR)
+        oled.write_cmd(x0 - start + col_offset)
+        oled.write_cmd(x1 - start + col_offset)
+        oled.write_cmd(_SET_PAGE_ADDR)
+        oled.write_cmd(page)
+        oled.write_cmd(page)
+        oled.write_data(memoryview(buf)[x0:x1 + 1])
+        _shadow[x0:x1 + 1] = buf[x0:x1 + 1]
+        sent += x1 + 1 - x0
+
+    if sent:
+        _frame_stats['partial'] += 1
+        _frame_stats['bytes'] += sent
+    else:
+        _frame_stats['skipped'] += 1
+
+
+def _render(lines):
+    """行のリストをフレームバッファに描画"""
+    oled.fill(0)  # 画面をクリア
+
+    line_height = getattr(config, 'OLED_LINE_HEIGHT', 10)
+    
+    # 複数行のメッセージを表示
+    for i, message in enumerate(lines):
+        y_pos = i * line_height 
+        x_start = 0 
+        oled.text(message, x_start, y_pos)
+
+
+def _to_lines(message_list):
+    """メッセージリストを表示する行（文字列、最大 OLED_MAX_LINES 行）に変換"""
+    max_lines = getattr(config, 'OLED_MAX_LINES', 4)
+    return [str(message) for message in message_list[:max_lines]]
+
+
+def show_message(message_list):
+    """
+    メッセージリストを描画して送信します（DisplayManager の表示処理用）。
+    push_message() と異なり I2C エラー時に待機・再初期化・再試行を行わず、OSError をそのまま送出します
+    （再初期化と再試行は呼び出し側がバックオフ付きで行います）。
+
+    Args:
+        message_list: 表示するメッセージのリスト
+
+    Returns:
+        bool: 表示した（または同じ内容のため省略した）場合は True、OLEDが利用できない場合は False
+    """
+    global _shadow_valid, _last_lines
+    if not oled_available or oled is None:
+        print(f"OLED: {' | '.join(str(msg) for msg in message_list)}")
+        return False
+
+    lines = _to_lines(message_list)
+    if lines == _last_lines:
+        _frame_stats['skipped'] += 1
+        return True
+
+    _render(lines)
+    try:
+        _flush()
+    except OSError:
+        # 送信途中で失敗した場合は画面の内容が分からないため、次回は全体を送信
+        _shadow_valid = False
+        _last_lines = None
+        raise
+    _last_lines = lines
+    return True
+
+
 def push_message(message_list):
     """
     メッセージリストをOLEDに表示します。
     メッセージリストは最大4行分を想定します。
+    前回と同じ内容の場合は何もせず、変化した部分（SSD1306 のページ・列単位）のみを送信します。
+    I2C エラー時はその場で待機・再初期化するため、起動後の表示は DisplayManager を経由してください。
     
     【修正】: I2Cタイムアウトエラー (Errno 110) に対応するための再試行ロジックを搭載。
     """
-    global oled, oled_available
+    global oled, oled_available, _last_lines
     if not oled_available or oled is None:
         # OLEDが利用できない場合は、コンソールにメッセージを出力
         print(f"OLED: {' | '.join(str(msg) for msg in message_list)}")
         return
 
-    oled.fill(0)  # 画面をクリア
+    lines = _to_lines(message_list)
+    if lines == _last_lines:
+        _frame_stats['skipped'] += 1
+        return
 
-    line_height = getattr(config, 'OLED_LINE_HEIGHT', 10)
-    max_lines = getattr(config, 'OLED_MAX_LINES', 4)
-    
-    # 複数行のメッセージを表示
-    for i, message in enumerate(message_list[:max_lines]): 
-        y_pos = i * line_height 
-        x_start = 0 
-        oled.text(str(message), x_start, y_pos)
+    _render(lines)
         
     # タイムアウトエラーに対応するための再試行ロジック
     MAX_RETRIES = getattr(config, 'OLED_I2C_RETRY_COUNT', 1)
     for attempt in range(MAX_RETRIES + 1):
         try:
-            # 画面に描画を反映
-            oled.show()
+            # 画面に描画を反映（再初期化後は描画し直して全体を送信）
+            if attempt > 0:
+                _render(lines)
+            _flush()
+            _last_lines = lines
             if attempt > 0:
                 print("OLED: I2C通信が回復し、メッセージを表示しました。")
             return # 成功したら終了
@@ -126,7 +249,7 @@ def clear_screen():
     
     【修正】: I2Cタイムアウトエラーに対応するためのエラーハンドリングを搭載。
     """
-    global oled, oled_available
+    global oled, oled_available, _last_lines
     if not oled_available or oled is None:
         print("OLED: 画面クリア（スキップ - OLED利用不可）")
         return
@@ -135,7 +258,8 @@ def clear_screen():
     
     # oled.show() でエラーが出る場合があるため、try-except でラップ
     try:
-        oled.show()
+        _flush()
+        _last_lines = []
     except OSError as e:
         if '[Errno 110] ETIMEDOUT' in str(e) or '110' in str(e):
             print("Warning: OLED I2Cタイムアウトを検出しました (クリア時)。showをスキップします。")
@@ -144,4 +268,19 @@ def clear_screen():
             print(f"Error: OLEDクリア中に予期せぬOSErrorが発生しました: {e}")
             oled_available = False # 利用不可フラグを設定
 
+def get_frame_stats():
+    """
+    送信統計を返します。
+
+    Returns:
+        dict: full（全体送信）、partial（部分送信）、skipped（送信なし）の回数と、bytes（送信した表示データのバイト数）
+    """
+    return dict(_frame_stats)
+
+
+def reset_frame_stats():
+    """送信統計をリセット"""
+    for key in _frame_stats:
+        _frame_stats[key] = 0
+
 # (注意: このコードは init_oled が外部から呼び出されることを前提としています)
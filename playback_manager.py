@@ -2,8 +2,10 @@
 import time
 import gc
 import effects
-import _thread
 import logger
+import playback_worker
+import scenario_compiler
+import step_scheduler
 
 class PlaybackManager:
     """シナリオ再生管理を担当するクラス"""
@@ -14,6 +16,39 @@ class PlaybackManager:
         self.stop_flag = [False]
         self.current_play_scenario = None
         self.play_complete_callback = None
+        # 非同期メインループ時のタスク起動関数（asyncio.create_task）。Noneならワーカースレッドで再生
+        self.task_runner = None
+        # ワーカースレッド（core1）で実行中の再生の要求番号
+        self.worker_poll_ms = getattr(config, 'PLAYBACK_WORKER_POLL_MS', 5) if config else 5
+        self.worker = None
+        self._job_id = None
+        # 非同期モードで実行中の再生タスクと、再生ごとの識別子（切り替え後の古い再生の終了処理を無視する）
+        self._task = None
+        self._play_token = None
+        # キャンセルしたがまだ終了していない（finally の処理中の）タスク
+        self._unwinding = []
+        # ワーカーで中断したシナリオが時間内に終了しなかった場合、その終了後にワーカー上で後始末する
+        self._deferred_cleanup = False
+        
+        # 再生中の開始要求で現在のシナリオを中断して切り替える（False なら従来どおり無視）
+        self.preempt = getattr(config, 'PLAYBACK_PREEMPT', True) if config else True
+        self.switch_timeout_ms = getattr(config, 'PLAYBACK_SWITCH_TIMEOUT_MS', 80) if config else 80
+        # 切り替えの統計（要求から次のシナリオの開始までの時間）
+        self.switches = 0
+        self.switch_timeouts = 0
+        self.last_switch_ms = None
+        self.max_switch_ms = 0
+        
+        # プレイリスト（続けて再生するシナリオキーの上限つきキュー）
+        self.playlist = []
+        self.playlist_size = getattr(config, 'PLAYLIST_SIZE', 8) if config else 8
+        self.playlist_gap_ms = getattr(config, 'PLAYLIST_GAP_MS', 0) if config else 0
+        self.prefetch = getattr(config, 'PLAYLIST_PREFETCH', True) if config else True
+        self.prefetch_compile = getattr(config, 'SCENARIO_PRECOMPILE', True) if config else True
+        self._playlist_dm = None
+        self._next_start = None      # プレイリストの次のシナリオを開始できる時刻
+        self._prefetched = None      # (シナリオキー, 読み込み・コンパイル済みのデータ)
+        self.prefetch_hits = 0
         
         # メモリ管理設定
         self.gc_on_complete = getattr(config, 'GC_ON_SCENARIO_COMPLETE', True) if config else True
@@ -23,63 +58,215 @@ class PlaybackManager:
         """再生完了時のコールバックを設定"""
         self.play_complete_callback = callback
 
+    def set_task_runner(self, runner):
+        """
+        再生をコルーチンとして起動する関数を設定（非同期メインループ用）
+        
+        Args:
+            runner: コルーチンを受け取ってタスクとして起動する関数（asyncio.create_task）。Noneでワーカースレッドでの再生に戻す
+        """
+        self.task_runner = runner
+
     def start_scenario(self, num, dm):
         """
         シナリオ再生を開始
+        再生中の場合は現在のシナリオを中断し、終了の確認と周辺機器の後始末の後に切り替えます
+        （PLAYBACK_PREEMPT = False の場合は要求を無視）。
         
         Args:
             num: シナリオ番号
             dm: DisplayManager インスタンス（エラー表示用）
         """
+        switch_start = None
         if self.is_playing:
-            logger.log_info("Scenario already playing — ignoring request")
-            return
+            if not self.preempt:
+                logger.log_info("Scenario already playing — ignoring request")
+                return
+            switch_start = time.ticks_ms()
+            logger.log_info(f"Switching scenario {self.current_play_scenario} -> {num}")
+            self._cancel_current()
         
         self.current_play_scenario = num
         self.is_playing = True
-        self.stop_flag[0] = False
-        self._start_scenario_in_thread(num, dm)
+        # 再生ごとに新しい停止フラグ（停止処理中の前のシナリオのフラグを戻さない）
+        self.stop_flag = [False]
+        self._play_token = object()
+        # シナリオデータは呼び出し側のスレッドで取得（先読みと同時にストアを読まない）
+        data, error = self._load_scenario(num)
+        if self.task_runner:
+            # 中断したタスクの終了の確認と後始末は、新しいタスクの中で行う
+            self._start_scenario_as_task(num, dm, data, error, switch_start)
+        else:
+            # 切り替え時間はワーカーが新しい要求を開始した時点で記録する
+            self._start_scenario_on_worker(num, dm, data, error, switch_start)
+
+    def _record_switch(self, switch_start):
+        """切り替えの統計を記録（要求から次のシナリオの開始まで）"""
+        elapsed = time.ticks_diff(time.ticks_ms(), switch_start)
+        self.switches += 1
+        self.last_switch_ms = elapsed
+        self.max_switch_ms = max(self.max_switch_ms, elapsed)
+
+    def _cancel_current(self):
+        """
+        再生中のシナリオを中断します。中断したシナリオの終了処理（完了コールバック）は呼ばれません。
+        ワーカーで再生中の場合は、終了を最大 switch_timeout_ms 待ってから周辺機器の後始末を行います
+        （時間内に終了しない場合、後始末はそのシナリオの終了後にワーカー上で行う）。
+        非同期モードではタスクをキャンセルするだけで、終了の確認と後始末は
+        呼び出し側のコルーチンが _await_unwinding() の後に行います。
+        
+        Returns:
+            bool: 後始末まで済んだ場合 True（非同期モードでは False）
+        """
+        self.stop_flag[0] = True
+        self._play_token = None
+        if self._task is not None:
+            # イベントループ上のタスクは次の待機点で CancelledError により終了する（finally はその後に実行される）
+            self._task.cancel()
+            self._unwinding.append(self._task)
+            self._task = None
+            return False
+        
+        stopped = True
+        if self.worker is not None and self._job_id is not None:
+            stopped = self._wait_worker(self._job_id, self.switch_timeout_ms)
+            self._job_id = None
+        if stopped:
+            effects.cleanup_peripherals()
+        else:
+            # ワーカーはまだ中断したシナリオを実行中: ここで周辺機器を操作すると競合するため、
+            # 後始末はワーカーの次の要求の先頭で行う（要求は順に実行されるため、その時点で終了済み）
+            self.switch_timeouts += 1
+            logger.log_warning(f"Scenario did not stop within {self.switch_timeout_ms}ms, cleanup deferred until it ends")
+            self._deferred_cleanup = True
+        return True
+
+    def _cleanup_after_cancel(self, stopped):
+        """中断したシナリオの終了を確認した後（またはタイムアウト後）の周辺機器の後始末"""
+        if not stopped:
+            self.switch_timeouts += 1
+            logger.log_warning(f"Scenario did not stop within {self.switch_timeout_ms}ms, switching anyway")
+        effects.cleanup_peripherals()
+
+    async def _await_unwinding(self):
+        """
+        キャンセルしたタスクが終了する（finally の処理を終える）まで最大 switch_timeout_ms 待機
+        
+        Returns:
+            bool: 時間内に終了を確認できた場合 True
+        """
+        deadline = time.ticks_add(time.ticks_ms(), self.switch_timeout_ms)
+        while self._unwinding:
+            if self._unwinding[0].done():
+                self._unwinding.pop(0)
+            elif time.ticks_diff(deadline, time.ticks_ms()) <= 0:
+                self._unwinding.clear()
+                return False
+            else:
+                await step_scheduler.sleep_ms_async(1)
+        return True
+
+    async def _cleanup_after_stop_async(self):
+        """停止したタスクの終了を待って後始末（その間に次のシナリオが始まった場合はそちらで行う）"""
+        stopped = await self._await_unwinding()
+        if not self.is_playing:
+            self._cleanup_after_cancel(stopped)
 
-    def _start_scenario_in_thread(self, num, dm):
-        """スレッドで再生（起動失敗を安全にハンドル）"""
-        def thread_func():
+    def _run_deferred_cleanup(self):
+        """ワーカー上で、時間内に終了しなかったシナリオの後始末を行う（保留中の場合のみ）"""
+        if self._deferred_cleanup:
+            self._deferred_cleanup = False
+            effects.cleanup_peripherals()
+
+    def _wait_worker(self, job_id, timeout_ms):
+        """
+        ワーカーが要求 job_id を解放するまで最大 timeout_ms 待機
+        （まだ開始していない要求は受付箱から取り下げ、実行中の場合は終了を待つ）
+        
+        Returns:
+            bool: 時間内に解放を確認できた場合 True
+        """
+        deadline = time.ticks_add(time.ticks_ms(), timeout_ms)
+        while not self.worker.withdraw(job_id):
+            if time.ticks_diff(deadline, time.ticks_ms()) <= 0:
+                return False
+            time.sleep_ms(1)
+        return True
+
+    def _load_scenario(self, num):
+        """
+        シナリオデータを取得します（先読み済みの場合はそれを使用）。
+        
+        Returns:
+            tuple: (データ, 例外)。取得できない場合はデータが None で、例外は再生側で報告する
+        """
+        prefetched = self._prefetched
+        self._prefetched = None
+        if prefetched is not None and prefetched[0] == num and prefetched[1] is not None:
+            self.prefetch_hits += 1
+            return prefetched[1], None
+        try:
+            if num not in self.scenarios_data:
+                raise KeyError(f"Scenario '{num}' not found")
+            return self.scenarios_data[num], None
+        except Exception as e:
+            return None, e
+
+    def _start_scenario_as_task(self, num, dm, data, error, switch_start=None):
+        """イベントループ上のタスクとして再生（起動失敗を安全にハンドル）"""
+        try:
+            self._task = self.task_runner(self._play_async(num, dm, self._play_token, data, error, self.stop_flag, switch_start))
+        except Exception as e:
+            logger.log_error(f"Task start error: {e}")
+            import sys
+            sys.print_exception(e)
+            dm.push_message(["System", "Error"])
+            self.is_playing = False
+            self.stop_flag[0] = True
+
+    async def _play_async(self, num, dm, token, data, error, stop_flag, switch_start=None):
+        """シナリオ再生コルーチン（切り替えで中断された場合は終了処理を行わない）"""
+        try:
+            if self._unwinding:
+                # 中断したシナリオのタスクの終了（finally の後始末を含む）を待ってから、周辺機器を後始末して開始
+                self._cleanup_after_cancel(await self._await_unwinding())
+            if switch_start is not None:
+                self._record_switch(switch_start)
+
+            if error is not None:
+                raise error
+
+            await effects.execute_command_async(data, stop_flag)
+        except Exception as e:
+            self._report_play_error(num, e, dm)
+        finally:
+            if token is self._play_token:
+                self._task = None
+                self._finish_play()
+
+    def _start_scenario_on_worker(self, num, dm, data, error, switch_start=None):
+        """
+        常駐のワーカースレッドで再生（起動失敗を安全にハンドル）
+        前のシナリオが停止処理中の場合、要求はその終了後に開始されます。終了は poll() で処理します。
+        """
+        stop_flag = self.stop_flag
+
+        def job():
             try:
-                # シナリオデータを取得
-                if num not in self.scenarios_data:
-                    raise KeyError(f"Scenario '{num}' not found")
-                
-                scenario_commands = self.scenarios_data[num]
-                effects.execute_command(scenario_commands, self.stop_flag)
-            except OSError as e:
-                # ハードウェア関連エラー（GPIO, I2C, UART等）
-                logger.log_error(f"Scenario {num} failed: {e}")
-                dm.push_message(["Hardware", "Error"])
-            except KeyError as e:
-                # シナリオデータの不整合
-                logger.log_error(f"Invalid scenario key {num}: {e}")
-                dm.push_message(["Invalid", "Scenario"])
-            except MemoryError as e:
-                # メモリ不足
-                logger.log_error(f"Out of memory in scenario {num}: {e}")
-                dm.push_message(["Memory", "Error"])
+                self._run_deferred_cleanup()
+                if switch_start is not None:
+                    self._record_switch(switch_start)
+                if error is not None:
+                    raise error
+                effects.execute_command(data, stop_flag)
             except Exception as e:
-                # その他の予期しないエラー
-                logger.log_error(f"Scenario thread failed: {e}")
-                import sys
-                sys.print_exception(e)
-                dm.push_message(["Playback", "Error"])
-            finally:
-                # 再生終了処理（例外時でも呼ぶ）
-                try:
-                    self._on_play_complete()
-                except Exception as e2:
-                    logger.log_error(f"play_complete_callback failed: {e2}")
-                    import sys
-                    sys.print_exception(e2)
-
-        # スレッド起動を試行
+                self._report_play_error(num, e, dm)
+
+        # ワーカーに要求を送信（初回はワーカースレッドを起動）
         try:
-            _thread.start_new_thread(thread_func, ())
+            if self.worker is None:
+                self.worker = playback_worker.get_worker(self.worker_poll_ms)
+            self._job_id = self.worker.submit(job)
         except OSError as e:
             # スレッド起動失敗（core1 in use, メモリ不足など）
             logger.log_error(f"Thread start failed: {e}")
@@ -99,15 +286,135 @@ class PlaybackManager:
             self.is_playing = False
             self.stop_flag[0] = True
 
+    def poll(self):
+        """
+        ワーカースレッドからの終了通知を処理します（メインループから呼び出す）。
+        再生完了の処理（GC・コールバック）はメインループ側で実行されます。
+        置き換えられた古い要求の終了は無視します。
+        """
+        if self.worker is not None:
+            for job_id in self.worker.poll():
+                if job_id == self._job_id:
+                    self._job_id = None
+                    self._finish_play()
+        self._update_playlist()
+
+    # ----------------------------------------------------------------------
+    # プレイリスト
+    # ----------------------------------------------------------------------
+    def enqueue(self, num, dm):
+        """
+        シナリオをプレイリストに追加します。再生中でなければ次の poll() で開始し、
+        以降は前のシナリオの終了後に playlist_gap_ms 空けて順に再生します。
+        
+        Args:
+            num: シナリオ番号
+            dm: DisplayManager インスタンス（エラー表示用）
+        
+        Returns:
+            bool: プレイリストが一杯で追加できなかった場合は False
+        """
+        if len(self.playlist) >= self.playlist_size:
+            logger.log_warning(f"Playlist is full ({self.playlist_size}), scenario {num} not queued")
+            return False
+        self.playlist.append(num)
+        self._playlist_dm = dm
+        return True
+
+    def clear_playlist(self):
+        """プレイリストと先読みしたデータを破棄"""
+        self.playlist.clear()
+        self._prefetched = None
+        self._next_start = None
+
+    def _update_playlist(self):
+        """プレイリストの次のシナリオを先読みし、再生中でなく間隔が経過していれば開始"""
+        if not self.playlist:
+            return
+        if self.is_playing:
+            if self.prefetch and self._prefetched is None:
+                self._prefetch(self.playlist[0])
+            return
+        if self._next_start is not None and time.ticks_diff(time.ticks_ms(), self._next_start) < 0:
+            return
+        self._start_next()
+
+    def _prefetch(self, num):
+        """次のシナリオを読み込み・コンパイルしておく（失敗した場合は開始時に通常どおり読み込む）"""
+        data = None
+        try:
+            if num in self.scenarios_data:
+                data = self.scenarios_data[num]
+                if self.prefetch_compile:
+                    data = scenario_compiler.compile_entry(data, num)
+        except Exception as e:
+            logger.log_warning(f"Prefetch of scenario {num} failed: {e}")
+            data = None
+        self._prefetched = (num, data)
+
+    def _start_next(self):
+        """プレイリストの先頭のシナリオを開始"""
+        self._next_start = None
+        num = self.playlist.pop(0)
+        logger.log_info(f"Playlist: scenario {num} ({len(self.playlist)} more)")
+        self.start_scenario(num, self._playlist_dm)
+
+    def _report_play_error(self, num, e, dm):
+        """再生中の例外を種類別にログ出力し、OLEDに表示"""
+        if isinstance(e, OSError):
+            # ハードウェア関連エラー（GPIO, I2C, UART等）
+            logger.log_error(f"Scenario {num} failed: {e}")
+            dm.push_message(["Hardware", "Error"])
+        elif isinstance(e, KeyError):
+            # シナリオデータの不整合
+            logger.log_error(f"Invalid scenario key {num}: {e}")
+            dm.push_message(["Invalid", "Scenario"])
+        elif isinstance(e, MemoryError):
+            # メモリ不足
+            logger.log_error(f"Out of memory in scenario {num}: {e}")
+            dm.push_message(["Memory", "Error"])
+        else:
+            # その他の予期しないエラー
+            logger.log_error(f"Scenario thread failed: {e}")
+            import sys
+            sys.print_exception(e)
+            dm.push_message(["Playback", "Error"])
+
+    def _finish_play(self):
+        """再生終了処理（コールバックの例外はログのみ）"""
+        try:
+            self._on_play_complete()
+        except Exception as e2:
+            logger.log_error(f"play_complete_callback failed: {e2}")
+            import sys
+            sys.print_exception(e2)
+
     def stop_playback(self, dm):
-        """再生を停止"""
+        """
+        再生を停止（プレイリストも破棄）
+        切り替えと同様に、シナリオの終了を最大 switch_timeout_ms 待って周辺機器を後始末してから
+        完了処理を行います（非同期モードでは終了の確認と後始末をタスクで行い、
+        ワーカーのシナリオが時間内に終了しない場合は後始末をワーカー上でその終了後に行う）。
+        """
+        if self.playlist:
+            self.clear_playlist()
         if not self.is_playing:
             return
         
         logger.log_info("Playback stopped by user.")
-        self.stop_flag[0] = True
-        self.is_playing = False
+        if not self._cancel_current():
+            try:
+                self.task_runner(self._cleanup_after_stop_async())
+            except Exception as e:
+                logger.log_warning(f"Stop cleanup task failed to start: {e}")
+                effects.cleanup_peripherals()
+        elif self._deferred_cleanup:
+            # 時間内に終了しなかったシナリオの後始末をワーカーに依頼（次のシナリオで置き換えられた場合はそちらで行う）
+            self.worker.submit(self._run_deferred_cleanup)
+        # 中断したシナリオの停止フラグは立てたまま、次の再生用のフラグに替える
+        self.stop_flag = [False]
         dm.push_message(["Stopped"])
+        self._finish_play()
 
     def _on_play_complete(self):
         """再生完了時の内部処理"""
@@ -139,10 +446,33 @@ class PlaybackManager:
             except Exception as e:
                 logger.log_warning(f"Scenario completion GC failed: {e}")
         
+        # プレイリストの途中では完了コールバックを呼ばずに次のシナリオへ
+        if self.playlist:
+            if self.playlist_gap_ms > 0:
+                self._next_start = time.ticks_add(time.ticks_ms(), self.playlist_gap_ms)
+            else:
+                self._start_next()
+            return
+        
         # 外部コールバック呼び出し
         if self.play_complete_callback:
             self.play_complete_callback()
 
+    def get_switch_stats(self):
+        """
+        シナリオ切り替えの統計を返す
+        
+        Returns:
+            dict: switches（切り替え回数）、timeouts（時間内に終了を確認できなかった回数）、
+                  last_ms / max_ms（要求から次のシナリオの開始までの時間）
+        """
+        return {
+            'switches': self.switches,
+            'timeouts': self.switch_timeouts,
+            'last_ms': self.last_switch_ms,
+            'max_ms': self.max_switch_ms,
+        }
+
     def is_busy(self):
-        """再生中かどうかを返す"""
-        return self.is_playing
+        """再生中（またはプレイリストに続きがある）かどうかを返す"""
+        return self.is_playing or bool(self.playlist)
@@ -0,0 +1,154 @@
+# playback_worker.py
+# シナリオ再生用の常駐ワーカースレッド（RP2040 では core1 で動作）
+#
+# シナリオごとに _thread.start_new_thread() を呼ぶと、前のスレッドが終了しきる前に次のシナリオを
+# 開始した場合に "core1 in use" で失敗し、毎回スレッドのスタックを確保します。
+# ワーカーは最初の要求で1度だけ起動し、ロックで保護した1件分の受付箱から要求を受け取って実行します。
+# 実行中に届いた要求は受付箱で待機し（さらに新しい要求が届いた場合は置き換え）、実行中の要求の終了後に開始します。
+# 終了した要求の番号は完了リストに入れ、メインループが poll() で受け取ります。
+
+import _thread
+import time
+
+# ワーカーはプロセスに1つ（core1 で動かせるスレッドは1つのみ）
+_worker = None
+
+
+class PlaybackWorker:
+    """要求（引数なしの関数）を1つずつ実行する常駐スレッド"""
+
+    def __init__(self, poll_ms=5):
+        """
+        Args:
+            poll_ms: 待機中に受付箱を確認する間隔（ms）
+        """
+        self.poll_ms = poll_ms
+        self._lock = _thread.allocate_lock()
+        self._request = None  # (要求番号, 関数)
+        self._done = []       # 終了した要求番号
+        self._started = False
+        self._next_id = 0
+        self.current = None   # 実行中の要求番号
+
+        # 統計
+        self.jobs = 0
+        self.replaced = 0
+        self.errors = 0
+
+    def is_started(self):
+        """ワーカースレッドが起動済みか"""
+        return self._started
+
+    def start(self):
+        """
+        ワーカースレッドを起動します（起動済みの場合は何もしない）。
+
+        Raises:
+            OSError, RuntimeError: スレッドを起動できない場合（core1 使用中、メモリ不足など）
+        """
+        if self._started:
+            return
+        _thread.start_new_thread(self._run, ())
+        self._started = True
+
+    def submit(self, func):
+        """
+        要求を受付箱に入れます（待機しない）。ワーカーが未起動の場合は起動します。
+
+        Args:
+            func: ワーカースレッドで実行する関数（引数なし）
+
+        Returns:
+            int: 要求番号（終了時に poll() で返される）
+        """
+        self.start()
+        with self._lock:
+            if self._request is not None:
+                self.replaced += 1
+                self._done.append(self._request[0])  # 置き換えた要求は実行せずに終了扱い
+            self._next_id += 1
+            self._request = (self._next_id, func)
+            return self._next_id
+
+    def withdraw(self, job_id):
+        """
+        まだ開始していない要求を受付箱から取り下げます（終了扱いにして poll() で返す）。
+
+        Args:
+            job_id: 要求番号
+
+        Returns:
+            bool: 要求を解放済みの場合 True（取り下げた、または終了済み）。実行中の場合は False
+        """
+        with self._lock:
+            if self._request is not None and self._request[0] == job_id:
+                self._request = None
+                self._done.append(job_id)
+                return True
+            return self.current != job_id
+
+    def poll(self):
+        """
+        終了した要求を受け取ります（メインループから呼び出す）。
+
+        Returns:
+            list: 終了した要求番号のリスト（終了順）
+        """
+        if not self._done:
+            return []
+        with self._lock:
+            done = self._done
+            self._done = []
+        return done
+
+    def is_idle(self):
+        """実行中・待機中の要求がないか"""
+        return self._request is None and self.current is None
+
+    def _run(self):
+        """ワーカースレッド本体（終了しない）"""
+        while True:
+            with self._lock:
+                request = self._request
+                self._request = None
+                if request is not None:
+                    self.current = request[0]
+            if request is None:
+                time.sleep_ms(self.poll_ms)
+                continue
+
+            job_id, func = request
+            self.jobs += 1
+            try:
+                func()
+            except Exception as e:
+                self.errors += 1
+                print(f"[Error] Playback worker job failed: {e}")
+            with self._lock:
+                self.current = None
+                self._done.append(job_id)
+
+    def get_stats(self):
+        """実行の統計"""
+        return {
+            'started': self._started,
+            'jobs': self.jobs,
+            'replaced': self.replaced,
+            'errors': self.errors,
+        }
+
+
+def get_worker(poll_ms=5):
+    """
+    共有のワーカーを取得します（初回に作成、スレッドは最初の submit() で起動）。
+
+    Args:
+        poll_ms: 待機中に受付箱を確認する間隔（ms、作成時のみ使用）
+
+    Returns:
+        PlaybackWorker: ワーカー
+    """
+    global _worker
+    if _worker is None:
+        _worker = PlaybackWorker(poll_ms)
+    return _worker
@@ -2,7 +2,9 @@
 # PWM LED（単色LED）コマンドのハンドラー
 
 import pwm_led_controller
+import fade_controller
 import command_parser
+import step_scheduler
 
 def handle(cmd, stop_flag_ref):
     """
@@ -24,6 +26,16 @@ def handle(cmd, stop_flag_ref):
     else:
         print(f"[Warning] Unknown PWM LED command format: {cmd}")
 
+def register(register_handler):
+    """
+    PWM LED（旧形式）コマンドを effects のディスパッチテーブルに登録します。
+    
+    Args:
+        register_handler: effects.register_handler
+    """
+    for cmd_type in ('led_on', 'led_off', 'led_fade_in', 'led_fade_out'):
+        register_handler(cmd_type, handle)
+
 def _handle_led_on(params):
     """
     PWM LEDを点灯します。
@@ -36,7 +48,16 @@ def _handle_led_on(params):
     
     # 輝度バリデーション
     brightness = command_parser.validate_range(brightness, 0, 100, "brightness")
+    led_on(led_index, brightness)
+
+def led_on(led_index, brightness):
+    """
+    検証済みのパラメータでPWM LEDを点灯します。
     
+    Args:
+        led_index: LEDインデックス
+        brightness: 輝度パーセント (0-100、検証済み)
+    """
     if not pwm_led_controller.is_pwm_led_available():
         print(f"[Warning] PWM LED: LED #{led_index} 点灯（スキップ - PWM LED利用不可）")
         return
@@ -55,7 +76,15 @@ def _handle_led_off(params):
         params: パラメータ辞書
     """
     led_index = command_parser.get_param(params, 'led_index', 0)
+    led_off(led_index)
+
+def led_off(led_index):
+    """
+    PWM LEDを消灯します。
     
+    Args:
+        led_index: LEDインデックス
+    """
     if not pwm_led_controller.is_pwm_led_available():
         print(f"[Warning] PWM LED: LED #{led_index} 消灯（スキップ - PWM LED利用不可）")
         return
@@ -66,6 +95,15 @@ def _handle_led_off(params):
         error_context=f"PWM LED off #{led_index}"
     )
 
+def all_off():
+    """
+    全てのPWM LEDを消灯します。
+    """
+    command_parser.safe_call(
+        pwm_led_controller.all_off,
+        error_context="PWM LED all off"
+    )
+
 def _handle_led_fade_in(params, stop_flag_ref):
     """
     PWM LEDをフェードインします。
@@ -80,14 +118,27 @@ def _handle_led_fade_in(params, stop_flag_ref):
     
     # 輝度バリデーション
     brightness = command_parser.validate_range(brightness, 0, 100, "brightness")
+    easing = fade_controller.easing_id(command_parser.get_param(params, 'easing'))
+    fade_in(led_index, brightness, duration_ms, stop_flag_ref, easing)
+
+def fade_in(led_index, brightness, duration_ms, stop_flag_ref, easing=fade_controller.EASING_LINEAR):
+    """
+    検証済みのパラメータでPWM LEDをフェードインします。
     
+    Args:
+        led_index: LEDインデックス
+        brightness: 目標輝度パーセント (0-100、検証済み)
+        duration_ms: フェード時間（ミリ秒）
+        stop_flag_ref: 停止フラグのリスト参照
+        easing: イージングID（fade_controller.easing_id() の戻り値、デフォルト: 線形）
+    """
     if not pwm_led_controller.is_pwm_led_available():
         print(f"[Warning] PWM LED: LED #{led_index} フェードイン（スキップ - PWM LED利用不可）")
         return
     
     command_parser.safe_call(
         pwm_led_controller.fade_pwm_led,
-        led_index, brightness, duration_ms, stop_flag_ref,
+        led_index, brightness, duration_ms, stop_flag_ref, easing,
         error_context=f"PWM LED fade_in #{led_index}"
     )
 
@@ -101,13 +152,51 @@ def _handle_led_fade_out(params, stop_flag_ref):
     """
     led_index = command_parser.get_param(params, 'led_index', 0)
     duration_ms = command_parser.get_param(params, 'duration_ms', 0)
+    easing = fade_controller.easing_id(command_parser.get_param(params, 'easing'))
+    fade_out(led_index, duration_ms, stop_flag_ref, easing)
+
+def fade_out(led_index, duration_ms, stop_flag_ref, easing=fade_controller.EASING_LINEAR):
+    """
+    PWM LEDをフェードアウトします。
     
+    Args:
+        led_index: LEDインデックス
+        duration_ms: フェード時間（ミリ秒）
+        stop_flag_ref: 停止フラグのリスト参照
+        easing: イージングID（fade_controller.easing_id() の戻り値、デフォルト: 線形）
+    """
     if not pwm_led_controller.is_pwm_led_available():
         print(f"[Warning] PWM LED: LED #{led_index} フェードアウト（スキップ - PWM LED利用不可）")
         return
     
     command_parser.safe_call(
         pwm_led_controller.fade_pwm_led,
-        led_index, 0, duration_ms, stop_flag_ref,
+        led_index, 0, duration_ms, stop_flag_ref, easing,
         error_context=f"PWM LED fade_out #{led_index}"
     )
+
+def fade_in_gen(led_index, brightness, duration_ms, stop_flag_ref, easing=fade_controller.EASING_LINEAR):
+    """
+    fade_in() の再開可能ステップ版（並列トラック再生用）。
+    
+    Args:
+        fade_in() と同じ
+    """
+    if not pwm_led_controller.is_pwm_led_available():
+        print(f"[Warning] PWM LED: LED #{led_index} フェードイン（スキップ - PWM LED利用不可）")
+        return
+    
+    yield from pwm_led_controller.fade_pwm_led_gen(led_index, brightness, duration_ms, stop_flag_ref, easing)
+
+def fade_out_gen(led_index, duration_ms, stop_flag_ref, easing=fade_controller.EASING_LINEAR):
+    """
+    fade_out() の再開可能ステップ版（並列トラック再生用）。
+    
+    Args:
+        fade_out() と同じ
+    """
+    if not pwm_led_controller.is_pwm_led_available():
+        print(f"[Warning] PWM LED: LED #{led_index} フェードアウト（スキップ - PWM LED利用不可）")
+        return
+    
+    yield from pwm_led_controller.fade_pwm_led_gen(led_index, 0, duration_ms, stop_flag_ref, easing)
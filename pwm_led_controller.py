@@ -3,14 +3,22 @@ import config
 from machine import Pin, PWM
 import time
 import math
+from array import array
 import fade_controller
+import step_scheduler
 
 # PWM LEDインスタンスを格納するリスト
 pwm_leds = []
-# 各LEDの現在の輝度を保持 (0-100%)
+# 各LEDの現在の輝度を輝度テーブルのインデックス（0-1000、0.1% 単位の整数）で保持
+# フェードの tick ごとに浮動小数点の割り算をしないよう、パーセントへの変換は get_brightness() でのみ行う
 led_brightness_cache = []
 # 利用可能なLEDのインデックス
 available_leds = set()
+# 輝度テーブルの分解能（1% あたりの段数。10 → 0.1% 刻み）
+_DUTY_STEPS_PER_PERCENT = 10
+# 輝度（0.1% 刻み）→ ガンマ補正済みPWMデューティ比のテーブル（1001要素）
+# init_pwm_leds() で PWM_LED_GAMMA と PWM_LED_MAX_DUTY から一度だけ作成
+_duty_table = array('H')
 
 def is_pwm_led_available():
     """
@@ -24,10 +32,27 @@ def get_available_leds():
     """
     return available_leds.copy()
 
+def build_duty_table():
+    """
+    輝度（0.1% 刻み）→ PWMデューティ比のテーブルを作成します。
+    config の PWM_LED_GAMMA・PWM_LED_MAX_DUTY はここでのみ参照します（変更後は再度呼び出す）。
+    """
+    global _duty_table
+    
+    gamma = getattr(config, 'PWM_LED_GAMMA', 2.2)
+    max_duty = getattr(config, 'PWM_LED_MAX_DUTY', 65535)
+    steps = 100 * _DUTY_STEPS_PER_PERCENT
+    
+    table = array('H', [0] * (steps + 1))
+    for i in range(steps + 1):
+        # ガンマ補正を適用してPWMデューティ比に変換
+        table[i] = int(math.pow(i / steps, gamma) * max_duty)
+    _duty_table = table
+
 def brightness_to_duty(brightness):
     """
     輝度（0-100%）をPWMデューティ比（0-65535）に変換
-    ガンマ補正を適用して、人間の目に自然な明るさに変換
+    ガンマ補正済みのテーブルを引くだけ（0.1% 刻みに丸め、math.pow は呼ばない）
     
     Args:
         brightness: 輝度パーセント (0-100)
@@ -35,19 +60,11 @@ def brightness_to_duty(brightness):
     Returns:
         PWMデューティ比 (0-65535)
     """
-    gamma = getattr(config, 'PWM_LED_GAMMA', 2.2)
-    max_duty = getattr(config, 'PWM_LED_MAX_DUTY', 65535)
-    
-    # 0-100% を 0.0-1.0 に正規化
-    normalized = max(0.0, min(100.0, brightness)) / 100.0
-    
-    # ガンマ補正を適用
-    corrected = math.pow(normalized, gamma)
-    
-    # PWMデューティ比に変換
-    duty = int(corrected * max_duty)
+    if not _duty_table:
+        build_duty_table()
     
-    return duty
+    # 0-100% をテーブルのインデックス（0-1000）に変換
+    return _duty_table[_table_index(brightness)]
 
 def init_pwm_leds():
     """
@@ -62,6 +79,7 @@ def init_pwm_leds():
     
     led_pins = getattr(config, 'PWM_LED_PINS', [])
     frequency = getattr(config, 'PWM_LED_FREQUENCY', 1000)
+    build_duty_table()
     
     if not led_pins:
         print("PWM LED: No pins configured")
@@ -75,7 +93,7 @@ def init_pwm_leds():
             pwm.duty_u16(0)  # 初期状態は消灯
             
             pwm_leds.append(pwm)
-            led_brightness_cache.append(0)  # 初期輝度は0%
+            led_brightness_cache.append(0)  # 初期輝度は0%（インデックス0）
             available_leds.add(index)
             
             print(f"PWM LED #{index} (GP{pin_num}): 初期化成功")
@@ -116,12 +134,17 @@ def set_brightness(led_index, brightness, update_cache=True):
         print(f"[Warning] LED #{led_index} is not available")
         return False
     
+    # 実行中のフェードがあれば止める（直接の設定を優先）
+    fade_controller.cancel_fade(_FADE_SINK, led_index)
+    
     try:
-        duty = brightness_to_duty(brightness)
-        pwm_leds[led_index].duty_u16(duty)
+        if not _duty_table:
+            build_duty_table()
+        index = _table_index(brightness)
+        pwm_leds[led_index].duty_u16(_duty_table[index])
         
         if update_cache:
-            led_brightness_cache[led_index] = brightness
+            led_brightness_cache[led_index] = index
         
         return True
         
@@ -134,9 +157,19 @@ def set_brightness(led_index, brightness, update_cache=True):
         sys.print_exception(e)
         return False
 
-def fade_pwm_led(led_index, target_brightness, duration_ms, stop_flag_ref=None):
+def fade_pwm_led(led_index, target_brightness, duration_ms, stop_flag_ref=None, easing=fade_controller.EASING_LINEAR):
     """
     指定されたLEDを現在の輝度から目標輝度までフェードします（ブロッキング）。
+    fade_pwm_led_gen() を呼び出し元のスレッドで最後まで実行します。
+    
+    Returns:
+        正常完了した場合True、中断/エラーの場合False
+    """
+    return step_scheduler.run_blocking(fade_pwm_led_gen(led_index, target_brightness, duration_ms, stop_flag_ref, easing))
+
+def fade_pwm_led_gen(led_index, target_brightness, duration_ms, stop_flag_ref=None, easing=fade_controller.EASING_LINEAR):
+    """
+    指定されたLEDを現在の輝度から目標輝度までフェードします（再開可能ステップ版）。
     stop_flag_refによる協調的キャンセルに対応。
     
     Args:
@@ -144,6 +177,7 @@ def fade_pwm_led(led_index, target_brightness, duration_ms, stop_flag_ref=None):
         target_brightness: 目標輝度パーセント (0-100)
         duration_ms: フェード時間 (ミリ秒)
         stop_flag_ref: 停止フラグのリスト参照 [bool] (オプション)
+        easing: イージングID (fade_controller.easing_id() の戻り値、デフォルト: 線形)
     
     Returns:
         正常完了した場合True、中断/エラーの場合False
@@ -156,25 +190,52 @@ def fade_pwm_led(led_index, target_brightness, duration_ms, stop_flag_ref=None):
         print(f"[Warning] LED #{led_index} is not available")
         return False
     
-    # 現在の輝度を取得
-    start_brightness = led_brightness_cache[led_index]
-    
-    # フェードパラメータの取得
-    step_interval_ms = getattr(config, 'PWM_FADE_STEP_INTERVAL_MS', 10)
+    # 現在の輝度と目標輝度を輝度テーブルのインデックス（0.1% 単位）で指定
+    start = led_brightness_cache[led_index]
+    end = _table_index(target_brightness)
+    if start == end:
+        fade_controller.cancel_fade(_FADE_SINK, led_index)
+        return True
     
-    # 更新コールバック関数
-    def update_callback(brightness):
-        set_brightness(led_index, brightness)
+    # 共通フェードエンジンに登録し、終了まで待機（他のLED・ストリップのフェードと同じ周期で更新）
+    fade_controller.start_fade(_FADE_SINK, led_index, (start,), (end,), duration_ms, easing)
+    return (yield from fade_controller.run_fades_gen(stop_flag_ref, _FADE_SINK, led_index))
+
+def _table_index(brightness):
+    """輝度パーセントを輝度テーブルのインデックス（0-1000）に変換"""
+    index = int(brightness * _DUTY_STEPS_PER_PERCENT + 0.5)
+    if index <= 0:
+        return 0
+    if index > 100 * _DUTY_STEPS_PER_PERCENT:
+        return 100 * _DUTY_STEPS_PER_PERCENT
+    return index
+
+def _apply_fades(channels, values, count):
+    """
+    フェードエンジンの出力先: 1回の tick で更新された全LEDのデューティ比をまとめて設定
     
-    # 共通フェード処理を使用
-    return fade_controller.linear_fade(
-        start_brightness,
-        target_brightness,
-        duration_ms,
-        step_interval_ms,
-        update_callback,
-        stop_flag_ref
-    )
+    Args:
+        channels: LEDインデックスの配列
+        values: 輝度テーブルのインデックス（values[k * FADE_LANES]）
+        count: 更新するLED数
+    """
+    if not _duty_table:
+        build_duty_table()
+    lanes = fade_controller.FADE_LANES
+    for k in range(count):
+        led_index = channels[k]
+        pwm = pwm_leds[led_index] if led_index < len(pwm_leds) else None
+        if pwm is None:
+            continue
+        index = values[k * lanes]
+        try:
+            pwm.duty_u16(_duty_table[index])
+        except OSError as e:
+            print(f"[Hardware Error] LED #{led_index} set brightness failed: {e}")
+            continue
+        led_brightness_cache[led_index] = index
+
+_FADE_SINK = fade_controller.register_fade_sink(_apply_fades)
 
 def turn_on(led_index, brightness=100):
     """
@@ -210,8 +271,8 @@ def get_brightness(led_index):
         led_index: LEDインデックス (0-3)
     
     Returns:
-        輝度パーセント (0-100)、エラーの場合None
+        輝度パーセント (0-100、0.1% 単位)、エラーの場合None
     """
     if led_index < 0 or led_index >= len(led_brightness_cache):
         return None
-    return led_brightness_cache[led_index]
+    return led_brightness_cache[led_index] / _DUTY_STEPS_PER_PERCENT
@@ -0,0 +1,527 @@
+# scenario_compiler.py
+# シナリオコンパイラ - JSONコマンドリストを事前検証済みの命令列に変換する
+#
+# scenarios.json の各シナリオを読み込み時に一度だけ解析し、
+# オペコード（bytearray）と整数引数（array('i')）からなるコンパクトな命令列に変換します。
+# 再生時は effects.execute_compiled() がこの命令列を直接実行するため、
+# コマンドごとのキー探索・文字列比較・範囲チェックが再生スレッドで発生しません。
+
+from array import array
+import config
+import command_parser
+import fade_controller
+
+# --- オペコード定義 ---
+OP_DELAY = 0             # [ms]
+OP_WAIT_MS = 1           # [ms]（旧形式: 中断時は停止フラグをクリアして続行）
+OP_STOP_PLAYBACK = 2     # []
+OP_SOUND = 3             # [folder, file]
+OP_LED_OFF = 4           # []
+OP_LED_FILL = 5          # [strip(定数), r, g, b, duration_ms]
+OP_PWM_ON = 6            # [led_index, brightness]
+OP_PWM_OFF = 7           # [led_index]
+OP_PWM_FADE_IN = 8       # [led_index, brightness, duration_ms, easing]
+OP_PWM_FADE_OUT = 9      # [led_index, duration_ms, easing]
+OP_SERVO_ROTATE = 10     # [servo_index, speed, duration_ms]
+OP_SERVO_STOP = 11       # [servo_index]
+OP_SERVO_STOP_ALL = 12   # []
+OP_SERVO_SET_ANGLE = 13  # [servo_index, angle, duration_ms]
+OP_SERVO_CENTER = 14     # [servo_index]
+OP_SERVO_CENTER_ALL = 15 # []
+OP_MOTOR_ROTATE = 16     # [angle(定数), speed(定数), direction]
+OP_MOTOR_STEP = 17       # [steps, speed(定数), direction]
+OP_RAW = 18              # [command(定数)] - 静的に変換できないコマンドは従来の解釈実行に委譲
+OP_LED_FADE = 19         # [strip(定数), start(0xRRGGBB, -1=現在の色), end(0xRRGGBB), duration_ms, easing]
+OP_MOTOR_MOVE_TO = 20    # [target(定数), speed(定数), in_degrees, shortest]（home は target=0）
+OP_MOTOR_SET_HOME = 21   # []
+OP_SOUND_WAIT_END = 22   # [timeout_ms]（0 = DFPLAYER_WAIT_END_TIMEOUT_MS）
+
+OP_COUNT = 23
+
+# 各オペコードが消費する引数の数（args配列の読み進め量）
+OP_ARITY = bytes([1, 1, 0, 2, 0, 5, 2, 1, 4, 3, 3, 1, 0, 3, 1, 0, 3, 3, 1, 5, 4, 0, 1])
+
+# モーターを使用するオペコード（シナリオ終了時の通電解除判定用）
+_MOTOR_OPS = (OP_MOTOR_ROTATE, OP_MOTOR_STEP, OP_MOTOR_MOVE_TO, OP_MOTOR_SET_HOME)
+
+# タイムライン計算用: 命令がブロックする時間（duration_ms）を持つ引数の位置
+# 255 = 時間を持たない（即時完了、またはモーター・再生終了待ちのように事前に時間が決まらない）
+_NO_DURATION = 255
+_DURATION_ARG = bytes([0, 0, 255, 255, 255, 4, 255, 255, 2, 1, 2, 255, 255, 2, 255, 255, 255, 255, 255, 3, 255, 255, 255])
+
+# 所要時間が事前に決まらない命令（モーター・解釈実行・再生終了待ち）
+# 実行側はこれらの命令の終了後、タイムラインの基準時刻を実際の終了時刻に合わせ直す
+# （合わせ直さないと、続く delay の終了時刻が既に過ぎていて待機が省略される）
+REANCHOR = bytearray(OP_COUNT)
+for _op in _MOTOR_OPS + (OP_RAW, OP_SOUND_WAIT_END):
+    REANCHOR[_op] = 1
+
+
+class CompiledScenario:
+    """
+    コンパイル済みシナリオ（命令列）
+
+    Attributes:
+        ops: オペコード列 (bytearray)
+        args: 全命令の整数引数を連結した配列 (array('i'))
+        consts: 整数にできない引数（ストリップ名、元コマンドなど）の定数プール
+        uses_motor: モーターコマンドを含むか
+        starts: 各命令の開始時刻（シナリオ開始からのミリ秒, array('i')）
+        total_ms: シナリオ全体の長さ（最後の命令の終了時刻, ミリ秒）
+    """
+
+    def __init__(self, ops, args, consts, uses_motor, starts=None, total_ms=0):
+        self.ops = ops
+        self.args = args
+        self.consts = consts
+        self.uses_motor = uses_motor
+        self.starts = starts if starts is not None else array('i', [0] * len(ops))
+        self.total_ms = total_ms
+
+    def __len__(self):
+        return len(self.ops)
+
+
+class CompiledTracks:
+    """
+    並列トラック形式（{"tracks": {"led": [...], "servo": [...]}}）のコンパイル済みシナリオ
+
+    Attributes:
+        tracks: [(トラック名, CompiledScenario), ...]
+        uses_motor: いずれかのトラックがモーターコマンドを含むか
+        total_ms: 最も長いトラックの長さ（ミリ秒）
+    """
+
+    def __init__(self, tracks):
+        self.tracks = tracks
+        self.uses_motor = False
+        self.total_ms = 0
+        for _, program in tracks:
+            if program.uses_motor:
+                self.uses_motor = True
+            if program.total_ms > self.total_ms:
+                self.total_ms = program.total_ms
+
+    def __len__(self):
+        return len(self.tracks)
+
+
+def _is_int(value):
+    """整数引数として格納できる値か判定（boolは除外）"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class _Builder:
+    """命令列の組み立て用ヘルパー"""
+
+    def __init__(self):
+        self.ops = bytearray()
+        self.args = array('i')
+        self.consts = []
+        self.uses_motor = False
+        self.starts = array('i')
+        self.cursor_ms = 0  # 次の命令の開始時刻（タイムライン上の位置）
+
+    def const(self, value):
+        """定数プールに値を登録してインデックスを返す（同一値は共有）"""
+        for i, c in enumerate(self.consts):
+            if c == value and type(c) is type(value):
+                return i
+        self.consts.append(value)
+        return len(self.consts) - 1
+
+    def emit(self, op, *values):
+        """
+        命令を1つ追加します。整数化できない引数を含む場合は
+        元コマンドを保持する OP_RAW として扱えるよう False を返します。
+        """
+        for v in values:
+            if not _is_int(v):
+                return False
+        self.ops.append(op)
+        for v in values:
+            self.args.append(v)
+        if op in _MOTOR_OPS:
+            self.uses_motor = True
+
+        # タイムライン: この命令の開始時刻を記録し、ブロックする時間だけ進める
+        self.starts.append(self.cursor_ms)
+        duration_arg = _DURATION_ARG[op]
+        if duration_arg != _NO_DURATION and values[duration_arg] > 0:
+            self.cursor_ms += values[duration_arg]
+        return True
+
+    def emit_raw(self, cmd):
+        """元コマンドをそのまま保持する命令を追加"""
+        self.ops.append(OP_RAW)
+        self.args.append(self.const(cmd))
+        # 解釈実行するコマンドの所要時間は不明なため、タイムラインは進めない（実行側で終了時刻に合わせ直す）
+        self.starts.append(self.cursor_ms)
+        cmd_type = command_parser.parse_command_type(cmd)
+        if cmd_type == 'motor':
+            self.uses_motor = True
+
+    def build(self):
+        return CompiledScenario(self.ops, self.args, self.consts, self.uses_motor,
+                                self.starts, self.cursor_ms)
+
+
+def compile_scenario(command_list, name=""):
+    """
+    シナリオのコマンドリストを命令列にコンパイルします。
+
+    実行時の各ハンドラーと同じバリデーション（範囲クランプ・色チェックなど）を
+    ここで一度だけ行い、無効なコマンドは警告を出して除外します。
+
+    Args:
+        command_list: コマンドのリスト（辞書形式・リスト形式混在可）
+        name: シナリオ名（ログ用）
+
+    Returns:
+        CompiledScenario
+    """
+    b = _Builder()
+    skipped_effects = 0
+
+    for cmd in command_list:
+        cmd_type = command_parser.parse_command_type(cmd)
+        if not cmd_type:
+            print(f"[Warning] Unknown command format or empty command: {cmd}")
+            continue
+
+        if cmd_type == 'effect':
+            # effectコマンドは予約（未実装）のため命令列から除外
+            skipped_effects += 1
+            continue
+
+        compiler = _COMPILERS.get(cmd_type)
+        if compiler is None:
+            # 未知のコマンドタイプは従来のディスパッチャーに委譲（拡張コマンド対応）
+            b.emit_raw(cmd)
+            continue
+
+        try:
+            if compiler(b, cmd) is False:
+                b.emit_raw(cmd)
+        except Exception as e:
+            print(f"[Warning] シナリオ {name}: コマンドのコンパイルに失敗したため解釈実行します: {cmd} ({e})")
+            b.emit_raw(cmd)
+
+    if skipped_effects:
+        print(f"[Warning] シナリオ {name}: 未実装の 'effect' コマンド {skipped_effects}件を除外しました")
+
+    return b.build()
+
+
+def is_tracks(value):
+    """並列トラック形式のシナリオ（{"tracks": {...}}）か判定"""
+    return isinstance(value, dict) and isinstance(value.get('tracks'), dict)
+
+
+def compile_tracks(scenario, name=""):
+    """
+    並列トラック形式のシナリオをコンパイルします。
+    各トラックは通常のコマンドリストとして個別にコンパイルされます。
+
+    Args:
+        scenario: {"tracks": {トラック名: コマンドリスト, ...}}
+        name: シナリオ名（ログ用）
+
+    Returns:
+        CompiledTracks
+    """
+    tracks = []
+    for track_name, commands in scenario['tracks'].items():
+        if not isinstance(commands, list):
+            print(f"[Warning] シナリオ {name}: トラック '{track_name}' がコマンドリストではないため除外しました")
+            continue
+        tracks.append((track_name, compile_scenario(commands, f"{name}/{track_name}")))
+    return CompiledTracks(tracks)
+
+
+def compile_entry(value, name=""):
+    """
+    シナリオ1件をコンパイルします（コマンドリスト・並列トラック形式に対応）。
+
+    Args:
+        value: シナリオの値
+        name: シナリオ名（ログ用）
+
+    Returns:
+        CompiledScenario / CompiledTracks。どちらの形式でもない値はそのまま返す
+    """
+    if isinstance(value, list):
+        return compile_scenario(value, name)
+    if is_tracks(value):
+        return compile_tracks(value, name)
+    return value
+
+
+def compile_all(scenarios):
+    """
+    全シナリオをコンパイルします。コンパイルに失敗したシナリオは元の値のまま残します。
+
+    Args:
+        scenarios: {シナリオキー: コマンドリストまたはトラック形式} の辞書
+
+    Returns:
+        {シナリオキー: CompiledScenario / CompiledTracks または元の値} の辞書
+    """
+    compiled = {}
+    for key, commands in scenarios.items():
+        try:
+            compiled[key] = compile_entry(commands, key)
+        except Exception as e:
+            print(f"[Warning] シナリオ {key} のコンパイルに失敗しました（解釈実行で再生します）: {e}")
+            compiled[key] = commands
+    return compiled
+
+
+# ----------------------------------------------------------------------
+# コマンドタイプ別のコンパイル処理
+# 各関数は命令を追加し、整数化できず OP_RAW に委譲すべき場合のみ False を返す
+# ----------------------------------------------------------------------
+
+def _compile_delay(b, cmd):
+    if isinstance(cmd, dict):
+        duration_ms = command_parser.get_param(cmd, "duration", 0)
+    elif isinstance(cmd, list) and len(cmd) == 2:
+        duration_ms = cmd[1]
+    else:
+        print(f"[Warning] Invalid delay command format: {cmd}")
+        return None
+
+    if not command_parser.validate_positive(duration_ms, "delay duration"):
+        return None
+    return b.emit(OP_DELAY, duration_ms)
+
+
+def _compile_wait_ms(b, cmd):
+    duration_ms = command_parser.get_param(cmd, 'wait_ms', 0)
+    if not command_parser.validate_positive(duration_ms, "wait_ms"):
+        return None
+    return b.emit(OP_WAIT_MS, duration_ms)
+
+
+def _compile_stop_playback(b, cmd):
+    return b.emit(OP_STOP_PLAYBACK)
+
+
+def _compile_sound(b, cmd):
+    if isinstance(cmd, dict):
+        command = command_parser.get_param(cmd, "command", "play")
+        if command == "wait_end":
+            timeout_ms = command_parser.get_param(cmd, "timeout", 0)
+            if not isinstance(timeout_ms, int) or timeout_ms < 0:
+                print(f"[Data Error] Invalid sound wait_end timeout: {timeout_ms}")
+                return None
+            return b.emit(OP_SOUND_WAIT_END, timeout_ms)
+        if command != "play":
+            print(f"[Warning] Unknown sound command: {command}")
+            return None
+        folder_num = command_parser.get_param(cmd, "folder")
+        file_num = command_parser.get_param(cmd, "file")
+        if folder_num is None or file_num is None:
+            print(f"[Data Error] folder and file required for sound command")
+            return None
+    elif isinstance(cmd, list):
+        if len(cmd) != 3:
+            print(f"[Data Error] sound command requires 3 elements: {cmd}")
+            return None
+        folder_num = cmd[1]
+        file_num = cmd[2]
+    else:
+        return False
+    return b.emit(OP_SOUND, folder_num, file_num)
+
+
+def _compile_led(b, cmd):
+    command = command_parser.get_param(cmd, "command")
+    if not command:
+        print(f"[Warning] LED command missing 'command' parameter")
+        return None
+
+    if command == 'off':
+        return b.emit(OP_LED_OFF)
+
+    if command == 'fill':
+        strip_name = command_parser.get_param(cmd, "strip", "all")
+        duration_ms = command_parser.get_param(cmd, "duration", 0)
+        validated_color = command_parser.validate_color(command_parser.get_param(cmd, "color"))
+        if not validated_color:
+            return None
+        if not isinstance(strip_name, str) or not _is_int(duration_ms):
+            return False
+        r, g, b_val = validated_color
+        return b.emit(OP_LED_FILL, b.const(strip_name), r, g, b_val, duration_ms)
+
+    if command == 'fade':
+        strip_name = command_parser.get_param(cmd, "strip", "all")
+        duration_ms = command_parser.get_param(cmd, "duration", 0)
+        start_color = command_parser.get_param(cmd, "start_color")
+        end_color = command_parser.get_param(cmd, "end_color", command_parser.get_param(cmd, "color"))
+        validated_end = command_parser.validate_color(end_color)
+        if not validated_end:
+            return None
+        start = -1
+        if start_color is not None:
+            validated_start = command_parser.validate_color(start_color)
+            if not validated_start:
+                return None
+            start = _pack_color(validated_start)
+        if not isinstance(strip_name, str) or not _is_int(duration_ms):
+            return False
+        easing = fade_controller.easing_id(command_parser.get_param(cmd, "easing"))
+        return b.emit(OP_LED_FADE, b.const(strip_name), start, _pack_color(validated_end), duration_ms, easing)
+
+    print(f"[Warning] Unknown led command: {command}")
+    return None
+
+
+def _pack_color(color):
+    """(R, G, B) を 0xRRGGBB の整数に変換"""
+    return (color[0] << 16) | (color[1] << 8) | color[2]
+
+
+def unpack_color(value):
+    """0xRRGGBB の整数を (R, G, B) に戻す（-1 は None）"""
+    if value < 0:
+        return None
+    return ((value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF)
+
+
+def _compile_pwm_led(b, cmd):
+    if 'led_on' in cmd:
+        params = cmd['led_on']
+        led_index = command_parser.get_param(params, 'led_index', 0)
+        brightness = command_parser.get_param(params, 'max_brightness', 100)
+        brightness = command_parser.validate_range(brightness, 0, 100, "brightness")
+        return b.emit(OP_PWM_ON, led_index, brightness)
+
+    if 'led_off' in cmd:
+        params = cmd['led_off']
+        return b.emit(OP_PWM_OFF, command_parser.get_param(params, 'led_index', 0))
+
+    if 'led_fade_in' in cmd:
+        params = cmd['led_fade_in']
+        led_index = command_parser.get_param(params, 'led_index', 0)
+        duration_ms = command_parser.get_param(params, 'duration_ms', 0)
+        brightness = command_parser.get_param(params, 'max_brightness', 100)
+        brightness = command_parser.validate_range(brightness, 0, 100, "brightness")
+        easing = fade_controller.easing_id(command_parser.get_param(params, 'easing'))
+        return b.emit(OP_PWM_FADE_IN, led_index, brightness, duration_ms, easing)
+
+    if 'led_fade_out' in cmd:
+        params = cmd['led_fade_out']
+        led_index = command_parser.get_param(params, 'led_index', 0)
+        duration_ms = command_parser.get_param(params, 'duration_ms', 0)
+        easing = fade_controller.easing_id(command_parser.get_param(params, 'easing'))
+        return b.emit(OP_PWM_FADE_OUT, led_index, duration_ms, easing)
+
+    return False
+
+
+def _compile_servo(b, cmd):
+    command = command_parser.get_param(cmd, "command")
+    servo_index = command_parser.get_param(cmd, "servo_index", 0)
+    if not command:
+        print(f"[Warning] Servo command missing 'command' parameter")
+        return None
+
+    servo_config = getattr(config, 'SERVO_CONFIG', [])
+    if not _is_int(servo_index):
+        return False
+    if servo_index >= len(servo_config):
+        print(f"[Warning] Servo #{servo_index} not configured in SERVO_CONFIG")
+        return None
+
+    servo_type = servo_config[servo_index][1]
+
+    if servo_type == 'continuous':
+        if command == "rotate":
+            speed = command_parser.get_param(cmd, "speed", 0)
+            duration_ms = command_parser.get_param(cmd, "duration_ms", 0)
+            speed = command_parser.validate_range(speed, -100, 100, "speed")
+            return b.emit(OP_SERVO_ROTATE, servo_index, speed, duration_ms)
+        if command == "stop":
+            return b.emit(OP_SERVO_STOP, servo_index)
+        if command == "stop_all":
+            return b.emit(OP_SERVO_STOP_ALL)
+        print(f"[Warning] Unknown continuous servo command: {command}")
+        return None
+
+    if servo_type == 'position':
+        if command == "set_angle":
+            angle = command_parser.get_param(cmd, "angle", 90)
+            duration_ms = command_parser.get_param(cmd, "duration_ms", 0)
+            min_angle = getattr(config, 'SERVO_POSITION_MIN_ANGLE', 0)
+            max_angle = getattr(config, 'SERVO_POSITION_MAX_ANGLE', 180)
+            angle = command_parser.validate_range(angle, min_angle, max_angle, "angle")
+            return b.emit(OP_SERVO_SET_ANGLE, servo_index, angle, duration_ms)
+        if command == "center":
+            return b.emit(OP_SERVO_CENTER, servo_index)
+        if command == "center_all":
+            return b.emit(OP_SERVO_CENTER_ALL)
+        print(f"[Warning] Unknown position servo command: {command}")
+        return None
+
+    print(f"[Warning] Unknown servo type '{servo_type}' for servo #{servo_index}")
+    return None
+
+
+def _compile_motor(b, cmd):
+    command = command_parser.get_param(cmd, "command")
+    if not command:
+        print(f"[Warning] Motor command missing 'command' parameter")
+        return None
+
+    direction = command_parser.get_param(cmd, "direction", 1)
+    if direction not in [1, -1]:
+        print(f"[Warning] Invalid direction {direction}, using 1")
+        direction = 1
+
+    if command == "rotate":
+        angle = command_parser.get_param(cmd, "angle", 0)
+        speed = command_parser.get_param(cmd, "speed", 200)
+        # 角度は小数、速度はプリセット名の場合があるため定数プールに格納
+        return b.emit(OP_MOTOR_ROTATE, b.const(angle), b.const(speed), direction)
+
+    if command == "step":
+        steps = command_parser.get_param(cmd, "steps", 0)
+        speed = command_parser.get_param(cmd, "speed", "NORMAL")
+        return b.emit(OP_MOTOR_STEP, steps, b.const(speed), direction)
+
+    if command in ("move_to", "home"):
+        speed = command_parser.get_param(cmd, "speed", "NORMAL")
+        shortest = 1 if command_parser.get_param(cmd, "shortest", True) else 0
+        if command == "home":
+            return b.emit(OP_MOTOR_MOVE_TO, b.const(0), b.const(speed), 0, shortest)
+        angle = command_parser.get_param(cmd, "angle")
+        position = command_parser.get_param(cmd, "position")
+        if angle is not None:
+            return b.emit(OP_MOTOR_MOVE_TO, b.const(angle), b.const(speed), 1, shortest)
+        if position is not None:
+            return b.emit(OP_MOTOR_MOVE_TO, b.const(position), b.const(speed), 0, shortest)
+        print("[Warning] Motor move_to requires 'angle' or 'position'")
+        return None
+
+    if command == "set_home":
+        return b.emit(OP_MOTOR_SET_HOME)
+
+    print(f"[Warning] Unknown motor command: {command}")
+    return None
+
+
+_COMPILERS = {
+    'delay': _compile_delay,
+    'wait_ms': _compile_wait_ms,
+    'stop_playback': _compile_stop_playback,
+    'sound': _compile_sound,
+    'led': _compile_led,
+    'led_on': _compile_pwm_led,
+    'led_off': _compile_pwm_led,
+    'led_fade_in': _compile_pwm_led,
+    'led_fade_out': _compile_pwm_led,
+    'servo': _compile_servo,
+    'motor': _compile_motor,
+}
@@ -0,0 +1,321 @@
+# scenario_index.py
+# scenarios.json のオフセットインデックスと遅延読み込み
+#
+# scenarios.json 全体を json.load すると、再生しないシナリオも含めて
+# すべての辞書/リストが起動時から常駐します。このモジュールはファイルを
+# ストリーム走査して「シナリオキー → (バイトオフセット, 長さ)」のインデックスを作り、
+# 再生開始時に該当シナリオの範囲だけを seek して json.loads します。
+#
+# インデックスはサイドカーファイル（scenarios.idx）に保存され、次回起動時は
+# 走査なしで読み込まれます。ホスト上で事前に作成することもできます:
+#     python scenario_index.py scenarios.json
+
+import json
+import os
+
+try:
+    from binascii import crc32
+except ImportError:
+    crc32 = None
+
+# インデックスファイルの形式バージョン（形式を変えたら更新する）
+INDEX_VERSION = 2
+
+# 鮮度判定でチェックサムを取るブロックのサイズ（先頭・中央・末尾、バイト）
+_SIGNATURE_BLOCK = 256
+
+# 走査時の読み込みチャンクサイズ（バイト）
+_CHUNK_SIZE = 512
+
+# 走査で使うバイト値
+_QUOTE = 0x22      # "
+_BACKSLASH = 0x5C  # \
+_COLON = 0x3A      # :
+_COMMA = 0x2C      # ,
+_OPENERS = (0x7B, 0x5B)   # { [
+_CLOSERS = (0x7D, 0x5D)   # } ]
+_WHITESPACE = (0x20, 0x09, 0x0A, 0x0D)
+
+
+def default_index_path(json_path):
+    """JSONファイルに対応するサイドカーインデックスのパスを返す"""
+    if json_path.endswith('.json'):
+        return json_path[:-5] + '.idx'
+    return json_path + '.idx'
+
+
+def _checksum(data, value=0):
+    """バイト列のチェックサム（binascii.crc32 が無いビルドでは簡易ハッシュ）"""
+    if crc32 is not None:
+        return crc32(data, value)
+    for b in data:
+        value = ((value * 31) + b) & 0xFFFFFFFF
+    return value
+
+
+def _source_signature(json_path):
+    """
+    インデックスの鮮度判定に使うファイルサイズと内容のチェックサム
+    （先頭・中央・末尾のブロックのみ読む）。
+
+    更新時刻は使いません。ホストで作成したインデックスをファイルごとデバイスにコピーすると
+    更新時刻が変わり、初回起動で毎回作り直しになるためです。
+    """
+    size = os.stat(json_path)[6]
+    value = 0
+    with open(json_path, 'rb') as f:
+        for offset in (0, size // 2, size - _SIGNATURE_BLOCK):
+            f.seek(max(0, offset))
+            value = _checksum(f.read(_SIGNATURE_BLOCK), value)
+    return [size, value]
+
+
+def build_index(json_path):
+    """
+    scenarios.json をチャンク単位で走査し、トップレベルの各キーについて
+    値のバイト範囲を求めます。ファイル全体をメモリに読み込みません。
+
+    Args:
+        json_path: シナリオJSONファイルのパス
+
+    Returns:
+        [[key, offset, length], ...] のリスト（ファイル内の出現順）
+
+    Raises:
+        OSError: ファイルを開けない場合
+        ValueError: トップレベルがオブジェクトでない、または構造が壊れている場合
+    """
+    entries = []
+    depth = 0
+    in_str = False
+    escape = False
+    # トップレベル（depth == 1）での状態: 'key' / 'colon' / 'value' / 'nested' / 'scalar' / 'comma'
+    state = 'key'
+    key_buf = None
+    key = None
+    value_start = 0
+    scalar_end = 0
+    pos = 0
+    closed = False
+
+    with open(json_path, 'rb') as f:
+        while not closed:
+            chunk = f.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            for i in range(len(chunk)):
+                c = chunk[i]
+                offset = pos + i
+
+                if in_str:
+                    if key_buf is not None:
+                        key_buf.append(c)
+                    if escape:
+                        escape = False
+                    elif c == _BACKSLASH:
+                        escape = True
+                    elif c == _QUOTE:
+                        in_str = False
+                        if key_buf is not None:
+                            key = json.loads(bytes(key_buf).decode('utf-8'))
+                            key_buf = None
+                            state = 'colon'
+                        elif depth == 1 and state == 'scalar':
+                            scalar_end = offset
+                    continue
+
+                if c in _WHITESPACE:
+                    continue
+
+                if depth == 0:
+                    if c != 0x7B:
+                        raise ValueError("Top-level JSON value must be an object")
+                    depth = 1
+                    continue
+
+                if c == _QUOTE:
+                    in_str = True
+                    if depth == 1:
+                        if state == 'key':
+                            key_buf = bytearray([c])
+                        elif state == 'value':
+                            value_start = offset
+                            state = 'scalar'
+                    continue
+
+                if c in _OPENERS:
+                    if depth == 1:
+                        if state != 'value':
+                            raise ValueError(f"Unexpected bracket at byte {offset}")
+                        value_start = offset
+                        state = 'nested'
+                    depth += 1
+                    continue
+
+                if c in _CLOSERS:
+                    depth -= 1
+                    if depth == 1 and state == 'nested':
+                        entries.append([key, value_start, offset + 1 - value_start])
+                        state = 'comma'
+                    elif depth == 0:
+                        if state == 'scalar':
+                            entries.append([key, value_start, scalar_end + 1 - value_start])
+                        closed = True
+                        break
+                    continue
+
+                if depth != 1:
+                    continue
+
+                if c == _COLON and state == 'colon':
+                    state = 'value'
+                elif c == _COMMA:
+                    if state == 'scalar':
+                        entries.append([key, value_start, scalar_end + 1 - value_start])
+                    state = 'key'
+                elif state == 'value':
+                    # 数値・true/false/null などのスカラー値
+                    value_start = offset
+                    state = 'scalar'
+
+                if state == 'scalar':
+                    scalar_end = offset
+            pos += len(chunk)
+
+    if not closed:
+        raise ValueError("Unexpected end of JSON file while building index")
+    return entries
+
+
+def save_index(index_path, json_path, entries):
+    """インデックスをサイドカーファイルに保存"""
+    data = {
+        'version': INDEX_VERSION,
+        'source': _source_signature(json_path),
+        'entries': entries,
+    }
+    with open(index_path, 'w') as f:
+        json.dump(data, f)
+
+
+def load_index(index_path, json_path):
+    """
+    サイドカーインデックスを読み込みます。
+
+    Returns:
+        エントリのリスト。ファイルが無い・形式が古い・JSONが更新されている場合はNone
+    """
+    try:
+        with open(index_path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(data, dict) or data.get('version') != INDEX_VERSION:
+        return None
+    if data.get('source') != _source_signature(json_path):
+        return None
+    return data.get('entries')
+
+
+def load_or_build_index(json_path, index_path=None):
+    """
+    有効なサイドカーインデックスがあれば読み込み、無ければ走査して作成・保存します。
+    保存に失敗してもメモリ上のインデックスは返します（読み取り専用FS対策）。
+
+    Returns:
+        [[key, offset, length], ...]
+    """
+    if index_path is None:
+        index_path = default_index_path(json_path)
+
+    entries = load_index(index_path, json_path)
+    if entries is not None:
+        return entries
+
+    print(f"シナリオインデックスを作成します: {index_path}")
+    entries = build_index(json_path)
+    try:
+        save_index(index_path, json_path, entries)
+    except OSError as e:
+        print(f"[Warning] シナリオインデックスを保存できませんでした: {e}")
+    return entries
+
+
+def read_scenario(json_path, offset, length):
+    """
+    インデックスのバイト範囲だけを読み込んでパースします。
+
+    Returns:
+        シナリオの値（通常はコマンドリスト）
+    """
+    with open(json_path, 'rb') as f:
+        f.seek(offset)
+        raw = f.read(length)
+    return json.loads(raw.decode('utf-8'))
+
+
+class ScenarioStore:
+    """
+    シナリオデータの遅延読み込みストア
+
+    dict と同じく `key in store`、`store[key]`、`len(store)`、`keys()` で扱えるため、
+    PlaybackManager などは読み込み方式を意識せずに利用できます。
+    読み込んだシナリオは直近1件のみ保持し、再生中のシナリオ以外は常駐させません。
+    """
+
+    def __init__(self, json_path, entries, compile_func=None):
+        """
+        Args:
+            json_path: シナリオJSONファイルのパス
+            entries: build_index() / load_index() のエントリ
+            compile_func: 読み込み後に適用する変換（例: scenario_compiler.compile_entry）
+        """
+        self.json_path = json_path
+        self.compile_func = compile_func
+        self._offsets = {}
+        for key, offset, length in entries:
+            self._offsets[key] = (offset, length)
+        self._cached_key = None
+        self._cached_value = None
+
+    def __contains__(self, key):
+        return key in self._offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, key):
+        if key == self._cached_key and self._cached_value is not None:
+            return self._cached_value
+
+        offset, length = self._offsets[key]  # 未登録キーは KeyError
+        # 先に古いキャッシュを解放してから読み込む（ピークメモリ削減）
+        self._cached_key = None
+        self._cached_value = None
+
+        value = read_scenario(self.json_path, offset, length)
+        if self.compile_func is not None:
+            value = self.compile_func(value, key)
+
+        self._cached_key = key
+        self._cached_value = value
+        return value
+
+    def keys(self):
+        return self._offsets.keys()
+
+    def release(self):
+        """キャッシュしているシナリオを解放"""
+        self._cached_key = None
+        self._cached_value = None
+
+
+if __name__ == "__main__":
+    # ホスト上でサイドカーインデックスを事前作成する
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else 'scenarios.json'
+    idx_path = default_index_path(path)
+    result = build_index(path)
+    save_index(idx_path, path, result)
+    print(f"{len(result)}件のシナリオのインデックスを {idx_path} に保存しました")
@@ -5,6 +5,7 @@ import config
 import servo_rotation_controller
 import servo_position_controller
 import command_parser
+import step_scheduler
 
 def handle(cmd, stop_flag_ref):
     """
@@ -38,6 +39,15 @@ def handle(cmd, stop_flag_ref):
     else:
         print(f"[Warning] Unknown servo type '{servo_type}' for servo #{servo_index}")
 
+def register(register_handler):
+    """
+    サーボコマンドを effects のディスパッチテーブルに登録します。
+    
+    Args:
+        register_handler: effects.register_handler
+    """
+    register_handler('servo', handle)
+
 def _handle_continuous(cmd, command, servo_index, stop_flag_ref):
     """
     連続回転型サーボのコマンドを処理します。
@@ -48,44 +58,19 @@ def _handle_continuous(cmd, command, servo_index, stop_flag_ref):
         servo_index: サーボインデックス
         stop_flag_ref: 停止フラグのリスト参照
     """
-    if not servo_rotation_controller.is_servo_available():
-        print("[Warning] Continuous servo controller not available")
-        return
-    
     if command == "rotate":
         speed = command_parser.get_param(cmd, "speed", 0)
         duration_ms = command_parser.get_param(cmd, "duration_ms", 0)
         
         # 速度バリデーション
         speed = command_parser.validate_range(speed, -100, 100, "speed")
-        
-        if duration_ms > 0:
-            # 時間指定回転（ブロッキング、stop_flag対応）
-            command_parser.safe_call(
-                servo_rotation_controller.rotate_timed,
-                servo_index, speed, duration_ms, stop_flag_ref,
-                error_context=f"Servo rotation #{servo_index}"
-            )
-        else:
-            # 継続回転（ノンブロッキング）
-            command_parser.safe_call(
-                servo_rotation_controller.set_speed,
-                servo_index, speed,
-                error_context=f"Servo set_speed #{servo_index}"
-            )
+        rotate(servo_index, speed, duration_ms, stop_flag_ref)
     
     elif command == "stop":
-        command_parser.safe_call(
-            servo_rotation_controller.stop,
-            servo_index,
-            error_context=f"Servo stop #{servo_index}"
-        )
+        stop(servo_index)
     
     elif command == "stop_all":
-        command_parser.safe_call(
-            servo_rotation_controller.stop_all,
-            error_context="Servo stop_all"
-        )
+        stop_all()
     
     else:
         print(f"[Warning] Unknown continuous servo command: {command}")
@@ -100,10 +85,6 @@ def _handle_position(cmd, command, servo_index, stop_flag_ref):
         servo_index: サーボインデックス
         stop_flag_ref: 停止フラグのリスト参照
     """
-    if not servo_position_controller.is_servo_available():
-        print("[Warning] Position servo controller not available")
-        return
-    
     if command == "set_angle":
         angle = command_parser.get_param(cmd, "angle", 90)
         duration_ms = command_parser.get_param(cmd, "duration_ms", 0)
@@ -112,34 +93,171 @@ def _handle_position(cmd, command, servo_index, stop_flag_ref):
         min_angle = getattr(config, 'SERVO_POSITION_MIN_ANGLE', 0)
         max_angle = getattr(config, 'SERVO_POSITION_MAX_ANGLE', 180)
         angle = command_parser.validate_range(angle, min_angle, max_angle, "angle")
-        
-        if duration_ms > 0:
-            # 時間指定保持（ブロッキング、stop_flag対応）
-            command_parser.safe_call(
-                servo_position_controller.move_angle_timed,
-                servo_index, angle, duration_ms, stop_flag_ref,
-                error_context=f"Servo set_angle #{servo_index}"
-            )
-        else:
-            # 角度設定のみ（ノンブロッキング）
-            command_parser.safe_call(
-                servo_position_controller.set_angle,
-                servo_index, angle,
-                error_context=f"Servo set_angle #{servo_index}"
-            )
+        set_angle(servo_index, angle, duration_ms, stop_flag_ref)
     
     elif command == "center":
-        command_parser.safe_call(
-            servo_position_controller.center,
-            servo_index,
-            error_context=f"Servo center #{servo_index}"
-        )
+        center(servo_index)
     
     elif command == "center_all":
+        center_all()
+    
+    else:
+        print(f"[Warning] Unknown position servo command: {command}")
+
+# ----------------------------------------------------------------------
+# 検証済みパラメータで実行する関数（コンパイル済みシナリオからも使用）
+# ----------------------------------------------------------------------
+
+def _continuous_available():
+    """連続回転型サーボコントローラーが利用可能かチェック"""
+    if not servo_rotation_controller.is_servo_available():
+        print("[Warning] Continuous servo controller not available")
+        return False
+    return True
+
+def _position_available():
+    """角度制御型サーボコントローラーが利用可能かチェック"""
+    if not servo_position_controller.is_servo_available():
+        print("[Warning] Position servo controller not available")
+        return False
+    return True
+
+def rotate(servo_index, speed, duration_ms, stop_flag_ref):
+    """
+    連続回転型サーボを回転させます。
+    
+    Args:
+        servo_index: サーボインデックス
+        speed: 速度（-100～100、検証済み）
+        duration_ms: 回転時間（0以下の場合は継続回転）
+        stop_flag_ref: 停止フラグのリスト参照
+    """
+    if not _continuous_available():
+        return
+    
+    if duration_ms > 0:
+        # 時間指定回転（ブロッキング、stop_flag対応）
+        command_parser.safe_call(
+            servo_rotation_controller.rotate_timed,
+            servo_index, speed, duration_ms, stop_flag_ref,
+            error_context=f"Servo rotation #{servo_index}"
+        )
+    else:
+        # 継続回転（ノンブロッキング）
         command_parser.safe_call(
-            servo_position_controller.center_all,
-            error_context="Servo center_all"
+            servo_rotation_controller.set_speed,
+            servo_index, speed,
+            error_context=f"Servo set_speed #{servo_index}"
         )
+
+def rotate_gen(servo_index, speed, duration_ms, stop_flag_ref):
+    """
+    rotate() の再開可能ステップ版（並列トラック再生用）。
+    時間指定回転の待機を yield し、完了・中断時にサーボを停止します。
+    
+    Args:
+        rotate() と同じ
+    """
+    if duration_ms <= 0:
+        rotate(servo_index, speed, duration_ms, stop_flag_ref)
+        return
+    
+    if not _continuous_available():
+        return
+    
+    yield from servo_rotation_controller.rotate_timed_gen(servo_index, speed, duration_ms, stop_flag_ref)
+
+def stop(servo_index):
+    """
+    連続回転型サーボを停止します。
+    
+    Args:
+        servo_index: サーボインデックス
+    """
+    if not _continuous_available():
+        return
+    
+    command_parser.safe_call(
+        servo_rotation_controller.stop,
+        servo_index,
+        error_context=f"Servo stop #{servo_index}"
+    )
+
+def stop_all():
+    """
+    全ての連続回転型サーボを停止します。
+    """
+    if not _continuous_available():
+        return
+    
+    command_parser.safe_call(
+        servo_rotation_controller.stop_all,
+        error_context="Servo stop_all"
+    )
+
+def set_angle(servo_index, angle, duration_ms, stop_flag_ref):
+    """
+    角度制御型サーボの角度を設定します。
+    
+    Args:
+        servo_index: サーボインデックス
+        angle: 角度（検証済み）
+        duration_ms: 保持時間（0以下の場合は設定のみ）
+        stop_flag_ref: 停止フラグのリスト参照
+    """
+    if not _position_available():
+        return
     
+    if duration_ms > 0:
+        # 時間指定保持（ブロッキング、stop_flag対応）
+        command_parser.safe_call(
+            servo_position_controller.move_angle_timed,
+            servo_index, angle, duration_ms, stop_flag_ref,
+            error_context=f"Servo set_angle #{servo_index}"
+        )
     else:
-        print(f"[Warning] Unknown position servo command: {command}")
+        # 角度設定のみ（ノンブロッキング）
+        command_parser.safe_call(
+            servo_position_controller.set_angle,
+            servo_index, angle,
+            error_context=f"Servo set_angle #{servo_index}"
+        )
+
+def set_angle_gen(servo_index, angle, duration_ms, stop_flag_ref):
+    """
+    set_angle() の再開可能ステップ版（並列トラック再生用）。
+    角度設定後の保持時間を yield します。
+    
+    Args:
+        set_angle() と同じ
+    """
+    set_angle(servo_index, angle, 0, stop_flag_ref)
+    yield from step_scheduler.sleep_gen(duration_ms)
+
+def center(servo_index):
+    """
+    角度制御型サーボを中央（90度）に移動します。
+    
+    Args:
+        servo_index: サーボインデックス
+    """
+    if not _position_available():
+        return
+    
+    command_parser.safe_call(
+        servo_position_controller.center,
+        servo_index,
+        error_context=f"Servo center #{servo_index}"
+    )
+
+def center_all():
+    """
+    全ての角度制御型サーボを中央に移動します。
+    """
+    if not _position_available():
+        return
+    
+    command_parser.safe_call(
+        servo_position_controller.center_all,
+        error_context="Servo center_all"
+    )
@@ -7,6 +7,7 @@ import config
 from machine import Pin, PWM
 import time
 import servo_pwm_utils
+import step_scheduler
 
 # PWMインスタンスを格納するリスト（servo_rotation_controllerと同じインデックス）
 servos = []
@@ -173,6 +174,16 @@ def set_angle(servo_index, angle):
 def move_angle_timed(servo_index, angle, duration_ms, stop_flag_ref=None):
     """
     指定されたサーボを指定角度に移動させ、指定時間保持します（ブロッキング）。
+    move_angle_timed_gen() を呼び出し元のスレッドで最後まで実行します。
+    
+    Returns:
+        正常完了した場合True、中断/エラーの場合False
+    """
+    return step_scheduler.run_blocking(move_angle_timed_gen(servo_index, angle, duration_ms, stop_flag_ref))
+
+def move_angle_timed_gen(servo_index, angle, duration_ms, stop_flag_ref=None):
+    """
+    指定されたサーボを指定角度に移動させ、指定時間保持します（再開可能ステップ版）。
     stop_flag_refによる協調的キャンセルに対応。
     
     Args:
@@ -212,7 +223,8 @@ def move_angle_timed(servo_index, angle, duration_ms, stop_flag_ref=None):
                 # 角度制御型は現在位置を保持（中央に戻さない）
                 return False
             
-            time.sleep_ms(check_interval_ms)
+            remaining = duration_ms - time.ticks_diff(time.ticks_ms(), start_time)
+            yield time.ticks_add(time.ticks_ms(), min(check_interval_ms, max(1, remaining)))
         
         return True
         
@@ -6,6 +6,7 @@ import config
 from machine import Pin, PWM
 import time
 import servo_pwm_utils
+import step_scheduler
 
 # PWMインスタンスを格納するリスト
 servos = []
@@ -139,7 +140,17 @@ def set_speed(servo_index, speed):
 def rotate_timed(servo_index, speed, duration_ms, stop_flag_ref=None):
     """
     指定されたサーボを指定時間だけ回転させます（ブロッキング）。
-    stop_flag_refによる協調的キャンセルに対応。
+    rotate_timed_gen() を呼び出し元のスレッドで最後まで実行します。
+    
+    Returns:
+        正常完了した場合True、中断/エラーの場合False
+    """
+    return step_scheduler.run_blocking(rotate_timed_gen(servo_index, speed, duration_ms, stop_flag_ref))
+
+def rotate_timed_gen(servo_index, speed, duration_ms, stop_flag_ref=None):
+    """
+    指定されたサーボを指定時間だけ回転させます（再開可能ステップ版）。
+    stop_flag_refによる協調的キャンセルに対応。途中で close() された場合もサーボを停止します。
     
     Args:
         servo_index: サーボインデックス (0-2)
@@ -175,21 +186,22 @@ def rotate_timed(servo_index, speed, duration_ms, stop_flag_ref=None):
             # 停止フラグチェック
             if stop_flag_ref and stop_flag_ref[0]:
                 print(f"[Info] Servo #{servo_index} rotation interrupted by stop_flag")
-                stop(servo_index)
                 return False
             
-            time.sleep_ms(check_interval_ms)
+            remaining = duration_ms - time.ticks_diff(time.ticks_ms(), start_time)
+            yield time.ticks_add(time.ticks_ms(), min(check_interval_ms, max(1, remaining)))
         
-        # 自動停止
-        stop(servo_index)
         return True
         
     except Exception as e:
         print(f"[Error] Servo #{servo_index} timed rotation error: {e}")
         import sys
         sys.print_exception(e)
-        stop(servo_index)
         return False
+    
+    finally:
+        # 自動停止（完了・中断・エラー・close() のいずれでも実行）
+        stop(servo_index)
 
 def stop(servo_index):
     """
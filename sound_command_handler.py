@@ -13,19 +13,38 @@ def handle(cmd, stop_flag_ref):
         stop_flag_ref: 停止フラグのリスト参照 [bool]
     """
     if isinstance(cmd, dict):
-        _handle_dict_format(cmd)
+        _handle_dict_format(cmd, stop_flag_ref)
     elif isinstance(cmd, list):
         _handle_list_format(cmd)
     else:
         print(f"[Warning] Unknown sound command format: {cmd}")
 
-def _handle_dict_format(cmd):
+def register(register_handler):
+    """
+    サウンドコマンドを effects のディスパッチテーブルに登録します。
+    
+    Args:
+        register_handler: effects.register_handler
+    """
+    register_handler('sound', handle)
+
+def _handle_dict_format(cmd, stop_flag_ref=None):
     """
     辞書形式のサウンドコマンドを処理します。
     
     Args:
         cmd: コマンド辞書 {"type": "sound", "folder": 2, "file": 1}
+             または {"type": "sound", "command": "wait_end", "timeout": 30000}
+        stop_flag_ref: 停止フラグのリスト参照 [bool]
     """
+    command = command_parser.get_param(cmd, "command", "play")
+    if command == "wait_end":
+        wait_end(command_parser.get_param(cmd, "timeout", 0), stop_flag_ref)
+        return
+    if command != "play":
+        print(f"[Warning] Unknown sound command: {command}")
+        return
+    
     folder_num = command_parser.get_param(cmd, "folder")
     file_num = command_parser.get_param(cmd, "file")
     
@@ -33,7 +52,7 @@ def _handle_dict_format(cmd):
         print(f"[Data Error] folder and file required for sound command")
         return
     
-    _play_sound(folder_num, file_num)
+    play(folder_num, file_num)
 
 def _handle_list_format(cmd):
     """
@@ -49,9 +68,9 @@ def _handle_list_format(cmd):
     folder_num = cmd[1]
     file_num = cmd[2]
     
-    _play_sound(folder_num, file_num)
+    play(folder_num, file_num)
 
-def _play_sound(folder_num, file_num):
+def play(folder_num, file_num):
     """
     サウンドを再生します。
     
@@ -68,3 +87,32 @@ def _play_sound(folder_num, file_num):
         folder_num, file_num,
         error_context=f"Sound play folder={folder_num}, file={file_num}"
     )
+
+def wait_end(timeout_ms, stop_flag_ref=None):
+    """
+    再生中のサウンドが終了するまで待機します（停止フラグで中断）。
+    
+    Args:
+        timeout_ms: 最大待ち時間（ミリ秒、0 の場合は DFPLAYER_WAIT_END_TIMEOUT_MS）
+        stop_flag_ref: 停止フラグのリスト参照 [bool]
+    """
+    if not sound_patterns.is_dfplayer_available():
+        return
+    
+    command_parser.safe_call(
+        sound_patterns.wait_end,
+        stop_flag_ref, timeout_ms,
+        error_context="Sound wait_end"
+    )
+
+def wait_end_gen(timeout_ms):
+    """
+    wait_end() の再開可能ステップ版（並列トラック再生用）。
+    
+    Args:
+        timeout_ms: wait_end() と同じ
+    """
+    if not sound_patterns.is_dfplayer_available():
+        return
+    
+    yield from sound_patterns.wait_end_gen(timeout_ms)
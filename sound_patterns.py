@@ -1,12 +1,17 @@
 import config
 from machine import Pin, UART
 import time
+import dfplayer
 
-# UARTとBUSYピンのインスタンスをグローバル変数として宣言
+# UART・BUSYピン・DFPlayerドライバのインスタンスをグローバル変数として宣言
 uart = None
 busy_pin = None
+player = None
 dfplayer_available = False
 
+# BUSYピン（再生中は LOW）が LOW になった時刻（割り込みで記録、短い音声でも取りこぼさない）
+_busy_fall_ms = None
+
 def is_dfplayer_available():
     """
     DFPlayerが利用可能かどうかを返します。
@@ -18,10 +23,14 @@ def init_dfplayer():
     DFPlayer Miniの初期化処理をすべて実行します。
     UART、およびDFPlayerの初期化を含みます。
     注: ボリューム設定は main.py のADC処理で行われますが、ここでは最低限のUART初期化を行います。
+
+    コマンドは dfplayer.DFPlayer の送信キュー経由で送信するため、この関数は待機せずに戻ります
+    （DFPlayer の起動待ち DFPLAYER_BOOT_MS の間、起動音はキューで待機します）。
     """
-    global uart, busy_pin, dfplayer_available
+    global uart, busy_pin, player, dfplayer_available
     
     dfplayer_available = False
+    player = None
     
     # DFPlayerのUART初期化
     # config.py の最新の定数名 (UART_ID, UART_BAUDRATE) に合わせて修正
@@ -29,6 +38,15 @@ def init_dfplayer():
         uart = UART(config.UART_ID, baudrate=config.UART_BAUDRATE, 
                     tx=Pin(config.DFPLAYER_TX_PIN), rx=Pin(config.DFPLAYER_RX_PIN))
         print("DFPlayer UART initialized.")
+        player = dfplayer.DFPlayer(
+            uart,
+            interval_ms=getattr(config, 'DFPLAYER_COMMAND_INTERVAL_MS', 30),
+            queue_size=getattr(config, 'DFPLAYER_QUEUE_SIZE', 8),
+            ack=getattr(config, 'DFPLAYER_ACK', True),
+            ack_timeout_ms=getattr(config, 'DFPLAYER_ACK_TIMEOUT_MS', 200),
+            boot_ms=getattr(config, 'DFPLAYER_BOOT_MS', 1000),
+            volume_interval_ms=getattr(config, 'DFPLAYER_VOLUME_INTERVAL_MS', 100),
+        )
         dfplayer_available = True
     except Exception as e:
         # 初期化エラーの詳細を表示
@@ -37,23 +55,21 @@ def init_dfplayer():
         uart = None # 初期化失敗時はNoneにしておく
         dfplayer_available = False
 
-    # BUSYピンは config.py で定義されていれば初期化するが、今回はスキップされている可能性を考慮
-    # if hasattr(config, 'DFPLAYER_BUSY_PIN'):
-    #     try:
-    #         busy_pin = Pin(config.DFPLAYER_BUSY_PIN, Pin.IN)
-    #         print("DFPlayer BUSY pin initialized.")
-    #     except Exception as e:
-    #         print(f"Error initializing DFPlayer BUSY pin: {e}")
-    #         busy_pin = None
+    # BUSYピンは config.py で定義されていれば初期化（None の場合は再生終了イベントで判定）
+    busy_pin = None
+    if dfplayer_available and getattr(config, 'DFPLAYER_BUSY_PIN', None) is not None:
+        try:
+            busy_pin = Pin(config.DFPLAYER_BUSY_PIN, Pin.IN, Pin.PULL_UP)
+            busy_pin.irq(handler=_on_busy, trigger=Pin.IRQ_FALLING)
+            print("DFPlayer BUSY pin initialized.")
+        except Exception as e:
+            print(f"[Warning] DFPlayer BUSY pin initialization failed: {e}")
+            busy_pin = None
     
-    time.sleep(1) # 初期化のための待ち時間
-
     # システム起動音を再生 (0x03 コマンド: 再生指定曲)
     if dfplayer_available:
-        startup_sound = bytearray([0x7E, 0xFF, 0x06, 0x03, 0x00, 0x00, 0x01, 0xEF])
         print("DFPlayer: 起動音を再生 (Track 1)")
-        uart.write(startup_sound)
-        time.sleep(2)
+        player.send(dfplayer.CMD_PLAY_TRACK, 1)
     else:
         print("DFPlayer: スキップ（初期化失敗のため）")
 
@@ -67,8 +83,7 @@ def play_sound(folder_num, file_num):
         
     print(f"DFPlayer: フォルダ{folder_num}のファイル{file_num}を再生")
     # 0x0Fコマンドでフォルダ内のファイルを指定
-    play_command = bytearray([0x7E, 0xFF, 0x06, 0x0F, 0x00, folder_num, file_num, 0xEF])
-    uart.write(play_command)
+    player.send(dfplayer.CMD_PLAY_FOLDER, (folder_num << 8) | file_num)
 
 def set_volume(volume):
     """
@@ -82,11 +97,8 @@ def set_volume(volume):
     # volumeを整数にキャストして0-30の範囲にクリップ (main.pyでクリップ済みだが安全のため)
     volume_byte = max(0, min(int(volume), 30))
     
-    # コマンド: 0x06 (ボリューム設定)
-    volume_set_command = bytearray([0x7E, 0xFF, 0x06, 0x06, 0x00, 0x00, volume_byte, 0xEF])
-    uart.write(volume_set_command)
-    # ボリューム設定コマンドの送信後は、DFPlayerがコマンドを処理するのを少し待つ
-    time.sleep(0.01) # 以前の0.5秒は長すぎるため、0.01秒に変更を推奨
+    # コマンド: 0x06 (ボリューム設定)。ノブを回している間の連続した変更は最新の値のみ送信する
+    player.set_volume(volume_byte)
 
 def stop_playback():
     """
@@ -97,6 +109,101 @@ def stop_playback():
         return
         
     print("DFPlayer: 再生を停止")
-    stop_command = bytearray([0x7E, 0xFF, 0x06, 0x16, 0x00, 0x00, 0x00, 0xEF])
-    uart.write(stop_command)
-    time.sleep(0.01) # 以前の0.5秒は長すぎるため、0.01秒に変更を推奨
+    player.send(dfplayer.CMD_STOP)
+
+def _on_busy(pin):
+    """BUSYピンの割り込みハンドラー（再生開始 = LOW になった時刻を記録）"""
+    global _busy_fall_ms
+    _busy_fall_ms = time.ticks_ms()
+
+def is_playing():
+    """
+    再生中かどうかを返します。
+
+    BUSYピンがある場合は、再生コマンドの送信後に BUSY が LOW になり、HIGH に戻るまでを再生中とします
+    （送信から DFPLAYER_START_TIMEOUT_MS 以内に LOW にならない場合は再生されなかったものとする）。
+    BUSYピンがない場合は、DFPlayer から再生終了・エラーのイベントを受信するまでを再生中とします。
+
+    Returns:
+        bool: 再生中（送信待ちの再生コマンドがある場合を含む）
+    """
+    if player is None:
+        return False
+    if player.pending_play():
+        return True
+    if not player.playing:
+        return False  # 停止コマンド・再生終了イベント・エラー
+    if busy_pin is None:
+        return True
+    if not busy_pin.value():
+        return True
+    sent_at = player.play_sent_at
+    if _busy_fall_ms is not None and time.ticks_diff(_busy_fall_ms, sent_at) >= 0:
+        return False  # 送信後に再生が始まり、終了した
+    return time.ticks_diff(time.ticks_ms(), sent_at) < getattr(config, 'DFPLAYER_START_TIMEOUT_MS', 500)
+
+def wait_end_gen(timeout_ms=0):
+    """
+    再生終了を待つ再開可能ステップ（並列トラック用、停止はスケジューラの close() で行う）。
+
+    Args:
+        timeout_ms: 最大待ち時間（ms、0 の場合は DFPLAYER_WAIT_END_TIMEOUT_MS）
+
+    Returns:
+        bool: 再生が終了した場合 True、タイムアウトの場合 False
+    """
+    if timeout_ms <= 0:
+        timeout_ms = getattr(config, 'DFPLAYER_WAIT_END_TIMEOUT_MS', 300000)
+    poll_ms = getattr(config, 'DFPLAYER_SERVICE_INTERVAL_MS', 10)
+    start = time.ticks_ms()
+    while True:
+        service()
+        if not is_playing():
+            return True
+        now = time.ticks_ms()
+        if time.ticks_diff(now, start) >= timeout_ms:
+            print("[Warning] DFPlayer: 再生終了待ちがタイムアウトしました")
+            return False
+        yield time.ticks_add(now, poll_ms)
+
+def wait_end(stop_flag_ref=None, timeout_ms=0):
+    """
+    再生が終了するまで待機します（停止フラグで中断）。
+
+    Args:
+        stop_flag_ref: 停止フラグのリスト参照 [bool]
+        timeout_ms: 最大待ち時間（ms、0 の場合は DFPLAYER_WAIT_END_TIMEOUT_MS）
+
+    Returns:
+        bool: 再生が終了した場合 True、中断・タイムアウトの場合 False
+    """
+    steps = wait_end_gen(timeout_ms)
+    try:
+        while True:
+            if stop_flag_ref and stop_flag_ref[0]:
+                return False
+            deadline = next(steps)
+            wait_ms = time.ticks_diff(deadline, time.ticks_ms())
+            if wait_ms > 0:
+                time.sleep_ms(wait_ms)
+    except StopIteration as e:
+        return e.value
+
+def service():
+    """
+    DFPlayer の送信キューを処理し、受信したイベント（ACK・再生終了・エラー）を解析します。
+    メインループから定期的に呼び出します（DFPlayer 利用不可の場合は何もしない）。
+    """
+    if player is not None:
+        player.service()
+
+def get_stats():
+    """
+    DFPlayer の送信・受信の統計を返します。
+
+    Returns:
+        dict: 統計（DFPlayer 利用不可の場合は None）
+    """
+    if player is None:
+        return None
+    return player.get_stats()
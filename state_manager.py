@@ -82,6 +82,15 @@ class StateManager:
                 logger.log_info(f"Random Play Scenario: {scenario}")
                 self.playback_manager.start_scenario(scenario, self.dm)
         
+        elif event == 'switch':
+            # 再生中の短押し: 別のシナリオをランダムに選んで切り替え
+            current = self.playback_manager.current_play_scenario
+            scenarios = [s for s in self.autoplay_controller.random_scenarios if s != current]
+            if scenarios:
+                scenario = random.choice(scenarios)
+                logger.log_info(f"Switch to Random Scenario: {scenario}")
+                self.playback_manager.start_scenario(scenario, self.dm)
+        
         elif event == 'stop':
             # 再生中断
             self.playback_manager.stop_playback(self.dm)
@@ -118,6 +127,17 @@ class StateManager:
         
         if scenario:
             self.playback_manager.start_scenario(scenario, self.dm)
+            return
+
+        # ワークショップモード: 再生中に次のシナリオをプレイリストに追加（終了後すぐに開始）
+        playback = self.playback_manager
+        scenario = self.autoplay_controller.next_for_playlist(
+            playback.is_playing,
+            len(playback.playlist),
+            self.select_mode
+        )
+        if scenario:
+            playback.enqueue(scenario, self.dm)
 
     # ----------------------------------------------------------------------
     # 後方互換性のためのプロパティ
@@ -0,0 +1,178 @@
+# step_scheduler.py
+# 再開可能ステップ（ジェネレーター）の実行と協調スケジューラ
+#
+# フェード・サーボ時間指定回転・ステッピングモーター回転などの「時間のかかる処理」は、
+# 待機のたびに「次に再開したい時刻（time.ticks_ms() の値）」を yield するジェネレーターとして
+# 実装されています（例: fade_controller.run_fades_gen）。
+#
+#   - run_blocking():     1つのステップを呼び出し元のスレッドで最後まで実行（従来のブロッキング動作）
+#   - run_concurrently(): 複数のステップを1つのスレッド上で交互に実行（並列トラック再生）
+#   - run_concurrently_async(): 同じ処理を asyncio のコルーチンとして実行（非同期メインループ用）
+#
+# スレッドを増やさずに、LED・サーボ・モーター・サウンドを同時に動かせます。
+
+import time
+
+# asyncio（MicroPython: asyncio / 旧バージョン: uasyncio、CPython: asyncio）
+try:
+    import asyncio
+except ImportError:
+    try:
+        import uasyncio as asyncio
+    except ImportError:
+        asyncio = None
+
+# 停止フラグの確認間隔（ミリ秒）
+DEFAULT_CHECK_INTERVAL_MS = 50
+
+
+def run_blocking(steps):
+    """
+    再開可能ステップを呼び出し元のスレッドで最後まで実行します。
+
+    Args:
+        steps: 再開時刻（ticks_ms）を yield するジェネレーター
+
+    Returns:
+        ジェネレーターの戻り値（return した値）
+    """
+    try:
+        while True:
+            deadline = next(steps)
+            wait_ms = time.ticks_diff(deadline, time.ticks_ms())
+            if wait_ms > 0:
+                time.sleep_ms(wait_ms)
+    except StopIteration as e:
+        return e.value
+
+
+def run_concurrently(step_list, stop_flag_ref=None, check_interval_ms=DEFAULT_CHECK_INTERVAL_MS):
+    """
+    複数の再開可能ステップを1つのスレッド上で交互に実行します。
+    毎回、再開時刻が最も早いステップを1つだけ進め、それ以外の時間は眠ります。
+
+    停止フラグが立った場合は、残りのステップをすべて close() して終了します
+    （各ステップの finally 節でサーボ停止などの後始末が行われます）。
+
+    Args:
+        step_list: ジェネレーターのリスト
+        stop_flag_ref: 停止フラグのリスト参照 [bool]（オプション）
+        check_interval_ms: 待機中に停止フラグを確認する間隔（ミリ秒）
+
+    Returns:
+        すべて完了した場合True、停止フラグで中断した場合False
+    """
+    tasks = _make_tasks(step_list)
+
+    try:
+        while tasks:
+            if stop_flag_ref and stop_flag_ref[0]:
+                return False
+
+            wait_ms = _advance(tasks)
+            if wait_ms > 0:
+                time.sleep_ms(min(wait_ms, check_interval_ms))
+
+        return True
+
+    finally:
+        for t in tasks:
+            t[0].close()
+
+
+async def run_concurrently_async(step_list, stop_flag_ref=None, check_interval_ms=DEFAULT_CHECK_INTERVAL_MS):
+    """
+    run_concurrently() のコルーチン版。
+    待機中はイベントループに制御を返すため、ボタン・ボリュームなどの他のタスクと並行して動作します。
+
+    Args:
+        step_list: ジェネレーターのリスト
+        stop_flag_ref: 停止フラグのリスト参照 [bool]（オプション）
+        check_interval_ms: 待機中に停止フラグを確認する間隔（ミリ秒）
+
+    Returns:
+        すべて完了した場合True、停止フラグで中断した場合False
+    """
+    tasks = _make_tasks(step_list)
+
+    try:
+        while tasks:
+            if stop_flag_ref and stop_flag_ref[0]:
+                return False
+
+            wait_ms = _advance(tasks)
+            # 即時実行できる場合も一度イベントループに譲る（他のタスクを止めない）
+            await sleep_ms_async(max(0, min(wait_ms, check_interval_ms)))
+
+        return True
+
+    finally:
+        for t in tasks:
+            t[0].close()
+
+
+def _make_tasks(step_list):
+    """[ジェネレーター, 次回再開時刻] のリストを作成"""
+    now = time.ticks_ms()
+    return [[steps, now] for steps in step_list]
+
+
+def _advance(tasks):
+    """
+    再開時刻が最も早いタスクを選び、時刻を過ぎていれば1回だけ進めます。
+
+    Args:
+        tasks: [ジェネレーター, 次回再開時刻] のリスト（完了・失敗したタスクは取り除く）
+
+    Returns:
+        次の再開時刻までの残り時間（ミリ秒）。タスクを進めた場合は0
+    """
+    task = tasks[0]
+    for t in tasks:
+        if time.ticks_diff(t[1], task[1]) < 0:
+            task = t
+
+    wait_ms = time.ticks_diff(task[1], time.ticks_ms())
+    if wait_ms > 0:
+        return wait_ms
+
+    try:
+        task[1] = next(task[0])
+    except StopIteration:
+        tasks.remove(task)
+    except Exception as e:
+        print(f"[Error] Step execution failed: {e}")
+        import sys
+        sys.print_exception(e)
+        tasks.remove(task)
+    return 0
+
+
+def is_async_available():
+    """asyncio（uasyncio）が利用可能かどうかを返す"""
+    return asyncio is not None
+
+
+async def sleep_ms_async(duration_ms):
+    """
+    指定時間イベントループに制御を返して待機します。
+    MicroPython の asyncio.sleep_ms() が無い環境（CPython）では asyncio.sleep() を使用します。
+
+    Args:
+        duration_ms: 待機時間（ミリ秒）
+    """
+    if hasattr(asyncio, 'sleep_ms'):
+        await asyncio.sleep_ms(duration_ms)
+    else:
+        await asyncio.sleep(duration_ms / 1000)
+
+
+def sleep_gen(duration_ms):
+    """
+    指定時間待つだけのステップ（ジェネレーター版の sleep_ms）
+
+    Args:
+        duration_ms: 待機時間（ミリ秒）
+    """
+    if duration_ms > 0:
+        yield time.ticks_add(time.ticks_ms(), duration_ms)
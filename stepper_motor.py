@@ -1,14 +1,180 @@
 from machine import Pin
+from array import array
+import sys
 import config
 import utime
 import math
+import step_scheduler
+import motion_profile
+
+try:
+    from machine import Timer
+except ImportError:
+    Timer = None
+
+try:
+    from machine import mem32
+except ImportError:
+    mem32 = None
 
 """ステッピングモーター制御クラス
 -----------------------------------
 ハーフステップ駆動で小型ステッピングモーターを制御します。
 角度・ステップ・回転数いずれの単位でも動作可能です。
+
+STEPPER_TIMER_MODE が有効な場合は machine.Timer のコールバックからステップを出力し
+（μs単位の間隔）、回転開始メソッドは移動ハンドル（StepperMove）を返します。
+再生スレッドは待機・ポーリング・キャンセルのみを行います。
+
+コイル4本への出力は、RP2040/RP2350 では SIO の GPIO_OUT_XOR レジスタへの1回の書き込みで
+同時に切り替えます（STEPPER_COIL_OUTPUT）。利用できない場合はピンごとの Pin.value() で出力します。
 """
 
+# SIO の GPIO_OUT_XOR レジスタ（書き込んだビットの出力を反転、他のピンは変化しない）
+_SIO_GPIO_OUT_XOR = {
+    'RP2040': 0xd000001c,
+    'RP2350': 0xd0000028,
+}
+
+# GPIO_OUT_XOR レジスタのアドレス → 同じ SIO の GPIO_OUT レジスタ（現在の出力値）のアドレス
+_SIO_GPIO_OUT = {
+    0xd000001c: 0xd0000010,
+    0xd0000028: 0xd0000010,
+}
+
+COIL_OUTPUT_AUTO = 'auto'
+COIL_OUTPUT_SIO = 'sio'
+COIL_OUTPUT_PIN = 'pin'
+
+
+def _sio_out_xor_address():
+    """実行中のチップの GPIO_OUT_XOR レジスタのアドレス（対応していないチップでは None）"""
+    machine_name = getattr(sys.implementation, '_machine', '')
+    for chip, address in _SIO_GPIO_OUT_XOR.items():
+        if chip in machine_name:
+            return address
+    return None
+
+
+class _PinCoilOutput:
+    """コイル出力（ピンごとの Pin.value()、フォールバック）。マスクの bit0..3 が AIN1, AIN2, BIN1, BIN2"""
+    name = COIL_OUTPUT_PIN
+
+    def __init__(self, pins):
+        self.pins = pins
+
+    def mask(self, pattern):
+        return sum(1 << i for i in range(4) if pattern[i])
+
+    def write(self, mask):
+        pins = self.pins
+        pins[0].value(mask & 1)
+        pins[1].value(mask & 2)
+        pins[2].value(mask & 4)
+        pins[3].value(mask & 8)
+
+
+class _SioCoilOutput:
+    """
+    コイル出力（SIO レジスタへの1回の書き込み）
+
+    マスクは GPIO 番号のビット位置。出力中のマスクとの差分を GPIO_OUT_XOR に書き込むため、
+    4本のコイルが同時に切り替わり、他のピンの出力には影響しません。
+    """
+    name = COIL_OUTPUT_SIO
+
+    def __init__(self, gpios, address, regs):
+        self.gpios = gpios
+        self.address = address
+        self.regs = regs
+        # 出力中のマスク。XOR で書き込むため、ソフトリセット後に HIGH のまま残ったピンも含めて
+        # 現在の出力値（GPIO_OUT）から取得する
+        out_address = _SIO_GPIO_OUT.get(address)
+        self.state = regs[out_address] & self.mask([1, 1, 1, 1]) if out_address is not None else 0
+
+    def mask(self, pattern):
+        return sum(1 << self.gpios[i] for i in range(4) if pattern[i])
+
+    def write(self, mask):
+        self.regs[self.address] = self.state ^ mask
+        self.state = mask
+
+
+class StepperMove:
+    """
+    タイマー駆動の移動1回分のハンドル
+
+    ステップ間隔（μs）は開始前に加減速プロファイル（motion_profile）として計算済みで、
+    タイマーのコールバックは整数演算と配列参照のみでステップを進めます。
+    """
+
+    def __init__(self, motor, profile, direction):
+        self.motor = motor
+        self.profile = profile
+        self.direction = direction
+        self.steps_total = profile.steps
+        self.steps_done = 0
+        self.cancelled = False
+        self._finished = profile.steps <= 0
+        self.interval_us = profile.interval_us(0) if profile.steps > 0 else 0
+
+    def done(self):
+        """移動が終了（完了またはキャンセル）していればTrue"""
+        return self._finished
+
+    def cancel(self):
+        """
+        移動をキャンセルします（次のステップは出力されない）。
+        
+        Returns:
+            bool: 実行中の移動をキャンセルした場合True
+        """
+        if self._finished:
+            return False
+        self.cancelled = True
+        self.motor._end_move(self)
+        return True
+
+    def wait(self, stop_flag_ref=None):
+        """
+        移動の終了まで待機します（ブロッキング）。
+        停止フラグは1ステップ間隔ごとに確認し、立っていればキャンセルします。
+        
+        Args:
+            stop_flag_ref: 停止フラグのリスト参照 [bool]（オプション）
+        
+        Returns:
+            bool: 最後まで移動した場合True、キャンセルされた場合False
+        """
+        while not self._finished:
+            if stop_flag_ref and stop_flag_ref[0]:
+                self.cancel()
+                break
+            utime.sleep_ms(self._poll_ms())
+        return not self.cancelled
+
+    def wait_gen(self, stop_flag_ref=None):
+        """
+        wait() の再開可能ステップ版（並列トラック再生用）。
+        途中で close() された場合（停止）は移動をキャンセルします。
+        
+        Args:
+            wait() と同じ
+        """
+        try:
+            while not self._finished:
+                if stop_flag_ref and stop_flag_ref[0]:
+                    break
+                yield utime.ticks_add(utime.ticks_ms(), self._poll_ms())
+        finally:
+            self.cancel()
+        return not self.cancelled
+
+    def _poll_ms(self):
+        """待機中の確認間隔: 現在のステップ間隔（1ms以上）"""
+        return max(1, self.interval_us // 1000)
+
+
 class StepperMotor:
 
     # 速度プリセット（1ステップごとの遅延時間 [ms]）
@@ -23,18 +189,23 @@ class StepperMotor:
     def __init__(self, debug=True):
         self.debug = debug
         pin_cfg = config.STEPPER_MOTOR_CONFIG
+        # 加減速プロファイル（最高速度 steps/s、加速度 steps/s²、形）
+        self.max_speed = getattr(config, 'STEPPER_MAX_SPEED', 2000)
+        self.acceleration = getattr(config, 'STEPPER_ACCELERATION', 10000)
+        self.profile_shape = getattr(config, 'STEPPER_PROFILE', motion_profile.PROFILE_TRAPEZOID)
 
-        # --- GPIO ピン設定 ---
+        # --- GPIO ピン設定（全コイルOFFで初期化。ソフトリセット前の出力を残さない） ---
         try:
-            self.AIN1 = Pin(pin_cfg['AIN1'], Pin.OUT)
-            self.AIN2 = Pin(pin_cfg['AIN2'], Pin.OUT)
-            self.BIN1 = Pin(pin_cfg['BIN1'], Pin.OUT)
-            self.BIN2 = Pin(pin_cfg['BIN2'], Pin.OUT)
+            self.AIN1 = Pin(pin_cfg['AIN1'], Pin.OUT, value=0)
+            self.AIN2 = Pin(pin_cfg['AIN2'], Pin.OUT, value=0)
+            self.BIN1 = Pin(pin_cfg['BIN1'], Pin.OUT, value=0)
+            self.BIN2 = Pin(pin_cfg['BIN2'], Pin.OUT, value=0)
             self.PINS = [self.AIN1, self.AIN2, self.BIN1, self.BIN2]
         except Exception as e:
             if self.debug:
                 print(f"[StepperMotor] GPIO initialization failed: {e}")
             raise  # effects.pyのinit()でハンドリングされる
+        gpios = [pin_cfg['AIN1'], pin_cfg['AIN2'], pin_cfg['BIN1'], pin_cfg['BIN2']]
 
         # --- ハーフステップシーケンス ---
         # 4相モーターを8パターンで1周期とする最も滑らかな駆動方式。
@@ -50,8 +221,15 @@ class StepperMotor:
             [1, 0, 0, 1]
         ]
 
+        # --- コイル出力 ---
+        # シーケンスの各パターンを出力用のマスクとして事前に計算（出力時はテーブル参照と1回の書き込み）
+        self._coils = self._create_coil_output(gpios)
+        self.coil_output = self._coils.name
+        self._step_masks = array('I', [self._coils.mask(p) for p in self.HALF_STEP_SEQUENCE])
+
         # 現在のシーケンス位置を追跡
         self.current_step = 0
+        self._move = None         # 実行中の StepperMove（タイマー駆動）
         
         # モーターを停止（初期状態は通電OFF）
         self.stop_motor()
@@ -65,64 +243,329 @@ class StepperMotor:
         # --- シーケンスの現在位置を保持する ---
         self.seq_index = 0        # HALF_STEP_SEQUENCE の現在インデックス（0..7）
         self.current_step = 0     # 論理的な「モーター軸ステップ」位置（0..steps_per_rev-1）
+        # 原点からの絶対位置（ステップ、回転数を含む符号付き）。通電解除（release()）しても保持し、
+        # 次の絶対位置指定の移動は保持した位置から計算する
+        self.position = 0
+
+        # --- タイマー駆動 ---
+        self._timer = None
+        if getattr(config, 'STEPPER_TIMER_MODE', True) and Timer is not None:
+            try:
+                self._timer = Timer(getattr(config, 'STEPPER_TIMER_ID', -1))
+            except Exception as e:
+                print(f"[Warning] Stepper timer unavailable, using blocking steps: {e}")
+                self._timer = None
+        # コールバック内でバウンドメソッドを生成しないよう事前に保持
+        self._isr = self._on_timer
 
     # ==========================================================
     # 基本制御メソッド
     # ==========================================================
 
+    def _create_coil_output(self, gpios):
+        """
+        config.STEPPER_COIL_OUTPUT に従ってコイル出力を選択
+
+        Args:
+            gpios (list): [AIN1, AIN2, BIN1, BIN2] の GPIO 番号
+
+        Returns:
+            _SioCoilOutput または _PinCoilOutput
+        """
+        mode = getattr(config, 'STEPPER_COIL_OUTPUT', COIL_OUTPUT_AUTO)
+        if mode in (COIL_OUTPUT_AUTO, COIL_OUTPUT_SIO):
+            address = _sio_out_xor_address()
+            if mem32 is not None and address is not None and all(0 <= g < 32 for g in gpios):
+                return _SioCoilOutput(gpios, address, mem32)
+            if mode == COIL_OUTPUT_SIO:
+                print("[Warning] SIO coil output unavailable, using per-pin writes")
+        elif mode != COIL_OUTPUT_PIN:
+            print(f"[Warning] Unknown STEPPER_COIL_OUTPUT '{mode}', using per-pin writes")
+        return _PinCoilOutput(self.PINS)
+
     def set_step(self, step_pattern):
-        """指定されたステップパターンを4つのピンに出力します。"""
-        for i in range(4):
-            self.PINS[i].value(step_pattern[i])
+        """指定されたステップパターンを4つのコイルに出力します。"""
+        self._coils.write(self._coils.mask(step_pattern))
 
     def _get_delay_ms(self, speed):
         """速度設定から遅延時間を取得します。"""
         if isinstance(speed, str):
             return self.SPEED_PRESETS.get(speed.upper(), self.SPEED_PRESETS['NORMAL'])
+        if self._timer is not None:
+            return speed  # タイマー駆動ではms未満の間隔も指定可能
         return int(speed)
 
+    def is_timer_driven(self):
+        """タイマー駆動で回転する場合True"""
+        return self._timer is not None
+
     def rotate_steps(self, num_steps, delay_ms, direction=1):
         """
         指定ステップ数・速度・方向でモーターを回転させる。
-        加減速制御を含む実装。
+        タイマー駆動では回転を開始してすぐに戻り、それ以外では最後まで回転してから戻る。
+
+        Args:
+            num_steps (int): ステップ数
+            delay_ms (int|float): 1ステップごとの遅延時間（ms、タイマー駆動では小数可）
+            direction (int): 1=正転, -1=逆転
+
+        Returns:
+            StepperMove: 移動ハンドル（wait() / done() / cancel()）
+        """
+        if self._timer is not None:
+            return self._start_move(num_steps, delay_ms, direction)
+
+        move = StepperMove(self, self._get_profile(num_steps, delay_ms), direction)
+        step_scheduler.run_blocking(self._rotate_steps_blocking_gen(num_steps, delay_ms, direction))
+        move.steps_done = num_steps
+        move._finished = True
+        return move
+
+    def rotate_steps_gen(self, num_steps, delay_ms, direction=1):
+        """
+        指定ステップ数・速度・方向でモーターを回転させる（再開可能ステップ版）。
+        タイマー駆動では移動の終了を待つだけのステップになる。
+        """
+        if self._timer is not None:
+            move = self._start_move(num_steps, delay_ms, direction)
+            yield from move.wait_gen()
+        else:
+            yield from self._rotate_steps_blocking_gen(num_steps, delay_ms, direction)
+
+    def move_steps(self, num_steps, speed='NORMAL', direction=1):
+        """
+        速度設定を指定してステップ数だけ回転させる（負のステップ数は逆方向）。
+
+        Args:
+            num_steps (int): ステップ数
+            speed (str|int|float): 速度設定（プリセット名またはms値）
+            direction (int): 1=正転, -1=逆転
+
+        Returns:
+            StepperMove: 移動ハンドル（rotate_steps() 参照）
+        """
+        if num_steps < 0:
+            num_steps, direction = -num_steps, -direction
+        return self.rotate_steps(num_steps, self._get_delay_ms(speed), direction)
+
+    def move_steps_gen(self, num_steps, speed='NORMAL', direction=1):
+        """
+        move_steps() の再開可能ステップ版。
+
+        Args:
+            move_steps() と同じ
+        """
+        if num_steps < 0:
+            num_steps, direction = -num_steps, -direction
+        yield from self.rotate_steps_gen(num_steps, self._get_delay_ms(speed), direction)
+
+    def _rotate_steps_blocking_gen(self, num_steps, delay_ms, direction=1):
+        """
+        タイマーを使わない回転（ms単位の待機を yield する再開可能ステップ）。
+        加減速制御を含む実装。各ステップの出力時刻を前ステップの時刻から積み上げて yield するため、
+        他のトラックと交互に実行しても回転速度が乱れにくい。
         """
         sequence_length = len(self.HALF_STEP_SEQUENCE)
-        accel_ratio = 0.1  # 全体の10%を加速・減速区間とする
+        profile = self._get_profile(num_steps, delay_ms)
 
         if self.debug:
             print(f"回転開始: ステップ数={num_steps}, 遅延={delay_ms}ms, 方向={'正転' if direction == 1 else '逆転'}")
 
+        next_time = utime.ticks_ms()
         for i in range(num_steps):
             # シーケンス更新
             self.seq_index = (self.seq_index + direction) % sequence_length
-            self.set_step(self.HALF_STEP_SEQUENCE[self.seq_index])
+            self._coils.write(self._step_masks[self.seq_index])
             self.current_step = (self.current_step + direction) % self.steps_per_rev
+            self.position += direction
+
+            now = utime.ticks_ms()
+            if utime.ticks_diff(now, next_time) > 0:
+                # 遅れた場合は詰めて追いつこうとせず、現在時刻から間隔を空ける（脱調防止）
+                next_time = now
+            # 加減速プロファイルの間隔（ms単位に丸める）
+            next_time = utime.ticks_add(next_time, max(1, (profile.interval_us(i) + 500) // 1000))
+            yield next_time
+
+    def _get_profile(self, num_steps, delay_ms):
+        """
+        移動の加減速プロファイルを取得（同じ移動はキャッシュを再利用）
+
+        Args:
+            num_steps (int): ステップ数
+            delay_ms (int|float): 定速区間の1ステップごとの遅延時間（ms）
+
+        Returns:
+            motion_profile.MotionProfile: プロファイル
+        """
+        if self._timer is not None:
+            cruise_us = max(1000000 // self.max_speed, int(delay_ms * 1000))
+        else:
+            cruise_us = max(1, int(delay_ms)) * 1000
+        return motion_profile.get_profile(num_steps, cruise_us, self.acceleration, self.profile_shape)
+
+    # ==========================================================
+    # タイマー駆動
+    # ==========================================================
+
+    def _start_move(self, num_steps, delay_ms, direction):
+        """実行中の移動をキャンセルし、タイマー駆動の移動を開始する"""
+        if self._move is not None:
+            self._move.cancel()
+
+        profile = self._get_profile(num_steps, delay_ms)
+        move = StepperMove(self, profile, direction)
+        if self.debug:
+            print(f"回転開始（タイマー）: ステップ数={num_steps}, 間隔={profile.cruise_us}μs, 方向={'正転' if direction == 1 else '逆転'}")
+        if move.done():
+            return move
+
+        # 1ステップ目はすぐに出力し、以降はタイマーのコールバックで出力
+        self._move = move
+        self._output_step(move)
+        self._arm_timer(move.interval_us)
+        return move
 
-            # 加減速補正
-            accel_steps = max(1, int(num_steps * accel_ratio))
-            if i < accel_steps:  # 加速区間
-                cur_delay = delay_ms * (1.5 - i / accel_steps * 0.5)  # 1.5倍→1.0倍へ
-            elif i >= num_steps - accel_steps:  # 減速区間
-                decel_i = num_steps - i
-                cur_delay = delay_ms * (1.0 + 0.5 * (1 - decel_i / accel_steps))  # 1.0倍→1.5倍へ
-            else:  # 定速区間
-                cur_delay = delay_ms
+    def _output_step(self, move):
+        """移動の次のステップを出力し、次のステップまでの間隔を更新"""
+        self.seq_index = (self.seq_index + move.direction) & 7
+        self._coils.write(self._step_masks[self.seq_index])
+        self.current_step = (self.current_step + move.direction) % self.steps_per_rev
+        self.position += move.direction
+        move.interval_us = move.profile.interval_us(move.steps_done)
+        move.steps_done += 1
 
-            utime.sleep_ms(max(1, int(cur_delay)))
+    def _arm_timer(self, interval_us):
+        """interval_us 後にコールバックが1回呼ばれるようタイマーを設定"""
+        self._timer.init(mode=Timer.ONE_SHOT, period=interval_us, tick_hz=1000000, callback=self._isr)
+
+    def _on_timer(self, timer):
+        """タイマーのコールバック（メモリ確保なし）: 次のステップを出力し、タイマーを再設定"""
+        move = self._move
+        if move is None:
+            return
+        if move.steps_done >= move.steps_total:
+            # 最後のステップの間隔が経過 → 移動完了
+            self._end_move(move)
+            return
+        self._output_step(move)
+        self._arm_timer(move.interval_us)
+
+    def _end_move(self, move):
+        """移動を終了し、実行中であればタイマーを止める"""
+        move._finished = True
+        if self._move is move:
+            self._move = None
+            self._timer.deinit()
 
     def stop_motor(self, reset=False):
-        """全てのコイルの通電をOFFにし、モーターをフリーにします。"""
+        """全てのコイルの通電をOFFにし、モーターをフリーにします（実行中の移動はキャンセル）。"""
         if self.debug:
             print("モーター停止 (通電オフ)")
 
-        self.set_step([0, 0, 0, 0])
+        if self._move is not None:
+            self._move.cancel()
+        self._coils.write(0)
         if reset:
-            self.current_step = 0
+            self.set_home()
 
     def release(self):
-        """モーターの通電を解除します（stop_motorのエイリアス）。"""
+        """モーターの通電を解除します（stop_motorのエイリアス、位置は保持）。"""
         self.stop_motor(reset=False)
 
+    # ==========================================================
+    # 絶対位置
+    # ==========================================================
+
+    def steps_per_output_rev(self):
+        """出力軸1回転あたりのステップ数（ギア比を含む）"""
+        return round(self.steps_per_rev * self.gear_ratio)
+
+    def set_home(self):
+        """現在の位置を原点（0）にします。"""
+        self.position = 0
+        self.current_step = 0
+
+    def get_position(self):
+        """原点からの絶対位置（ステップ）"""
+        return self.position
+
+    def get_angle(self):
+        """出力軸の現在角度（0〜360°未満）"""
+        rev_steps = self.steps_per_output_rev()
+        return (self.position % rev_steps) * 360 / rev_steps
+
+    def angle_to_position(self, degrees):
+        """出力軸の角度を絶対位置（ステップ）に変換"""
+        return round(degrees * self.steps_per_output_rev() / 360)
+
+    def _delta_to(self, target, shortest):
+        """
+        現在位置から目標位置までの移動量（ステップ、符号付き）
+
+        Args:
+            target (int): 目標の絶対位置（ステップ）
+            shortest (bool): True の場合、1回転を法として近い方向に回る（±半回転以内）
+        """
+        delta = target - self.position
+        if shortest:
+            rev_steps = self.steps_per_output_rev()
+            delta %= rev_steps
+            if delta > rev_steps // 2:
+                delta -= rev_steps
+        return delta
+
+    def move_to(self, target, speed='NORMAL', shortest=True):
+        """
+        絶対位置（ステップ）へ移動する。
+
+        Args:
+            target (int): 目標の絶対位置（ステップ、原点 = 0）
+            speed (str|int|float): 速度設定（プリセット名またはms値）
+            shortest (bool): True の場合は近い方向に回る（1回転を法とする）、False の場合は回転数も含めて戻す
+
+        Returns:
+            StepperMove: 移動ハンドル（rotate_steps() 参照）
+        """
+        delta = self._delta_to(target, shortest)
+        if self.debug:
+            print(f"位置指定: {self.position} → {target}（移動 {delta} ステップ）")
+        return self.move_steps(delta, speed)
+
+    def move_to_gen(self, target, speed='NORMAL', shortest=True):
+        """
+        move_to() の再開可能ステップ版（移動量は実行開始時の位置から計算）。
+
+        Args:
+            move_to() と同じ
+        """
+        yield from self.move_steps_gen(self._delta_to(target, shortest), speed)
+
+    def move_to_angle(self, degrees, speed='NORMAL', shortest=True):
+        """
+        出力軸の絶対角度（原点 = 0°）へ移動する。
+
+        Args:
+            degrees (float): 目標角度（°）
+            speed, shortest: move_to() と同じ
+
+        Returns:
+            StepperMove: 移動ハンドル
+        """
+        return self.move_to(self.angle_to_position(degrees), speed, shortest)
+
+    def home(self, speed='NORMAL', shortest=True):
+        """
+        原点へ戻る（1回の移動）。
+
+        Args:
+            speed, shortest: move_to() と同じ
+
+        Returns:
+            StepperMove: 移動ハンドル
+        """
+        return self.move_to(0, speed, shortest)
+
     # ==========================================================
     # 角度・回転数指定の高レベル制御
     # ==========================================================
@@ -132,10 +575,16 @@ class StepperMotor:
         指定角度だけモーターを回転させる。
 
         Args:
-            degrees (float): 回転角度（°）
-            speed (str|int): 速度設定（プリセット名またはms値）
-            direction (int): 1=正転, -1=逆転
+            rotate_degrees_gen() と同じ
+
+        Returns:
+            StepperMove: 移動ハンドル（rotate_steps() 参照）
         """
+        total_steps = self._degrees_to_steps(degrees)
+        return self.rotate_steps(total_steps, self._get_delay_ms(speed), direction)
+
+    def _degrees_to_steps(self, degrees):
+        """角度を総ステップ数に変換（1ステップ以上）"""
         # 1度あたりのステップ数を算出
         steps_per_degree = self.steps_per_rev / 360.0
         # 総ステップ数 = 角度 × ステップ/度 × ギア比
@@ -143,9 +592,19 @@ class StepperMotor:
 
         if self.debug:
             print(f"角度指定: {degrees}°, 計算ステップ数: {total_steps}")
+        return total_steps
 
-        delay_ms = self._get_delay_ms(speed)
-        self.rotate_steps(total_steps, delay_ms, direction)
+    def rotate_degrees_gen(self, degrees, speed='NORMAL', direction=1):
+        """
+        指定角度だけモーターを回転させる（再開可能ステップ版）。
+
+        Args:
+            degrees (float): 回転角度（°）
+            speed (str|int|float): 速度設定（プリセット名またはms値、タイマー駆動では小数可）
+            direction (int): 1=正転, -1=逆転
+        """
+        total_steps = self._degrees_to_steps(degrees)
+        yield from self.rotate_steps_gen(total_steps, self._get_delay_ms(speed), direction)
 
     def rotate_rotations(self, rotations, speed='NORMAL', direction=1):
         """
@@ -153,8 +612,11 @@ class StepperMotor:
 
         Args:
             rotations (float): 回転数（例: 0.5 → 半回転）
-            speed (str|int): 速度設定（プリセット名またはms値）
+            speed (str|int|float): 速度設定（プリセット名またはms値、タイマー駆動では小数可）
             direction (int): 1=正転, -1=逆転
+
+        Returns:
+            StepperMove: 移動ハンドル（rotate_steps() 参照）
         """
         total_steps = round(rotations * self.steps_per_rev * self.gear_ratio)
         delay_ms = self._get_delay_ms(speed)
@@ -162,4 +624,4 @@ class StepperMotor:
         if self.debug:
             print(f"回転指定: {rotations}回転, 総ステップ数: {total_steps}")
 
-        self.rotate_steps(total_steps, delay_ms, direction)
+        return self.rotate_steps(total_steps, delay_ms, direction)
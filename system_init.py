@@ -27,6 +27,8 @@ import servo_rotation_controller
 import servo_position_controller
 import volume_control
 import display_manager
+import scenario_compiler
+import scenario_index
 
 
 def load_scenarios(filename):
@@ -47,35 +49,17 @@ def load_scenarios(filename):
         raise
 
     try:
-        selectable_keys = []
-        random_keys = []
         filtered = {}
-
         for k, v in scenarios.items():
             if not isinstance(k, str) or not k:
                 logger.log_warning(f"Invalid scenario key: {k}")
                 continue
-            is_digit_like = k.isdigit() or (k.lstrip('_').isdigit() and k.startswith('_'))
             filtered[k] = v
-            selectable_keys.append(k)
-            if is_digit_like:
-                random_keys.append(k)
 
         if not filtered:
             raise ValueError("No valid scenarios found in JSON file")
 
-        # 自然順ソート: 数値キーは数値順、文字列キーは辞書順
-        def natural_sort_key(s):
-            """自然順ソートのためのキー関数（数値キーを数値として扱う）"""
-            if s.isdigit():
-                return (0, int(s), s)  # 数値キー: グループ0、数値順
-            elif s.lstrip('_').isdigit() and s.startswith('_'):
-                return (0, int(s.lstrip('_')), s)  # _123形式も数値扱い
-            else:
-                return (1, 0, s)  # 文字列キー: グループ1、辞書順
-        
-        sorted_selectable_keys = sorted(selectable_keys, key=natural_sort_key)
-        
+        sorted_selectable_keys, random_keys = _classify_scenario_keys(filtered.keys())
         return filtered, sorted_selectable_keys, random_keys
     except Exception as e:
         logger.log_error(f"Failed to process scenario data: {e}")
@@ -84,6 +68,64 @@ def load_scenarios(filename):
         raise
 
 
+def load_scenarios_lazy(filename, compile_func=None):
+    """
+    サイドカーインデックスを使ってシナリオを遅延読み込みするストアを返す。
+    起動時はキー一覧とバイト範囲のみを保持し、各シナリオは再生開始時に読み込む。
+    
+    Args:
+        filename: シナリオJSONファイルのパス
+        compile_func: 読み込み後に適用する変換（事前コンパイル有効時）
+    
+    Returns:
+        tuple: (ScenarioStore, valid_scenarios, random_scenarios)
+    """
+    entries = scenario_index.load_or_build_index(filename)
+
+    valid_entries = []
+    for entry in entries:
+        k = entry[0]
+        if not isinstance(k, str) or not k:
+            logger.log_warning(f"Invalid scenario key: {k}")
+            continue
+        valid_entries.append(entry)
+
+    if not valid_entries:
+        raise ValueError("No valid scenarios found in JSON file")
+
+    store = scenario_index.ScenarioStore(filename, valid_entries, compile_func)
+    sorted_selectable_keys, random_keys = _classify_scenario_keys(store.keys())
+    return store, sorted_selectable_keys, random_keys
+
+
+def _classify_scenario_keys(keys):
+    """
+    シナリオキーを選択用（自然順ソート済み）とランダム再生用に分類する
+    
+    Returns:
+        tuple: (sorted_selectable_keys, random_keys)
+    """
+    selectable_keys = []
+    random_keys = []
+    for k in keys:
+        is_digit_like = k.isdigit() or (k.lstrip('_').isdigit() and k.startswith('_'))
+        selectable_keys.append(k)
+        if is_digit_like:
+            random_keys.append(k)
+
+    # 自然順ソート: 数値キーは数値順、文字列キーは辞書順
+    def natural_sort_key(s):
+        """自然順ソートのためのキー関数（数値キーを数値として扱う）"""
+        if s.isdigit():
+            return (0, int(s), s)  # 数値キー: グループ0、数値順
+        elif s.lstrip('_').isdigit() and s.startswith('_'):
+            return (0, int(s.lstrip('_')), s)  # _123形式も数値扱い
+        else:
+            return (1, 0, s)  # 文字列キー: グループ1、辞書順
+    
+    return sorted(selectable_keys, key=natural_sort_key), random_keys
+
+
 def get_fallback_scenarios():
     """
     シナリオ読み込み失敗時のフォールバックシナリオを返す
@@ -164,8 +206,20 @@ def initialize_system():
     AUTO_PLAY_INTERVAL_MS = getattr(config, 'AUTO_PLAY_INTERVAL_SECONDS', 60) * 1000
 
     # ---- シナリオ読み込み ----
+    precompile = getattr(config, 'SCENARIO_PRECOMPILE', True)
     try:
-        scenarios_data, valid_scenarios, random_scenarios = load_scenarios('scenarios.json')
+        scenarios_data = None
+        if getattr(config, 'SCENARIO_LAZY_LOAD', True):
+            # インデックスモード: キー一覧のみ読み込み、各シナリオは再生開始時に読み込む
+            try:
+                compile_func = scenario_compiler.compile_entry if precompile else None
+                scenarios_data, valid_scenarios, random_scenarios = load_scenarios_lazy('scenarios.json', compile_func)
+                logger.log_info("シナリオをインデックスモードで読み込みました（再生時に個別読み込み）")
+            except ValueError as e:
+                logger.log_warning(f"シナリオインデックスを作成できません（一括読み込みに切り替えます）: {e}")
+                scenarios_data = None
+        if scenarios_data is None:
+            scenarios_data, valid_scenarios, random_scenarios = load_scenarios('scenarios.json')
         if not scenarios_data:
             raise ValueError("scenarios.json is empty or invalid.")
         fallback = False
@@ -188,6 +242,15 @@ def initialize_system():
         scenarios_data, valid_scenarios, random_scenarios = get_fallback_scenarios()
         fallback = True
 
+    # ---- シナリオの事前コンパイル（一括読み込み時） ----
+    # インデックスモードではストアが読み込み時に個別にコンパイルする
+    if precompile and isinstance(scenarios_data, dict):
+        try:
+            scenarios_data = scenario_compiler.compile_all(scenarios_data)
+            logger.log_info(f"{len(scenarios_data)}件のシナリオをコンパイルしました")
+        except Exception as e:
+            logger.log_warning(f"シナリオのコンパイルに失敗しました（解釈実行で再生します）: {e}")
+
     # ---- ハードウェア初期化 ----
     # hardware_init.pyは、DFPlayer以外の個別のHW初期化を担当していると想定
     try:
@@ -217,7 +280,7 @@ def initialize_system():
         init_messages = ["Init Error"]
         final_messages = ["Safe Mode"]
 
-    dm = display_manager.DisplayManager(oled_patterns)
+    dm = display_manager.DisplayManager(oled_patterns, config)
 
     # ---- ボリューム初期化 ----
     # ここで sound_patterns.is_dfplayer_available() が正しく機能するはず
@@ -255,6 +318,7 @@ def initialize_system():
 
     try:
         dm.push_message(final_messages)
+        dm.flush()  # メインループの開始前に表示
     except Exception as e:
         logger.log_warning(f"Display message failed: {e}")
 
@@ -0,0 +1,199 @@
+"""
+コマンドディスパッチのマイクロベンチマーク
+
+スタブハードウェア（tests/micropython_stubs.py）上で1000コマンドのシナリオを実行し、
+1コマンドあたりのディスパッチ時間を計測します。PC（CPython）上で実行します。
+実行方法: python tests/bench_dispatch.py [繰り返し回数]
+
+計測内容:
+  1. ディスパッチのみ: ハンドラーを空関数に差し替え、コマンド判定と振り分けの時間を比較
+     （旧 if/elif チェーン vs ディスパッチテーブル）
+  2. 実行全体: スタブハードウェアに対する execute_command()
+     （解釈実行 / コンパイル済み / コンパイル済み＋タイムラインモード）
+"""
+
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import config
+import command_parser
+import effects
+import scenario_compiler
+import neopixel_controller
+import pwm_led_controller
+import servo_rotation_controller
+import servo_position_controller
+import sound_patterns
+
+SCENARIO_LENGTH = 1000
+
+# 待機を伴わない（即時完了する）コマンドの繰り返しパターン
+_PATTERN = [
+    {"type": "led", "command": "fill", "strip": "all", "color": [255, 0, 0]},
+    {"led_on": {"led_index": 0, "max_brightness": 80}},
+    {"type": "servo", "command": "stop", "servo_index": 0},
+    ["sound", 1, 2],
+    {"led_off": {"led_index": 0}},
+    {"type": "servo", "command": "center", "servo_index": 1},
+    ["delay", 0],
+    {"type": "led", "command": "off"},
+]
+
+
+def build_scenario(length=SCENARIO_LENGTH):
+    """パターンを繰り返して指定長のシナリオを作成"""
+    return [_PATTERN[i % len(_PATTERN)] for i in range(length)]
+
+
+def init_stub_hardware():
+    """スタブハードウェア上で各コントローラーを初期化"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        neopixel_controller.init_neopixels()
+        pwm_led_controller.init_pwm_leds()
+        servo_rotation_controller.init_servos()
+        servo_position_controller.init_servos()
+        sound_patterns.init_dfplayer()
+        effects.init()
+
+
+def _legacy_dispatch(cmd, stop_flag_ref, handlers):
+    """
+    比較用: 変更前の if/elif チェーンによる振り分け
+
+    変更前の _dispatch() と同じく、不明な形式・タイプの警告と例外処理を含めます
+    （テーブル側と同じ処理量で比較するため）。
+    """
+    cmd_type = command_parser.parse_command_type(cmd)
+
+    if not cmd_type:
+        print(f"[Warning] Unknown command format or empty command: {cmd}")
+        return None
+
+    try:
+        if cmd_type == 'servo':
+            handlers['servo'](cmd, stop_flag_ref)
+        elif cmd_type == 'led':
+            handlers['led'](cmd, stop_flag_ref)
+        elif cmd_type == 'motor':
+            handlers['motor'](cmd, stop_flag_ref)
+        elif cmd_type == 'sound':
+            handlers['sound'](cmd, stop_flag_ref)
+        elif cmd_type == 'delay':
+            handlers['delay'](cmd, stop_flag_ref)
+        elif cmd_type == 'wait_ms':
+            handlers['wait_ms'](cmd, stop_flag_ref)
+        elif cmd_type == 'stop_playback':
+            handlers['stop_playback'](cmd, stop_flag_ref)
+        elif cmd_type in ['led_on', 'led_off', 'led_fade_in', 'led_fade_out']:
+            handlers[cmd_type](cmd, stop_flag_ref)
+        elif cmd_type == 'effect':
+            handlers['effect'](cmd, stop_flag_ref)
+        else:
+            print(f"[Warning] Unknown command type: {cmd_type}")
+
+    except Exception as e:
+        print(f"[Error] Command execution failed: {cmd_type}")
+        sys.print_exception(e)
+
+    return cmd_type
+
+
+def _time_per_command(func, scenario, repeat):
+    """func(scenario) を repeat 回実行し、最良値から1コマンドあたりの時間（μs）を返す"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(scenario)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best * 1000000 / len(scenario)
+
+
+def bench_dispatch_only(scenario, repeat):
+    """ハンドラーを空関数にして、振り分けのみの時間を計測"""
+    def noop(cmd, stop_flag_ref):
+        pass
+
+    saved = dict(effects._handlers)
+    noop_handlers = {cmd_type: noop for cmd_type in saved}
+    stop_flag = [False]
+
+    def run_legacy(cmds):
+        for cmd in cmds:
+            _legacy_dispatch(cmd, stop_flag, noop_handlers)
+
+    def run_table(cmds):
+        for cmd in cmds:
+            effects._dispatch(cmd, stop_flag)
+
+    try:
+        effects._handlers.clear()
+        effects._handlers.update(noop_handlers)
+        legacy = _time_per_command(run_legacy, scenario, repeat)
+        table = _time_per_command(run_table, scenario, repeat)
+    finally:
+        effects._handlers.clear()
+        effects._handlers.update(saved)
+    return legacy, table
+
+
+def bench_execute(scenario, repeat):
+    """スタブハードウェアに対する execute_command() 全体の時間を計測"""
+    stop_flag = [False]
+    compiled = scenario_compiler.compile_scenario(scenario, "bench")
+
+    def run_interpreted(cmds):
+        effects.execute_command(cmds, stop_flag)
+
+    def run_compiled(cmds):
+        effects.execute_command(compiled, stop_flag)
+
+    saved_timeline = getattr(config, 'SCENARIO_TIMELINE', True)
+    try:
+        # ハンドラーのログ出力は計測から除外（出力先を破棄）
+        with contextlib.redirect_stdout(io.StringIO()):
+            config.SCENARIO_TIMELINE = False
+            interpreted = _time_per_command(run_interpreted, scenario, repeat)
+            compiled_time = _time_per_command(run_compiled, scenario, repeat)
+            config.SCENARIO_TIMELINE = True
+            timeline_time = _time_per_command(run_compiled, scenario, repeat)
+    finally:
+        config.SCENARIO_TIMELINE = saved_timeline
+    return interpreted, compiled_time, timeline_time
+
+
+def run_benchmark(repeat=20):
+    init_stub_hardware()
+    scenario = build_scenario()
+
+    print("=" * 60)
+    print(f"ディスパッチ ベンチマーク（{len(scenario)}コマンド × {repeat}回、最良値）")
+    print("=" * 60)
+
+    legacy, table = bench_dispatch_only(scenario, repeat)
+    print("\n--- ディスパッチのみ（ハンドラーは空関数） ---")
+    print(f"  if/elif チェーン     : {legacy:6.2f} μs/コマンド")
+    print(f"  ディスパッチテーブル : {table:6.2f} μs/コマンド")
+
+    interpreted, compiled_time, timeline_time = bench_execute(scenario, repeat)
+    print("\n--- 実行全体（スタブハードウェア） ---")
+    print(f"  解釈実行             : {interpreted:6.2f} μs/コマンド")
+    print(f"  コンパイル済み       : {compiled_time:6.2f} μs/コマンド")
+    print(f"  タイムラインモード   : {timeline_time:6.2f} μs/コマンド")
+    print("\n※ CPython上の相対比較です。実機（RP2040）では絶対値が大きく異なります。")
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    run_benchmark(repeat)
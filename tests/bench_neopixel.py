@@ -0,0 +1,108 @@
+"""
+NeoPixel フレーム更新のマイクロベンチマーク
+
+スタブハードウェア（tests/micropython_stubs.py）上で、config.NEOPIXEL_STRIPS の全LEDを
+単色で塗りつぶす処理（フェードの1ステップ相当）の時間を計測します。PC（CPython）上で実行します。
+実行方法: python tests/bench_neopixel.py [繰り返し回数]
+
+計測内容:
+  1. 旧方式: (np, i) タプルのマップを引き、LEDごとに np[i] = (r, g, b) と色キャッシュを更新
+  2. フレームバッファ: 全ストリップ共通の bytearray をスライスコピーで塗りつぶし
+  3. 変化なし: 前のフレームと同じ色での塗りつぶし（flush() は送信を省略）
+  （1, 2 はストリップごとの np.write() を含む。スタブの write() は送信時間を含まないため、
+    実機では 3 の効果は送信時間（1LEDあたり約30μs）の分さらに大きくなる）
+"""
+
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import neopixel_controller
+
+FRAMES = 200
+
+
+def _build_legacy_map():
+    """比較用: 変更前の global_led_map / led_color_cache を作成"""
+    led_map = []
+    for np in neopixel_controller._strip_list:
+        for i in range(np.n):
+            led_map.append((np, i))
+    return led_map, [(0, 0, 0)] * len(led_map)
+
+
+def _legacy_fill(led_map, cache, indices, r, g, b):
+    """比較用: 変更前の fade_global_leds() の update_callback"""
+    modified_strips = set()
+    for index in indices:
+        np, local_index = led_map[index]
+        np[local_index] = (r, g, b)
+        cache[index] = (r, g, b)
+        modified_strips.add(np)
+    for np in modified_strips:
+        np.write()
+
+
+def _time_per_frame(func, repeat):
+    """func(frame) を FRAMES 回 × repeat 回実行し、最良値から1フレームあたりの時間（μs）を返す"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for frame in range(FRAMES):
+            func(frame)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best * 1000000 / FRAMES
+
+
+def run_benchmark(repeat=20):
+    with contextlib.redirect_stdout(io.StringIO()):
+        neopixel_controller.init_neopixels()
+    led_map, cache = _build_legacy_map()
+    all_indices = list(range(neopixel_controller.get_total_led_count()))
+
+    # フェードと同じく、対象ストリップと連続範囲の判定は開始前に一度だけ行う
+    strips = neopixel_controller._strips_of(all_indices)
+    contiguous = neopixel_controller._in_range(all_indices)
+
+    def legacy(frame):
+        _legacy_fill(led_map, cache, all_indices, frame & 0xFF, 0, 255 - (frame & 0xFF))
+
+    def framebuffer(frame):
+        neopixel_controller._set_indices(all_indices, contiguous, frame & 0xFF, 0, 255 - (frame & 0xFF))
+        neopixel_controller.flush(strips)
+
+    def unchanged(frame):
+        neopixel_controller._set_indices(all_indices, contiguous, 10, 0, 245)
+        neopixel_controller.flush(strips)
+
+    print("=" * 60)
+    print(f"NeoPixel ベンチマーク（{len(all_indices)} LED、{FRAMES}フレーム × {repeat}回、最良値）")
+    print("=" * 60)
+
+    legacy_time = _time_per_frame(legacy, repeat)
+    framebuffer_time = _time_per_frame(framebuffer, repeat)
+    neopixel_controller.reset_frame_stats()
+    unchanged_time = _time_per_frame(unchanged, repeat)
+    stats = neopixel_controller.get_frame_stats()
+    print(f"  旧方式（タプル・LEDごと） : {legacy_time:7.2f} μs/フレーム")
+    print(f"  フレームバッファ          : {framebuffer_time:7.2f} μs/フレーム")
+    print(f"  速度比                    : {legacy_time / framebuffer_time:5.1f} 倍")
+    print(f"  変化なし（送信省略）      : {unchanged_time:7.2f} μs/フレーム"
+          f"（送信 {stats['written']} / 省略 {stats['skipped']} ストリップ）")
+    print("\n※ CPython上の相対比較です。実機（RP2040）では絶対値が大きく異なります。")
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    run_benchmark(repeat)
@@ -0,0 +1,78 @@
+"""
+PWM LED 輝度変換のマイクロベンチマーク
+
+スタブハードウェア（tests/micropython_stubs.py）上で、4つのPWM LEDを同時にフェードさせる
+1ステップ分（輝度 → デューティ比の変換と duty_u16() の設定 × 4）の時間を計測します。PC（CPython）上で実行します。
+実行方法: python tests/bench_pwm_led.py [繰り返し回数]
+
+計測内容:
+  1. 旧方式: 呼び出しごとに getattr(config, ...) × 2 と math.pow で計算
+  2. テーブル: init_pwm_leds() で作成したガンマ補正済みテーブル（0.1% 刻み）を引く
+"""
+
+import contextlib
+import io
+import math
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import config
+import pwm_led_controller
+
+STEPS = 1000
+LEDS = 4
+
+
+def _legacy_brightness_to_duty(brightness):
+    """比較用: 変更前の brightness_to_duty()"""
+    gamma = getattr(config, 'PWM_LED_GAMMA', 2.2)
+    max_duty = getattr(config, 'PWM_LED_MAX_DUTY', 65535)
+    normalized = max(0.0, min(100.0, brightness)) / 100.0
+    corrected = math.pow(normalized, gamma)
+    return int(corrected * max_duty)
+
+
+def _time_per_step(convert, pwms, repeat):
+    """STEPS ステップのフェード（各ステップで全LEDを更新）を repeat 回実行し、最良値から1ステップあたりの時間（μs）を返す"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for step in range(STEPS):
+            brightness = step * 100.0 / STEPS
+            for pwm in pwms:
+                pwm.duty_u16(convert(brightness))
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best * 1000000 / STEPS
+
+
+def run_benchmark(repeat=20):
+    config.PWM_LED_PINS = [1, 2, 3, 4]
+    with contextlib.redirect_stdout(io.StringIO()):
+        pwm_led_controller.init_pwm_leds()
+    pwms = pwm_led_controller.pwm_leds[:LEDS]
+
+    print("=" * 60)
+    print(f"PWM LED ベンチマーク（{LEDS} LED、{STEPS}ステップ × {repeat}回、最良値）")
+    print("=" * 60)
+
+    legacy_time = _time_per_step(_legacy_brightness_to_duty, pwms, repeat)
+    table_time = _time_per_step(pwm_led_controller.brightness_to_duty, pwms, repeat)
+    print(f"  旧方式（math.pow）: {legacy_time:7.2f} μs/ステップ")
+    print(f"  テーブル          : {table_time:7.2f} μs/ステップ")
+    print(f"  速度比            : {legacy_time / table_time:5.1f} 倍")
+    print("\n※ CPython上の相対比較です。実機（RP2040）では浮動小数点演算がソフトウェア処理のため、差はさらに大きくなります。")
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    run_benchmark(repeat)
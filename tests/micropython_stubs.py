@@ -0,0 +1,291 @@
+"""
+MicroPython用モジュールのスタブ（PC上のテスト・ベンチマーク用）
+
+machine / neopixel / utime / ssd1306 / micropython を sys.modules に登録し、
+time モジュールに ticks_ms() などの MicroPython 拡張関数を追加します。
+ハードウェアへの出力は記録するだけで、実際には何もしません。
+
+使い方:
+    import micropython_stubs
+    micropython_stubs.install()
+    import effects  # 以降は machine などを import するモジュールも読み込める
+"""
+
+import sys
+import time
+import types
+
+
+class Pin:
+    """machine.Pin のスタブ（出力値を記録）"""
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, pin_id, mode=-1, pull=-1, value=None):
+        self.id = pin_id
+        self.mode = mode
+        self.pull = pull
+        self._value = 1 if pull == Pin.PULL_UP else 0
+        self.irq_handler = None
+        if value is not None:
+            self._value = value
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = 1 if v else 0
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def irq(self, handler=None, trigger=0):
+        self.irq_handler = handler
+
+
+class PWM:
+    """machine.PWM のスタブ"""
+
+    def __init__(self, pin, freq=None, duty_u16=None):
+        self.pin = pin
+        self._freq = freq or 0
+        self._duty = duty_u16 or 0
+
+    def freq(self, f=None):
+        if f is None:
+            return self._freq
+        self._freq = f
+
+    def duty_u16(self, d=None):
+        if d is None:
+            return self._duty
+        self._duty = d
+
+    def duty_ns(self, ns=None):
+        if ns is None:
+            return 0
+
+    def deinit(self):
+        pass
+
+
+class UART:
+    """machine.UART のスタブ（送信バイト列を記録）"""
+
+    def __init__(self, uart_id, baudrate=9600, tx=None, rx=None, **kwargs):
+        self.id = uart_id
+        self.baudrate = baudrate
+        self.written = []
+        self.rx_buffer = bytearray()
+
+    def write(self, data):
+        self.written.append(bytes(data))
+        return len(data)
+
+    def any(self):
+        return len(self.rx_buffer)
+
+    def read(self, n=None):
+        if not self.rx_buffer:
+            return None
+        if n is None:
+            n = len(self.rx_buffer)
+        data = bytes(self.rx_buffer[:n])
+        del self.rx_buffer[:n]
+        return data
+
+
+class I2C:
+    """machine.I2C のスタブ"""
+
+    def __init__(self, i2c_id, scl=None, sda=None, freq=400000):
+        self.id = i2c_id
+
+    def scan(self):
+        return []
+
+    def writeto(self, addr, buf):
+        return len(buf)
+
+
+class ADC:
+    """machine.ADC のスタブ"""
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.raw = 0
+
+    def read_u16(self):
+        return self.raw
+
+
+class Timer:
+    """machine.Timer のスタブ（コールバックは手動で呼び出す）"""
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, timer_id=-1):
+        self.callback = None
+        self.mode = None
+        self.period = None
+        self.tick_hz = 1000
+
+    def init(self, mode=PERIODIC, freq=None, period=None, tick_hz=1000, callback=None, hard=False):
+        self.mode = mode
+        self.period = period
+        self.tick_hz = tick_hz
+        self.callback = callback
+
+    def deinit(self):
+        self.callback = None
+
+
+class Mem32:
+    """machine.mem32 のスタブ（レジスタへの書き込みを記録）"""
+
+    def __init__(self):
+        self.regs = {}
+        self.writes = []
+
+    def __getitem__(self, address):
+        return self.regs.get(address, 0)
+
+    def __setitem__(self, address, value):
+        self.regs[address] = value & 0xFFFFFFFF
+        self.writes.append((address, value & 0xFFFFFFFF))
+
+
+class NeoPixel:
+    """neopixel.NeoPixel のスタブ（write() 回数を記録）"""
+
+    def __init__(self, pin, n, bpp=3):
+        self.pin = pin
+        self.n = n
+        self.bpp = bpp
+        self.buf = bytearray(n * bpp)
+        self.write_count = 0
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, i, color):
+        offset = i * self.bpp
+        # NeoPixel の内部バイト順（GRB）
+        self.buf[offset] = color[1]
+        self.buf[offset + 1] = color[0]
+        self.buf[offset + 2] = color[2]
+
+    def __getitem__(self, i):
+        offset = i * self.bpp
+        return (self.buf[offset + 1], self.buf[offset], self.buf[offset + 2])
+
+    def fill(self, color):
+        for i in range(self.n):
+            self[i] = color
+
+    def write(self):
+        self.write_count += 1
+
+
+class SSD1306_I2C:
+    """ssd1306.SSD1306_I2C のスタブ（ページ単位のフレームバッファ、送信したコマンド・データを記録）"""
+
+    def __init__(self, width, height, i2c, addr=0x3C):
+        self.width = width
+        self.height = height
+        self.buffer = bytearray(width * (height // 8))
+        self.commands = []
+        self.data = []
+
+    def fill(self, c):
+        v = 0xFF if c else 0
+        for i in range(len(self.buffer)):
+            self.buffer[i] = v
+
+    def pixel(self, x, y, c=1):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            i = (y >> 3) * self.width + x
+            if c:
+                self.buffer[i] |= 1 << (y & 7)
+            else:
+                self.buffer[i] &= ~(1 << (y & 7))
+
+    def text(self, s, x, y, c=1):
+        # 実際のフォントの代わりに、文字コードから決まる 8x8 のパターンを描画
+        for k, ch in enumerate(s):
+            for col in range(8):
+                bits = (ord(ch) * (col + 3)) & 0xFF
+                for row in range(8):
+                    if bits >> row & 1:
+                        self.pixel(x + k * 8 + col, y + row, c)
+
+    def write_cmd(self, cmd):
+        self.commands.append(cmd)
+
+    def write_data(self, buf):
+        self.data.append(bytes(buf))
+
+    def show(self):
+        self.write_data(self.buffer)
+
+
+def _print_exception(e, file=None):
+    """sys.print_exception の代替"""
+    import traceback
+    traceback.print_exception(type(e), e, e.__traceback__, file=file)
+
+
+def _install_time_extensions(mod):
+    """CPython の time モジュールに MicroPython 拡張関数を追加"""
+    if not hasattr(mod, 'ticks_ms'):
+        mod.ticks_ms = lambda: int(time.monotonic() * 1000)
+        mod.ticks_us = lambda: int(time.monotonic() * 1000000)
+        mod.ticks_diff = lambda a, b: a - b
+        mod.ticks_add = lambda a, b: a + b
+        mod.sleep_ms = lambda ms: time.sleep(ms / 1000)
+        mod.sleep_us = lambda us: time.sleep(us / 1000000)
+
+
+def install():
+    """スタブモジュールを sys.modules に登録（複数回呼んでも安全）"""
+    if 'machine' in sys.modules and getattr(sys.modules['machine'], '_is_stub', False):
+        return
+
+    _install_time_extensions(time)
+    if not hasattr(sys, 'print_exception'):
+        sys.print_exception = _print_exception
+
+    machine = types.ModuleType('machine')
+    machine._is_stub = True
+    machine.Pin = Pin
+    machine.PWM = PWM
+    machine.UART = UART
+    machine.I2C = I2C
+    machine.ADC = ADC
+    machine.Timer = Timer
+    machine.mem32 = Mem32()
+    machine.disable_irq = lambda: 0
+    machine.enable_irq = lambda state: None
+    sys.modules['machine'] = machine
+
+    neopixel = types.ModuleType('neopixel')
+    neopixel.NeoPixel = NeoPixel
+    sys.modules['neopixel'] = neopixel
+
+    ssd1306 = types.ModuleType('ssd1306')
+    ssd1306.SSD1306_I2C = SSD1306_I2C
+    sys.modules['ssd1306'] = ssd1306
+
+    micropython = types.ModuleType('micropython')
+    micropython.const = lambda x: x
+    micropython.schedule = lambda func, arg: func(arg)
+    micropython.alloc_emergency_exception_buf = lambda size: None
+    sys.modules['micropython'] = micropython
+
+    sys.modules['utime'] = time
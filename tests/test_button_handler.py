@@ -0,0 +1,211 @@
+"""
+Test suite for button_handler.py の割り込みモード
+
+エッジを注入できる擬似ピンと擬似クロックで実行する単体テスト
+実行方法: python tests/test_button_handler.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import button_handler
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+# MicroPython の ticks_ms() の周期（2^30 で 0 に戻る）
+TICKS_PERIOD = 1 << 30
+
+class FakeClock:
+    """button_handler の time を置き換える擬似クロック（ticks_ms を任意に進める、周期で折り返す）"""
+    def __init__(self, now=1000):
+        self.now = now
+
+    def ticks_ms(self):
+        return self.now
+
+    def ticks_add(self, a, b):
+        return (a + b) % TICKS_PERIOD
+
+    def ticks_diff(self, a, b):
+        return ((a - b + TICKS_PERIOD // 2) % TICKS_PERIOD) - TICKS_PERIOD // 2
+
+class FakePin:
+    """エッジを注入できる擬似ピン（押下:1, 離:0）"""
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.level = 0
+        self.handler = None
+        self.trigger = 0
+
+    def value(self):
+        return self.level
+
+    def irq(self, trigger=0, handler=None):
+        self.trigger = trigger
+        self.handler = handler
+
+    def edge(self, at, level):
+        """時刻 at にレベルを変化させ、割り込みハンドラーを呼ぶ"""
+        self.clock.now = at
+        self.level = level
+        if self.handler:
+            self.handler(self)
+
+class Config:
+    BUTTON_IRQ_MODE = True
+    BUTTON_DEBOUNCE_MS = 20
+    BUTTON_EVENT_QUEUE_SIZE = 8
+
+def make_handler(irq_mode=True, now=1000):
+    """擬似クロックに切り替えてハンドラーを作成（各テストの最後に button_handler.time を戻す）"""
+    clock = FakeClock(now)
+    button_handler.time = clock
+    cfg = Config()
+    cfg.BUTTON_IRQ_MODE = irq_mode
+    handler = button_handler.ButtonHandler(cfg)
+    pin = FakePin(clock)
+    handler.update(pin, False, False)  # 初回の update() で割り込みを登録
+    return handler, pin, clock
+
+def drain(handler, pin, clock, at, select_mode=False, is_playing=False):
+    """時刻 at に update() を繰り返し、検出されたイベントを (イベント, 押下時間) のリストで返す"""
+    clock.now = at
+    events = []
+    for _ in range(10):
+        result = handler.update(pin, select_mode, is_playing)
+        if result['event']:
+            events.append((result['event'], result['press_duration']))
+    return events
+
+# ===== 短押し・チャタリング =====
+def test_short_press():
+    print("\n=== 短押し・チャタリング除去 ===")
+
+    handler, pin, clock = make_handler()
+    assert_equal(pin.trigger, FakePin.IRQ_RISING | FakePin.IRQ_FALLING, "両エッジに割り込みを登録")
+
+    # ポーリング周期（50ms）より短い 30ms の押下
+    pin.edge(1100, 1)
+    pin.edge(1130, 0)
+    assert_equal(drain(handler, pin, clock, 1150), [('short_press', 30)], "ループ周期より短い押下も検出し、押下時間はエッジ間の実測値")
+
+    # 押下・解放それぞれでチャタリング
+    for at, level in [(2000, 1), (2002, 0), (2004, 1), (2300, 0), (2301, 1), (2303, 0)]:
+        pin.edge(at, level)
+    assert_equal(drain(handler, pin, clock, 2350), [('short_press', 300)], "チャタリングを除去して1回の押下として判定")
+
+    # 解放エッジがチャタリング除去期間内（5ms押下）→ ピンの状態から補完
+    pin.edge(3000, 1)
+    pin.edge(3005, 0)
+    assert_equal(drain(handler, pin, clock, 3010), [], "除去期間内は判定を保留")
+    assert_equal(drain(handler, pin, clock, 3030), [('short_press', 30)], "除去期間後にピンの状態と同期")
+
+    # 再生中: 押すと停止（BUTTON_SWITCH_ON_PRESS = True なら短押しで切り替え、それより長い押下で停止）
+    assert_equal(handler.PRESS_SWITCHES, False, "BUTTON_SWITCH_ON_PRESS はデフォルトで無効")
+    pin.edge(4000, 1)
+    pin.edge(4100, 0)
+    assert_equal(drain(handler, pin, clock, 4150, is_playing=True), [('stop', 100)], "再生中の短押しは停止")
+    handler.PRESS_SWITCHES = True
+    pin.edge(5000, 1)
+    pin.edge(5100, 0)
+    assert_equal(drain(handler, pin, clock, 5150, is_playing=True), [('switch', 100)], "BUTTON_SWITCH_ON_PRESS では再生中の短押しで切り替え")
+    pin.edge(6000, 1)
+    pin.edge(6700, 0)
+    assert_equal(drain(handler, pin, clock, 6750, is_playing=True), [('stop', 700)], "BUTTON_SWITCH_ON_PRESS でも長めの押下は停止")
+
+    # ticks_ms() が折り返した直後に割り込みを登録
+    handler, pin, clock = make_handler(now=5)
+    assert_equal(0 <= handler._last_edge_time < TICKS_PERIOD, True, "初期のエッジ時刻は ticks_add() で計算（周期内の値）")
+    pin.edge(10, 1)
+    pin.edge(60, 0)
+    assert_equal(drain(handler, pin, clock, 100), [('short_press', 50)], "折り返し直後の押下も検出")
+    button_handler.time = time
+
+# ===== 長押し・ダブルクリック =====
+def test_long_press_and_clicks():
+    print("\n=== 長押し・ダブルクリック ===")
+
+    handler, pin, clock = make_handler()
+    pin.edge(1000, 1)
+    assert_equal(drain(handler, pin, clock, 1500), [], "押下中（長押し未満）はイベントなし")
+    assert_equal(drain(handler, pin, clock, 2000)[:1], [('enter_select_mode', 1000)], "押し続けると長押しでセレクトモードへ")
+    pin.edge(2100, 0)
+    drain(handler, pin, clock, 2150, select_mode=True)
+
+    # 2回のクリックがまとめてキューに溜まっても、1回の update() で1イベントずつ返す
+    for at, level in [(3000, 1), (3080, 0), (3200, 1), (3260, 0)]:
+        pin.edge(at, level)
+    assert_equal(drain(handler, pin, clock, 3300, select_mode=True), [('select_click', 80), ('select_click', 60)], "クリックを順に判定")
+    clock.now = 3900
+    assert_equal(handler.get_selection_change(), -1, "ダブルクリックで前へ")
+    assert_equal(handler.is_idle(), True, "判定完了後はアイドル")
+    button_handler.time = time
+
+# ===== バッファ・ポーリングモード =====
+def test_buffer_and_polling():
+    print("\n=== リングバッファ・ポーリングモード ===")
+
+    handler, pin, clock = make_handler()
+    for i in range(20):
+        pin.edge(1000 + i * 30, (i + 1) % 2)
+    assert_equal(handler.dropped_edges, 13, "バッファ満杯時は新しいエッジを破棄（8要素 = 7エッジ保持）")
+    events = drain(handler, pin, clock, 2000)
+    assert_equal(len(events) >= 1 and handler.is_idle(), True, "溢れた後もキューを処理して復帰")
+
+    handler, pin, clock = make_handler(irq_mode=False)
+    assert_equal(pin.handler, None, "ポーリングモードでは割り込みを登録しない")
+    pin.level = 1
+    drain(handler, pin, clock, 1000)
+    pin.level = 0
+    assert_equal(drain(handler, pin, clock, 1050), [('short_press', 50)], "ポーリングモードは従来どおりループ周期で判定")
+    button_handler.time = time
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("Button Handler テストスイート")
+    print("=" * 60)
+
+    test_short_press()
+    test_long_press_and_clicks()
+    test_buffer_and_polling()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
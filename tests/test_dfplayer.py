@@ -0,0 +1,327 @@
+"""
+Test suite for dfplayer.py
+
+擬似UART（送信を記録し、ACK などの受信フレームを返す）と擬似時計で実行する単体テスト
+実行方法: python tests/test_dfplayer.py
+"""
+
+import sys
+import time
+import contextlib
+import io
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import dfplayer
+import sound_patterns
+import sound_command_handler
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+def quiet(func, *args):
+    """ログ出力を抑えて実行"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+class FakeClock:
+    """dfplayer の utime・sound_patterns の time を置き換える擬似時計（sleep_ms() の間に on_sleep を呼ぶ）"""
+    def __init__(self, on_sleep=None):
+        self.now = 1000
+        self.on_sleep = on_sleep
+
+    def sleep_ms(self, ms):
+        self.now += ms
+        if self.on_sleep:
+            self.on_sleep(self.now)
+
+    def ticks_ms(self):
+        return self.now
+
+    def ticks_add(self, a, b):
+        return a + b
+
+    def ticks_diff(self, a, b):
+        return a - b
+
+class FakeUart(micropython_stubs.UART):
+    """ACK を要求されたコマンドに自動で ACK を返す擬似UART（auto_ack=False の場合は返さない）"""
+    def __init__(self, auto_ack=True):
+        super().__init__(0)
+        self.auto_ack = auto_ack
+
+    def write(self, data):
+        if self.auto_ack and data[4]:
+            self.reply(dfplayer.EVT_ACK)
+        return super().write(data)
+
+    def reply(self, cmd, param=0):
+        self.rx_buffer.extend(dfplayer.build_frame(cmd, param))
+
+def commands(uart):
+    return [(frame[3], frame[5] << 8 | frame[6]) for frame in uart.written]
+
+# ===== フレーム =====
+def test_frames():
+    print("\n=== フレーム ===")
+
+    assert_equal(dfplayer.build_frame(dfplayer.CMD_PLAY_TRACK, 1).hex(' '), '7e ff 06 03 00 00 01 fe f7 ef',
+                 "チェックサムつきの10バイトフレーム")
+    assert_equal(dfplayer.build_frame(dfplayer.CMD_PLAY_FOLDER, 0x0203, True)[3:7], bytes([0x0F, 1, 2, 3]),
+                 "コマンド・ACK要求・16ビットのパラメータ")
+
+    parser = dfplayer.FrameParser()
+    ack = dfplayer.build_frame(dfplayer.EVT_ACK)
+    finished = dfplayer.build_frame(dfplayer.EVT_SD_FINISHED, 7)
+    broken = bytearray(finished)
+    broken[8] ^= 1
+    assert_equal(parser.feed(b'\x00\x13' + ack[:4]), [], "未完成のフレームは保留")
+    assert_equal(parser.feed(ack[4:] + bytes(broken) + finished), [(dfplayer.EVT_ACK, 0), (dfplayer.EVT_SD_FINISHED, 7)],
+                 "複数回の read() にまたがるフレーム・前後の不要なバイト")
+    assert_equal(parser.bad_frames, 1, "チェックサムが合わないフレームは破棄")
+
+# ===== 送信キュー =====
+def test_queue():
+    print("\n=== 送信キュー ===")
+
+    clock = FakeClock()
+    dfplayer.utime = clock
+    try:
+        uart = FakeUart()
+        player = dfplayer.DFPlayer(uart, interval_ms=30, queue_size=3)
+        player.send(dfplayer.CMD_SET_VOLUME, 10)
+        player.send(dfplayer.CMD_PLAY_FOLDER, 0x0201)
+        assert_equal((commands(uart), player.pending()), ([(dfplayer.CMD_SET_VOLUME, 10)], 1),
+                     "send() は待たずに戻る（送信できるコマンドはすぐに送信し、残りはキューへ）")
+
+        clock.now += 10
+        player.service()
+        assert_equal(len(uart.written), 1, "最小送信間隔の間は送信しない")
+        clock.now += 20
+        player.service()
+        player.service()
+        assert_equal(commands(uart)[-1], (dfplayer.CMD_PLAY_FOLDER, 0x0201), "間隔が経過したら次のコマンドを送信")
+        assert_equal((player.playing, player.acked), (True, 2), "ACK を受信")
+
+        uart.auto_ack = False
+        clock.now += 30
+        player.send(dfplayer.CMD_STOP)
+        player.send(dfplayer.CMD_SET_VOLUME, 5)
+        clock.now += 100
+        player.service()
+        assert_equal(len(uart.written), 3, "ACK を受信するまで次を送信しない")
+        clock.now += 100
+        player.service()
+        assert_equal((len(uart.written), player.ack_timeouts), (4, 1), "ACK のタイムアウト後は次を送信")
+
+        clock.now += 300
+        for volume in range(5):
+            player.send(dfplayer.CMD_SET_VOLUME, volume)
+        assert_equal((player.pending(), player.dropped), (3, 1), "キューの上限を超えた場合は最も古いコマンドを破棄")
+        player.clear()
+    finally:
+        dfplayer.utime = time
+
+# ===== 受信イベント =====
+def test_events():
+    print("\n=== 受信イベント ===")
+
+    clock = FakeClock()
+    dfplayer.utime = clock
+    try:
+        uart = FakeUart()
+        player = dfplayer.DFPlayer(uart, boot_ms=1000)
+        player.send(dfplayer.CMD_PLAY_TRACK, 1)
+        assert_equal(len(uart.written), 0, "起動待ちの間はキューで待機")
+        uart.reply(dfplayer.EVT_INIT_DONE, 2)
+        clock.now += 5
+        player.service()
+        assert_equal((len(uart.written), player.playing), (1, True), "初期化完了の通知で起動待ちを終了")
+
+        uart.reply(dfplayer.EVT_SD_FINISHED, 1)
+        uart.reply(dfplayer.EVT_ERROR, 0x06)
+        quiet(player.service)
+        assert_equal((player.playing, player.finished_count, player.last_finished), (False, 1, 1), "再生終了イベント")
+        assert_equal((player.error_count, player.last_error), (1, 0x06), "エラーイベント")
+        assert_equal(player.get_stats(), {'sent': 1, 'acked': 1, 'ack_timeouts': 0, 'dropped': 0, 'coalesced': 0,
+                                          'errors': 1, 'finished': 1, 'pending': 0}, "統計")
+    finally:
+        dfplayer.utime = time
+
+# ===== 音量の間引き =====
+def test_volume_coalescing():
+    print("\n=== 音量の間引き ===")
+
+    clock = FakeClock()
+    dfplayer.utime = clock
+    try:
+        uart = FakeUart()
+        player = dfplayer.DFPlayer(uart, volume_interval_ms=100)
+        # ノブを回している間（10msごとに音量が変化）
+        for i in range(45):
+            player.set_volume(i % 31)
+            clock.now += 10
+            player.service()
+        volumes = [param for cmd, param in commands(uart) if cmd == dfplayer.CMD_SET_VOLUME]
+        assert_equal(len(volumes), 5, f"音量コマンドは volume_interval_ms ごとに1回（{volumes}）")
+        assert_equal(player.coalesced, 39, "間の変更は送信せずに最新の値で置き換え")
+
+        clock.now += 100
+        player.send(dfplayer.CMD_PLAY_FOLDER, 0x0101)
+        clock.now += 30
+        player.service()
+        assert_equal(commands(uart)[-2:], [(dfplayer.CMD_SET_VOLUME, 44 % 31), (dfplayer.CMD_PLAY_FOLDER, 0x0101)],
+                     "ノブが止まったら最後の値を送信（キューのコマンドより優先）")
+        clock.now += 200
+        player.set_volume(13)
+        player.service()
+        assert_equal(len(uart.written), 7, "送信済みと同じ音量は送信しない")
+    finally:
+        dfplayer.utime = time
+
+# ===== 再生終了待ち =====
+def test_wait_end():
+    print("\n=== 再生終了待ち ===")
+
+    config = sound_patterns.config
+    config.DFPLAYER_BOOT_MS = 0
+    config.DFPLAYER_ACK = False
+    config.DFPLAYER_START_TIMEOUT_MS = 500
+    config.DFPLAYER_BUSY_PIN = 14
+    clip = {}  # 再生開始・終了の時刻（BUSY が LOW の区間）
+
+    def dfplayer_model(now):
+        """擬似DFPlayer: 再生コマンドの受信から clip の区間だけ BUSY を LOW にする"""
+        if clip and clip['start'] <= now < clip['end'] and busy.value():
+            busy.value(0)
+            busy.irq_handler(busy)
+        elif clip and now >= clip['end']:
+            busy.value(1)
+
+    clock = FakeClock(dfplayer_model)
+    dfplayer.utime = clock
+    sound_patterns.time = clock
+    try:
+        quiet(sound_patterns.init_dfplayer)
+        busy = sound_patterns.busy_pin
+        assert_equal((busy is not None, busy.irq_handler is sound_patterns._on_busy), (True, True), "BUSYピンの割り込みを登録")
+        quiet(sound_patterns.play_sound, 2, 1)
+        clip.update(start=clock.now + 100, end=clock.now + 2400)
+        start = clock.now
+        stop_flag = [False]
+        quiet(sound_command_handler.handle, {"type": "sound", "command": "wait_end"}, stop_flag)
+        assert_equal(2400 <= clock.now - start <= 2400 + 10, True, f"BUSY が HIGH に戻った時点で終了（{clock.now - start}ms）")
+
+        # ポーリングの間に終わる短い音声: 割り込みで記録した再生開始から判定
+        clock.now += 100
+        quiet(sound_patterns.play_sound, 2, 2)
+        busy.irq_handler(busy)
+        clip.clear()
+        start = clock.now
+        assert_equal((sound_patterns.wait_end(), clock.now - start), (True, 0), "割り込みで記録した短い音声の終了")
+
+        clock.now += 100
+        quiet(sound_patterns.play_sound, 2, 99)
+        start = clock.now
+        assert_equal((sound_patterns.wait_end(), clock.now - start), (True, 500), "再生が始まらない場合は DFPLAYER_START_TIMEOUT_MS で終了")
+
+        clock.now += 100
+        quiet(sound_patterns.play_sound, 2, 1)
+        clip.update(start=clock.now + 100, end=clock.now + 5000)
+        stop_flag = [False]
+        clock.on_sleep = lambda now: (dfplayer_model(now), stop_flag.__setitem__(0, now - start >= 1000))
+        start = clock.now
+        assert_equal(sound_patterns.wait_end(stop_flag), False, "停止フラグで中断")
+        assert_equal(clock.now - start <= 1010, True, "停止フラグから1ポーリング以内")
+        clock.on_sleep = dfplayer_model
+
+        # BUSYピンなし: 再生終了イベントで判定
+        sound_patterns.busy_pin = None
+        clip.clear()
+        clock.now += 5000
+        quiet(sound_patterns.play_sound, 3, 1)
+        clock.on_sleep = lambda now: now - start >= 800 and sound_patterns.uart.rx_buffer.extend(
+            dfplayer.build_frame(dfplayer.EVT_SD_FINISHED, 1))
+        start = clock.now
+        assert_equal(sound_patterns.wait_end(), True, "BUSYピンなしは再生終了イベントで終了")
+        assert_equal(800 <= clock.now - start <= 810, True, f"イベントの受信から1ポーリング以内（{clock.now - start}ms）")
+    finally:
+        dfplayer.utime = time
+        sound_patterns.time = time
+        config.DFPLAYER_ACK = True
+
+# ===== sound_patterns =====
+def test_sound_patterns():
+    print("\n=== sound_patterns ===")
+
+    config = sound_patterns.config
+    config.DFPLAYER_BOOT_MS = 0
+    config.DFPLAYER_ACK = False
+    start = time.monotonic()
+    quiet(sound_patterns.init_dfplayer)
+    assert_equal(time.monotonic() - start < 0.5, True, "init_dfplayer() は起動音を待たずに戻る")
+    uart = sound_patterns.uart
+    assert_equal(commands(uart), [(dfplayer.CMD_PLAY_TRACK, 1)], "起動音はキュー経由で送信")
+
+    clock = FakeClock()
+    clock.now = time.ticks_ms()
+    dfplayer.utime = clock
+    try:
+        quiet(sound_patterns.set_volume, 40)
+        quiet(sound_patterns.play_sound, 2, 3)
+        assert_equal(sound_patterns.get_stats()['pending'], 1, "シナリオからのコマンドはキューに追加して戻る")
+        for _ in range(2):
+            clock.now += 30
+            sound_patterns.service()
+    finally:
+        dfplayer.utime = time
+        config.DFPLAYER_ACK = True
+    assert_equal(commands(uart)[1:], [(dfplayer.CMD_SET_VOLUME, 30), (dfplayer.CMD_PLAY_FOLDER, 0x0203)],
+                 "service() で音量・キューの順に送信（音量は 0〜30 に制限）")
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("DFPlayer テストスイート")
+    print("=" * 60)
+
+    test_frames()
+    test_queue()
+    test_events()
+    test_volume_coalescing()
+    test_wait_end()
+    test_sound_patterns()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
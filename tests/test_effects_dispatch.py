@@ -0,0 +1,100 @@
+"""
+Test suite for effects.py のディスパッチテーブル
+
+スタブハードウェア（tests/micropython_stubs.py）上で実行する単体テスト
+実行方法: python tests/test_effects_dispatch.py
+"""
+
+import sys
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import effects
+import scenario_compiler
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+# ===== 標準ハンドラーの登録 =====
+def test_builtin_handlers():
+    print("\n=== 標準ハンドラーの登録 ===")
+
+    effects._handlers.clear()
+    effects._builtin_handlers_registered = False
+    effects.register_handler('custom_before_init', lambda cmd, stop_flag_ref: None)
+    effects.execute_command([], [False])
+    expected = ['custom_before_init', 'delay', 'effect', 'led', 'led_fade_in', 'led_fade_out', 'led_off', 'led_on',
+                'motor', 'servo', 'sound', 'stop_playback', 'wait_ms']
+    assert_equal(sorted(effects._handlers.keys()), expected, "init()前でも初回実行時にテーブルを構築")
+
+# ===== カスタムコマンドの追加 =====
+def test_custom_handler():
+    print("\n=== カスタムコマンドの追加 ===")
+
+    calls = []
+    effects.register_handler('beep', lambda cmd, stop_flag_ref: calls.append(cmd))
+
+    effects.execute_command([{"type": "beep", "count": 2}, ["beep", 3]], [False])
+    assert_equal(calls, [{"type": "beep", "count": 2}, ["beep", 3]], "登録したハンドラーに振り分け")
+
+    # コンパイル済みシナリオでも OP_RAW 経由で同じテーブルを使う
+    calls.clear()
+    program = scenario_compiler.compile_scenario([["beep", 1], ["delay", 0]], "custom")
+    effects.execute_command(program, [False])
+    assert_equal(calls, [["beep", 1]], "コンパイル済みシナリオからも呼び出し")
+
+    # 例外が出ても後続のコマンドは実行される
+    calls.clear()
+    def broken(cmd, stop_flag_ref):
+        raise ValueError("broken handler")
+    effects.register_handler('broken', broken)
+    effects.execute_command([["broken"], ["beep", 4]], [False])
+    assert_equal(calls, [["beep", 4]], "ハンドラーの例外後も続行")
+
+    assert_equal(effects._dispatch(["unknown_type"], [False]), "unknown_type", "未登録タイプは警告のみ")
+
+    del effects._handlers['beep']
+    del effects._handlers['broken']
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("Effects Dispatch テストスイート")
+    print("=" * 60)
+
+    test_builtin_handlers()
+    test_custom_handler()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,203 @@
+"""
+Test suite for effects.py のタイムラインモード
+
+スタブハードウェア（tests/micropython_stubs.py）上で実行する単体テスト
+時刻は仮想クロック（sleep_ms で進む ticks_ms）を使うため、PCの負荷に関係なく結果は一定です。
+実行方法: python tests/test_effects_timeline.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import config
+import command_parser
+import effects
+import led_command_handler
+
+# タイミング判定の許容誤差（ミリ秒、仮想クロックでは誤差は生じない）
+TOLERANCE_MS = 1
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+def near(actual, expected):
+    """許容誤差内で一致するか"""
+    return abs(actual - expected) <= TOLERANCE_MS
+
+class FakeClock:
+    """
+    仮想クロック: time.ticks_ms() は sleep_ms() で進めた時刻を返す
+    （待機・LED書き込みなどの時間をすべて sleep_ms() で表すため、実時間に依存しない）
+    """
+
+    # 実行中の仮想クロック（テスト用ハンドラーから参照）
+    active = None
+
+    def __init__(self, now=1000):
+        self.now = now
+        self.alarms = []
+
+    def ticks_ms(self):
+        return self.now
+
+    def sleep_ms(self, ms):
+        self.now += max(0, int(ms))
+        for alarm in [a for a in self.alarms if self.now >= a[0]]:
+            self.alarms.remove(alarm)
+            alarm[1][0] = True
+
+    def stop_after(self, ms, stop_flag_ref):
+        """ms 後（の sleep_ms()）に停止フラグを立てる"""
+        self.alarms.append((self.now + ms, stop_flag_ref))
+
+    def __enter__(self):
+        FakeClock.active = self
+        self._saved = (time.ticks_ms, time.sleep_ms)
+        time.ticks_ms = self.ticks_ms
+        time.sleep_ms = self.sleep_ms
+        return self
+
+    def __exit__(self, *exc):
+        time.ticks_ms, time.sleep_ms = self._saved
+        FakeClock.active = None
+        return False
+
+def run_marked_scenario(timeline, scenario=None):
+    """
+    30msかかるコマンド（書き込みに時間のかかる LED fill）の後に delay を挟んで mark を2回実行し、
+    シナリオ開始からの各 mark の時刻を返す
+    """
+    marks = []
+    effects.register_handler('mark', lambda cmd, sf: marks.append(time.ticks_diff(time.ticks_ms(), t0)))
+    slow = {"type": "led", "command": "fill", "color": [255, 0, 0]}
+    if scenario is None:
+        scenario = [slow, ["delay", 50], ["mark"], slow, ["delay", 50], ["mark"]]
+
+    original_fill = led_command_handler.fill
+    led_command_handler.fill = lambda *args: time.sleep_ms(30)
+    config.SCENARIO_TIMELINE = timeline
+    try:
+        with FakeClock():
+            t0 = time.ticks_ms()
+            effects.execute_command(scenario, [False])
+    finally:
+        led_command_handler.fill = original_fill
+    return marks
+
+# ===== wait_until =====
+def test_wait_until():
+    print("\n=== command_parser.wait_until() ===")
+
+    with FakeClock():
+        deadline = time.ticks_add(time.ticks_ms(), 40)
+        time.sleep_ms(15)
+        ok = command_parser.wait_until(deadline, [False])
+        assert_equal(ok and near(time.ticks_diff(time.ticks_ms(), deadline), 0), True, "絶対時刻まで待機（直前の処理時間を差し引く）")
+
+        past = time.ticks_add(time.ticks_ms(), -10)
+        assert_equal(command_parser.wait_until(past, [False]), True, "過去の時刻は即座に完了")
+
+        assert_equal(command_parser.wait_until(time.ticks_add(time.ticks_ms(), 200), [True]), False, "停止フラグで中断")
+
+# ===== タイムライン実行 =====
+def test_timeline_execution():
+    print("\n=== タイムライン実行 ===")
+
+    marks = run_marked_scenario(timeline=False)
+    assert_equal(near(marks[1], 160), True, f"従来モードは処理時間が累積（{marks[1]}ms）")
+
+    marks = run_marked_scenario(timeline=True)
+    assert_equal(near(marks[0], 50) and near(marks[1], 100), True, f"タイムラインモードは予定時刻で開始（{marks}）")
+
+    report = effects.last_timeline_report
+    assert_equal(report['executed'], 6, "レポート: 実行命令数")
+    assert_equal(report['planned_ms'], 100, "レポート: 予定時間")
+    assert_equal(near(report['late_ms'][1], 30), True, "レポート: slow後のdelayは30ms遅れで開始")
+    assert_equal(near(report['late_ms'][2], 0), True, "レポート: markは予定どおり開始")
+
+    config.SCENARIO_TIMELINE = True
+    effects.execute_command([["delay", 500], ["mark"]], [True])
+    assert_equal(effects.last_timeline_report['executed'], 0, "停止フラグで中断")
+
+    del effects._handlers['mark']
+
+# ===== 所要時間が不明な命令 =====
+def test_reanchor():
+    print("\n=== 所要時間が不明な命令の後の delay ===")
+
+    # 解釈実行するコマンド（モーター・再生終了待ちと同様に所要時間が事前に決まらない）
+    effects.register_handler('blocking', lambda cmd, sf: time.sleep_ms(60))
+    scenario = [["blocking"], ["delay", 50], ["mark"]]
+    marks = run_marked_scenario(timeline=False, scenario=scenario)
+    assert_equal(near(marks[0], 110), True, f"従来モード: 終了後に delay（{marks[0]}ms）")
+    marks = run_marked_scenario(timeline=True, scenario=scenario)
+    assert_equal(near(marks[0], 110), True, f"タイムラインモードも終了時刻から delay を待機（{marks[0]}ms）")
+
+    marks = run_marked_scenario(timeline=True, scenario={"tracks": {"a": scenario, "b": [["delay", 20]]}})
+    assert_equal(near(marks[0], 110), True, f"並列トラックも終了時刻から delay を待機（{marks[0]}ms）")
+
+    del effects._handlers['blocking']
+    del effects._handlers['mark']
+
+# ===== 中断した wait_ms =====
+def test_interrupted_wait():
+    print("\n=== 中断した wait_ms ===")
+
+    # 待機の途中（20ms後）に停止フラグを立てる: wait_ms はフラグを戻さず、シナリオ全体が停止する
+    effects.register_handler('interrupt', lambda cmd, sf: FakeClock.active.stop_after(20, sf))
+    scenario = [["interrupt"], {"wait_ms": 200}, ["mark"], ["delay", 50], ["mark"]]
+    marks = run_marked_scenario(timeline=False, scenario=scenario)
+    assert_equal(marks, [], "従来モード: 待機の中断でシナリオを停止")
+    marks = run_marked_scenario(timeline=True, scenario=scenario)
+    assert_equal(marks, [], "タイムラインモード: 待機の中断でシナリオを停止")
+    assert_equal(effects.last_timeline_report['executed'], 2, "レポート: wait_ms までを実行")
+
+    del effects._handlers['interrupt']
+    del effects._handlers['mark']
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("Effects Timeline テストスイート")
+    print("=" * 60)
+
+    test_wait_until()
+    test_timeline_execution()
+    test_reanchor()
+    test_interrupted_wait()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,254 @@
+"""
+Test suite for fade_controller.py の複数チャンネル同時フェードエンジン
+
+擬似クロックと記録用の出力先、スタブハードウェア（tests/micropython_stubs.py）上で実行する単体テスト
+実行方法: python tests/test_fade_controller.py
+"""
+
+import sys
+import time
+import math
+import contextlib
+import io
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import config
+import fade_controller
+import step_scheduler
+import pwm_led_controller
+import neopixel_controller
+import effects
+
+# テスト用のストリップ構成（LV1: 4個, LV2: 3個）
+config.NEOPIXEL_STRIPS = {
+    'LV1': {'pin': 20, 'count': 4},
+    'LV2': {'pin': 21, 'count': 3},
+}
+config.PWM_LED_PINS = [1, 2, 3, 4]
+config.FADE_ENGINE_INTERVAL_MS = 10
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+def quiet(func, *args):
+    """ログ出力を抑えて実行"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+class FakeClock:
+    """fade_controller の time を置き換える擬似クロック"""
+    def __init__(self):
+        self.now = 1000
+
+    def ticks_ms(self):
+        return self.now
+
+    def ticks_diff(self, a, b):
+        return a - b
+
+    def ticks_add(self, a, b):
+        return a + b
+
+class RecordingSink:
+    """tick ごとの呼び出しを記録する出力先"""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, channels, values, count):
+        lanes = fade_controller.FADE_LANES
+        self.calls.append({channels[k]: tuple(values[k * lanes:k * lanes + lanes]) for k in range(count)})
+
+# ===== エンジン =====
+def test_engine():
+    print("\n=== フェードエンジン ===")
+
+    clock = FakeClock()
+    fade_controller.time = clock
+    fade_controller.init_fade_engine(4)
+    rgb = RecordingSink()
+    mono = RecordingSink()
+    rgb_id = fade_controller.register_fade_sink(rgb)
+    mono_id = fade_controller.register_fade_sink(mono)
+
+    fade_controller.start_fade(rgb_id, 0, (0, 0, 0), (100, 200, 50), 100)
+    fade_controller.start_fade(rgb_id, 1, (255, 255, 255), (0, 0, 0), 200)
+    fade_controller.start_fade(mono_id, 3, (0,), (1000,), 100)
+    clock.now = 1050
+    fade_controller.tick()
+    assert_equal((len(rgb.calls), len(mono.calls)), (1, 1), "1回の tick で出力先ごとに1回だけ呼び出し")
+    assert_equal(rgb.calls[0], {0: (50, 100, 25), 1: (191, 191, 191)}, "複数チャンネルを整数演算で補間")
+    assert_equal(mono.calls[0], {3: (500, 0, 0)}, "単一値のフェード")
+
+    fade_controller.start_fade(mono_id, 3, (500,), (0,), 100)
+    assert_equal(fade_controller.get_active_fade_count(), 3, "同じチャンネルのフェードは置き換え")
+
+    clock.now = 1100
+    fade_controller.tick()
+    assert_equal(rgb.calls[-1][0], (100, 200, 50), "終了時刻で終了値")
+    assert_equal(fade_controller.get_active_fade_count(), 2, "終了したフェードは削除")
+
+    fade_controller.start_fade(rgb_id, 5, (0, 0, 0), (1, 1, 1), 100)
+    fade_controller.start_fade(rgb_id, 6, (0, 0, 0), (1, 1, 1), 100)
+    result = quiet(fade_controller.start_fade, rgb_id, 7, (0, 0, 0), (9, 9, 9), 100)
+    assert_equal((result, rgb.calls[-1]), (False, {7: (9, 9, 9)}), "上限を超えた場合は終了値を即座に反映")
+
+    fade_controller.cancel_fade(rgb_id, 5)
+    assert_equal((fade_controller.is_fading(rgb_id, 5), fade_controller.is_fading(rgb_id, 6)), (False, True), "cancel_fade() は指定チャンネルのみ停止")
+
+    fade_controller.cancel_all_fades()
+    fade_controller.time = time
+    fade_controller.init_fade_engine()
+
+# ===== イージング =====
+def test_easing():
+    print("\n=== イージング ===")
+
+    one = fade_controller.EASING_ONE
+    sine = fade_controller.easing_id("sine")
+    table = fade_controller.get_easing_table(sine)
+    assert_equal((table.typecode, len(table), table[0], table[-1]), ('H', 65, 0, one), "array('H') の固定小数点テーブル（65点、両端は0と1）")
+    assert_equal(fade_controller.easing_id("sine"), sine, "同じカーブは同じID（テーブルは1つ）")
+
+    def at(easing, elapsed):
+        return fade_controller.eased_progress(easing, elapsed, 1000)
+
+    ease_in = fade_controller.easing_id("ease_in")
+    ease_out = fade_controller.easing_id("ease_out")
+    assert_equal((at(ease_in, 500) < one // 2 < at(ease_out, 500)), True, "ease_in は前半が遅く、ease_out は前半が速い")
+    errors = [abs(at(sine, t) - (1 - math.cos(math.pi * t / 1000)) / 2 * one) for t in range(0, 1001, 7)]
+    assert_equal(max(errors) < one * 0.002, True, f"整数演算の補間がカーブに一致（最大誤差 {max(errors) / one:.4%}）")
+    assert_equal([at(fade_controller.easing_id("exponential"), t) for t in (0, 1000)], [0, one], "exponential の両端")
+
+    custom = fade_controller.easing_id([0, 0.8, 1])
+    assert_equal(abs(at(custom, 500) - int(0.8 * one)) <= 1, True, "カスタムカーブ（等間隔の点列）")
+    assert_equal(quiet(fade_controller.easing_id, "bounce"), fade_controller.EASING_LINEAR, "未知の名前は線形")
+    assert_equal(quiet(fade_controller.easing_id, [0, 2]), fade_controller.EASING_LINEAR, "範囲外の点を含むカスタムカーブは線形")
+
+    # エンジン: イージング付きのフェード
+    clock = FakeClock()
+    fade_controller.time = clock
+    sink = RecordingSink()
+    sink_id = fade_controller.register_fade_sink(sink)
+    fade_controller.start_fade(sink_id, 0, (0,), (1000,), 100, ease_in)
+    fade_controller.start_fade(sink_id, 1, (0,), (1000,), 100)
+    clock.now = 1050
+    fade_controller.tick()
+    assert_equal((sink.calls[-1][0][0], sink.calls[-1][1][0]), (250, 500), "チャンネルごとに異なるイージング")
+    clock.now = 1100
+    fade_controller.tick()
+    assert_equal(sink.calls[-1][0][0], 1000, "イージング付きでも終了値に一致")
+    fade_controller.time = time
+
+# ===== PWM LED・NeoPixel の同時フェード =====
+def test_concurrent_fades():
+    print("\n=== PWM LED・NeoPixel の同時フェード ===")
+
+    quiet(pwm_led_controller.init_pwm_leds)
+    quiet(neopixel_controller.init_neopixels)
+
+    calls = []
+    pwm_sink = fade_controller._sinks[pwm_led_controller._FADE_SINK]
+    def counting_sink(channels, values, count):
+        calls.append(count)
+        pwm_sink(channels, values, count)
+    fade_controller._sinks[pwm_led_controller._FADE_SINK] = counting_sink
+
+    steps = [pwm_led_controller.fade_pwm_led_gen(i, 100, 100) for i in range(4)]
+    t0 = time.ticks_ms()
+    try:
+        quiet(step_scheduler.run_concurrently, steps)
+    finally:
+        fade_controller._sinks[pwm_led_controller._FADE_SINK] = pwm_sink
+    elapsed = time.ticks_diff(time.ticks_ms(), t0)
+
+    assert_equal([pwm_led_controller.get_brightness(i) for i in range(4)], [100] * 4, "4つのLEDが目標輝度に到達")
+    assert_equal(elapsed < 160, True, f"4つのLEDを同時にフェード（{elapsed}ms、直列なら400ms以上）")
+    assert_equal(max(calls) == 4 and len(calls) <= 13, True, f"tick ごとに全LEDをまとめて1回で反映（{len(calls)}回）")
+
+    # シナリオ: NeoPixel全体とPWM LEDを並列トラックで同時にクロスフェード
+    scenario = {"tracks": {
+        "rig": [{"type": "led", "command": "fade", "strip": "all", "color": [200, 100, 0], "duration": 100}],
+        "pwm": [{"led_fade_out": {"led_index": 0, "duration_ms": 100}}],
+    }}
+    t0 = time.ticks_ms()
+    quiet(effects.execute_command, scenario, [False])
+    elapsed = time.ticks_diff(time.ticks_ms(), t0)
+    colors = [neopixel_controller.get_global_led(i) for i in range(7)]
+    assert_equal((colors, pwm_led_controller.get_brightness(0)), ([(200, 100, 0)] * 7, 0), "led fade と led_fade_out が同時に完了")
+    assert_equal(elapsed < 160, True, f"同じ周期で同時に進行（{elapsed}ms）")
+
+    scenario = [{"type": "led", "command": "fade", "strip": "LV2", "start_color": [255, 0, 0], "end_color": [0, 0, 255], "duration": 50}]
+    quiet(effects.execute_command, scenario, [False])
+    colors = [neopixel_controller.get_global_led(i) for i in range(7)]
+    assert_equal(colors, [(200, 100, 0)] * 4 + [(0, 0, 255)] * 3, "start_color・end_color 指定のフェード（対象ストリップのみ）")
+
+# ===== 中断 =====
+def test_interrupted_fades():
+    print("\n=== 中断したフェードの後始末 ===")
+
+    quiet(pwm_led_controller.init_pwm_leds)
+    step = pwm_led_controller.fade_pwm_led_gen(0, 100, 1000)
+    next(step)
+    assert_equal(fade_controller.get_active_fade_count(), 1, "フェードをエンジンに登録")
+    step.close()
+    assert_equal(fade_controller.get_active_fade_count(), 0, "close() したステップのフェードを止める")
+
+    # 並列トラックの停止: スケジューラが残りのステップを close()
+    stop_flag = [False]
+    def stopper():
+        yield time.ticks_add(time.ticks_ms(), 30)
+        stop_flag[0] = True
+    steps = [pwm_led_controller.fade_pwm_led_gen(i, 0, 1000) for i in range(2)] + [stopper()]
+    quiet(step_scheduler.run_concurrently, steps, stop_flag)
+    brightness = pwm_led_controller.get_brightness(1)
+    assert_equal(fade_controller.get_active_fade_count(), 0, "停止したシナリオのフェードはエンジンに残らない")
+
+    # 次のシナリオのフェードの tick で、停止したフェードが動き出さない
+    quiet(step_scheduler.run_blocking, pwm_led_controller.fade_pwm_led_gen(2, 50, 50))
+    assert_equal(pwm_led_controller.get_brightness(1), brightness, "次のシナリオで停止したLEDは変化しない")
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("Fade Controller テストスイート")
+    print("=" * 60)
+
+    test_engine()
+    test_easing()
+    test_concurrent_fades()
+    test_interrupted_fades()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,202 @@
+"""
+Test suite for loop_controller.py の非同期モード
+
+スタブハードウェア（tests/micropython_stubs.py）上で、CPython の asyncio を使って実行する単体テスト
+実行方法: python tests/test_loop_async.py
+"""
+
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import config
+import effects
+import step_scheduler
+import loop_controller
+from machine import Pin
+from state_manager import StateManager
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+class FakeDisplay:
+    """DisplayManager の代わり（表示要求を記録）"""
+    def __init__(self):
+        self.messages = []
+
+    def push_message(self, lines):
+        self.messages.append(lines)
+
+class FakeVolumeController:
+    """PollingVolumeController の代わり（ポーリング回数を記録）"""
+    poll_interval_ms = 100
+
+    def __init__(self):
+        self.polls = 0
+
+    def poll(self, current_time):
+        self.polls += 1
+
+class FakeThreadSafeFlag(asyncio.Event):
+    """MicroPython の asyncio.ThreadSafeFlag 相当（wait() 後に自動でクリア）"""
+    async def wait(self):
+        await super().wait()
+        self.clear()
+
+def make_loop(use_irq):
+    """スタブのボタン・表示・ボリュームで StateManager と LoopController を作成"""
+    config.MAIN_LOOP_ASYNC = True
+    config.BUTTON_POLL_MS = 10
+    config.AUTOPLAY_CHECK_INTERVAL_MS = 500
+    config.IDLE_TIMEOUT_MS = 300000
+    config.GC_INTERVAL = 0
+    config.BUTTON_IRQ_MODE = True
+
+    if use_irq:
+        asyncio.ThreadSafeFlag = FakeThreadSafeFlag
+    elif hasattr(asyncio, 'ThreadSafeFlag'):
+        del asyncio.ThreadSafeFlag
+
+    scenarios = {
+        "1": [["mark", "1"], ["delay", 1000], ["mark", "1"]],
+        "2": [["mark", "2"], ["delay", 1000], ["mark", "2"]],
+    }
+    state = StateManager(FakeDisplay(), None, scenarios, ["1", "2"], ["1", "2"], config)
+    vc = FakeVolumeController()
+    button = Pin(15, Pin.IN, Pin.PULL_DOWN)
+    loop = loop_controller.LoopController(state, vc, button, True, 50, config=config)
+    return loop, state, vc, button
+
+def set_level(button, level):
+    """ピンのレベルを変え、割り込みハンドラーを呼ぶ（実機の両エッジ割り込み相当）"""
+    button.value(level)
+    if button.irq_handler:
+        button.irq_handler(button)
+
+async def click(button, hold_ms=30):
+    """ボタンを押して離す"""
+    set_level(button, 1)
+    await step_scheduler.sleep_ms_async(hold_ms)
+    set_level(button, 0)
+    return time.ticks_ms()
+
+# ===== ボタン・再生・ボリューム =====
+def test_event_loop():
+    print("\n=== 非同期メインループ ===")
+
+    loop, state, vc, button = make_loop(use_irq=True)
+    marks = []
+    effects.register_handler('mark', lambda cmd, sf: marks.append((time.ticks_ms(), threading.get_ident(), cmd[1])))
+
+    button_updates = []
+    original_handle = state.handle_button
+    state.handle_button = lambda b: (button_updates.append(time.ticks_ms()), original_handle(b))
+
+    result = {}
+
+    async def scenario_driver():
+        await step_scheduler.sleep_ms_async(300)
+        result['idle_updates'] = len(button_updates)
+
+        # 短押し → ランダム再生（コルーチンとして開始）
+        released = await click(button)
+        await step_scheduler.sleep_ms_async(50)
+        result['busy'] = state.playback_manager.is_busy()
+        result['start_latency'] = time.ticks_diff(marks[0][0], released) if marks else None
+
+        # 再生中の短押し → 別のシナリオに切り替え（BUTTON_SWITCH_ON_PRESS = True 相当）
+        state.button_handler.PRESS_SWITCHES = True
+        await step_scheduler.sleep_ms_async(100)
+        await click(button)
+        await step_scheduler.sleep_ms_async(100)
+
+        # 再生中の長めの押下（0.5秒以上）→ 停止（各シナリオの2回目の mark は実行されない）
+        await click(button, 600)
+        await step_scheduler.sleep_ms_async(300)
+        result['busy_after_stop'] = state.playback_manager.is_busy()
+        loop.stop()
+
+    async def main():
+        driver = asyncio.create_task(scenario_driver())
+        t0 = time.ticks_ms()
+        await loop.run_async()
+        result['elapsed'] = time.ticks_diff(time.ticks_ms(), t0)
+        await driver
+
+    asyncio.run(main())
+
+    assert_equal(result['idle_updates'] <= 2, True, f"待機中はボタン割り込みまで起床しない（{result['idle_updates']}回）")
+    assert_equal(result['busy'], True, "短押しで再生開始")
+    assert_equal(result['start_latency'] is not None and result['start_latency'] <= 20, True,
+                 f"ボタンを離してから再生開始まで20ms以内（{result['start_latency']}ms）")
+    assert_equal(marks[0][1], threading.get_ident(), "再生はスレッドではなくイベントループ上で実行")
+    assert_equal((len(marks), marks[0][2] != marks[-1][2]), (2, True), "再生中の短押しで別のシナリオに切り替え")
+    assert_equal(result['busy_after_stop'], False, "再生中の長めの押下で停止")
+    assert_equal(abs(vc.polls - result['elapsed'] // 100) <= 2, True, f"ボリュームは100ms周期（{vc.polls}回 / {result['elapsed']}ms）")
+    assert_equal(state.playback_manager.task_runner, None, "終了後はスレッド再生に戻す")
+
+    del effects._handlers['mark']
+
+# ===== 割り込みが使えない環境 =====
+def test_polling_fallback():
+    print("\n=== ThreadSafeFlag が無い環境（ポーリング） ===")
+
+    loop, state, vc, button = make_loop(use_irq=False)
+    calls = []
+    state.handle_button = lambda b: calls.append(time.ticks_ms())
+
+    async def main():
+        async def stopper():
+            await step_scheduler.sleep_ms_async(200)
+            loop.stop()
+        asyncio.create_task(stopper())
+        await loop.run_async()
+
+    asyncio.run(main())
+    assert_equal(10 <= len(calls) <= 21, True, f"BUTTON_POLL_MS間隔でポーリング（{len(calls)}回 / 200ms）")
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("Loop Controller (async) テストスイート")
+    print("=" * 60)
+
+    test_event_loop()
+    test_polling_fallback()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,129 @@
+"""
+Test suite for motion_profile.py
+
+ステッピングモーターの加減速プロファイル（ステップ間隔テーブル）とキャッシュの単体テスト
+実行方法: python tests/test_motion_profile.py
+"""
+
+import sys
+import contextlib
+import io
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import motion_profile as mp
+
+# motion_profile が参照している config（他のテストが config を差し替えていても同じものを設定する）
+config = mp.config
+config.STEPPER_START_SPEED = 200
+config.STEPPER_PROFILE_CACHE_SIZE = 3
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+def quiet(func, *args):
+    """ログ出力を抑えて実行"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+def intervals(profile):
+    return [profile.interval_us(i) for i in range(profile.steps)]
+
+def accelerations(profile):
+    """加速区間の各ステップでの加速度（steps/s²）"""
+    speeds = [1000000 / t for t in profile.ramp_us]
+    return [(speeds[k + 1] - speeds[k]) * 1000000 / profile.ramp_us[k] for k in range(len(speeds) - 1)]
+
+# ===== 台形・S字プロファイル =====
+def test_profiles():
+    print("\n=== 台形・S字プロファイル ===")
+
+    trap = mp.build_profile(200, 1000, 10000, 200, mp.PROFILE_TRAPEZOID)
+    table = intervals(trap)
+    assert_equal((trap.ramp_us.typecode, table[0], table[-1], min(table)), ('I', 5000, 5000, 1000),
+                 "整数のμs間隔（開始速度から加速し、定速区間は最高速度、開始速度まで減速）")
+    assert_equal(table, table[::-1], "加速と減速は対称")
+    acc = accelerations(trap)
+    assert_equal(all(8000 < a < 12000 for a in acc), True, f"台形: 加速度は一定（{min(acc):.0f}〜{max(acc):.0f} steps/s²）")
+
+    s_curve = mp.build_profile(200, 1000, 10000, 200, mp.PROFILE_S_CURVE)
+    acc = accelerations(s_curve)
+    assert_equal(max(acc) <= 10000 * 1.05 and acc[0] < acc[len(acc) // 2], True,
+                 f"S字: 加速度は0付近から最大 accel まで変化（{acc[0]:.0f} → 最大 {max(acc):.0f} steps/s²）")
+    assert_equal(s_curve.duration_us() > trap.duration_us(), True, "S字は同じ最大加速度の台形より時間がかかる")
+
+    short = mp.build_profile(7, 1000, 10000, 200)
+    assert_equal((len(short.ramp_us), intervals(short) == intervals(short)[::-1], min(intervals(short)) > 1000), (4, True, True),
+                 "短い移動は最高速度に届く前に減速（三角形）")
+    slow = mp.build_profile(10, 20000, 10000, 200)
+    assert_equal(intervals(slow), [20000] * 10, "開始速度以下の速度は加減速なし")
+
+    faster = mp.build_profile(200, 500, 10000, 200)
+    assert_equal(faster.duration_us() < trap.duration_us(), True,
+                 f"最高速度を上げると短時間（{trap.duration_us() // 1000}ms → {faster.duration_us() // 1000}ms）")
+
+# ===== LRUキャッシュ =====
+def test_cache():
+    print("\n=== LRUキャッシュ ===")
+
+    mp.clear_cache()
+    first = mp.get_profile(40, 2000, 10000, mp.PROFILE_TRAPEZOID)
+    assert_equal(mp.get_profile(40, 2000, 10000, mp.PROFILE_TRAPEZOID) is first, True, "同じ移動はテーブルを再利用")
+    assert_equal(mp.get_profile(40, 2000, 5000, mp.PROFILE_TRAPEZOID) is first, False, "加速度が異なれば別のテーブル")
+    assert_equal((mp.cache_hits, mp.cache_misses), (1, 2), "ヒット・ミスを集計")
+
+    mp.get_profile(80, 2000, 10000, mp.PROFILE_TRAPEZOID)
+    mp.get_profile(40, 2000, 10000, mp.PROFILE_TRAPEZOID)  # first を最近使ったものにする
+    mp.get_profile(120, 2000, 10000, mp.PROFILE_TRAPEZOID)  # 4つ目 → 最も古いものを破棄
+    assert_equal(len(mp._cache), 3, "STEPPER_PROFILE_CACHE_SIZE 件まで保持")
+    assert_equal(mp.get_profile(40, 2000, 10000, mp.PROFILE_TRAPEZOID) is first, True, "最近使ったテーブルは残る")
+    misses = mp.cache_misses
+    mp.get_profile(40, 2000, 5000, mp.PROFILE_TRAPEZOID)
+    assert_equal(mp.cache_misses, misses + 1, "最も長く使われていないテーブルを破棄")
+
+    profile = quiet(mp.get_profile, 40, 2000, 10000, 'bounce')
+    assert_equal(intervals(profile), intervals(first), "未知のプロファイル名は台形")
+    mp.clear_cache()
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("Motion Profile テストスイート")
+    print("=" * 60)
+
+    test_profiles()
+    test_cache()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,185 @@
+"""
+Test suite for neopixel_controller.py
+
+スタブハードウェア（tests/micropython_stubs.py）上で実行する単体テスト
+実行方法: python tests/test_neopixel_controller.py
+"""
+
+import sys
+import contextlib
+import io
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import config
+import neopixel_controller as npc
+
+# テスト用のストリップ構成（LV1: 4個, LV2: 3個, LV3: 0個 = 無効）
+config.NEOPIXEL_STRIPS = {
+    'LV1': {'pin': 20, 'count': 4},
+    'LV2': {'pin': 21, 'count': 3},
+    'LV3': {'pin': 22, 'count': 0},
+}
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+def quiet(func, *args):
+    """ログ出力を抑えて実行"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+def write_counts():
+    return [npc.neopixels[name].write_count for name in ('LV1', 'LV2')]
+
+def colors():
+    return [npc.get_global_led(i) for i in range(npc.get_total_led_count())]
+
+# ===== フレームバッファ =====
+def test_framebuffer():
+    print("\n=== フレームバッファ ===")
+
+    quiet(npc.init_neopixels)
+    assert_equal(len(npc.framebuffer), 7 * 3, "全ストリップ分のフレームバッファ（GRB 3バイト × 7）")
+
+    lv1 = npc.neopixels['LV1']
+    assert_equal(lv1.buf is npc.strip_views['LV1'], True, "NeoPixel.buf はフレームバッファの memoryview（コピーなし）")
+
+    npc.set_global_led(5, 10, 20, 30)
+    assert_equal(bytes(npc.framebuffer[15:18]), bytes([20, 10, 30]), "GRB順で格納")
+    assert_equal(npc.neopixels['LV2'][1], (10, 20, 30), "ストリップ側からも同じ色が見える")
+    assert_equal(npc.get_global_led(5), (10, 20, 30), "get_global_led() で現在の色を取得")
+
+# ===== ストリップ表 =====
+def test_strip_table():
+    print("\n=== ストリップ表 ===")
+
+    quiet(npc.init_neopixels)
+    assert_equal({name: entry[:2] for name, entry in npc.strip_table.items()}, {'LV1': (0, 4), 'LV2': (4, 3)},
+                 "名前 → (開始位置, LED数)（LED数0のストリップは除外）")
+    assert_equal(npc.get_global_indices_for_strip('LV2'), range(4, 7), "ストリップのインデックスは range で返す")
+    assert_equal(quiet(npc.get_global_indices_for_strip, 'LV3'), range(0), "利用不可のストリップは空")
+
+    config.NEOPIXEL_STRIPS['LV9'] = {'pin': 23, 'count': 2}
+    try:
+        assert_equal(npc.get_global_indices_for_strip('LV2'), range(4, 7), "初期化後は config を参照しない")
+    finally:
+        del config.NEOPIXEL_STRIPS['LV9']
+
+    quiet(npc.set_global_leds_by_indices, range(3, 5), 4, 5, 6)
+    assert_equal(colors()[2:6], [(0, 0, 0), (4, 5, 6), (4, 5, 6), (0, 0, 0)], "range 指定での設定（ストリップをまたぐ）")
+
+# ===== 塗りつぶし =====
+def test_fill():
+    print("\n=== 塗りつぶし ===")
+
+    quiet(npc.init_neopixels)
+    before = write_counts()
+    quiet(npc.set_global_leds_by_indices, "all", 1, 2, 3)
+    assert_equal(colors(), [(1, 2, 3)] * 7, "all: 全LEDを塗りつぶし")
+    assert_equal([a - b for a, b in zip(write_counts(), before)], [1, 1], "all: 各ストリップを1回ずつ書き込み")
+
+    before = write_counts()
+    quiet(npc.set_global_leds_by_indices, "LV2", 255, 0, 0)
+    assert_equal(colors(), [(1, 2, 3)] * 4 + [(255, 0, 0)] * 3, "ストリップ名: 該当部分のみ")
+    assert_equal([a - b for a, b in zip(write_counts(), before)], [0, 1], "ストリップ名: 該当ストリップのみ書き込み")
+
+    quiet(npc.set_global_leds_by_indices, [2, 3, 4], 0, 9, 0)
+    quiet(npc.set_global_leds_by_indices, [0, 6], 7, 7, 7)
+    assert_equal(colors(), [(7, 7, 7), (1, 2, 3), (0, 9, 0), (0, 9, 0), (0, 9, 0), (255, 0, 0), (7, 7, 7)],
+                 "インデックス指定（連続・非連続、ストリップをまたぐ範囲）")
+
+    quiet(npc.execute_color_command, 'LV1', "ALL", 50, 50, 50, 0, [False])
+    assert_equal(colors()[:4], [(7, 7, 7), (1, 2, 3), (0, 9, 0), (0, 9, 0)], "execute_color_command: 点灯後に元の色へ復元")
+
+    quiet(npc.pattern_off, [False])
+    assert_equal(colors(), [(0, 0, 0)] * 7, "pattern_off: 全消灯")
+
+# ===== フェード =====
+def test_fade():
+    print("\n=== フェード ===")
+
+    quiet(npc.init_neopixels)
+    quiet(npc.fade_global_leds, [4, 5, 6], (0, 0, 0), (100, 200, 50), 50, [False])
+    assert_equal(colors()[4:], [(100, 200, 50)] * 3, "フェード終了時に終了色")
+    assert_equal(colors()[:4], [(0, 0, 0)] * 4, "対象外のLEDは変化しない")
+    assert_equal(npc.neopixels['LV1'].write_count, 0, "対象外のストリップは書き込まない")
+
+# ===== 変化したストリップのみ送信 =====
+def test_dirty_flush():
+    print("\n=== 変化したストリップのみ送信 ===")
+
+    quiet(npc.init_neopixels)
+    quiet(npc.set_global_leds_by_indices, "all", 1, 2, 3)
+    before = write_counts()
+    quiet(npc.set_global_leds_by_indices, "all", 1, 2, 3)
+    quiet(npc.set_global_leds_by_indices, "LV2", 1, 2, 3)
+    quiet(npc.set_global_leds_by_indices, [0, 2, 5], 1, 2, 3)
+    quiet(npc.set_global_leds_by_indices, range(3, 6), 1, 2, 3)
+    assert_equal([a - b for a, b in zip(write_counts(), before)], [0, 0], "同じ色での再設定（全体・ストリップ・インデックス）は送信しない")
+
+    quiet(npc.set_global_leds_by_indices, [5], 9, 9, 9)
+    assert_equal([a - b for a, b in zip(write_counts(), before)], [0, 1], "1LEDの変化はそのストリップのみ送信")
+    quiet(npc.set_global_leds_by_indices, "LV2", 1, 2, 3)
+    assert_equal([a - b for a, b in zip(write_counts(), before)], [0, 2], "部分的な変更の後の同色塗りつぶしは送信する")
+
+    npc.set_global_led(1, 4, 4, 4)
+    npc.set_global_led(1, 1, 2, 3)
+    npc.reset_frame_stats()
+    assert_equal(npc.flush(), 1, "flush() は未送信のストリップのみ送信（元に戻した変更も送信対象）")
+    assert_equal(npc.get_frame_stats(), {'written': 1, 'skipped': 1}, "送信・省略したストリップ数を集計")
+
+    # 変化の小さい長いフェード: 色が変わらないステップは送信しない
+    quiet(npc.pattern_off, [False])
+    before = write_counts()
+    npc.reset_frame_stats()
+    quiet(npc.fade_global_leds, [4, 5, 6], (0, 0, 0), (2, 0, 0), 100, [False])
+    stats = npc.get_frame_stats()
+    assert_equal(write_counts()[1] - before[1], 2, "フェード: 色が変わったステップのみ送信")
+    assert_equal(stats['written'] == 2 and stats['skipped'] >= 5, True, f"フェード中の省略を集計（{stats}）")
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("NeoPixel Controller テストスイート")
+    print("=" * 60)
+
+    test_framebuffer()
+    test_strip_table()
+    test_fill()
+    test_fade()
+    test_dirty_flush()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,235 @@
+"""
+Test suite for oled_patterns.py のフレーム差分送信
+
+スタブの SSD1306 ドライバ（送信したコマンド・データを記録）上で実行する単体テスト
+実行方法: python tests/test_oled_patterns.py
+"""
+
+import sys
+import contextlib
+import io
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import oled_patterns
+from display_manager import DisplayManager
+
+# oled_patterns が参照している config（他のテストが config を差し替えていても同じものを設定する）
+config = oled_patterns.config
+config.I2C_ID = 0
+config.OLED_SCL_PIN = 17
+config.OLED_SDA_PIN = 16
+config.I2C_FREQ = 400000
+config.OLED_WIDTH = 128
+config.OLED_HEIGHT = 64
+config.OLED_LINE_HEIGHT = 10
+config.OLED_MAX_LINES = 4
+config.OLED_I2C_RETRY_COUNT = 1
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+def quiet(func, *args):
+    """ログ出力を抑えて実行"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+def init():
+    quiet(oled_patterns.init_oled)
+    oled_patterns.reset_frame_stats()
+    oled = oled_patterns.oled
+    oled.commands.clear()
+    oled.data.clear()
+    return oled
+
+def render(lines):
+    """同じ内容を全体描画したフレームバッファ（比較用）"""
+    oled = micropython_stubs.SSD1306_I2C(128, 64, None)
+    for i, line in enumerate(lines):
+        oled.text(line, 0, i * 10)
+    return bytes(oled.buffer)
+
+class FailingWrite:
+    """write_data で I2C タイムアウトを1回発生させる"""
+    def __init__(self, oled):
+        self.oled = oled
+        self.original = oled.write_data
+        oled.write_data = self
+
+    def __call__(self, buf):
+        self.oled.write_data = self.original
+        raise OSError(110, '[Errno 110] ETIMEDOUT')
+
+# ===== 差分送信 =====
+def test_partial_update():
+    print("\n=== 差分送信 ===")
+
+    oled = init()
+    quiet(oled_patterns.push_message, ["Scenario 1", "Playing", "", "Vol 20"])
+    assert_equal(oled_patterns.get_frame_stats()['partial'], 1, "初期表示からの変化は部分送信")
+    assert_equal(bytes(oled_patterns._shadow), bytes(oled.buffer), "送信後の写しはフレームバッファと一致")
+
+    oled.commands.clear()
+    oled.data.clear()
+    quiet(oled_patterns.push_message, ["Scenario 1", "Playing", "", "Vol 21"])
+    # 4行目（y=30〜37）はページ3・4にまたがる。"Vol 2" までは同じなので最後の文字の列（40〜47）だけが変化
+    pages = [oled.commands[i + 4] for i in range(0, len(oled.commands), 6)]
+    columns = [(oled.commands[i + 1], oled.commands[i + 2]) for i in range(0, len(oled.commands), 6)]
+    assert_equal(pages, [3, 4], "変化したページのみページ範囲を設定")
+    assert_equal(all(40 <= x0 <= x1 <= 47 for x0, x1 in columns), True, f"変化した列の範囲を設定（{columns}）")
+    assert_equal(sum(len(d) for d in oled.data) <= 16, True, "変化した列のみ送信（1024バイトではなく16バイト以下）")
+    assert_equal(bytes(oled.buffer), render(["Scenario 1", "Playing", "", "Vol 21"]), "全体描画と同じ表示内容")
+    assert_equal(bytes(oled_patterns._shadow), bytes(oled.buffer), "写しを送信した内容で更新")
+
+    oled.commands.clear()
+    oled.data.clear()
+    quiet(oled_patterns.push_message, ["Scenario 1", "Playing", "", "Vol 21"])
+    assert_equal((oled.commands, oled.data), ([], []), "同じ内容の表示は送信しない")
+    assert_equal(oled_patterns.get_frame_stats(), {'full': 0, 'partial': 2, 'skipped': 1, 'bytes': oled_patterns.get_frame_stats()['bytes']},
+                 "部分送信・省略の回数を集計")
+
+    quiet(oled_patterns.clear_screen)
+    assert_equal(bytes(oled.buffer), bytes(1024), "クリアも差分送信")
+
+# ===== 再初期化 =====
+def test_reinit():
+    print("\n=== I2Cエラー後の再初期化 ===")
+
+    oled = init()
+    quiet(oled_patterns.push_message, ["A", "B"])
+    oled = oled_patterns.oled
+    FailingWrite(oled)
+    quiet(oled_patterns.push_message, ["A", "C"])
+    oled = oled_patterns.oled
+    stats = oled_patterns.get_frame_stats()
+    assert_equal((oled.data[0], oled_patterns.is_oled_available()), (bytes(render(["OLED Initialized"])), True),
+                 "再初期化で全体を送信（写しも初期化）")
+    assert_equal(stats['partial'], 2, "再初期化後の再送信は差分のみ")
+    assert_equal(bytes(oled.buffer), render(["A", "C"]), "再初期化後に描画し直して表示")
+    assert_equal(bytes(oled_patterns._shadow), bytes(oled.buffer), "全体送信で写しを更新")
+
+    # 部分更新に対応していないドライバは常に show()
+    oled_patterns._shadow = None
+    shows = len(oled.data)
+    quiet(oled_patterns.push_message, ["A", "D"])
+    assert_equal((len(oled.data) - shows, len(oled.data[-1])), (1, 1024), "写しがない場合は show() で全体を送信")
+    quiet(oled_patterns.init_oled)
+
+# ===== DisplayManager =====
+class FlakyOled:
+    """oled_patterns の代わり（broken の間は I2C エラー、表示した内容を記録）"""
+    def __init__(self):
+        self.shown = []
+        self.inits = 0
+        self.broken = False
+
+    def show_message(self, msgs):
+        if self.broken:
+            raise OSError(110, '[Errno 110] ETIMEDOUT')
+        self.shown.append(list(msgs))
+        return True
+
+    def init_oled(self):
+        self.inits += 1
+
+    def is_oled_available(self):
+        return True
+
+def test_display_manager():
+    print("\n=== DisplayManager（表示待ちのメッセージ） ===")
+
+    oled = init()
+    display = DisplayManager(oled_patterns, config)
+    t = display._next_frame
+    display.push_message("Loading")
+    display.push_message(["Scenario", "1"])
+    display.push_message(["Scenario", "2"])
+    assert_equal((oled.data, display.pending()), ([], True), "push_message() は I2C に送信せずに戻る")
+    assert_equal(display.service(t), True, "service() で表示")
+    assert_equal((bytes(oled.buffer), display.get_stats()['replaced']), (render(["Scenario", "2"]), 2),
+                 "表示前に届いたメッセージは最新のものだけを表示")
+
+    display.push_message(["Scenario", "3"])
+    assert_equal(display.service(t + 10), False, "DISPLAY_FRAME_INTERVAL_MS 以内は表示しない")
+    assert_equal((display.service(t + 50), bytes(oled.buffer)), (True, render(["Scenario", "3"])), "フレーム間隔の経過後に表示")
+    display.push_message(["Scenario", "3"])
+    assert_equal(display.pending(), False, "表示中と同じ内容は無視")
+
+    # I2C エラー: 呼び出し元を待たせず、バックオフ後に再初期化して再試行
+    FailingWrite(oled)
+    display.push_message(["Stopped"])
+    quiet(display.service, t + 100)
+    assert_equal((display.pending(), display.get_stats()['backoff_ms']), (True, 100), "失敗したメッセージは DISPLAY_RETRY_MS 後に再試行")
+    assert_equal(display.service(t + 150), False, "バックオフ中は再試行しない")
+    quiet(display.service, t + 200)
+    assert_equal((bytes(oled_patterns.oled.buffer), display.get_stats()['retries'], display.get_stats()['backoff_ms']),
+                 (render(["Stopped"]), 1, 0), "再初期化して表示（回復後はバックオフを解除）")
+
+    # 失敗が続く場合はバックオフを2倍ずつ延ばし、新しいメッセージで置き換える
+    flaky = FlakyOled()
+    flaky.broken = True
+    display = DisplayManager(flaky, config)
+    t = display._next_frame
+    display.push_message(["Error"])
+    backoffs = []
+    for _ in range(8):
+        quiet(display.service, t)
+        backoffs.append(display.get_stats()['backoff_ms'])
+        t += backoffs[-1]
+    assert_equal(backoffs, [100, 200, 400, 800, 1600, 3200, 5000, 5000], "バックオフは2倍ずつ DISPLAY_RETRY_MAX_MS まで")
+    display.push_message(["Ready"])
+    flaky.broken = False
+    quiet(display.service, t)
+    assert_equal((flaky.shown, flaky.inits), ([["Ready"]], 8), "再試行の前に再初期化し、最新のメッセージを表示")
+
+    lines = ["Ready", "Vol 10"]
+    display.push_message(lines)
+    display.service(t + 50)
+    lines[1] = "Vol 11"
+    display.push_message(lines)
+    display.service(t + 100)
+    assert_equal(flaky.shown[-1], ["Ready", "Vol 11"], "同じリストを書き換えて渡しても変化を検出")
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("OLED Patterns テストスイート")
+    print("=" * 60)
+
+    test_partial_update()
+    test_reinit()
+    test_display_manager()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,386 @@
+"""
+Test suite for playback_worker.py と PlaybackManager のワーカー再生
+
+常駐ワーカースレッドでのシナリオ再生（受付箱・終了通知・連続再生・プレイリスト）の単体テスト
+実行方法: python tests/test_playback_worker.py
+"""
+
+import sys
+import time
+import asyncio
+import threading
+import _thread
+import contextlib
+import io
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import effects
+import playback_worker
+from playback_manager import PlaybackManager
+from autoplay_controller import AutoPlayController
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+def quiet(func, *args):
+    """ログ出力を抑えて実行"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+class CountingThread:
+    """_thread の代わり（start_new_thread の呼び出し回数を記録）"""
+    def __init__(self):
+        self.starts = 0
+
+    def start_new_thread(self, func, args):
+        self.starts += 1
+        return _thread.start_new_thread(func, args)
+
+    def allocate_lock(self):
+        return _thread.allocate_lock()
+
+class FakeDisplay:
+    """DisplayManager の代わり（表示要求を記録）"""
+    def __init__(self):
+        self.messages = []
+
+    def push_message(self, lines):
+        self.messages.append(lines)
+
+def wait_until(cond, timeout_ms=3000, poll=None):
+    """cond() が真になるまで待機（poll があればメインループ相当として呼ぶ）"""
+    deadline = time.ticks_add(time.ticks_ms(), timeout_ms)
+    while time.ticks_diff(deadline, time.ticks_ms()) > 0:
+        if poll:
+            poll()
+        if cond():
+            return True
+        time.sleep_ms(2)
+    return False
+
+# ===== ワーカー =====
+def test_worker():
+    print("\n=== 常駐ワーカー ===")
+
+    counting = CountingThread()
+    playback_worker._thread = counting
+    try:
+        worker = playback_worker.PlaybackWorker(poll_ms=2)
+        gate = _thread.allocate_lock()
+        gate.acquire()
+        ran = []
+
+        first = worker.submit(lambda: (gate.acquire(), ran.append(('first', threading.get_ident()))))
+        assert_equal(wait_until(lambda: worker.current == first), True, "要求をワーカースレッドで実行")
+        second = worker.submit(lambda: ran.append(('second', threading.get_ident())))
+        third = worker.submit(lambda: ran.append(('third', threading.get_ident())))
+        assert_equal((worker.current, worker.replaced), (first, 1), "実行中に届いた要求は受付箱で待機（新しい要求で置き換え）")
+        assert_equal(worker.poll(), [second], "置き換えた要求は実行せずに終了扱い")
+        assert_equal(worker.withdraw(first), False, "実行中の要求は取り下げられない")
+        fourth = worker.submit(lambda: ran.append(('fourth', threading.get_ident())))
+        assert_equal((worker.withdraw(fourth), worker.poll(), worker.withdraw(second)), (True, [third, fourth], True),
+                     "待機中の要求を取り下げ（終了扱い）、終了済みの要求は解放済み")
+        third = worker.submit(lambda: ran.append(('third', threading.get_ident())))
+
+        gate.release()
+        assert_equal(wait_until(worker.is_idle), True, "実行中の要求の終了後に待機中の要求を実行")
+        assert_equal([name for name, ident in ran], ['first', 'third'], "受け付けた順に実行")
+        assert_equal((len({ident for name, ident in ran}), ran[0][1] != threading.get_ident()), (1, True),
+                     "同じワーカースレッドで実行")
+        assert_equal((worker.poll(), worker.poll()), ([first, third], []), "終了通知は1回だけ受け取る")
+
+        quiet(worker.submit, lambda: 1 / 0)
+        assert_equal(quiet(wait_until, lambda: worker.errors == 1 and worker.is_idle()), True, "要求の例外でワーカーは止まらない")
+        assert_equal(counting.starts, 1, "スレッドの起動は最初の1回のみ")
+    finally:
+        playback_worker._thread = _thread
+
+# ===== PlaybackManager =====
+def test_playback_manager():
+    print("\n=== PlaybackManager のワーカー再生 ===")
+
+    marks = []
+    effects.register_handler('mark', lambda cmd, sf: marks.append((cmd[1], threading.get_ident())))
+    scenarios = {
+        "1": [["mark", "1"], ["delay", 200], ["mark", "1 end"]],
+        "2": [["mark", "2"]],
+    }
+    pm = PlaybackManager(scenarios)
+    pm.gc_on_complete = False
+    completed = []
+    pm.set_complete_callback(lambda: completed.append(pm.current_play_scenario))
+    dm = FakeDisplay()
+
+    quiet(pm.start_scenario, "1", dm)
+    assert_equal(wait_until(lambda: marks), True, "シナリオをワーカースレッドで開始")
+    assert_equal(pm.worker is playback_worker.get_worker(), True, "共有のワーカーを使用")
+
+    # 再生中に停止してすぐ次のシナリオ（自動再生の連続など）
+    first_flag = pm.stop_flag
+    quiet(pm.stop_playback, dm)
+    quiet(pm.start_scenario, "2", dm)
+    assert_equal((pm.stop_flag is first_flag, pm.stop_flag[0]), (False, False), "次のシナリオは別の停止フラグ（停止したシナリオのフラグを戻さない）")
+    assert_equal(quiet(wait_until, lambda: not pm.is_busy(), 3000, pm.poll), True, "前のシナリオの停止後に次のシナリオを再生して終了")
+    assert_equal([name for name, ident in marks], ["1", "2"], "停止したシナリオは続きを実行しない")
+    assert_equal(len({ident for name, ident in marks}), 1, "スレッドを作り直さない")
+    assert_equal((completed, dm.messages), ([None, None], [["Stopped"]]),
+                 "停止と終了でそれぞれ1回だけ完了処理（停止したジョブの終了通知は無視、エラー表示なし）")
+
+    quiet(pm.start_scenario, "missing", dm)
+    quiet(wait_until, lambda: not pm.is_busy(), 3000, pm.poll)
+    assert_equal(dm.messages[-1], ["Invalid", "Scenario"], "存在しないシナリオはエラー表示して終了")
+
+# ===== シナリオの切り替え =====
+def test_preempt():
+    print("\n=== シナリオの切り替え ===")
+
+    marks = []
+    cleanups = []
+    effects.register_handler('mark', lambda cmd, sf: marks.append(cmd[1]))
+    quiet(effects.cleanup_peripherals)  # 標準の後始末を登録
+    effects.register_cleanup('test', lambda: cleanups.append(list(marks)))
+    scenarios = {
+        "1": [["mark", "1"], ["delay", 2000], ["mark", "1 end"]],
+        "2": [["mark", "2"], ["delay", 100], ["mark", "2 end"]],
+    }
+    pm = PlaybackManager(scenarios)
+    pm.gc_on_complete = False
+    completed = []
+    pm.set_complete_callback(lambda: completed.append(len(marks)))
+    dm = FakeDisplay()
+
+    quiet(pm.start_scenario, "1", dm)
+    wait_until(lambda: marks)
+    quiet(pm.start_scenario, "2", dm)
+    wait_until(lambda: "2" in marks)
+    stats = pm.get_switch_stats()
+    assert_equal((stats['switches'], stats['timeouts']), (1, 0), "再生中の開始要求で現在のシナリオを中断（時間内に終了を確認）")
+    assert_equal(stats['last_ms'] < 100, True, f"切り替え時間は100ms未満（{stats['last_ms']}ms）")
+    assert_equal(cleanups, [["1"]], "中断したシナリオの終了後、次のシナリオの開始前に後始末")
+    assert_equal(quiet(wait_until, lambda: not pm.is_busy(), 3000, pm.poll), True, "次のシナリオを再生して終了")
+    assert_equal((marks, completed), (["1", "2", "2 end"], [3]), "中断したシナリオの完了処理は行わない")
+
+    # wait_ms の待機中に切り替え（wait_ms が停止フラグを戻して中断したシナリオが続くことはない）
+    marks.clear()
+    cleanups.clear()
+    completed.clear()
+    scenarios["4"] = [["mark", "4"], {"wait_ms": 1000}, ["mark", "4 end"]]
+    quiet(pm.start_scenario, "4", dm)
+    wait_until(lambda: marks)
+    quiet(pm.start_scenario, "2", dm)
+    assert_equal((pm.get_switch_stats()['timeouts'], cleanups), (0, [["4"]]), "wait_ms の待機中でも時間内に終了を確認")
+    quiet(wait_until, lambda: not pm.is_busy(), 3000, pm.poll)
+    assert_equal(marks, ["4", "2", "2 end"], "中断したシナリオは wait_ms の後を実行しない")
+
+
+    # 停止も切り替えと同様に終了を確認し、後始末してから完了処理
+    marks.clear()
+    cleanups.clear()
+    completed.clear()
+    quiet(pm.start_scenario, "1", dm)
+    wait_until(lambda: marks)
+    quiet(pm.stop_playback, dm)
+    assert_equal((pm.worker.current, cleanups, completed), (None, [["1"]], [1]), "停止はシナリオの終了を確認して後始末してから完了処理")
+    assert_equal(pm.get_switch_stats()['timeouts'], 0, "停止も時間内に終了を確認")
+
+    pm.preempt = False
+    quiet(pm.start_scenario, "1", dm)
+    quiet(pm.start_scenario, "2", dm)
+    assert_equal((pm.current_play_scenario, pm.get_switch_stats()['switches']), ("1", 2), "PLAYBACK_PREEMPT = False では再生中の要求を無視")
+    quiet(pm.stop_playback, dm)
+    quiet(wait_until, lambda: pm.worker.is_idle(), 3000, pm.poll)
+
+    # 非同期モード: タスクをキャンセルして切り替え
+    marks.clear()
+    cleanups.clear()
+    completed.clear()
+    pm.preempt = True
+
+    async def run():
+        pm.set_task_runner(asyncio.create_task)
+        quiet(pm.start_scenario, "1", dm)
+        await asyncio.sleep(0.05)
+        quiet(pm.start_scenario, "2", dm)
+        for _ in range(100):
+            if not pm.is_busy():
+                break
+            await asyncio.sleep(0.01)
+        pm.set_task_runner(None)
+
+    quiet(asyncio.run, run())
+    assert_equal((marks, completed, cleanups), (["1", "2", "2 end"], [3], [["1"]]),
+                 "非同期モードもタスクをキャンセルし、後始末をして切り替え")
+    assert_equal(pm.get_switch_stats()['switches'], 3, "切り替え回数を集計")
+
+    # 非同期モード: 中断したタスクの finally（モーター通電解除）の後に後始末して次のシナリオを開始
+    order = []
+    release_motor = effects._release_motor
+    effects._release_motor = lambda: order.append("release")
+    effects.register_cleanup('test', lambda: order.append("cleanup"))
+    effects.register_handler('mark', lambda cmd, sf: order.append(cmd[1]))
+    scenarios["3"] = [["mark", "3"], ["delay", 2000], {"type": "motor", "command": "step", "steps": 10, "speed": 3}]
+
+    async def run_motor():
+        pm.set_task_runner(asyncio.create_task)
+        quiet(pm.start_scenario, "3", dm)
+        await asyncio.sleep(0.05)
+        quiet(pm.start_scenario, "2", dm)
+        for _ in range(100):
+            if not pm.is_busy():
+                break
+            await asyncio.sleep(0.01)
+        quiet(pm.start_scenario, "3", dm)
+        await asyncio.sleep(0.05)
+        quiet(pm.stop_playback, dm)
+        await asyncio.sleep(0.05)
+        pm.set_task_runner(None)
+
+    try:
+        quiet(asyncio.run, run_motor())
+    finally:
+        effects._release_motor = release_motor
+    stats = pm.get_switch_stats()
+    assert_equal(order, ["3", "release", "cleanup", "2", "2 end", "3", "release", "cleanup"],
+                 "中断したタスクの終了を待って後始末し、次のシナリオを開始（停止も同様）")
+    assert_equal((stats['switches'], stats['timeouts'], stats['last_ms'] < 100), (4, 0, True),
+                 f"非同期モードの切り替え時間も後始末の完了までを計測（{stats['last_ms']}ms）")
+
+    # 停止フラグを確認しないコマンドの実行中に切り替え: 時間内に終了しない
+    marks.clear()
+    cleanups.clear()
+    effects.register_handler('mark', lambda cmd, sf: marks.append(cmd[1]))
+    effects.register_cleanup('test', lambda: cleanups.append(list(marks)))
+    effects.register_handler('busy', lambda cmd, sf: time.sleep_ms(300))
+    scenarios["5"] = [["mark", "5"], ["busy"], ["mark", "5 end"]]
+    quiet(pm.start_scenario, "5", dm)
+    wait_until(lambda: marks)
+    switch_start = time.ticks_ms()
+    quiet(pm.start_scenario, "2", dm)
+    assert_equal((pm.get_switch_stats()['timeouts'], cleanups), (1, []),
+                 "時間内に終了しない場合、実行中のシナリオと並行して後始末しない")
+    quiet(wait_until, lambda: not pm.is_busy(), 3000, pm.poll)
+    stats = pm.get_switch_stats()
+    assert_equal((marks, cleanups), (["5", "2", "2 end"], [["5"]]), "後始末は中断したシナリオの終了後、次のシナリオの開始前にワーカー上で実行")
+    assert_equal(stats['last_ms'] >= 200 and stats['last_ms'] <= time.ticks_diff(time.ticks_ms(), switch_start), True,
+                 f"切り替え時間はワーカーが次のシナリオを開始した時点で記録（{stats['last_ms']}ms）")
+
+    # 停止の場合も、後始末はシナリオの終了後にワーカー上で実行
+    marks.clear()
+    cleanups.clear()
+    completed.clear()
+    quiet(pm.start_scenario, "5", dm)
+    wait_until(lambda: marks)
+    quiet(pm.stop_playback, dm)
+    assert_equal((cleanups, completed, pm.is_playing), ([], [1], False), "停止はすぐに完了し、後始末は保留")
+    assert_equal(quiet(wait_until, lambda: cleanups and pm.worker.is_idle(), 3000, pm.poll), True, "シナリオの終了後に後始末")
+    assert_equal((marks, cleanups), (["5"], [["5"]]), "停止したシナリオの続きは実行せず、後始末は1回だけ")
+    del effects._handlers['busy']
+    del effects._cleanups['test']
+
+# ===== プレイリスト =====
+class Settings:
+    """PlaybackManager / AutoPlayController に渡す設定"""
+    PLAYLIST_SIZE = 3
+    PLAYLIST_GAP_MS = 0
+    WORKSHOP_MODE = True
+    WORKSHOP_MODE_INTERVAL_SECONDS = 3
+
+def test_playlist():
+    print("\n=== プレイリスト ===")
+
+    marks = []
+    effects.register_handler('mark', lambda cmd, sf: marks.append((cmd[1], time.ticks_ms())))
+    scenarios = {
+        "1": [["mark", "1"], ["delay", 100], ["mark", "1 end"]],
+        "2": [["mark", "2"], ["delay", 50], ["mark", "2 end"]],
+        "3": [["mark", "3"], ["mark", "3 end"]],
+    }
+    pm = PlaybackManager(scenarios, Settings)
+    pm.gc_on_complete = False
+    completed = []
+    pm.set_complete_callback(lambda: completed.append([name for name, t in marks]))
+    dm = FakeDisplay()
+
+    assert_equal([pm.enqueue(num, dm) for num in ("1", "2", "3")], [True, True, True], "PLAYLIST_SIZE まで追加")
+    assert_equal((quiet(pm.enqueue, "1", dm), pm.playlist), (False, ["1", "2", "3"]), "一杯のプレイリストには追加しない")
+    assert_equal(pm.is_busy(), True, "待機中のシナリオがあれば is_busy()")
+
+    assert_equal(quiet(wait_until, lambda: not pm.is_busy(), 3000, pm.poll), True, "プレイリストを最後まで再生")
+    assert_equal(completed, [["1", "1 end", "2", "2 end", "3", "3 end"]], "順に連続再生し、完了コールバックは最後に1回だけ")
+    assert_equal(pm.prefetch_hits, 2, "再生中に次のシナリオを先読みして使用")
+
+    # シナリオ間の間隔
+    marks.clear()
+    completed.clear()
+    pm.playlist_gap_ms = 100
+    pm.enqueue("3", dm)
+    pm.enqueue("3", dm)
+    quiet(wait_until, lambda: not pm.is_busy(), 3000, pm.poll)
+    starts = [t for name, t in marks if name == "3"]
+    assert_equal(time.ticks_diff(starts[1], starts[0]) >= 100, True, "PLAYLIST_GAP_MS 空けて次のシナリオを開始")
+    assert_equal(len(completed), 1, "間隔を空ける場合も完了コールバックは最後に1回だけ")
+
+    # 停止でプレイリストも破棄
+    marks.clear()
+    pm.playlist_gap_ms = 0
+    pm.enqueue("1", dm)
+    pm.enqueue("2", dm)
+    quiet(wait_until, lambda: marks, 3000, pm.poll)
+    quiet(pm.stop_playback, dm)
+    quiet(wait_until, lambda: not pm.is_busy() and pm.worker.is_idle(), 3000, pm.poll)
+    assert_equal(([name for name, t in marks], pm.playlist), (["1"], []), "停止すると続きのシナリオは再生しない")
+
+    # ワークショップモード: 再生中に次のシナリオを追加
+    auto = AutoPlayController(["2"], Settings)
+    assert_equal(quiet(auto.next_for_playlist, False, 0, False), None, "再生中でなければ追加しない（通常の自動再生で開始）")
+    assert_equal(quiet(auto.next_for_playlist, True, 0, False), "2", "再生中に次のシナリオを選ぶ")
+    assert_equal((auto.next_for_playlist(True, 1, False), auto.next_for_playlist(True, 0, True)), (None, None),
+                 "待機中のシナリオがある場合・セレクトモード中は追加しない")
+    auto.WORKSHOP_PLAYLIST = False
+    assert_equal(auto.next_for_playlist(True, 0, False), None, "WORKSHOP_PLAYLIST = False では追加しない")
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("Playback Worker テストスイート")
+    print("=" * 60)
+
+    test_worker()
+    test_playback_manager()
+    test_preempt()
+    test_playlist()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,114 @@
+"""
+Test suite for pwm_led_controller.py
+
+スタブハードウェア（tests/micropython_stubs.py）上で実行する単体テスト
+実行方法: python tests/test_pwm_led_controller.py
+"""
+
+import sys
+import math
+import contextlib
+import io
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import pwm_led_controller as plc
+
+# pwm_led_controller が参照している config（他のテストが config を差し替えていても同じものを設定する）
+config = plc.config
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+def quiet(func, *args):
+    """ログ出力を抑えて実行"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+def setup(gamma=2.2, max_duty=65535):
+    """4つのLEDで初期化"""
+    config.PWM_LED_PINS = [1, 2, 3, 4]
+    config.PWM_LED_GAMMA = gamma
+    config.PWM_LED_MAX_DUTY = max_duty
+    config.FADE_ENGINE_INTERVAL_MS = 10
+    quiet(plc.init_pwm_leds)
+
+def pow_duty(brightness, gamma=2.2, max_duty=65535):
+    """比較用: 変更前の math.pow による計算"""
+    return int(math.pow(max(0.0, min(100.0, brightness)) / 100.0, gamma) * max_duty)
+
+# ===== 輝度テーブル =====
+def test_duty_table():
+    print("\n=== 輝度テーブル ===")
+
+    setup()
+    assert_equal(len(plc._duty_table), 1001, "0.1% 刻みの1001要素")
+    assert_equal((plc.brightness_to_duty(0), plc.brightness_to_duty(100)), (0, 65535), "0% → 0、100% → 最大デューティ比")
+    grid = [i / 10 for i in range(1001)]
+    assert_equal([plc.brightness_to_duty(b) for b in grid], [pow_duty(b) for b in grid], "0.1% 刻みの輝度は math.pow と一致")
+    assert_equal(plc.brightness_to_duty(50.04), pow_duty(50.0), "0.1% 刻みに丸め")
+    assert_equal((plc.brightness_to_duty(-5), plc.brightness_to_duty(150)), (0, 65535), "範囲外はクリップ")
+
+    config.PWM_LED_GAMMA = 1.0
+    assert_equal(plc.brightness_to_duty(50), pow_duty(50), "初期化後は config を参照しない")
+    setup(gamma=1.0, max_duty=1000)
+    assert_equal(plc.brightness_to_duty(50), 500, "再初期化で PWM_LED_GAMMA・PWM_LED_MAX_DUTY を反映")
+    setup()
+
+# ===== 設定・フェード =====
+def test_set_and_fade():
+    print("\n=== 設定・フェード ===")
+
+    setup()
+    plc.set_brightness(1, 30)
+    assert_equal(plc.pwm_leds[1].duty_u16(), pow_duty(30), "set_brightness() はテーブルの値を設定")
+
+    quiet(plc.fade_pwm_led, 2, 80, 50, [False])
+    assert_equal((plc.get_brightness(2), plc.pwm_leds[2].duty_u16()), (80, pow_duty(80)), "フェード終了時に目標輝度")
+    assert_equal(plc.led_brightness_cache[1:3], [300, 800], "キャッシュは輝度テーブルの整数インデックス")
+
+    plc.set_brightness(1, 33.33)
+    assert_equal(plc.get_brightness(1), 33.3, "get_brightness() は 0.1% 単位のパーセントを返す")
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("PWM LED Controller テストスイート")
+    print("=" * 60)
+
+    test_duty_table()
+    test_set_and_fade()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,216 @@
+"""
+Test suite for scenario_compiler.py
+
+PC上で実行可能な単体テスト
+実行方法: python tests/test_scenario_compiler.py
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+import scenario_compiler as sc
+import fade_controller
+
+# テスト用のサーボ構成（#0: 連続回転型, #1: 角度制御型）
+config.SERVO_CONFIG = [[5, 'continuous'], [6, 'position']]
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+def decode(program):
+    """命令列を [(opcode, [args...]), ...] に展開（検証用）"""
+    result = []
+    pos = 0
+    for op in program.ops:
+        n = sc.OP_ARITY[op]
+        result.append((op, list(program.args[pos:pos + n])))
+        pos += n
+    return result
+
+# ===== 待機コマンド =====
+def test_delay_commands():
+    print("\n=== 待機コマンド ===")
+
+    p = sc.compile_scenario([["delay", 1000], {"type": "delay", "duration": 200}, {"wait_ms": 500}])
+    assert_equal(decode(p), [(sc.OP_DELAY, [1000]), (sc.OP_DELAY, [200]), (sc.OP_WAIT_MS, [500])], "delay/wait_msの変換")
+
+    p = sc.compile_scenario([["delay", -5], ["delay"], {"wait_ms": -1}])
+    assert_equal(len(p), 0, "負数・不正形式の待機は除外")
+
+    p = sc.compile_scenario([["delay", 1.5]])
+    assert_equal(decode(p)[0][0], sc.OP_RAW, "整数以外の引数はOP_RAWに委譲")
+    assert_equal(p.consts[0], ["delay", 1.5], "OP_RAWは元コマンドを保持")
+
+# ===== LED / サウンド =====
+def test_led_and_sound():
+    print("\n=== LED / サウンド ===")
+
+    p = sc.compile_scenario([
+        {"type": "led", "command": "fill", "strip": "LV2", "color": [255, 128, 0], "duration": 300},
+        {"type": "led", "command": "off"},
+        {"type": "led", "command": "fill", "color": [300, 0, 0]},
+    ])
+    ops = decode(p)
+    assert_equal(len(ops), 2, "無効な色のfillは除外")
+    assert_equal(ops[0], (sc.OP_LED_FILL, [0, 255, 128, 0, 300]), "fillの引数")
+    assert_equal(p.consts[0], "LV2", "ストリップ名は定数プールに格納")
+    assert_equal(ops[1], (sc.OP_LED_OFF, []), "off")
+
+    p = sc.compile_scenario([["sound", 2, 3], {"type": "sound", "folder": 1, "file": 4}, ["sound", 1]])
+    assert_equal(decode(p), [(sc.OP_SOUND, [2, 3]), (sc.OP_SOUND, [1, 4])], "sound（リスト・辞書形式）")
+
+    p = sc.compile_scenario([{"type": "sound", "command": "wait_end"}, {"type": "sound", "command": "wait_end", "timeout": 5000},
+                             {"type": "sound", "command": "wait_end", "timeout": -1}])
+    assert_equal(decode(p), [(sc.OP_SOUND_WAIT_END, [0]), (sc.OP_SOUND_WAIT_END, [5000])], "sound wait_end（不正なタイムアウトは除外）")
+
+# ===== PWM LED =====
+def test_pwm_led():
+    print("\n=== PWM LED ===")
+
+    p = sc.compile_scenario([
+        {"led_on": {"led_index": 1, "max_brightness": 150}},
+        {"led_off": {"led_index": 2}},
+        {"led_fade_in": {"led_index": 0, "duration_ms": 800, "max_brightness": 50}},
+        {"led_fade_out": {"led_index": 3, "duration_ms": 400}},
+    ])
+    assert_equal(decode(p), [
+        (sc.OP_PWM_ON, [1, 100]),
+        (sc.OP_PWM_OFF, [2]),
+        (sc.OP_PWM_FADE_IN, [0, 50, 800, 0]),
+        (sc.OP_PWM_FADE_OUT, [3, 400, 0]),
+    ], "PWM LED旧形式の変換と輝度クランプ（イージング省略時は線形: 0）")
+
+    p = sc.compile_scenario([
+        {"led_fade_in": {"led_index": 0, "duration_ms": 800, "easing": "sine"}},
+        {"led_fade_out": {"led_index": 0, "duration_ms": 400, "easing": [0, 0.8, 1]}},
+    ])
+    easings = [args[-1] for _, args in decode(p)]
+    assert_equal((easings[0] == fade_controller.easing_id("sine"), easings[1] == fade_controller.easing_id([0, 0.8, 1]), 0 not in easings),
+                 (True, True, True), "イージング指定（名前・カスタムカーブ）をイージングIDに変換")
+
+# ===== サーボ / モーター =====
+def test_servo_and_motor():
+    print("\n=== サーボ / モーター ===")
+
+    p = sc.compile_scenario([
+        {"type": "servo", "command": "rotate", "servo_index": 0, "speed": 120, "duration_ms": 500},
+        {"type": "servo", "command": "set_angle", "servo_index": 1, "angle": 45},
+        {"type": "servo", "command": "stop_all", "servo_index": 0},
+        {"type": "servo", "command": "rotate", "servo_index": 5, "speed": 10},
+    ])
+    assert_equal(decode(p), [
+        (sc.OP_SERVO_ROTATE, [0, 100, 500]),
+        (sc.OP_SERVO_SET_ANGLE, [1, 45, 0]),
+        (sc.OP_SERVO_STOP_ALL, []),
+    ], "サーボ型に応じた変換・未設定サーボの除外")
+    assert_equal(p.uses_motor, False, "モーター未使用")
+
+    p = sc.compile_scenario([{"type": "motor", "command": "rotate", "angle": 90, "speed": "SLOW", "direction": 3}])
+    ops = decode(p)
+    assert_equal(ops[0][0], sc.OP_MOTOR_ROTATE, "motor rotate")
+    assert_equal((p.consts[ops[0][1][0]], p.consts[ops[0][1][1]], ops[0][1][2]), (90, "SLOW", 1), "角度・速度・方向の補正")
+    assert_equal(p.uses_motor, True, "モーター使用フラグ")
+
+    p = sc.compile_scenario([
+        {"type": "motor", "command": "step", "steps": -10, "speed": 3},
+        {"type": "motor", "command": "move_to", "angle": 90},
+        {"type": "motor", "command": "move_to", "position": 5, "shortest": False},
+        {"type": "motor", "command": "home", "speed": "FAST"},
+        {"type": "motor", "command": "set_home"},
+        {"type": "motor", "command": "move_to"},
+    ])
+    resolved = [(op, [p.consts[v] if k < 2 and op == sc.OP_MOTOR_MOVE_TO else v for k, v in enumerate(args)]) for op, args in decode(p)]
+    assert_equal(resolved[0], (sc.OP_MOTOR_STEP, [-10, resolved[0][1][1], 1]), "motor step（速度は定数プール）")
+    assert_equal(resolved[1:], [
+        (sc.OP_MOTOR_MOVE_TO, [90, "NORMAL", 1, 1]),
+        (sc.OP_MOTOR_MOVE_TO, [5, "NORMAL", 0, 0]),
+        (sc.OP_MOTOR_MOVE_TO, [0, "FAST", 0, 1]),
+        (sc.OP_MOTOR_SET_HOME, []),
+    ], "move_to（角度・位置）・home（原点への move_to）・set_home、目標のない move_to は除外")
+
+# ===== その他 =====
+def test_misc():
+    print("\n=== その他 ===")
+
+    p = sc.compile_scenario([["effect", "fade", "all", [0, 0, 0], [0, 255, 0], 500], {"type": "custom_x"}, {}])
+    ops = decode(p)
+    assert_equal(len(ops), 1, "effectと空コマンドは除外")
+    assert_equal(ops[0][0], sc.OP_RAW, "未知のコマンドはOP_RAW")
+
+    compiled = sc.compile_all({"a": [["delay", 10]], "b": "invalid"})
+    assert_equal(isinstance(compiled["a"], sc.CompiledScenario), True, "compile_allでコンパイル")
+    assert_equal(compiled["b"], "invalid", "リスト以外はそのまま")
+
+# ===== タイムライン =====
+def test_timeline_offsets():
+    print("\n=== タイムライン（開始時刻の計算） ===")
+
+    p = sc.compile_scenario([
+        ["sound", 1, 1],
+        {"type": "led", "command": "fill", "color": [255, 0, 0], "duration": 300},
+        ["delay", 200],
+        {"type": "servo", "command": "rotate", "servo_index": 0, "speed": 50},
+        {"led_fade_in": {"led_index": 0, "duration_ms": 400}},
+        {"type": "custom_x"},
+        {"wait_ms": 100},
+        {"type": "led", "command": "off"},
+    ])
+    assert_equal(list(p.starts), [0, 0, 300, 500, 500, 900, 900, 1000], "各命令の開始時刻（待機・duration付き命令で進む）")
+    assert_equal(p.total_ms, 1000, "シナリオ全体の長さ")
+
+def test_scenarios_json():
+    print("\n=== scenarios.json 全体のコンパイル ===")
+
+    path = Path(__file__).parent.parent / "scenarios.json"
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    compiled = sc.compile_all(data)
+    ok = all(isinstance(v, sc.CompiledScenario) for v in compiled.values())
+    assert_equal(ok, True, f"全{len(data)}シナリオがコンパイル可能")
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("Scenario Compiler テストスイート")
+    print("=" * 60)
+
+    test_delay_commands()
+    test_led_and_sound()
+    test_pwm_led()
+    test_servo_and_motor()
+    test_misc()
+    test_timeline_offsets()
+    test_scenarios_json()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
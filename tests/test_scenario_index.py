@@ -0,0 +1,181 @@
+"""
+Test suite for scenario_index.py
+
+PC上で実行可能な単体テスト
+実行方法: python tests/test_scenario_index.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import scenario_index as si
+
+SCENARIOS_PATH = str(Path(__file__).parent.parent / "scenarios.json")
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+def write_temp_json(text):
+    """一時JSONファイルを作成してパスを返す"""
+    fd, path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return path
+
+# ===== scenarios.json のインデックス =====
+def test_scenarios_json():
+    print("\n=== scenarios.json のインデックス ===")
+
+    with open(SCENARIOS_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    entries = si.build_index(SCENARIOS_PATH)
+    assert_equal([e[0] for e in entries], list(data.keys()), "キーの順序がjson.loadと一致")
+
+    mismatched = [key for key, offset, length in entries
+                  if si.read_scenario(SCENARIOS_PATH, offset, length) != data[key]]
+    assert_equal(mismatched, [], f"全{len(entries)}シナリオの範囲読み込みがjson.loadと一致")
+
+# ===== 紛らわしいJSON =====
+def test_tricky_json():
+    print("\n=== 文字列内の括弧・エスケープ・スカラー値 ===")
+
+    data = {
+        "1": [["delay", 10], {"type": "led", "command": "fill", "strip": "a]{,\"b"}],
+        "テスト": {"nested": [1, {"x": "}"}]},
+        "esc\"key": [],
+        "num": 42,
+        "str": "va,l:ue",
+        "flag": True,
+        "last": None,
+    }
+    path = write_temp_json(json.dumps(data, ensure_ascii=False, indent=2))
+    try:
+        entries = si.build_index(path)
+        assert_equal([e[0] for e in entries], list(data.keys()), "全キーを検出")
+        loaded = {key: si.read_scenario(path, offset, length) for key, offset, length in entries}
+        assert_equal(loaded, data, "各値の範囲が正しい")
+    finally:
+        os.remove(path)
+
+    path = write_temp_json('[1, 2, 3]')
+    try:
+        try:
+            si.build_index(path)
+            raised = False
+        except ValueError:
+            raised = True
+        assert_equal(raised, True, "トップレベルが配列ならValueError")
+    finally:
+        os.remove(path)
+
+# ===== サイドカーファイル =====
+def test_sidecar():
+    print("\n=== サイドカーインデックスの保存と鮮度判定 ===")
+
+    path = write_temp_json('{"1": [["delay", 1]], "2": [["delay", 2]]}')
+    idx_path = si.default_index_path(path)
+    try:
+        assert_equal(idx_path.endswith('.idx'), True, "拡張子は.idx")
+        assert_equal(si.load_index(idx_path, path), None, "未作成ならNone")
+
+        entries = si.load_or_build_index(path)
+        assert_equal(os.path.exists(idx_path), True, "インデックスを保存")
+        assert_equal(si.load_index(idx_path, path), entries, "保存したインデックスを再読み込み")
+
+        # JSONを書き換えるとサイズが変わり、古いインデックスは無効になる
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"1": [["delay", 100]], "2": [["delay", 2]], "3": []}')
+        assert_equal(si.load_index(idx_path, path), None, "JSON更新後は古いインデックスを無効化")
+        entries = si.load_or_build_index(path)
+        assert_equal([e[0] for e in entries], ["1", "2", "3"], "再作成")
+
+        # 同じ内容のままコピー（更新時刻だけが変わる）: ホストで作成したインデックスをそのまま使う
+        st = os.stat(path)
+        os.utime(path, (st.st_atime + 3600, st.st_mtime + 3600))
+        assert_equal(si.load_index(idx_path, path), entries, "更新時刻だけが変わってもインデックスは有効")
+
+        # サイズが同じでも内容が変われば無効
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"1": [["delay", 200]], "2": [["delay", 2]], "3": []}')
+        assert_equal(si.load_index(idx_path, path), None, "同じサイズでも内容が変われば無効化")
+    finally:
+        os.remove(path)
+        if os.path.exists(idx_path):
+            os.remove(idx_path)
+
+# ===== ScenarioStore =====
+def test_store():
+    print("\n=== ScenarioStore ===")
+
+    entries = si.build_index(SCENARIOS_PATH)
+    calls = []
+
+    def fake_compile(commands, name):
+        calls.append(name)
+        return ("compiled", name, len(commands))
+
+    store = si.ScenarioStore(SCENARIOS_PATH, entries, fake_compile)
+    assert_equal(len(store), len(entries), "len()")
+    assert_equal("1" in store, True, "in（存在するキー）")
+    assert_equal("no_such_key" in store, False, "in（存在しないキー）")
+
+    value = store["1"]
+    assert_equal(value[:2], ("compiled", "1"), "読み込み時にcompile_funcを適用")
+    store["1"]
+    assert_equal(calls, ["1"], "同じキーはキャッシュを利用")
+    store["2"]
+    assert_equal(store._cached_key, "2", "キャッシュは直近1件のみ")
+    store.release()
+    assert_equal(store._cached_value, None, "release()でキャッシュ解放")
+
+    try:
+        store["no_such_key"]
+        raised = False
+    except KeyError:
+        raised = True
+    assert_equal(raised, True, "未登録キーはKeyError")
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("Scenario Index テストスイート")
+    print("=" * 60)
+
+    test_scenarios_json()
+    test_tricky_json()
+    test_sidecar()
+    test_store()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -87,6 +87,11 @@ def validate_scenario_content(data):
     print("\n=== シナリオ内容の検証 ===")
     
     for key, scenario in data.items():
+        # 並列トラック形式: {"tracks": {トラック名: コマンドリスト, ...}}
+        if isinstance(scenario, dict) and "tracks" in scenario:
+            validate_tracks(key, scenario["tracks"])
+            continue
+        
         # シナリオはリストである必要がある
         if not isinstance(scenario, list):
             log_fail(f"シナリオ {key}: コマンドリストではありません（{type(scenario).__name__}）")
@@ -98,6 +103,21 @@ def validate_scenario_content(data):
         for idx, cmd in enumerate(scenario):
             validate_command(key, idx, cmd)
 
+def validate_tracks(key, tracks):
+    """並列トラック形式のシナリオの検証"""
+    if not isinstance(tracks, dict) or len(tracks) == 0:
+        log_fail(f"シナリオ {key}: tracks はトラック名とコマンドリストの辞書である必要があります")
+        return
+    
+    for track_name, commands in tracks.items():
+        if not isinstance(commands, list):
+            log_fail(f"シナリオ {key}: トラック '{track_name}' がコマンドリストではありません（{type(commands).__name__}）")
+            continue
+        
+        log_pass(f"シナリオ {key}: トラック '{track_name}' {len(commands)}個のコマンド")
+        for idx, cmd in enumerate(commands):
+            validate_command(f"{key}/{track_name}", idx, cmd)
+
 def validate_command(scenario_key, cmd_idx, cmd):
     """個別コマンドの検証"""
     
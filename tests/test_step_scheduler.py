@@ -0,0 +1,165 @@
+"""
+Test suite for step_scheduler.py と並列トラック再生
+
+スタブハードウェア（tests/micropython_stubs.py）上で実行する単体テスト
+実行方法: python tests/test_step_scheduler.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import config
+import effects
+import step_scheduler
+import servo_rotation_controller
+import pwm_led_controller
+
+# テスト用のハードウェア構成（#0: 連続回転型サーボ, PWM LED 1個）
+config.SERVO_CONFIG = [[5, 'continuous'], [6, 'position']]
+config.SERVO_FREQUENCY = 50
+config.PWM_LED_PINS = [1]
+config.PWM_LED_FREQUENCY = 1000
+
+# タイミング判定の許容誤差（ミリ秒）
+TOLERANCE_MS = 30
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+def elapsed_since(t0):
+    return time.ticks_diff(time.ticks_ms(), t0)
+
+# ===== run_blocking / run_concurrently =====
+def test_scheduler():
+    print("\n=== step_scheduler ===")
+
+    def worker(log, name, count, interval_ms):
+        for i in range(count):
+            log.append(name)
+            yield time.ticks_add(time.ticks_ms(), interval_ms)
+        return name
+
+    log = []
+    assert_equal(step_scheduler.run_blocking(worker(log, "a", 2, 10)), "a", "run_blockingはジェネレーターの戻り値を返す")
+
+    log = []
+    t0 = time.ticks_ms()
+    result = step_scheduler.run_concurrently([worker(log, "a", 4, 25), worker(log, "b", 4, 25)])
+    elapsed = elapsed_since(t0)
+    assert_equal(result, True, "すべて完了でTrue")
+    assert_equal(abs(elapsed - 100) <= TOLERANCE_MS, True, f"2つのステップを並行実行（{elapsed}ms、直列なら200ms）")
+    assert_equal(log[:4], ["a", "b", "a", "b"], "交互に実行")
+
+    cleaned = []
+    def endless():
+        try:
+            while True:
+                yield time.ticks_add(time.ticks_ms(), 10)
+        finally:
+            cleaned.append(True)
+
+    stop_flag = [False]
+    def stopper():
+        yield time.ticks_add(time.ticks_ms(), 30)
+        stop_flag[0] = True
+
+    result = step_scheduler.run_concurrently([endless(), stopper()], stop_flag)
+    assert_equal((result, cleaned), (False, [True]), "停止フラグで中断し、残りのステップをclose()")
+
+# ===== 並列トラック =====
+def test_tracks():
+    print("\n=== 並列トラック（effects） ===")
+
+    servo_rotation_controller.init_servos()
+    pwm_led_controller.init_pwm_leds()
+
+    scenario = {"tracks": {
+        "servo": [{"type": "servo", "command": "rotate", "servo_index": 0, "speed": 50, "duration_ms": 200}],
+        "led": [
+            {"led_fade_in": {"led_index": 0, "duration_ms": 100}},
+            {"led_fade_out": {"led_index": 0, "duration_ms": 100}},
+        ],
+        "cue": [["delay", 150], {"led_on": {"led_index": 0, "max_brightness": 100}}],
+    }}
+
+    # LED #0 のデューティ比の設定（フェードエンジン・led_on の両方）を記録
+    cue_seen = []
+    pwm = pwm_led_controller.pwm_leds[0]
+    original_duty = pwm.duty_u16
+    def tracing_duty(d=None):
+        if d is not None:
+            cue_seen.append((elapsed_since(t0), d))
+        return original_duty(d)
+    pwm.duty_u16 = tracing_duty
+
+    t0 = time.ticks_ms()
+    try:
+        effects.execute_command(scenario, [False])
+    finally:
+        del pwm.duty_u16
+    elapsed = elapsed_since(t0)
+
+    assert_equal(abs(elapsed - 200) <= TOLERANCE_MS, True, f"サーボ回転中にLEDフェードも進行（{elapsed}ms、直列なら400ms以上）")
+    assert_equal(servo_rotation_controller.servos[0].duty_u16(), 0, "時間指定回転の終了時にサーボ停止")
+    fade_updates_during_rotation = [t for t, b in cue_seen if t < 190]
+    assert_equal(len(fade_updates_during_rotation) > 5, True, "回転中にフェードが更新されている")
+
+    # 停止フラグ: 回転中のサーボも停止する
+    stop_flag = [False]
+    effects.register_handler('stop_now', lambda cmd, sf: sf.__setitem__(0, True))
+    scenario = {"tracks": {
+        "servo": [{"type": "servo", "command": "rotate", "servo_index": 0, "speed": 50, "duration_ms": 1000}],
+        "stop": [["delay", 50], ["stop_now"]],
+    }}
+    t0 = time.ticks_ms()
+    effects.execute_command(scenario, stop_flag)
+    elapsed = elapsed_since(t0)
+    assert_equal(elapsed < 200, True, f"停止フラグで全トラックを中断（{elapsed}ms）")
+    assert_equal(servo_rotation_controller.servos[0].duty_u16(), 0, "中断時もサーボ停止")
+    assert_equal(stop_flag[0], True, "中断後も停止フラグは立てたまま（再生ごとに新しいフラグを使う）")
+    del effects._handlers['stop_now']
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("Step Scheduler テストスイート")
+    print("=" * 60)
+
+    test_scheduler()
+    test_tracks()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)
@@ -0,0 +1,294 @@
+"""
+Test suite for stepper_motor.py のタイマー駆動
+
+スタブのタイマー（コールバックを手動で呼び出す）上で実行する単体テスト
+実行方法: python tests/test_stepper_motor.py
+"""
+
+import sys
+import time
+import contextlib
+import io
+from pathlib import Path
+
+# プロジェクトルートとtestsディレクトリをパスに追加
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import micropython_stubs
+micropython_stubs.install()
+
+import stepper_motor
+import step_scheduler
+import motor_command_handler
+
+# stepper_motor が参照している config（他のテストが config を差し替えていても同じものを設定する）
+config = stepper_motor.config
+# テスト用のピン構成・加減速プロファイル
+config.STEPPER_MOTOR_CONFIG = {'AIN1': 9, 'AIN2': 10, 'BIN1': 11, 'BIN2': 15}
+config.STEPPER_PROFILE = 'trapezoid'
+config.STEPPER_MAX_SPEED = 2000
+config.STEPPER_ACCELERATION = 10000
+config.STEPPER_START_SPEED = 200
+
+# テストカウンター
+tests_passed = 0
+tests_failed = 0
+
+def assert_equal(actual, expected, test_name):
+    """テストアサーション"""
+    global tests_passed, tests_failed
+    if actual == expected:
+        tests_passed += 1
+        print(f"✓ {test_name}")
+    else:
+        tests_failed += 1
+        print(f"✗ {test_name}")
+        print(f"  Expected: {expected}")
+        print(f"  Actual: {actual}")
+
+def quiet(func, *args):
+    """ログ出力を抑えて実行"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+class FakeUtime:
+    """stepper_motor の utime を置き換える擬似時計（sleep_ms() の間にタイマーが発火する）"""
+    def __init__(self, motor, on_sleep=None):
+        self.motor = motor
+        self.now = 1000
+        self.sleeps = []
+        self.on_sleep = on_sleep
+
+    def ticks_ms(self):
+        return self.now
+
+    def ticks_add(self, a, b):
+        return a + b
+
+    def ticks_diff(self, a, b):
+        return a - b
+
+    def sleep_ms(self, ms):
+        self.sleeps.append(ms)
+        self.now += ms
+        fire(self.motor)
+        if self.on_sleep:
+            self.on_sleep(self)
+
+def fire(motor):
+    """タイマーのコールバックを1回呼ぶ（設定されていれば）"""
+    timer = motor._timer
+    if timer.callback:
+        timer.callback(timer)
+
+def pins(motor):
+    return [p.value() for p in motor.PINS]
+
+def make_motor(timer_mode=True):
+    config.STEPPER_TIMER_MODE = timer_mode
+    return stepper_motor.StepperMotor(debug=False)
+
+# ===== タイマー駆動の移動 =====
+def test_timer_move():
+    print("\n=== タイマー駆動の移動 ===")
+
+    motor = make_motor()
+    assert_equal(motor.is_timer_driven(), True, "STEPPER_TIMER_MODE でタイマー駆動")
+
+    move = motor.rotate_degrees(270, 2)  # 30ステップ、定速区間 2ms
+    assert_equal((move.done(), move.steps_done, motor.seq_index), (False, 1, 1), "開始直後に戻り、1ステップ目は出力済み")
+    assert_equal(pins(motor), motor.HALF_STEP_SEQUENCE[1], "1ステップ目のパターンを出力")
+    assert_equal((motor._timer.mode, motor._timer.period, motor._timer.tick_hz), (stepper_motor.Timer.ONE_SHOT, 5000, 1000000),
+                 "次のステップまでμs単位のワンショットタイマー（加速区間の先頭は開始速度 200 steps/s）")
+
+    periods = [motor._timer.period]
+    while not move.done():
+        fire(motor)
+        if not move.done():
+            periods.append(motor._timer.period)
+    assert_equal((move.steps_done, move.cancelled, motor.current_step), (30, False, 30), "全ステップを出力して完了")
+    assert_equal(periods, [move.profile.interval_us(i) for i in range(30)], "ステップ実行前に計算済みのプロファイルの間隔")
+    assert_equal((min(periods), periods[-1]), (2000, 5000), "定速区間は指定速度、最後は開始速度まで減速")
+    assert_equal(motor._timer.callback, None, "完了後はタイマー停止")
+
+    move = motor.rotate_steps(10, 0.25)
+    assert_equal(move.profile.cruise_us, 500, "ms未満の速度指定（STEPPER_MAX_SPEED = 2000 steps/s で制限）")
+    move.cancel()
+
+# ===== キャンセル・待機 =====
+def test_cancel_and_wait():
+    print("\n=== キャンセル・待機 ===")
+
+    motor = make_motor()
+    move = motor.rotate_steps(40, 5)
+    fire(motor)
+    assert_equal(move.cancel(), True, "実行中の移動をキャンセル")
+    fire(motor)
+    assert_equal((move.done(), move.cancelled, move.steps_done), (True, True, 2), "キャンセル後はステップを出力しない")
+    assert_equal(move.cancel(), False, "終了済みの移動のキャンセルは何もしない")
+
+    # wait(): 停止フラグは1ステップごとに確認
+    stop_flag = [False]
+    fake = FakeUtime(motor, on_sleep=lambda f: stop_flag.__setitem__(0, len(f.sleeps) >= 3))
+    stepper_motor.utime = fake
+    move = motor.rotate_steps(40, 5)
+    assert_equal(move.wait(stop_flag), False, "停止フラグで中断")
+    assert_equal(move.steps_done, 4, "停止フラグが立ってから1ステップ以内に停止")
+    assert_equal(max(fake.sleeps) <= 8, True, f"確認間隔はステップ間隔（{fake.sleeps}ms）")
+
+    fake.on_sleep = None
+    move = motor.rotate_steps(8, 5)
+    assert_equal((move.wait(), move.steps_done), (True, 8), "wait() は完了まで待機")
+
+    # 並列トラック用の wait_gen(): close() でキャンセル
+    move = motor.rotate_steps(8, 5)
+    steps = motor.rotate_degrees_gen(360, 5)
+    next(steps)
+    assert_equal(move.cancelled, True, "新しい移動の開始で実行中の移動をキャンセル")
+    steps.close()
+    assert_equal((motor._move, motor._timer.callback), (None, None), "close() で移動をキャンセルしタイマー停止")
+
+    stepper_motor.utime = time
+
+# ===== 絶対位置・原点復帰 =====
+def test_absolute_position():
+    print("\n=== 絶対位置・原点復帰 ===")
+
+    motor = make_motor()
+    fake = FakeUtime(motor)
+    stepper_motor.utime = fake
+    motor.rotate_degrees(90, 5, -1).wait()
+    motor.rotate_degrees(540, 5).wait()
+    assert_equal((motor.get_position(), motor.get_angle()), (50, 90.0), "回転数を含む絶対位置と出力軸の角度")
+
+    motor.release()
+    assert_equal(motor.get_position(), 50, "通電解除しても位置を保持")
+
+    move = motor.move_to_angle(315)
+    assert_equal((move.direction, move.steps_total), (-1, 15), "近い方向を選択（90° → 315° は逆転135°）")
+    move.wait()
+    move = motor.home()
+    assert_equal((move.direction, move.steps_total), (1, 5), "原点へ1回の移動で戻る")
+    move.wait()
+    assert_equal((motor.get_position(), motor.get_angle()), (40, 0.0), "原点（1回転を法とする）に到達")
+
+    move = motor.home(shortest=False)
+    move.wait()
+    assert_equal((move.steps_total, motor.get_position()), (40, 0), "shortest=False は回転数も含めて戻す")
+
+    quiet(motor_command_handler.handle, {"type": "motor", "command": "step", "steps": -3}, motor, [False])
+    assert_equal(motor.get_position(), -3, "step コマンド（負のステップ数は逆方向）")
+    quiet(motor_command_handler.handle, {"type": "motor", "command": "move_to", "position": 12}, motor, [False])
+    assert_equal(motor.get_position(), 12, "move_to コマンド（ステップ位置）")
+    quiet(motor_command_handler.handle, {"type": "motor", "command": "set_home"}, motor, [False])
+    quiet(motor_command_handler.handle, {"type": "motor", "command": "move_to", "angle": -90}, motor, [False])
+    assert_equal((motor.get_position(), motor.get_angle()), (-10, 270.0), "set_home 後の move_to コマンド（角度）")
+    stepper_motor.utime = time
+
+# ===== コマンド・タイマーなし =====
+def test_command_and_fallback():
+    print("\n=== モーターコマンド・タイマーなし ===")
+
+    motor = make_motor()
+    fake = FakeUtime(motor)
+    stepper_motor.utime = fake
+    quiet(motor_command_handler.handle, {"type": "motor", "command": "rotate", "angle": 90, "speed": 3}, motor, [False])
+    assert_equal((motor.current_step, motor._move), (10, None), "rotate コマンドは回転終了まで待機")
+    motor.release()
+    stepper_motor.utime = time
+
+    motor = make_motor(timer_mode=False)
+    assert_equal(motor.is_timer_driven(), False, "STEPPER_TIMER_MODE = False ではタイマーを使わない")
+    move = motor.rotate_steps(4, 1)
+    assert_equal((move.done(), move.steps_done, motor.current_step), (True, 4, 4), "回転してから完了済みのハンドルを返す")
+    step_scheduler.run_blocking(motor.rotate_steps_gen(2, 1, -1))
+    assert_equal(motor.current_step, 2, "再開可能ステップ版（逆転）")
+    config.STEPPER_TIMER_MODE = True
+
+# ===== コイル出力 =====
+def test_coil_output():
+    print("\n=== コイル出力 ===")
+
+    motor = make_motor()
+    assert_equal(motor.coil_output, 'pin', "チップを判別できない環境ではピンごとの出力")
+
+    regs = stepper_motor.mem32
+    detect = stepper_motor._sio_out_xor_address
+    stepper_motor._sio_out_xor_address = lambda: 0xd000001c
+    config.STEPPER_COIL_OUTPUT = 'sio'
+    try:
+        motor = make_motor()
+        coil_bits = (1 << 9) | (1 << 10) | (1 << 11) | (1 << 15)
+        assert_equal((motor.coil_output, list(motor._step_masks[:2])), ('sio', [1 << 9, (1 << 9) | (1 << 11)]),
+                     "パターンを GPIO のビットマスクとして事前計算")
+
+        regs.writes.clear()
+        out = 1 << 25  # コイル以外のピン（GP25）が出力中
+        states = []
+        move = motor.rotate_steps(12, 1, -1)
+        while not move.done():
+            fire(motor)
+        for address, value in regs.writes:
+            out ^= value
+            states.append([(out >> g) & 1 for g in (9, 10, 11, 15)])
+        assert_equal(len(regs.writes), 12, "1ステップにつきレジスタへの書き込み1回")
+        assert_equal(all(address == 0xd000001c and not (value & ~coil_bits) for address, value in regs.writes), True,
+                     "GPIO_OUT_XOR にコイルのビットのみ書き込む")
+        assert_equal(states, [motor.HALF_STEP_SEQUENCE[-i % 8] for i in range(1, 13)], "4本のコイルが同時にシーケンスどおり切り替わる")
+
+        motor.release()
+        out ^= regs.writes[-1][1]
+        assert_equal((out & coil_bits, out >> 25 & 1), (0, 1), "release() で全コイルOFF（他のピンは変化しない）")
+
+        # ソフトリセット後など、コイルのピンが HIGH のまま残っている状態から開始
+        out = (1 << 10) | (1 << 15) | (1 << 25)
+        regs.regs[0xd0000010] = out
+        regs.writes.clear()
+        motor = make_motor()
+        move = motor.rotate_steps(2, 1, -1)
+        while not move.done():
+            fire(motor)
+        states = []
+        for address, value in regs.writes:
+            out ^= value
+            states.append([(out >> g) & 1 for g in (9, 10, 11, 15)])
+        assert_equal(states, [[0, 0, 0, 0]] + [motor.HALF_STEP_SEQUENCE[-i % 8] for i in range(1, 3)],
+                     "出力中のマスクを GPIO_OUT から取得（初期化で残っていた出力をOFFにし、シーケンスどおりに切り替え）")
+        del regs.regs[0xd0000010]
+
+        stepper_motor._sio_out_xor_address = lambda: None
+        motor = quiet(make_motor)
+        assert_equal(motor.coil_output, 'pin', "SIO が使えない場合はピンごとの出力にフォールバック")
+        motor.rotate_steps(1, 1).cancel()
+        assert_equal(pins(motor), motor.HALF_STEP_SEQUENCE[1], "フォールバック時もパターンを出力")
+    finally:
+        stepper_motor._sio_out_xor_address = detect
+        config.STEPPER_COIL_OUTPUT = 'auto'
+
+# ===== すべてのテストを実行 =====
+def run_all_tests():
+    print("=" * 60)
+    print("Stepper Motor テストスイート")
+    print("=" * 60)
+
+    test_timer_move()
+    test_cancel_and_wait()
+    test_absolute_position()
+    test_command_and_fallback()
+    test_coil_output()
+
+    print("\n" + "=" * 60)
+    print(f"テスト結果: {tests_passed} 合格 / {tests_failed} 失敗")
+    print("=" * 60)
+
+    if tests_failed == 0:
+        print("✅ すべてのテストが合格しました！")
+        return 0
+    else:
+        print(f"❌ {tests_failed}件のテストが失敗しました")
+        return 1
+
+if __name__ == "__main__":
+    exit_code = run_all_tests()
+    sys.exit(exit_code)